@@ -43,45 +43,188 @@ function setupSocketHandlers() {
   // Maps "cartId:tagId" to last action timestamp
   const rfidCooldownCache = new Map();
   const COOLDOWN_MS = 1000; // 1 second cooldown on backend
+  const WEIGHT_TOLERANCE = 0.3; // 300g tolerance
+  
+  // Returns true if this cart/tag pair was acted on within COOLDOWN_MS,
+  // otherwise records the action time and returns false
+  const checkCooldown = (cartId, tagId, now) => {
+    const cacheKey = `${cartId}:${tagId}`;
+    const lastScan = rfidCooldownCache.get(cacheKey);
+    
+    if (lastScan && (now - lastScan) < COOLDOWN_MS) {
+      const remainingMs = COOLDOWN_MS - (now - lastScan);
+      console.log(`[RFID] ⏱️  Cooldown active for ${tagId} (${(remainingMs/1000).toFixed(1)}s remaining)`);
+      return true;
+    }
+    
+    // Update cooldown cache
+    rfidCooldownCache.set(cacheKey, now);
+    
+    // Periodic cleanup of old cache entries (every 100 scans)
+    if (rfidCooldownCache.size > 100) {
+      const cutoff = now - COOLDOWN_MS;
+      for (const [key, time] of rfidCooldownCache.entries()) {
+        if (time < cutoff) {
+          rfidCooldownCache.delete(key);
+        }
+      }
+    }
+    return false;
+  };
+  
+  // Scans sent with a scanId (Pi option RFID_ACK) are acknowledged with
+  // their outcome. A Pi that missed the ack retransmits the same scanId;
+  // it gets the first outcome again instead of toggling the item twice
+  const processedScans = new Map(); // scanId -> { status, time }
+  const SCAN_ID_TTL_MS = 60000;
+  
+  const rememberScan = (scanId, status, now) => {
+    processedScans.set(scanId, { status, time: now });
+    if (processedScans.size > 1000) {
+      const cutoff = now - SCAN_ID_TTL_MS;
+      for (const [key, entry] of processedScans.entries()) {
+        if (entry.time < cutoff) {
+          processedScans.delete(key);
+        }
+      }
+    }
+  };
+  
+  // Wraps a scan handler that resolves to an outcome status
+  const withAck = (handler) => async (data, ack) => {
+    const reply = typeof ack === "function" ? ack : () => {};
+    const scanId = data && data.scanId;
+    if (scanId) {
+      const seen = processedScans.get(scanId);
+      if (seen) {
+        console.log(`[RFID] Duplicate scan ${scanId} (retransmit) - already ${seen.status}`);
+        reply({ scanId, status: seen.status, duplicate: true });
+        return;
+      }
+      // Claimed before processing so a retransmit arriving meanwhile is not applied
+      rememberScan(scanId, "processing", Date.now());
+    }
+    const status = await handler(data, scanId);
+    if (scanId) {
+      rememberScan(scanId, status, Date.now());
+    }
+    reply({ scanId, status });
+  };
+  
+  const cartItemFromProduct = (product) => ({
+    productId: product.productId,
+    name: product.name,
+    price: product.price,
+    weight: product.weight,
+    expiryDate: product.expiryDate,
+    quantity: 1,
+    image: product.image || "https://via.placeholder.com/150",
+    addedAt: new Date()
+  });
+  
+  const updateCartTotals = (cart) => {
+    cart.totalPrice = cart.items.reduce(
+      (sum, item) => sum + item.price * item.quantity, 
+      0
+    );
+    cart.totalWeight = cart.items.reduce(
+      (sum, item) => sum + item.weight * item.quantity, 
+      0
+    );
+  };
+  
+  // weight_step events (Pi option WEIGHT_STEP_EVENTS) carry the settled
+  // weight change of each item added or removed. A scan is validated
+  // against a recent step of its product's weight first, and against the
+  // measuredWeight snapshot only when no step matches. A scan rejected
+  // because its item had not landed yet is held, and applied when the
+  // matching step arrives
+  const recentSteps = new Map(); // cartId -> [{ delta, confidence, time, used }]
+  const heldScans = new Map(); // cartId -> [{ action, product, scanId, time }]
+  const STEP_WINDOW_MS = 10000; // How long a step and a scan can be apart
+  const STEP_STALE_MS = 60000; // Steps replayed from the Pi's journal later than this are ignored
+  const STEP_TOLERANCE = 0.1; // 100g between a step and the product weight
+  const STEP_MIN_CONFIDENCE = 0.5;
+  
+  const withinWindow = (entries, now) => entries.filter(entry => now - entry.time <= STEP_WINDOW_MS);
+  const signedWeight = (action, product) => (action === 'add' ? 1 : -1) * product.weight;
+  
+  // Consumes the newest unused step matching a weight change, if any
+  const takeStep = (cartId, change, now) => {
+    const steps = withinWindow(recentSteps.get(cartId) || [], now);
+    recentSteps.set(cartId, steps);
+    for (let i = steps.length - 1; i >= 0; i--) {
+      const step = steps[i];
+      if (!step.used && step.confidence >= STEP_MIN_CONFIDENCE && Math.abs(step.delta - change) <= STEP_TOLERANCE) {
+        step.used = true;
+        return step;
+      }
+    }
+    return null;
+  };
+  
+  const holdScan = (cartId, action, product, scanId, now) => {
+    const held = withinWindow(heldScans.get(cartId) || [], now);
+    held.push({ action, product, scanId, time: now });
+    heldScans.set(cartId, held);
+  };
+  
+  // Applies a held scan once its weight_step has arrived
+  const applyHeldScan = async (cartId, scan, step) => {
+    const Cart = require("./models/Cart");
+    const cart = await Cart.findOne({ cartId });
+    if (!cart) {
+      return;
+    }
+    const index = cart.items.findIndex(item => item.productId === scan.product.productId);
+    if (scan.action === 'add' && index === -1) {
+      cart.items.push(cartItemFromProduct(scan.product));
+    } else if (scan.action === 'remove' && index !== -1) {
+      cart.items.splice(index, 1);
+    } else {
+      return; // Cart changed meanwhile
+    }
+    updateCartTotals(cart);
+    await cart.save();
+    console.log(`[Weight] ✅ ${scan.action === 'add' ? 'ADDED' : 'REMOVED'} ${scan.product.name} on cart ${cartId} after its weight step (${step.delta.toFixed(3)}kg)`);
+    io.emit("updateCart", {
+      ...cart.toObject(),
+      action: scan.action,
+      affectedProduct: scan.product.name,
+      scanId: scan.scanId,
+      resolvedBy: "weight_step"
+    });
+  };
   
   io.on("connection", (socket) => {
   console.log("Microcontroller Connected:", socket.id);
 
-  socket.on("rfid_scan", async (data) => {
+  // A presence-mode Pi sends one tag_enter per physical presence instead of a
+  // stream of rfid_scan repeats; both go through the same add/remove toggle
+  // Resolves to the scan's outcome status (acked back when requested)
+  const handleRfidScan = async (data, scanId) => {
     try {
       // Subtask 3.1: Extract and validate event payload
-      const { cartId, tagId, timestamp } = data;
+      const { cartId, tagId, timestamp } = data || {};
       
       if (!cartId || !tagId) {
         console.warn("[RFID] Missing required data: cartId or tagId");
         socket.emit("error", { message: "Missing cartId or tagId" });
-        return;
+        return "invalid";
       }
       
       console.log(`[RFID] Received scan - Cart: ${cartId}, Tag: ${tagId}`);
       
-      // Check backend cooldown to prevent rapid toggles
-      const cacheKey = `${cartId}:${tagId}`;
-      const now = Date.now();
-      const lastScan = rfidCooldownCache.get(cacheKey);
-      
-      if (lastScan && (now - lastScan) < COOLDOWN_MS) {
-        const remainingMs = COOLDOWN_MS - (now - lastScan);
-        console.log(`[RFID] ⏱️  Cooldown active for ${tagId} (${(remainingMs/1000).toFixed(1)}s remaining)`);
-        return; // Silently ignore - still in cooldown
+      // Scans journaled on the Pi while offline arrive late with their
+      // original timestamp
+      const scanAgeMs = timestamp ? Date.now() - new Date(timestamp).getTime() : 0;
+      if (scanAgeMs > 5000) {
+        console.log(`[RFID] Replayed scan from ${timestamp} (${(scanAgeMs / 1000).toFixed(0)}s old)`);
       }
       
-      // Update cooldown cache
-      rfidCooldownCache.set(cacheKey, now);
-      
-      // Periodic cleanup of old cache entries (every 100 scans)
-      if (rfidCooldownCache.size > 100) {
-        const cutoff = now - COOLDOWN_MS;
-        for (const [key, time] of rfidCooldownCache.entries()) {
-          if (time < cutoff) {
-            rfidCooldownCache.delete(key);
-          }
-        }
+      // Check backend cooldown to prevent rapid toggles
+      if (checkCooldown(cartId, tagId, Date.now())) {
+        return "cooldown"; // Silently ignore - still in cooldown
       }
       
       // Load models
@@ -93,15 +236,15 @@ function setupSocketHandlers() {
       if (!cart) {
         console.warn(`[RFID] Cart ${cartId} not found`);
         socket.emit("error", { message: "Cart not found" });
-        return;
+        return "cart_not_found";
       }
       
       // Subtask 3.2: Product lookup by RFID tag
       const product = await Item.findOne({ rfidTag: tagId });
       if (!product) {
         console.warn(`[RFID] Unknown tag: ${tagId}`);
-        io.emit("unknownTag", { cartId, tagId, timestamp: timestamp || new Date().toISOString() });
-        return;
+        io.emit("unknownTag", { cartId, tagId, scanId, timestamp: timestamp || new Date().toISOString() });
+        return "unknown_tag";
       }
       
       // Subtask 3.3: Toggle logic for add/remove with weight validation
@@ -112,7 +255,6 @@ function setupSocketHandlers() {
       // Get current measured weight from cart (updated by weight_update handler)
       const currentMeasuredWeight = cart.measuredWeight || 0;
       const expectedCartWeight = cart.totalWeight || 0;
-      const WEIGHT_TOLERANCE = 0.3; // 300g tolerance
       
       console.log(`[RFID] 🔍 Weight Check - Current Measured: ${currentMeasuredWeight.toFixed(2)}kg, Expected Cart: ${expectedCartWeight.toFixed(2)}kg, Product: ${product.weight}kg`);
       
@@ -123,43 +265,47 @@ function setupSocketHandlers() {
         // Expected: weight should decrease by product.weight
         const expectedWeightAfterRemoval = expectedCartWeight - product.weight;
         const weightDiff = Math.abs(currentMeasuredWeight - expectedWeightAfterRemoval);
+        // The snapshot first: a step is only consumed when it is needed, so
+        // it stays free for a later scan of another item of the same weight
+        const step = weightDiff <= WEIGHT_TOLERANCE ? null : takeStep(cartId, -product.weight, Date.now());
         
-        if (weightDiff <= WEIGHT_TOLERANCE) {
+        if (step || weightDiff <= WEIGHT_TOLERANCE) {
           // Weight decreased as expected - remove item
           cart.items.splice(existingItemIndex, 1);
           action = 'remove';
-          console.log(`[RFID] 🗑️  REMOVED ${product.name} from cart ${cartId} (weight validated: ${currentMeasuredWeight.toFixed(2)}kg)`);
+          const validation = step ? `step ${step.delta.toFixed(3)}kg` : `measured: ${currentMeasuredWeight.toFixed(2)}kg`;
+          console.log(`[RFID] 🗑️  REMOVED ${product.name} from cart ${cartId} (weight validated: ${validation})`);
         } else {
-          // Weight didn't decrease - silently ignore (item not physically removed)
+          // Weight didn't decrease - silently ignore (item not physically removed),
+          // unless its weight step arrives shortly
+          holdScan(cartId, 'remove', product, scanId, Date.now());
           console.log(`[RFID] 🔇 IGNORED removal of ${product.name} - weight unchanged (measured: ${currentMeasuredWeight.toFixed(2)}kg, expected after removal: ${expectedWeightAfterRemoval.toFixed(2)}kg)`);
-          return; // Exit without updating cart or emitting events
+          return "ignored"; // Exit without updating cart or emitting events
         }
       } else {
         // ===== ADD LOGIC =====
         // Expected: weight should increase by product.weight
         const expectedWeightAfterAdd = expectedCartWeight + product.weight;
         const weightDiff = Math.abs(currentMeasuredWeight - expectedWeightAfterAdd);
+        // The snapshot first: a step is only consumed when it is needed, so
+        // it stays free for a later scan of another item of the same weight
+        const step = weightDiff <= WEIGHT_TOLERANCE ? null : takeStep(cartId, product.weight, Date.now());
         
-        if (weightDiff <= WEIGHT_TOLERANCE) {
+        if (step || weightDiff <= WEIGHT_TOLERANCE) {
           // Weight increased as expected - add item
-          cart.items.push({
-            productId: product.productId,
-            name: product.name,
-            price: product.price,
-            weight: product.weight,
-            expiryDate: product.expiryDate,
-            quantity: 1,
-            image: product.image || "https://via.placeholder.com/150",
-            addedAt: new Date()
-          });
+          cart.items.push(cartItemFromProduct(product));
           action = 'add';
-          console.log(`[RFID] ✅ ADDED ${product.name} to cart ${cartId} (weight validated: ${currentMeasuredWeight.toFixed(2)}kg)`);
+          const validation = step ? `step +${step.delta.toFixed(3)}kg` : `measured: ${currentMeasuredWeight.toFixed(2)}kg`;
+          console.log(`[RFID] ✅ ADDED ${product.name} to cart ${cartId} (weight validated: ${validation})`);
         } else {
-          // Weight didn't increase - emit weight mismatch error
+          // Weight didn't increase - emit weight mismatch error; the add is
+          // still applied if the item's weight step arrives shortly
+          holdScan(cartId, 'add', product, scanId, Date.now());
           console.log(`[RFID] ⚠️  WEIGHT MISMATCH - Cannot add ${product.name} (measured: ${currentMeasuredWeight.toFixed(2)}kg, expected: ${expectedWeightAfterAdd.toFixed(2)}kg, diff: ${weightDiff.toFixed(2)}kg)`);
           
           io.emit("weightMismatch", {
             cartId: cartId,
+            scanId,
             productName: product.name,
             action: 'add',
             measuredWeight: currentMeasuredWeight,
@@ -171,19 +317,12 @@ function setupSocketHandlers() {
           socket.emit("error", { 
             message: `Weight mismatch! Cannot add ${product.name}. Expected weight: ${expectedWeightAfterAdd.toFixed(2)}kg, Measured: ${currentMeasuredWeight.toFixed(2)}kg` 
           });
-          return; // Exit without updating cart
+          return "weight_mismatch"; // Exit without updating cart
         }
       }
       
       // Subtask 3.4: Update cart totals
-      cart.totalPrice = cart.items.reduce(
-        (sum, item) => sum + item.price * item.quantity, 
-        0
-      );
-      cart.totalWeight = cart.items.reduce(
-        (sum, item) => sum + item.weight * item.quantity, 
-        0
-      );
+      updateCartTotals(cart);
       
       await cart.save();
       
@@ -191,13 +330,159 @@ function setupSocketHandlers() {
       io.emit("updateCart", {
         ...cart.toObject(),
         action: action,
-        affectedProduct: product.name
+        affectedProduct: product.name,
+        scanId
       });
+      return action === 'add' ? "added" : "removed";
       
     } catch (err) {
       console.error("[RFID] Error processing scan:", err.message);
       socket.emit("error", { message: err.message });
+      return "error";
     }
+  };
+
+  // rfid_scan_batch: { cartId, timestamp, scans: [{ tagId, ageMs }, ...] }
+  // Applies every scan with one cart load, one item query and one save.
+  // The toggles are first validated together against the measured weight
+  // (an armful of items lands on the load cell at once); if that fails,
+  // each toggle is validated on its own like a single rfid_scan.
+  const handleRfidScanBatch = async (data, scanId) => {
+    try {
+      const { cartId, scans, timestamp } = data || {};
+      
+      if (!cartId || !Array.isArray(scans) || scans.length === 0) {
+        console.warn("[RFID] Invalid batch: missing cartId or scans");
+        socket.emit("error", { message: "Missing cartId or scans" });
+        return "invalid";
+      }
+      
+      // Drop repeats within the batch and tags still in cooldown
+      const now = Date.now();
+      const tagIds = [];
+      for (const scan of scans) {
+        const tagId = scan && scan.tagId;
+        if (!tagId || tagIds.includes(tagId) || checkCooldown(cartId, tagId, now)) {
+          continue;
+        }
+        tagIds.push(tagId);
+      }
+      
+      console.log(`[RFID] Received batch - Cart: ${cartId}, ${scans.length} scans, ${tagIds.length} to process`);
+      if (tagIds.length === 0) {
+        return "cooldown";
+      }
+      
+      const Cart = require("./models/Cart");
+      const Item = require("./models/CartItem");
+      
+      const cart = await Cart.findOne({ cartId });
+      if (!cart) {
+        console.warn(`[RFID] Cart ${cartId} not found`);
+        socket.emit("error", { message: "Cart not found" });
+        return "cart_not_found";
+      }
+      
+      const products = await Item.find({ rfidTag: { $in: tagIds } });
+      const productsByTag = new Map(products.map(product => [product.rfidTag, product]));
+      
+      // Plan the toggles in scan order
+      const inCart = new Set(cart.items.map(item => item.productId));
+      const toggles = [];
+      for (const tagId of tagIds) {
+        const product = productsByTag.get(tagId);
+        if (!product) {
+          console.warn(`[RFID] Unknown tag: ${tagId}`);
+          io.emit("unknownTag", { cartId, tagId, scanId, timestamp: timestamp || new Date().toISOString() });
+          continue;
+        }
+        const action = inCart.has(product.productId) ? 'remove' : 'add';
+        if (action === 'remove') {
+          inCart.delete(product.productId);
+        } else {
+          inCart.add(product.productId);
+        }
+        toggles.push({ action, product });
+      }
+      if (toggles.length === 0) {
+        return "unknown_tag";
+      }
+      
+      const currentMeasuredWeight = cart.measuredWeight || 0;
+      const expectedCartWeight = cart.totalWeight || 0;
+      const weightChange = (toggle) => (toggle.action === 'add' ? 1 : -1) * toggle.product.weight;
+      const expectedAfterAll = toggles.reduce((sum, toggle) => sum + weightChange(toggle), expectedCartWeight);
+      
+      let accepted;
+      if (Math.abs(currentMeasuredWeight - expectedAfterAll) <= WEIGHT_TOLERANCE) {
+        accepted = toggles;
+      } else {
+        accepted = [];
+        let expectedWeight = expectedCartWeight;
+        for (const toggle of toggles) {
+          const expectedAfter = expectedWeight + weightChange(toggle);
+          const weightDiff = Math.abs(currentMeasuredWeight - expectedAfter);
+          if (weightDiff <= WEIGHT_TOLERANCE) {
+            accepted.push(toggle);
+            expectedWeight = expectedAfter;
+          } else if (toggle.action === 'add') {
+            console.log(`[RFID] ⚠️  WEIGHT MISMATCH - Cannot add ${toggle.product.name} (measured: ${currentMeasuredWeight.toFixed(2)}kg, expected: ${expectedAfter.toFixed(2)}kg, diff: ${weightDiff.toFixed(2)}kg)`);
+            io.emit("weightMismatch", {
+              cartId: cartId,
+              scanId,
+              productName: toggle.product.name,
+              action: 'add',
+              measuredWeight: currentMeasuredWeight,
+              expectedWeight: expectedAfter,
+              difference: weightDiff,
+              timestamp: timestamp || new Date().toISOString()
+            });
+          } else {
+            console.log(`[RFID] 🔇 IGNORED removal of ${toggle.product.name} - weight unchanged`);
+          }
+        }
+      }
+      if (accepted.length === 0) {
+        return "rejected";
+      }
+      
+      for (const { action, product } of accepted) {
+        if (action === 'add') {
+          cart.items.push(cartItemFromProduct(product));
+        } else {
+          const index = cart.items.findIndex(item => item.productId === product.productId);
+          if (index !== -1) {
+            cart.items.splice(index, 1);
+          }
+        }
+      }
+      updateCartTotals(cart);
+      await cart.save();
+      
+      console.log(`[RFID] ✅ Batch applied to cart ${cartId}: ${accepted.map(t => `${t.action} ${t.product.name}`).join(", ")}`);
+      io.emit("updateCart", {
+        ...cart.toObject(),
+        action: accepted.length === 1 ? accepted[0].action : 'batch',
+        affectedProduct: accepted.map(toggle => toggle.product.name).join(", "),
+        changes: accepted.map(toggle => ({ action: toggle.action, productId: toggle.product.productId })),
+        scanId
+      });
+      return "applied";
+      
+    } catch (err) {
+      console.error("[RFID] Error processing scan batch:", err.message);
+      socket.emit("error", { message: err.message });
+      return "error";
+    }
+  };
+
+  socket.on("rfid_scan", withAck(handleRfidScan));
+  socket.on("tag_enter", withAck(handleRfidScan));
+  socket.on("rfid_scan_batch", withAck(handleRfidScanBatch));
+
+  socket.on("tag_exit", (data) => {
+    const { cartId, tagId, duration, reads } = data || {};
+    console.log(`[RFID] Tag left field - Cart: ${cartId}, Tag: ${tagId} (${reads} reads over ${duration}s)`);
   });
 
   socket.on("weight_update", async (data) => {
@@ -213,6 +498,15 @@ function setupSocketHandlers() {
         return;
       }
       
+      // Samples journaled on the Pi while offline are replayed with their
+      // original timestamp; never let one overwrite a newer reading
+      const parsedTime = timestamp ? new Date(timestamp) : null;
+      const sampleTime = parsedTime && !isNaN(parsedTime) ? parsedTime : new Date();
+      if (cart.lastWeightUpdate && sampleTime < cart.lastWeightUpdate) {
+        console.log(`[Weight] Ignoring stale update for cart ${cartId} from ${timestamp}`);
+        return;
+      }
+      
       // Update cart.measuredWeight with received value
       cart.measuredWeight = measuredWeight;
       
@@ -223,8 +517,8 @@ function setupSocketHandlers() {
       // Set cart.weightDiscrepancy to true if difference exceeds 0.3kg
       cart.weightDiscrepancy = weightDiff > 0.3;
       
-      // Update cart.lastWeightUpdate with current timestamp
-      cart.lastWeightUpdate = new Date();
+      // Update cart.lastWeightUpdate with the sample's timestamp
+      cart.lastWeightUpdate = sampleTime;
       
       // Save cart to database
       await cart.save();
@@ -248,6 +542,43 @@ function setupSocketHandlers() {
       console.error("[Weight] Error processing weight update:", err.message);
     }
   });
+  
+  // weight_step: { cartId, delta, weightBefore, weightAfter, settleSeconds, confidence, settled, timestamp }
+  socket.on("weight_step", async (data) => {
+    try {
+      const { cartId, delta, confidence, settleSeconds, timestamp } = data || {};
+      if (!cartId || typeof delta !== "number") {
+        console.warn("[Weight] Invalid weight_step: missing cartId or delta");
+        return;
+      }
+      
+      const now = Date.now();
+      const stepTime = timestamp ? new Date(timestamp).getTime() : now;
+      if (!isNaN(stepTime) && now - stepTime > STEP_STALE_MS) {
+        console.log(`[Weight] Ignoring stale step for cart ${cartId} from ${timestamp}`);
+        return;
+      }
+      console.log(`[Weight] Step on cart ${cartId}: ${delta > 0 ? '+' : ''}${delta.toFixed(3)}kg (settled in ${settleSeconds}s, confidence ${confidence})`);
+      io.emit("weightStep", data);
+      
+      const step = { delta, confidence: typeof confidence === "number" ? confidence : 1, time: now, used: false };
+      recentSteps.set(cartId, [...withinWindow(recentSteps.get(cartId) || [], now), step]);
+      
+      // A scan that came in before its item landed is applied now
+      const held = withinWindow(heldScans.get(cartId) || [], now);
+      const index = step.confidence >= STEP_MIN_CONFIDENCE
+        ? held.findIndex(scan => Math.abs(signedWeight(scan.action, scan.product) - delta) <= STEP_TOLERANCE)
+        : -1;
+      const [scan] = index !== -1 ? held.splice(index, 1) : [];
+      heldScans.set(cartId, held);
+      if (scan) {
+        step.used = true;
+        await applyHeldScan(cartId, scan, step);
+      }
+    } catch (err) {
+      console.error("[Weight] Error processing weight step:", err.message);
+    }
+  });
   });
 }
 
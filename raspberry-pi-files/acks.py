@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Acknowledged Scans for SmartKart
+Tracks scans sent with a Socket.IO acknowledgement, measures their round
+trip and retransmits the ones the backend never confirmed
+
+Every tracked scan carries a scanId. The backend acks it with the outcome
+({scanId, status}) once the scan is processed and echoes the scanId in the
+updateCart / weightMismatch / unknownTag broadcast it caused, so the Pi can
+time both:
+
+- ack RTT: first send -> ack (backend processing plus two network hops)
+- reply RTT: first send -> matching broadcast, per reply event
+
+A scan with no ack after `timeout` seconds is sent again with the same
+scanId (the backend answers a repeat with the first outcome instead of
+toggling the item twice), with the timeout doubling on each attempt; after
+`retries` retransmits it is counted as lost.
+"""
+
+import itertools
+import os
+import threading
+import time
+
+import metrics
+
+ACK_TIMEOUT = 2.0      # Seconds to wait for an ack before retransmitting
+ACK_RETRIES = 3        # Retransmits before a scan is counted as lost
+REPLY_TIMEOUT = 5.0    # Seconds after the ack to wait for the matching broadcast
+
+# Ack status -> broadcast the backend sends for it; other statuses
+# (cooldown, invalid, ignored, ...) are not broadcast
+REPLY_EVENTS = {
+    'added': 'updateCart',
+    'removed': 'updateCart',
+    'applied': 'updateCart',
+    'weight_mismatch': 'weightMismatch',
+    'rejected': 'weightMismatch',
+    'unknown_tag': 'unknownTag',
+}
+
+PERCENTILES = (50, 95, 99)
+
+
+class AckTracker:
+    """Outstanding acknowledged scans, keyed by scanId"""
+
+    def __init__(self, timeout=ACK_TIMEOUT, retries=ACK_RETRIES, reply_timeout=REPLY_TIMEOUT,
+                 registry=None, prefix=None):
+        """
+        Args:
+            timeout (float): Seconds to wait for the first ack; doubles per retransmit
+            retries (int): Retransmits before giving up on a scan
+            reply_timeout (float): Seconds after the ack to keep waiting for the broadcast
+            registry (metrics.Registry): Where the RTT histograms live (default: metrics.REGISTRY)
+            prefix (str): scanId prefix (default: random per process, so ids
+                from before a restart are not mistaken for new ones)
+        """
+        registry = registry if registry is not None else metrics.REGISTRY
+        self.timeout = timeout
+        self.retries = retries
+        self.reply_timeout = reply_timeout
+        self.prefix = prefix or os.urandom(3).hex()
+        self._ids = itertools.count(1)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self.acked_count = 0     # Scans acknowledged
+        self.replied = 0         # Scans whose broadcast arrived
+        self.retransmits = 0     # Scans sent again after an ack timeout
+        self.lost = 0            # Scans given up on after all retries
+        self.no_reply = 0        # Acked scans whose broadcast never arrived
+        self.statuses = {}       # Ack status -> count
+        self._ack_seconds = registry.histogram(
+            'smartkart_scan_ack_seconds', 'Time from first send of a scan to its ack')
+        self._reply_family = registry.histogram(
+            'smartkart_scan_reply_seconds', 'Time from first send of a scan to the broadcast it caused', ['reply'])
+        self._retransmit_counter = registry.counter(
+            'smartkart_scan_retransmits_total', 'Scans sent again after an ack timeout')
+        self._lost_counter = registry.counter(
+            'smartkart_scan_lost_total', 'Scans never acknowledged after all retransmits')
+        self._reply_seconds = {}
+
+    def __len__(self):
+        return len(self._pending)
+
+    def new_id(self):
+        return f"{self.prefix}-{next(self._ids)}"
+
+    def sent(self, scan_id, event, payload, now=None):
+        """
+        Start tracking a scan that was just emitted with an ack callback.
+
+        Args:
+            scan_id (str): The payload's scanId
+            event (str): Socket.IO event name (kept for retransmits)
+            payload (dict): Payload as sent (kept for retransmits)
+            now (float): time.monotonic() of the send (default: now)
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            self._pending[scan_id] = {
+                'event': event,
+                'payload': payload,
+                'first_sent': now,
+                'deadline': now + self.timeout,
+                'attempts': 1,
+                'acked': False,
+                'replied': False,
+            }
+
+    def forget(self, scan_id):
+        """Stop tracking a scan (e.g. it was journaled instead of sent)"""
+        with self._lock:
+            self._pending.pop(scan_id, None)
+
+    def acked(self, response, now=None):
+        """
+        Handle the backend's ack.
+
+        Args:
+            response (dict): {scanId, status[, duplicate]} from the backend
+            now (float): time.monotonic() the ack arrived (default: now)
+
+        Returns:
+            str: The ack status, or None for an unknown or repeated ack
+        """
+        if now is None:
+            now = time.monotonic()
+        if not isinstance(response, dict):
+            return None
+        scan_id = response.get('scanId')
+        status = response.get('status')
+        with self._lock:
+            entry = self._pending.get(scan_id)
+            if entry is None or entry['acked']:
+                return None
+            entry['acked'] = True
+            self.acked_count += 1
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            self._ack_seconds.record(now - entry['first_sent'])
+            # A repeat's broadcast went out with the first attempt (and may
+            # have been missed); only wait for one the backend will send
+            if entry['replied'] or response.get('duplicate') or status not in REPLY_EVENTS:
+                del self._pending[scan_id]
+            else:
+                entry['deadline'] = now + self.reply_timeout
+        return status
+
+    def replied_to(self, reply_event, scan_id, now=None):
+        """
+        Handle an updateCart / weightMismatch / unknownTag carrying a scanId.
+
+        The broadcast is usually received just before the ack. Only the first
+        broadcast per scan is timed (a batch can cause several).
+
+        Returns:
+            bool: True if it matched an outstanding scan of this service
+        """
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            entry = self._pending.get(scan_id)
+            if entry is None or entry['replied']:
+                return False
+            entry['replied'] = True
+            self.replied += 1
+            histogram = self._reply_seconds.get(reply_event)
+            if histogram is None:
+                histogram = self._reply_seconds[reply_event] = self._reply_family.labels(reply_event)
+            histogram.record(now - entry['first_sent'])
+            if entry['acked']:
+                del self._pending[scan_id]
+        return True
+
+    def expire(self, now=None):
+        """
+        Find scans whose ack (or broadcast) is overdue.
+
+        Returns:
+            tuple: (retransmit, lost) - retransmit is a list of
+                (scan_id, event, payload) to send again now, lost a list of
+                scanIds given up on
+        """
+        if now is None:
+            now = time.monotonic()
+        retransmit, lost = [], []
+        with self._lock:
+            for scan_id, entry in list(self._pending.items()):
+                if entry['deadline'] > now:
+                    continue
+                if entry['acked']:
+                    del self._pending[scan_id]
+                    self.no_reply += 1
+                elif entry['attempts'] > self.retries:
+                    del self._pending[scan_id]
+                    self.lost += 1
+                    self._lost_counter.inc()
+                    lost.append(scan_id)
+                else:
+                    entry['deadline'] = now + self.timeout * 2 ** entry['attempts']
+                    entry['attempts'] += 1
+                    self.retransmits += 1
+                    self._retransmit_counter.inc()
+                    retransmit.append((scan_id, entry['event'], entry['payload']))
+        return retransmit, lost
+
+    def next_deadline(self):
+        """
+        time.monotonic() at which expire() next has work.
+
+        Returns:
+            float: Deadline, or None when nothing is outstanding
+        """
+        with self._lock:
+            if not self._pending:
+                return None
+            return min(entry['deadline'] for entry in self._pending.values())
+
+    def stats(self):
+        """
+        Counters and round-trip percentiles.
+
+        Returns:
+            dict: outstanding, acked, replied, retransmits, lost, no_reply,
+                statuses, 'ack' {count, p50, p95, p99} and 'replies'
+                {reply event: {count, p50, p95, p99}}, times in seconds
+        """
+        return {
+            'outstanding': len(self._pending),
+            'acked': self.acked_count,
+            'replied': self.replied,
+            'retransmits': self.retransmits,
+            'lost': self.lost,
+            'no_reply': self.no_reply,
+            'statuses': dict(self.statuses),
+            'ack': _summary(self._ack_seconds),
+            'replies': {event: _summary(histogram) for event, histogram in list(self._reply_seconds.items())},
+        }
+
+
+def _summary(histogram):
+    summary = {'count': histogram.count}
+    for q in PERCENTILES:
+        summary[f'p{q}'] = histogram.percentile(q)
+    return summary
+
+
+def format_stats(stats):
+    """
+    Format AckTracker.stats() for the service log.
+
+    Returns:
+        str: e.g. 'ack p50/p95/p99 12.1/30.5/48.0ms (40) | updateCart ... | 1 retransmits, 0 lost'
+    """
+    def rtt(name, summary):
+        values = '/'.join(f"{summary[f'p{q}'] * 1000:.1f}" for q in PERCENTILES)
+        return f"{name} p50/p95/p99 {values}ms ({summary['count']})"
+
+    parts = [rtt('ack', stats['ack'])]
+    parts.extend(rtt(event, summary) for event, summary in sorted(stats['replies'].items()))
+    parts.append(f"{stats['retransmits']} retransmits, {stats['lost']} lost, {stats['outstanding']} outstanding")
+    return ' | '.join(parts)
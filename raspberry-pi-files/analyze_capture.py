@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+RDM6300 Capture Analyzer
+Vectorized (NumPy) decoder for long raw serial captures
+
+Loads a raw byte capture of one RDM6300 reader with np.memmap, finds every
+STX/ETX-aligned 14-byte frame with array operations and validates hex and
+XOR checksums for all candidates at once. Timestamped captures recorded
+by rfid_service (capture.py format) are also accepted; each reader in
+them is analyzed separately. The framing rules are the same
+as rdm6300.FrameDecoder (and the original rfid_service.read_tag):
+
+- Bytes before the next STX are garbage
+- An STX without ETX 13 bytes later is skipped (no_etx)
+- An aligned frame is consumed whether or not it validates, so STX bytes
+  inside it are never examined
+- A trailing STX with fewer than 14 bytes after it is left pending
+
+Reports per-tag read counts, the rejection breakdown (same reason names as
+FrameDecoder.rejected) and per-tag inter-read timing histograms. Raw
+captures carry no timestamps, so frame times are derived from the byte
+offset at the line rate (10 bits per byte at --baud); for timestamped
+captures each frame gets the read time of the chunk that completed it.
+
+Usage:
+    python3 analyze_capture.py capture.bin [--baud 9600] [--json report.json]
+    python3 analyze_capture.py capture.skc [--reader reader2] [--json report.json]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from rdm6300 import STX, ETX, PACKET_SIZE
+from capture import is_capture, read_capture
+
+# Inter-read gap histogram bin edges in milliseconds
+DEFAULT_BIN_EDGES_MS = (0, 10, 20, 30, 50, 75, 100, 150, 250, 500, 1000, 5000, float('inf'))
+
+# Hex digit value for every byte, 0xFF if it is not an ASCII hex digit
+_HEX_VALUE = np.full(256, 0xFF, dtype=np.uint8)
+for _value, _char in enumerate(b'0123456789ABCDEF'):
+    _HEX_VALUE[_char] = _value
+    _HEX_VALUE[_char | 0x20] = _value
+del _value, _char
+
+
+def load_capture(path):
+    """Memory-map a raw capture file as a uint8 array (empty if nothing was captured)"""
+    if os.path.getsize(path) == 0:
+        return np.empty(0, np.uint8)   # np.memmap cannot map an empty file
+    return np.memmap(path, dtype=np.uint8, mode='r')
+
+
+def load_timed_capture(path):
+    """
+    Load a timestamped capture (capture.py format) per reader.
+
+    Returns:
+        dict: reader_id -> (uint8 data, chunk end offsets, chunk times in seconds)
+    """
+    chunks = {}
+    for capture_time, reader_id, data in read_capture(path):
+        chunks.setdefault(reader_id, []).append((capture_time, data))
+    readers = {}
+    for reader_id, reader_chunks in chunks.items():
+        data = np.frombuffer(b''.join(chunk for _, chunk in reader_chunks), dtype=np.uint8)
+        ends = np.cumsum([len(chunk) for _, chunk in reader_chunks])
+        times = np.array([capture_time for capture_time, _ in reader_chunks], dtype=float)
+        readers[reader_id] = (data, ends, times)
+    return readers
+
+
+def chunk_times(offsets, chunk_ends, times):
+    """Frame times from the read time of the chunk holding each frame's ETX"""
+    index = np.searchsorted(chunk_ends, offsets + PACKET_SIZE - 1, side='right')
+    return times[index]
+
+
+def _select_frames(candidates):
+    """
+    Greedy in-order selection of non-overlapping 14-byte frames.
+
+    A candidate that starts inside an already accepted frame is never seen
+    by the sequential decoder. Only runs of candidates closer than 14 bytes
+    need the sequential pass; everything else is kept as-is.
+    """
+    if len(candidates) < 2:
+        return candidates
+    close = np.diff(candidates) < PACKET_SIZE
+    if not close.any():
+        return candidates
+
+    keep = np.ones(len(candidates), dtype=bool)
+    # Indices of candidates that follow a close predecessor
+    for index in np.flatnonzero(close) + 1:
+        # Find the last kept candidate before this one within the same run
+        previous = index - 1
+        while not keep[previous]:
+            previous -= 1
+        if candidates[index] < candidates[previous] + PACKET_SIZE:
+            keep[index] = False
+    return candidates[keep]
+
+
+def decode_capture(data):
+    """
+    Decode a whole capture with FrameDecoder-equivalent framing.
+
+    Args:
+        data (np.ndarray): uint8 array of raw reader bytes
+
+    Returns:
+        dict: {
+            'offsets': byte offset of each valid frame,
+            'tags': uint64 40-bit tag value of each valid frame,
+            'frames': valid frame count,
+            'rejected': {reason: count} like FrameDecoder.rejected,
+            'pending_bytes': trailing bytes of an incomplete frame,
+        }
+    """
+    data = np.asarray(data, dtype=np.uint8)
+    size = len(data)
+
+    stx = np.flatnonzero(data == STX)
+    complete = stx[stx + PACKET_SIZE <= size]
+    aligned = complete[data[complete + 13] == ETX]
+    frames = _select_frames(aligned)
+
+    # STX bytes outside accepted frames: skipped (no_etx) or trailing pending
+    if len(frames):
+        owner = np.searchsorted(frames, stx, side='right') - 1
+        inside = (owner >= 0) & (stx < frames[np.maximum(owner, 0)] + PACKET_SIZE)
+    else:
+        inside = np.zeros(len(stx), dtype=bool)
+    loose = stx[~inside]
+    no_etx = int(np.count_nonzero(loose + PACKET_SIZE <= size))
+    trailing = loose[loose + PACKET_SIZE > size]
+    pending = int(size - trailing[0]) if len(trailing) else 0
+
+    # Validate every aligned frame at once
+    fields = data[frames[:, None] + np.arange(1, 13)]
+    values = _HEX_VALUE[fields]
+    bad_hex = (values > 15).any(axis=1)
+    nibbles = values.astype(np.uint64) & 0xF
+    frame_bytes = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    checksum = np.bitwise_xor.reduce(frame_bytes[:, :5], axis=1)
+    bad_checksum = ~bad_hex & (checksum != frame_bytes[:, 5])
+    valid = ~bad_hex & ~bad_checksum
+
+    tag_values = np.zeros(len(frames), dtype=np.uint64)
+    for i in range(5):
+        tag_values = (tag_values << np.uint64(8)) | frame_bytes[:, i]
+
+    garbage = size - PACKET_SIZE * len(frames) - no_etx - pending
+    return {
+        'offsets': frames[valid],
+        'tags': tag_values[valid],
+        'frames': int(np.count_nonzero(valid)),
+        'rejected': {
+            'garbage_bytes': int(garbage),
+            'no_etx': no_etx,
+            'bad_hex': int(np.count_nonzero(bad_hex)),
+            'bad_checksum': int(np.count_nonzero(bad_checksum)),
+            'overflow_bytes': 0,
+        },
+        'pending_bytes': pending,
+    }
+
+
+def format_tag(value):
+    return '%010X' % int(value)
+
+
+def tag_counts(result):
+    """Return {tag_id: valid read count}, most frequent first"""
+    values, counts = np.unique(result['tags'], return_counts=True)
+    order = np.argsort(-counts, kind='stable')
+    return {format_tag(values[i]): int(counts[i]) for i in order}
+
+
+def inter_read_histograms(result, times, bin_edges_ms=DEFAULT_BIN_EDGES_MS):
+    """
+    Histogram the gaps between consecutive reads of the same tag.
+
+    Args:
+        result (dict): Output of decode_capture()
+        times (np.ndarray): Time in seconds of each valid frame
+        bin_edges_ms (tuple): Histogram bin edges in milliseconds
+
+    Returns:
+        dict: tag_id -> list of counts per bin
+    """
+    edges = np.asarray(bin_edges_ms, dtype=float)
+    tags = result['tags']
+    if not len(tags):
+        return {}
+    order = np.argsort(tags, kind='stable')
+    sorted_tags = tags[order]
+    sorted_times = np.asarray(times, dtype=float)[order]
+    # Gap to the previous read of the same tag (frames are time-ordered per tag)
+    same = sorted_tags[1:] == sorted_tags[:-1]
+    gaps_ms = np.diff(sorted_times) * 1000
+    starts = np.flatnonzero(np.r_[True, ~same])
+    ends = np.r_[starts[1:], len(sorted_tags)]
+
+    histograms = {}
+    for start, end in zip(starts, ends):
+        tag_gaps = gaps_ms[start:end - 1]
+        counts, _ = np.histogram(tag_gaps, bins=edges)
+        histograms[format_tag(sorted_tags[start])] = counts.tolist()
+    return histograms
+
+
+def line_times(offsets, baud):
+    """Frame times derived from byte offsets at 10 bits per byte"""
+    return offsets.astype(float) * 10 / baud
+
+
+def print_report(result, counts, histograms, bin_edges_ms, total_bytes):
+    print("=" * 60)
+    print("RDM6300 Capture Analysis")
+    print("=" * 60)
+    print(f"Bytes: {total_bytes}, valid frames: {result['frames']}, "
+          f"pending: {result['pending_bytes']} bytes")
+
+    print("\nRejections:")
+    for reason, count in result['rejected'].items():
+        print(f"  {reason:15s} {count}")
+
+    print("\nReads per tag:")
+    for tag, count in counts.items():
+        print(f"  {tag}  {count}")
+
+    labels = []
+    for low, high in zip(bin_edges_ms[:-1], bin_edges_ms[1:]):
+        labels.append(f"{low:g}+" if high == float('inf') else f"{low:g}-{high:g}")
+    print("\nInter-read gap histogram (ms):")
+    print("  " + " " * 10 + "".join(f"{label:>10s}" for label in labels))
+    for tag, bins in histograms.items():
+        print(f"  {tag}" + "".join(f"{count:10d}" for count in bins))
+    print("=" * 60)
+
+
+def analyze(data, times_for):
+    """Decode one reader's bytes and build its JSON-ready report"""
+    result = decode_capture(data)
+    counts = tag_counts(result)
+    histograms = inter_read_histograms(result, times_for(result['offsets']))
+    print_report(result, counts, histograms, DEFAULT_BIN_EDGES_MS, len(data))
+    return {
+        'bytes': int(len(data)),
+        'frames': result['frames'],
+        'pending_bytes': result['pending_bytes'],
+        'rejected': result['rejected'],
+        'tag_counts': counts,
+        'histogram_bin_edges_ms': [edge if edge != float('inf') else None
+                                   for edge in DEFAULT_BIN_EDGES_MS],
+        'inter_read_histograms': histograms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vectorized RDM6300 capture analyzer")
+    parser.add_argument('capture', help='raw byte capture of one reader, or a capture.py capture')
+    parser.add_argument('--baud', type=int, default=9600, help='line rate used to derive frame times')
+    parser.add_argument('--reader', help='only analyze this reader of a capture.py capture')
+    parser.add_argument('--json', help='also write the report as JSON to this path')
+    args = parser.parse_args()
+
+    if is_capture(args.capture):
+        readers = load_timed_capture(args.capture)
+        if args.reader:
+            if args.reader not in readers:
+                print(f"Reader {args.reader} not in capture (found: {', '.join(readers)})")
+                return 1
+            readers = {args.reader: readers[args.reader]}
+        report = {}
+        for reader_id, (data, ends, times) in readers.items():
+            print(f"\n[{reader_id}]")
+            report[reader_id] = analyze(
+                data, lambda offsets, ends=ends, times=times: chunk_times(offsets, ends, times))
+    else:
+        report = analyze(load_capture(args.capture), lambda offsets: line_times(offsets, args.baud))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.json}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Load test of the rfid_service serial path against emulated RDM6300 readers
+
+Starts N rdm6300_emulator readers with the requested error injection,
+opens them with rfid_service.initialize_readers() and runs the unmodified
+select / poll / threads read loops for a fixed window. Reports decoded
+frames/sec, the share of intact emulated frames that were decoded, the
+decoder rejection counters and the read loop thread's CPU use.
+
+    python3 bench_emulated_readers.py [--readers 8] [--speed 1] [--modes select,threads]
+        [--noise 0.05 --truncate 0.02 --bad-checksum 0.02 --burst 0.05] [--profile out.prof]
+
+--speed 0 streams as fast as the ptys accept (extreme load); --profile
+runs each loop under cProfile and writes the stats (one file per mode).
+"""
+
+import argparse
+import cProfile
+import threading
+import time
+
+import rfid_service
+from rdm6300_emulator import EmulatorFleet
+
+LOOPS = {
+    'select': rfid_service.select_readers,
+    'poll': rfid_service.poll_readers,
+    'threads': rfid_service.thread_readers,
+}
+
+
+def run(mode, args):
+    """Run one read loop against a fresh emulator fleet; return a result dict"""
+    fleet = EmulatorFleet(args.readers, seed=args.seed, speed=args.speed, noise=args.noise,
+                          truncate=args.truncate, bad_checksum=args.bad_checksum, burst=args.burst)
+    for index, emulator in enumerate(fleet.readers):
+        emulator.present('%010X' % (0xC000000000 + index))
+    readers = rfid_service.initialize_readers(fleet.paths)
+    decoders = {}
+    decoded = [0]
+    stop_event = threading.Event()
+    cpu = {}
+
+    def on_tags(label, tags):
+        decoded[0] += len(tags)
+
+    def target():
+        profiler = cProfile.Profile() if args.profile else None
+        start = time.thread_time()
+        if profiler:
+            profiler.enable()
+        LOOPS[mode](readers, decoders, on_tags, stop_event)
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(f"{args.profile}.{mode}")
+        cpu['seconds'] = time.thread_time() - start
+
+    loop = threading.Thread(target=target, name=f"loop-{mode}")
+    loop.start()
+    fleet.start()
+    start = time.perf_counter()
+    time.sleep(args.seconds)
+    # Stop generating first, then let the loop drain what is queued
+    for emulator in fleet.readers:
+        emulator.clear()
+    time.sleep(0.3)
+    elapsed = time.perf_counter() - start
+    stop_event.set()
+    loop.join()
+    for _, _, reader in readers:
+        reader.close()
+    fleet.stop()
+
+    generated = sum(emulator.frames for emulator in fleet.readers)
+    overrun = sum(emulator.overrun_bytes for emulator in fleet.readers)
+    rejected = {}
+    for decoder in decoders.values():
+        for reason, count in decoder.rejected.items():
+            rejected[reason] = rejected.get(reason, 0) + count
+    return {
+        'frames_per_sec': decoded[0] / elapsed,
+        'decoded': decoded[0],
+        'generated': generated,
+        'overrun_bytes': overrun,
+        'rejected': rejected,
+        'cpu': cpu.get('seconds', 0.0) / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', type=int, default=8, help='emulated readers')
+    parser.add_argument('--seconds', type=float, default=5.0, help='measurement window per mode')
+    parser.add_argument('--modes', default='select,threads,poll', help='read loops to test')
+    parser.add_argument('--speed', type=float, default=1.0, help='frame rate multiplier (0 = unthrottled)')
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--truncate', type=float, default=0.0)
+    parser.add_argument('--bad-checksum', type=float, default=0.0)
+    parser.add_argument('--burst', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=6300)
+    parser.add_argument('--profile', help='write cProfile stats to PROFILE.<mode>')
+    args = parser.parse_args()
+
+    print("=" * 60)
+    print("Emulated Reader Load Test")
+    print("=" * 60)
+    speed = 'unthrottled' if args.speed <= 0 else f'{args.speed:g}x line rate'
+    print(f"Readers: {args.readers}, speed: {speed}, window: {args.seconds}s")
+    print(f"Errors: noise={args.noise} truncate={args.truncate} "
+          f"bad_checksum={args.bad_checksum} burst={args.burst}")
+
+    results = {}
+    for mode in args.modes.split(','):
+        results[mode] = run(mode, args)
+
+    print(f"\n{'mode':>8} {'frames/s':>10} {'decoded':>9} {'of intact':>10} {'loop CPU':>9} {'overrun':>8}")
+    for mode, result in results.items():
+        share = result['decoded'] / result['generated'] if result['generated'] else 0.0
+        print(f"{mode:>8} {result['frames_per_sec']:10.0f} {result['decoded']:9d} {share:10.1%} "
+              f"{result['cpu']:9.1%} {result['overrun_bytes']:8d}")
+        rejected = ' '.join(f"{reason}={count}" for reason, count in result['rejected'].items() if count)
+        if rejected:
+            print(f"{'':8s} rejected: {rejected}")
+    if args.profile:
+        print(f"\nProfiles written to {args.profile}.<mode> (python3 -m pstats)")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Overhead benchmark for the metrics.py instrumentation
+
+Times the individual metric operations, then the instrumented
+rfid_service.read_tags() against the same read path without metrics
+(bench_rdm6300.decoder_read_tags) with one frame per read, the worst case
+for per-event overhead. Run it on the target board (e.g. Pi Zero):
+
+    python3 bench_metrics.py [--ops 200000] [--frames 20000]
+"""
+
+import argparse
+import random
+import time
+
+import metrics
+import rfid_service
+from bench_rdm6300 import decoder_read_tags, run
+from test_rdm6300 import noisy_stream
+
+BUDGET_US = 3.0  # Allowed instrumentation cost per event on the hot path
+
+
+def per_op(fn, ops):
+    """Microseconds per call of fn, best of 3"""
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(ops):
+            fn()
+        elapsed = (time.perf_counter() - start) / ops * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics instrumentation overhead")
+    parser.add_argument('--ops', type=int, default=200000, help='calls per micro-benchmark')
+    parser.add_argument('--frames', type=int, default=20000, help='frames for the read path comparison')
+    args = parser.parse_args()
+
+    registry = metrics.Registry()
+    histogram = registry.histogram('bench_seconds', 'bench')
+    labeled = registry.histogram('bench_labeled_seconds', 'bench', ['reader'])
+    counter = registry.counter('bench_total', 'bench')
+    perf_counter = time.perf_counter
+
+    def instrumented():
+        start = perf_counter()
+        labeled.labels('reader1').record(perf_counter() - start)
+
+    def timed():
+        with histogram.time():
+            pass
+
+    baseline = per_op(lambda: None, args.ops)
+    results = [
+        ("Histogram.record()", per_op(lambda: histogram.record(0.000123), args.ops)),
+        ("labels().record()", per_op(lambda: labeled.labels('reader1').record(0.000123), args.ops)),
+        ("Counter.inc()", per_op(counter.inc, args.ops)),
+        ("perf_counter x2 + labels().record()", per_op(instrumented, args.ops)),
+        ("with Histogram.time()", per_op(timed, args.ops)),
+    ]
+
+    print("=" * 60)
+    print("Metrics Overhead Benchmark")
+    print("=" * 60)
+    print(f"{'operation':38s} {'µs/op':>8}")
+    for name, cost in results:
+        print(f"{name:38s} {cost - baseline:8.3f}")
+
+    # Whole read path, one frame per read: instrumented vs bare
+    stream = noisy_stream(random.Random(14), args.frames)
+    plain_costs, instrumented_costs = [], []
+    for _ in range(5):
+        frames, plain, _ = run(decoder_read_tags, stream, 14)
+        plain_costs.append(plain / frames)
+        frames, instr, _ = run(rfid_service.read_tags, stream, 14)
+        instrumented_costs.append(instr / frames)
+    overhead = (min(instrumented_costs) - min(plain_costs)) * 1e6
+    print(f"\nread_tags per frame: {min(plain_costs) * 1e6:.2f} µs bare, "
+          f"{min(instrumented_costs) * 1e6:.2f} µs instrumented ({overhead:+.2f} µs)")
+    verdict = "within" if overhead <= BUDGET_US else "OVER"
+    print(f"Hot path overhead {verdict} the {BUDGET_US:g} µs/event budget")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: original bytes-based read_tag() vs rdm6300.FrameDecoder
+
+Feeds the same captured-style byte streams through both parsers in
+serial-sized chunks and reports decoded frames per second. Run it on the
+target board (e.g. Pi Zero) to see the per-reader parsing budget:
+
+    python3 bench_rdm6300.py [--frames 20000] [--chunk 14]
+"""
+
+import argparse
+import random
+import time
+
+from rdm6300 import FrameDecoder, encode_frame
+from test_rdm6300 import FakeSerial, legacy_parse, noisy_stream
+
+
+def legacy_read_tag(serial_connection, buffer_dict, reader_id):
+    """Original read_tag(): append with +=, then one parse step (<= 1 tag)"""
+    if reader_id not in buffer_dict:
+        buffer_dict[reader_id] = b''
+    if serial_connection.in_waiting > 0:
+        buffer_dict[reader_id] += serial_connection.read(serial_connection.in_waiting)
+    tag = legacy_parse(buffer_dict, reader_id)
+    return [] if tag is None else [tag]
+
+
+def decoder_read_tags(serial_connection, buffer_dict, reader_id):
+    """Current read_tags(): drain the port through the ring buffer"""
+    decoder = buffer_dict.get(reader_id)
+    if decoder is None:
+        decoder = buffer_dict[reader_id] = FrameDecoder()
+    waiting = serial_connection.in_waiting
+    if waiting == 0:
+        return []
+    return decoder.drain(serial_connection, waiting)
+
+
+def run(read_tags, stream, chunk_size):
+    """Poll like main() does until the stream is consumed; return (tags, seconds)"""
+    ser = FakeSerial(stream, chunk_size)
+    buffers = {}
+    decoded = 0
+    polls = 0
+    idle_polls = 0
+    start = time.perf_counter()
+    while idle_polls < 64:
+        ser.poll()
+        polls += 1
+        tags = read_tags(ser, buffers, 'reader1')
+        if tags:
+            decoded += len(tags)
+            idle_polls = 0
+        elif ser.pos >= len(stream):
+            idle_polls += 1
+    return decoded, time.perf_counter() - start, polls
+
+
+def parse_only(parser, stream, chunk_size):
+    """Feed chunks directly and parse until stuck; return (tags, seconds)"""
+    if parser == 'legacy':
+        buffers = {'reader1': b''}
+
+        def feed(chunk):
+            buffers['reader1'] += chunk
+
+        def pending():
+            return len(buffers['reader1'])
+
+        def step():
+            return legacy_parse(buffers, 'reader1')
+    else:
+        decoder = FrameDecoder()
+        feed = decoder.feed
+        pending = decoder.__len__
+        step = decoder.next_frame
+
+    decoded = 0
+    start = time.perf_counter()
+    for offset in range(0, len(stream), chunk_size):
+        feed(stream[offset:offset + chunk_size])
+        while True:
+            before = pending()
+            if step() is not None:
+                decoded += 1
+            elif pending() == before:
+                break
+    return decoded, time.perf_counter() - start, None
+
+
+def report(name, stream, results):
+    """Print one result block and check both parsers agree"""
+    legacy_count, legacy_time, _ = results['legacy']
+    decoder_count, decoder_time, _ = results['decoder']
+    assert legacy_count == decoder_count, "Parsers disagree on decoded frame count"
+    print(f"\n[{name}] {len(stream)} bytes, {decoder_count} valid frames")
+    for label, (count, elapsed, polls) in results.items():
+        polls_note = f"  {polls:6d} polls" if polls is not None else ""
+        print(f"  {label:8s} {elapsed * 1000:8.1f} ms  {count / elapsed:10.0f} frames/s  "
+              f"{elapsed / len(stream) * 1e9:7.0f} ns/byte{polls_note}")
+    print(f"  speedup  {legacy_time / decoder_time:.2f}x")
+
+
+def best_of(repeat, func, *args):
+    """Return (tags, fastest seconds, polls) over several runs"""
+    best = None
+    for _ in range(repeat):
+        decoded, elapsed, polls = func(*args)
+        if best is None or elapsed < best[1]:
+            best = (decoded, elapsed, polls)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=20000, help='frames per stream')
+    parser.add_argument('--chunk', type=int, default=14, help='bytes arriving per poll')
+    parser.add_argument('--repeat', type=int, default=5, help='best-of repetitions')
+    args = parser.parse_args()
+
+    rng = random.Random(6300)
+    streams = {
+        'clean': encode_frame('0A1B2C3D4E') * args.frames,
+        'noisy': noisy_stream(rng, args.frames),
+    }
+
+    print("=" * 60)
+    print("RDM6300 Parser Benchmark")
+    print("=" * 60)
+    print(f"Frames per stream: {args.frames}, chunk: {args.chunk} bytes/poll")
+
+    for name, stream in streams.items():
+        # Full polling path as main() runs it: in_waiting + read + parse.
+        # The legacy path needs extra polls to work off its backlog.
+        report(f"{name}, polled read", stream, {
+            'legacy': best_of(args.repeat, run, legacy_read_tag, stream, args.chunk),
+            'decoder': best_of(args.repeat, run, decoder_read_tags, stream, args.chunk),
+        })
+        # Parser alone, without the serial stand-in overhead
+        report(f"{name}, parse only", stream, {
+            'legacy': best_of(args.repeat, parse_only, 'legacy', stream, args.chunk),
+            'decoder': best_of(args.repeat, parse_only, 'decoder', stream, args.chunk),
+        })
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Tag-to-emit latency and idle CPU: poll loop vs select loop in rfid_service
+
+Creates pseudo-terminal pairs that stand in for the RDM6300 readers, opens
+them through pyserial exactly like initialize_reader() does, and runs
+rfid_service.poll_readers() and rfid_service.select_readers() in turn:
+
+- Latency: a frame is written to a random reader at random intervals and
+  the time until the loop hands the tag to its emit callback is recorded.
+- Idle CPU: the loop runs with no traffic and the process CPU time used
+  is measured.
+
+No backend connection is needed. Usage:
+
+    python3 bench_read_latency.py [--frames 100] [--idle 10]
+"""
+
+import argparse
+import os
+import random
+import threading
+import time
+import tty
+
+import serial
+
+import rfid_service
+from rdm6300 import encode_frame
+
+
+def open_pty_reader(index):
+    """Create a pty pair; return (master_fd, reader tuple for the loops)"""
+    master, slave = os.openpty()
+    tty.setraw(master)
+    port = os.ttyname(slave)
+    reader = serial.Serial(port=port, baudrate=rfid_service.BAUD_RATE,
+                           timeout=rfid_service.SERIAL_TIMEOUT)
+    os.close(slave)
+    return master, (f'reader{index + 1}', f'Reader {index + 1}', reader)
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def measure(loop, readers, masters, frames, idle_seconds, rng):
+    """Run one read loop; return (latencies in ms, idle CPU %)"""
+    stop_event = threading.Event()
+    emitted = []
+
+    def on_tags(label, tags):
+        now = time.perf_counter()
+        emitted.extend((tag, now) for tag in tags)
+
+    thread = threading.Thread(target=loop, args=(readers, {}, on_tags, stop_event), daemon=True)
+    thread.start()
+    time.sleep(0.2)
+
+    # Idle CPU: nothing is written, only the loop's own wake-ups cost CPU
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    time.sleep(idle_seconds)
+    idle_cpu = (time.process_time() - cpu_start) / (time.perf_counter() - wall_start) * 100
+
+    # Latency: one distinct tag per frame so emits can be matched to writes
+    latencies = []
+    for i in range(frames):
+        tag = '%010X' % (0xA000000000 + i)
+        master = rng.choice(masters)
+        emitted.clear()
+        written_at = time.perf_counter()
+        os.write(master, encode_frame(tag))
+        deadline = written_at + 1.0
+        while time.perf_counter() < deadline:
+            hit = next((t for emitted_tag, t in emitted if emitted_tag == tag), None)
+            if hit is not None:
+                latencies.append((hit - written_at) * 1000)
+                break
+            time.sleep(0.0005)
+        time.sleep(rng.uniform(0.02, 0.12))
+
+    stop_event.set()
+    thread.join(timeout=rfid_service.SELECT_TIMEOUT + 1)
+    return latencies, idle_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--frames', type=int, default=100, help='frames to time per loop')
+    parser.add_argument('--idle', type=float, default=10.0, help='idle seconds per loop')
+    parser.add_argument('--readers', type=int, default=2, help='emulated readers')
+    args = parser.parse_args()
+
+    rng = random.Random(6300)
+    ptys = [open_pty_reader(i) for i in range(args.readers)]
+    masters = [master for master, _ in ptys]
+    readers = [reader for _, reader in ptys]
+
+    print("=" * 60)
+    print("RFID Read Loop Latency / Idle CPU Benchmark")
+    print("=" * 60)
+    print(f"Readers: {args.readers}, frames: {args.frames}, idle window: {args.idle}s")
+
+    try:
+        for name, loop in (('poll', rfid_service.poll_readers), ('select', rfid_service.select_readers)):
+            latencies, idle_cpu = measure(loop, readers, masters, args.frames, args.idle, rng)
+            print(f"\n[{name}]")
+            if latencies:
+                print(f"  latency  p50={percentile(latencies, 0.50):6.2f} ms  "
+                      f"p95={percentile(latencies, 0.95):6.2f} ms  max={max(latencies):6.2f} ms  "
+                      f"({len(latencies)}/{args.frames} frames)")
+            else:
+                print("  latency  no frames received")
+            print(f"  idle CPU {idle_cpu:.3f}% of one core")
+    finally:
+        for master, (_, _, reader) in ptys:
+            reader.close()
+            os.close(master)
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Reader pool scaling benchmark: aggregate scans/sec vs number of readers
+
+Each reader is an rdm6300_emulator.EmulatedReader opened through
+rfid_service.initialize_readers() like a real port. By default the
+emulators are paced at the reader's line rate (9600 baud, ~68 frames/s, the
+same as an RDM6300 with a tag held in the field), so with a working pool
+the aggregate rate should grow linearly with the reader count.
+--unthrottled streams as fast as the pty accepts to find the CPU ceiling.
+
+    python3 bench_reader_pool.py [--readers 1,2,4,8] [--seconds 5] [--unthrottled]
+"""
+
+import argparse
+import time
+
+from rdm6300 import PACKET_SIZE
+from rdm6300_emulator import EmulatorFleet, BITS_PER_BYTE
+from reader_pool import ReaderPool
+import rfid_service
+
+FRAME_SECONDS = PACKET_SIZE * BITS_PER_BYTE / rfid_service.BAUD_RATE
+
+
+def run(reader_count, seconds, unthrottled):
+    """Run the pool against N emulated readers; return (scans/s, per-reader stats)"""
+    fleet = EmulatorFleet(reader_count, speed=0 if unthrottled else 1)
+    for index, emulator in enumerate(fleet.readers):
+        emulator.present('%010X' % (0xB000000000 + index))
+    readers = rfid_service.initialize_readers(fleet.paths)
+    pool = ReaderPool(readers)
+
+    pool.start()
+    fleet.start()
+
+    # Single emitter: drain the queue for the measurement window
+    consumed = 0
+    start = time.perf_counter()
+    deadline = start + seconds
+    while time.perf_counter() < deadline:
+        if pool.get(timeout=0.1) is not None:
+            consumed += 1
+    elapsed = time.perf_counter() - start
+    stats = pool.stats()
+
+    pool.stop()
+    for _, _, reader in readers:
+        reader.close()
+    fleet.stop()
+    return consumed / elapsed, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--readers', default='1,2,4,8', help='comma-separated reader counts')
+    parser.add_argument('--seconds', type=float, default=5.0, help='measurement window per run')
+    parser.add_argument('--unthrottled', action='store_true', help='write frames as fast as possible')
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.readers.split(',')]
+
+    print("=" * 60)
+    print("Reader Pool Scaling Benchmark")
+    print("=" * 60)
+    pacing = "unthrottled" if args.unthrottled else f"{1 / FRAME_SECONDS:.1f} frames/s per reader (line rate)"
+    print(f"Emulators: {pacing}, window: {args.seconds}s")
+    print(f"\n{'readers':>8} {'scans/s':>10} {'per reader':>11} {'scaling':>8} {'dropped':>8}")
+
+    baseline = None
+    for count in counts:
+        rate, stats = run(count, args.seconds, args.unthrottled)
+        if baseline is None:
+            baseline = rate / count
+        dropped = sum(s['dropped'] for s in stats.values())
+        print(f"{count:8d} {rate:10.1f} {rate / count:11.1f} {rate / (baseline * count):7.0%} {dropped:8d}")
+        spread = ', '.join(f"{rid}={s['scans_per_sec']:.0f}" for rid, s in stats.items())
+        print(f"{'':8s} per-reader scans/s: {spread}")
+
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Cost and step-response benchmark for the weight filters (weight_filters.py)
+
+For every filter: the time one call takes over a full sample window (what
+the sampler thread pays per HX711 read), and, over many synthetic item
+drops with noise, settling overshoot and spikes
+(test_weight_filters.synthetic_signal), how long the estimate takes to
+settle within --tolerance of the new load, and the worst error in three
+parts:
+
+    steady      load steady (before the drop, and once settled)
+    transient   from the drop until settled (overshoot while settling)
+    start       the first START_SAMPLES samples: with fewer than three
+                there is no median to tell a spike from the load
+
+'mean' is the previous behavior (average of the last 5 samples).
+Run it on the target board (e.g. Pi Zero):
+
+    python3 bench_weight_filters.py [--calls 5000] [--drops 50] [--rate 10]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from test_weight_filters import (
+    SCALE_FACTOR, ZERO_OFFSET, run_filter, step_latency, synthetic_signal, to_weight)
+from weight_filters import HISTORY, MeanFilter, make_filter
+
+FILTERS = ('mean', 'median', 'ema', 'kalman')
+STEP_AT = 3.0
+START_SAMPLES = 2
+
+
+def build(name):
+    if name == 'mean':
+        return MeanFilter(to_weight)
+    return make_filter(ZERO_OFFSET, SCALE_FACTOR, name)
+
+
+def per_call(weight_filter, raw, calls):
+    """Microseconds per filter call over a full window, best of 3"""
+    window = raw[-weight_filter.history:]
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        for _ in range(calls):
+            weight_filter(window)
+        elapsed = (time.perf_counter() - start) / calls * 1e6
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--calls', type=int, default=5000, help='filter calls per cost measurement')
+    parser.add_argument('--drops', type=int, default=50, help='synthetic item drops per filter')
+    parser.add_argument('--rate', type=float, default=10.0, help='HX711 samples per second (10 or 80)')
+    parser.add_argument('--noise', type=float, default=0.01, help='noise RMS in kg')
+    parser.add_argument('--spikes', type=float, default=0.02, help='spike probability per sample')
+    parser.add_argument('--tolerance', type=float, default=0.02, help='settled when within this many kg')
+    args = parser.parse_args()
+
+    signals = [synthetic_signal(rate=args.rate, step_at=STEP_AT, noise_kg=args.noise,
+                                spike_rate=args.spikes, seed=seed)
+               for seed in range(args.drops)]
+    history_raw = signals[0][2][:HISTORY]
+
+    print(f"{args.drops} item drops of 0.5 kg at {args.rate:g} SPS, noise {args.noise * 1000:.0f} g RMS, "
+          f"{args.spikes:.0%} spikes")
+    print(f"{'filter':<8} {'us/call':>8} {'settle p50':>11} {'settle p95':>11} "
+          f"{'steady max':>11} {'transient max':>14} {'start max':>10}")
+    for name in FILTERS:
+        weight_filter = build(name)
+        cost = per_call(weight_filter, history_raw, args.calls)
+        latencies = []
+        steady = []
+        transient = []
+        start = []
+        for times, truth, raw in signals:
+            estimates = run_filter(weight_filter, raw)
+            errors = np.abs(estimates - truth)
+            latency = step_latency(times, truth, estimates, STEP_AT, args.tolerance)
+            latencies.append(latency)
+            settling = (times >= STEP_AT) & (times < STEP_AT + latency)
+            start.append(errors[:START_SAMPLES].max())
+            if settling.any():
+                transient.append(errors[settling].max())
+            # Spikes on an empty cart and on the settled load both count
+            steady.append(errors[START_SAMPLES:][~settling[START_SAMPLES:]].max())
+        print(f"{name:<8} {cost:>8.1f} {np.percentile(latencies, 50):>10.2f}s "
+              f"{np.percentile(latencies, 95):>10.2f}s {max(steady) * 1000:>9.0f} g "
+              f"{max(transient, default=0.0) * 1000:>12.0f} g {max(start) * 1000:>8.0f} g")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,64 +2,137 @@
 """
 HX711 Calibration Script
 Run this to calibrate your weight sensor
+
+Each point is read until its mean is known to within --precision kg
+(calibration.measure()), so a quiet load cell takes a second or two per
+point. On a first calibration (no profile yet) the raw counts per kg are
+not known: the empty cart and the first weight are read for a few seconds,
+the scale is estimated from them, and both are then read on to the same
+precision. Several known weights give a least-squares fit with a residual
+check. The result is written to the cart's calibration profile, which
+weight_sensor.py loads at startup - nothing to paste by hand. Stop the
+weight service first (it owns the HX711 pins).
+
+    python3 calibrate_sensor.py                     # empty + one known weight
+    python3 calibrate_sensor.py --weights 0.5,1,2.5 # multi-point fit
+    python3 calibrate_sensor.py --zero-only         # re-tare, keep the scale
 """
 
-import time
+import argparse
+import sys
+
+import calibration
 import weight_sensor
 
-def get_raw_reading(samples=10):
-    """Get average raw reading"""
-    readings = []
-    for i in range(samples):
-        raw_data = weight_sensor.hx.get_raw_data()
-        if raw_data:
-            if isinstance(raw_data, list):
-                readings.extend(raw_data)
-            else:
-                readings.append(raw_data)
-        time.sleep(0.1)
-    
-    if readings:
-        return sum(readings) / len(readings)
-    return 0
+
+def read_point(label, target_stderr, max_samples, values=None):
+    """Measure one point; without a target (scale not known yet) read a provisional block"""
+    print(f"Reading {label}...")
+    if target_stderr is None:
+        measurement = calibration.measure(weight_sensor.read_raw, 0.0,
+                                          max_samples=calibration.PROVISIONAL_SAMPLES, values=values)
+        status = "  (provisional)"
+    else:
+        measurement = calibration.measure(weight_sensor.read_raw, target_stderr,
+                                          max_samples=max_samples, values=values)
+        status = "" if measurement.converged else "  (did not converge - is the cart moving?)"
+    print(f"  {measurement.mean:.2f} ±{measurement.stderr:.2f} from {measurement.samples} samples "
+          f"in {measurement.seconds:.1f}s, {measurement.rejected} spikes ignored{status}")
+    return measurement
+
 
 def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--weights', help='known weights in kg, comma separated (asked for if omitted)')
+    parser.add_argument('--zero-only', action='store_true', help='only re-measure the zero offset')
+    parser.add_argument('--precision', type=float, default=calibration.PRECISION_KG,
+                        help='target standard error per point in kg')
+    parser.add_argument('--max-samples', type=int, default=calibration.MAX_SAMPLES,
+                        help='stop a point after this many conversions')
+    parser.add_argument('--profile', default=calibration.CALIBRATION_PATH, help='calibration profile to write')
+    args = parser.parse_args()
+
     print("=" * 60)
     print("HX711 Weight Sensor Calibration")
     print("=" * 60)
-    
+
     if not weight_sensor.REAL_HARDWARE:
         print("Error: Real hardware not detected!")
-        return
-    
+        return 1
+
     # Initialize
     weight_sensor.initialize_hx711()
-    
+    profile = calibration.load_profile(args.profile)
+    # Stop rule in raw counts, from the current scale. Without a profile it
+    # is set once the first weight has been read (the built-in default
+    # scale is nowhere near a real load cell's)
+    target_stderr = args.precision * abs(profile.scale_factor) if profile is not None else None
+
+    if args.zero_only:
+        if profile is None:
+            print(f"Error: no calibration profile at {args.profile}; run a full calibration first")
+            return 1
+        input("\nRemove ALL weight from the cart and press Enter...")
+        zero = read_point("zero offset", target_stderr, args.max_samples)
+        print(f"Zero moved by {profile.to_kg(zero.mean) * 1000:+.1f}g")
+        profile.rezero(zero.mean)
+        calibration.save_profile(profile, args.profile)
+        print(f"\nSaved to {args.profile}")
+        return 0
+
+    if args.weights:
+        known_weights = [float(weight) for weight in args.weights.split(',')]
+    else:
+        known_weights = [float(input("\nEnter the weight you'll place on the sensor (in kg): "))]
+
     # Step 1: Tare (zero)
     input("\nStep 1: Remove ALL weight from the sensor and press Enter...")
-    print("Reading zero offset (this may take a few seconds)...")
-    zero_offset = get_raw_reading(20)
-    print(f"Zero offset: {zero_offset:.2f}")
-    
-    # Step 2: Calibrate with known weight
-    known_weight = float(input("\nStep 2: Enter the weight you'll place on the sensor (in kg): "))
-    input(f"Now place {known_weight}kg on the sensor and press Enter...")
-    print("Reading with weight (this may take a few seconds)...")
-    weight_reading = get_raw_reading(20)
-    print(f"Reading with weight: {weight_reading:.2f}")
-    
-    # Calculate calibration factor
-    scale_factor = (weight_reading - zero_offset) / known_weight
+    zero_values = []
+    provisional_zero = target_stderr is None
+    zero = read_point("zero offset", target_stderr, args.max_samples, zero_values)
+    points = [(0.0, zero)]
+
+    # Step 2: Each known weight
+    step = 2
+    for known_weight in known_weights:
+        input(f"\nStep {step}: Place {known_weight}kg on the sensor and press Enter...")
+        step += 1
+        values = []
+        measurement = read_point(f"{known_weight}kg", target_stderr, args.max_samples, values)
+        if target_stderr is None and known_weight:
+            scale = (measurement.mean - zero.mean) / known_weight
+            if scale == 0:
+                print("Error: the reading did not change with the weight - check the load cell wiring")
+                return 1
+            target_stderr = args.precision * abs(scale)
+            print(f"  Provisional scale {scale:.2f} counts/kg: reading on to ±{target_stderr:.2f} counts")
+            measurement = read_point(f"{known_weight}kg", target_stderr, args.max_samples, values)
+        points.append((known_weight, measurement))
+
+    # First calibration: the zero was only read provisionally
+    if provisional_zero and target_stderr is not None and zero.stderr > target_stderr:
+        input(f"\nStep {step}: Remove ALL weight again and press Enter to finish the zero reading...")
+        points[0] = (0.0, read_point("zero offset", target_stderr, args.max_samples, zero_values))
+
+    try:
+        profile = calibration.CalibrationProfile.from_points(points, cart_id=calibration.CART_ID)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
     print("\n" + "=" * 60)
     print("CALIBRATION RESULTS")
     print("=" * 60)
-    print(f"Zero Offset: {zero_offset:.2f}")
-    print(f"Scale Factor: {scale_factor:.2f}")
-    print("\nUpdate your weight_sensor.py with these values:")
-    print(f"  ZERO_OFFSET = {zero_offset:.2f}")
-    print(f"  SCALE_FACTOR = {scale_factor:.2f}")
-    print("\nThen use: weight_kg = (raw_reading - ZERO_OFFSET) / SCALE_FACTOR")
+    print(f"Zero Offset: {profile.zero_offset:.2f}")
+    print(f"Scale Factor: {profile.scale_factor:.4f}")
+    if len(points) > 2:
+        print(f"Fit residual: {profile.residual_kg * 1000:.1f}g RMS")
+        if profile.residual_kg > 3 * args.precision:
+            print("Warning: the points are not on a line - check the weights and that nothing touches the cart")
+    calibration.save_profile(profile, args.profile)
+    print(f"\nSaved to {args.profile}; restart the weight service to use it")
     print("=" * 60)
+    return 0
+
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
@@ -0,0 +1,307 @@
+#!/usr/bin/env python3
+"""
+Calibration Engine for SmartKart
+Statistically terminated HX711 measurements, multi-point least-squares
+calibration fits, per-cart calibration profiles and automatic re-zeroing
+
+calibrate_sensor.py used to average a fixed 20 reads per phase, 0.1s apart,
+and print constants to paste into weight_sensor.py. Now:
+
+- measure() reads conversions until the standard error of their mean is
+  below a target (robust to spikes: samples more than OUTLIER_MADS scaled
+  MADs from the median are left out), so a quiet load cell is done in a
+  second and a noisy one takes the samples it needs, up to max_samples
+- fit() is a least-squares line raw = zero_offset + scale_factor * kg
+  through any number of (known kg, measured raw) points, weighted by each
+  point's standard error, with the residual in kg as a quality check
+- the result is a CalibrationProfile saved as JSON (one per cart,
+  CALIBRATION_PATH) that weight_sensor loads at startup
+- AutoZero watches a cart the backend knows to be empty: once the weight
+  has been steady for AUTOZERO_SECONDS the zero offset is re-measured from
+  the raw samples, so creep and temperature drift are tared out without
+  anyone running the calibration again
+"""
+
+import json
+import math
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+CART_ID = os.getenv('CART_ID', '1234')
+CALIBRATION_PATH = os.getenv(
+    'CALIBRATION_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), f'calibration-{CART_ID}.json'))
+
+PRECISION_KG = 0.002        # Target standard error of a calibration point
+MIN_SAMPLES = 8             # Conversions before the stop rule is checked
+MAX_SAMPLES = 800           # Give up converging after this many (10-80 s)
+PROVISIONAL_SAMPLES = 30    # Conversions per point before the scale is known (first calibration)
+OUTLIER_MADS = 5.0          # Samples this many scaled MADs from the median are ignored
+STDERR_FLOOR = 1.0          # Raw counts; fit weights are capped at 1 / STDERR_FLOOR^2
+
+# Auto re-zero: empty cart, weight steady within AUTOZERO_STABLE_KG for
+# AUTOZERO_SECONDS, zero moved by AUTOZERO_MIN_SHIFT_KG but less than
+# AUTOZERO_MAX_KG (more than that is something in the cart, not drift)
+AUTOZERO = os.getenv('WEIGHT_AUTOZERO', '1').lower() in ('1', 'true', 'yes')
+AUTOZERO_SECONDS = float(os.getenv('WEIGHT_AUTOZERO_SECONDS', '10'))
+AUTOZERO_STABLE_KG = 0.005
+AUTOZERO_MIN_SHIFT_KG = 0.003
+AUTOZERO_MAX_KG = 0.2
+
+PROFILE_VERSION = 1
+
+
+def _utc_now():
+    return datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+class Measurement:
+    """Mean of the conversions read for one calibration point"""
+
+    __slots__ = ('mean', 'stderr', 'samples', 'rejected', 'seconds', 'converged')
+
+    def __init__(self, mean, stderr, samples, rejected, seconds, converged):
+        self.mean = mean
+        self.stderr = stderr
+        self.samples = samples
+        self.rejected = rejected
+        self.seconds = seconds
+        self.converged = converged
+
+    def __repr__(self):
+        return (f"Measurement({self.mean:.2f} ±{self.stderr:.2f}, {self.samples} samples, "
+                f"{self.rejected} rejected, {self.seconds:.1f}s)")
+
+
+def robust_mean(values):
+    """
+    Mean and standard error of the values, outliers left out.
+
+    Returns:
+        tuple: (mean, stderr, inliers, rejected)
+    """
+    median = statistics.median(values)
+    mad = statistics.median(abs(value - median) for value in values) * 1.4826
+    if mad > 0:
+        inliers = [value for value in values if abs(value - median) <= OUTLIER_MADS * mad]
+    else:
+        inliers = list(values)
+    mean = sum(inliers) / len(inliers)
+    stderr = statistics.stdev(inliers) / math.sqrt(len(inliers)) if len(inliers) > 1 else math.inf
+    return mean, stderr, len(inliers), len(values) - len(inliers)
+
+
+def measure(read, target_stderr, min_samples=MIN_SAMPLES, max_samples=MAX_SAMPLES, clock=time.monotonic,
+            values=None):
+    """
+    Read until the mean is known to within target_stderr.
+
+    Args:
+        read (callable): Blocking read returning a list of raw conversions
+            (or one number), e.g. weight_sensor.read_raw
+        target_stderr (float): Stop once the mean's standard error (raw
+            counts) is at or below this
+        min_samples (int): Conversions before the stop rule applies
+        max_samples (int): Stop (not converged) after this many
+        clock (callable): Time source for the duration
+        values (list): Conversions already read for this point; new ones
+            are appended, so passing the same list again resumes the point
+            (e.g. with a tighter target once the scale is known)
+
+    Returns:
+        Measurement
+    """
+    start = clock()
+    values = [] if values is None else values
+    mean, stderr, inliers, rejected = 0.0, math.inf, 0, 0
+    while len(values) < max_samples:
+        result = read()
+        values.extend(result if isinstance(result, (list, tuple)) else [result])
+        if len(values) < min_samples:
+            continue
+        mean, stderr, inliers, rejected = robust_mean(values)
+        if stderr <= target_stderr:
+            return Measurement(mean, stderr, inliers, rejected, clock() - start, True)
+    if values:
+        mean, stderr, inliers, rejected = robust_mean(values)
+    return Measurement(mean, stderr, inliers, rejected, clock() - start, False)
+
+
+def fit(points):
+    """
+    Weighted least-squares calibration line raw = zero_offset + scale_factor * kg.
+
+    Args:
+        points (list): (kg, Measurement) pairs; at least two distinct kg
+
+    Returns:
+        tuple: (zero_offset, scale_factor, residual_kg) where residual_kg is
+            the RMS distance of the points from the line, in kg
+
+    Raises:
+        ValueError: Fewer than two distinct known weights
+    """
+    if len({kg for kg, _ in points}) < 2:
+        raise ValueError("Calibration needs at least two different known weights (e.g. empty and one weight)")
+    # Points measured to a tighter standard error count more; the floor keeps
+    # a perfectly quiet point from taking all the weight
+    weights = [1.0 / max(measurement.stderr, STDERR_FLOOR) ** 2 if math.isfinite(measurement.stderr) else 0.0
+               for _, measurement in points]
+    if not any(weights):
+        weights = [1.0] * len(points)
+    total = sum(weights)
+    mean_kg = sum(w * kg for w, (kg, _) in zip(weights, points)) / total
+    mean_raw = sum(w * m.mean for w, (_, m) in zip(weights, points)) / total
+    sxx = sum(w * (kg - mean_kg) ** 2 for w, (kg, _) in zip(weights, points))
+    sxy = sum(w * (kg - mean_kg) * (m.mean - mean_raw) for w, (kg, m) in zip(weights, points))
+    scale_factor = sxy / sxx
+    zero_offset = mean_raw - scale_factor * mean_kg
+    residual_kg = math.sqrt(sum(((m.mean - zero_offset) / scale_factor - kg) ** 2 for kg, m in points) / len(points))
+    return zero_offset, scale_factor, residual_kg
+
+
+class CalibrationProfile:
+    """One cart's calibration, as saved to CALIBRATION_PATH"""
+
+    def __init__(self, zero_offset, scale_factor, cart_id=CART_ID, points=(), residual_kg=None,
+                 calibrated_at=None, rezeroed_at=None):
+        self.zero_offset = zero_offset
+        self.scale_factor = scale_factor
+        self.cart_id = cart_id
+        self.points = list(points)        # [{'kg', 'raw', 'stderr', 'samples'}]
+        self.residual_kg = residual_kg
+        self.calibrated_at = calibrated_at or _utc_now()
+        self.rezeroed_at = rezeroed_at
+
+    @classmethod
+    def from_points(cls, points, cart_id=CART_ID):
+        """Fit a profile to (kg, Measurement) pairs"""
+        zero_offset, scale_factor, residual_kg = fit(points)
+        return cls(zero_offset, scale_factor, cart_id=cart_id, residual_kg=residual_kg, points=[
+            {'kg': kg, 'raw': round(m.mean, 2), 'stderr': round(m.stderr, 3), 'samples': m.samples}
+            for kg, m in points])
+
+    def to_kg(self, raw):
+        """Raw counts -> kg (not clamped)"""
+        return (raw - self.zero_offset) / self.scale_factor
+
+    def rezero(self, zero_offset):
+        self.zero_offset = zero_offset
+        self.rezeroed_at = _utc_now()
+
+    def to_dict(self):
+        return {
+            'version': PROFILE_VERSION,
+            'cart_id': self.cart_id,
+            'zero_offset': self.zero_offset,
+            'scale_factor': self.scale_factor,
+            'residual_kg': self.residual_kg,
+            'points': self.points,
+            'calibrated_at': self.calibrated_at,
+            'rezeroed_at': self.rezeroed_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get('version') != PROFILE_VERSION:
+            raise ValueError(f"Unsupported calibration profile version {data.get('version')!r}")
+        if not data.get('scale_factor'):
+            raise ValueError("Calibration profile has no scale factor")
+        return cls(float(data['zero_offset']), float(data['scale_factor']), cart_id=data.get('cart_id', CART_ID),
+                   points=data.get('points', ()), residual_kg=data.get('residual_kg'),
+                   calibrated_at=data.get('calibrated_at'), rezeroed_at=data.get('rezeroed_at'))
+
+
+def load_profile(path=CALIBRATION_PATH):
+    """
+    Returns:
+        CalibrationProfile: The saved profile, or None if there is none
+
+    Raises:
+        ValueError: The file exists but is not a usable profile
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Calibration profile {path} is not valid JSON: {e}") from None
+    return CalibrationProfile.from_dict(data)
+
+
+def save_profile(profile, path=CALIBRATION_PATH):
+    """Write the profile atomically (a crash never leaves half a file)"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(profile.to_dict(), f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+class AutoZero:
+    """Decides when an empty, steady cart is re-zeroed"""
+
+    def __init__(self, seconds=AUTOZERO_SECONDS, stable_kg=AUTOZERO_STABLE_KG, min_shift_kg=AUTOZERO_MIN_SHIFT_KG,
+                 max_kg=AUTOZERO_MAX_KG):
+        """
+        Args:
+            seconds (float): Time the empty cart's weight must stay steady
+            stable_kg (float): Max movement of the weight while steady
+            min_shift_kg (float): Smaller zero shifts are left alone
+            max_kg (float): Larger ones are a load, not drift
+        """
+        self.seconds = seconds
+        self.stable_kg = stable_kg
+        self.min_shift_kg = min_shift_kg
+        self.max_kg = max_kg
+        self._anchor = None
+        self._since = None
+        self.rezeros = 0
+
+    def update(self, weight, empty, now):
+        """
+        Feed one filtered weight.
+
+        Args:
+            weight (float): kg
+            empty (bool): The backend's cart has no items
+            now (float): time.monotonic()
+
+        Returns:
+            bool: True when the cart has been empty and steady for `seconds`
+                (the caller then measures the zero shift with shift())
+        """
+        if not empty or self._anchor is None or abs(weight - self._anchor) > self.stable_kg:
+            self._anchor = weight if empty else None
+            self._since = now
+            return False
+        return now - self._since >= self.seconds
+
+    def shift(self, raw_values, profile):
+        """
+        Zero shift measured from the steady empty cart's raw samples.
+
+        Args:
+            raw_values (list): Raw conversions from the steady period
+            profile (CalibrationProfile): Current calibration
+
+        Returns:
+            float: New zero offset, or None if the shift is too small to
+                matter or too large to be drift
+        """
+        self._anchor = None         # Start over: wait for the next steady period
+        if len(raw_values) < MIN_SAMPLES:
+            return None
+        zero, _, _, _ = robust_mean(raw_values)
+        shift_kg = abs(profile.to_kg(zero))
+        if shift_kg < self.min_shift_kg or shift_kg > self.max_kg:
+            return None
+        self.rezeros += 1
+        return zero
@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+RFID Serial Capture and Replay for SmartKart
+Records each reader's raw bytes with monotonic timestamps and replays them
+through the decoder and emitter without hardware
+
+rfid_service records when RFID_CAPTURE is set to a file path: every chunk
+read from a reader is appended with the time it was read. Field problems
+(e.g. the Reader 2 garbage bursts diagnose_reader2.py and
+debug_dual_readers.py were written to chase) can then be reproduced and
+benchmarked on a dev box:
+
+    python3 capture.py info capture.skc
+    python3 capture.py replay capture.skc                # 1x, real timing
+    python3 capture.py replay capture.skc --speed 10     # 10x
+    python3 capture.py replay capture.skc --speed 0      # unthrottled
+    python3 capture.py replay capture.skc --backend http://localhost:8001
+
+Replay reports decoded frames/sec and the rejection counters per reader,
+so decoder regressions show up as a throughput or count change.
+
+File format (little-endian):
+- 16-byte header: b'SKCAP1\\0\\0', version u32, reserved u32
+- records: [dt_us u32][kind u8][reader u8][length u16][payload]
+  dt_us is the time since the previous record. kind 0 is reader data;
+  kind 1 names a reader index (payload: reader_id, UTF-8) and is written
+  before that reader's first data record.
+"""
+
+import argparse
+import struct
+import sys
+import threading
+import time
+
+from rdm6300 import FrameDecoder
+
+MAGIC = b'SKCAP1\x00\x00'
+VERSION = 1
+FLUSH_INTERVAL = 1.0   # Seconds between file flushes while recording
+
+_HEADER = struct.Struct('<8sII')
+_RECORD = struct.Struct('<IBBH')
+_KIND_DATA = 0
+_KIND_READER = 1
+_MAX_CHUNK = 0xFFFF
+_MAX_DT_US = 0xFFFFFFFF
+
+
+class CaptureWriter:
+    """Appends timestamped reader chunks to a capture file (thread-safe)"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Capture file to create (overwritten if it exists)
+        """
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(_HEADER.pack(MAGIC, VERSION, 0))
+        self._readers = {}
+        self._last = None
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.records = 0
+
+    def record(self, reader_id, data, now=None):
+        """
+        Append one chunk read from a reader.
+
+        Args:
+            reader_id (str): Reader the bytes came from (e.g. 'reader2')
+            data (bytes): Raw bytes as read from the port
+            now (float): time.monotonic() of the read (default: now)
+        """
+        if not data:
+            return
+        if now is None:
+            now = time.monotonic()
+        with self._lock:
+            if self._file.closed:
+                return
+            index = self._readers.get(reader_id)
+            if index is None:
+                index = self._readers[reader_id] = len(self._readers)
+                name = reader_id.encode()
+                self._write(now, _KIND_READER, index, name)
+            view = memoryview(data)
+            for start in range(0, len(view), _MAX_CHUNK):
+                self._write(now, _KIND_DATA, index, view[start:start + _MAX_CHUNK])
+            self.bytes += len(data)
+            if now - self._last_flush >= FLUSH_INTERVAL:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self):
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _write(self, now, kind, index, payload):
+        if self._last is None:
+            self._last = now
+        dt_us = min(max(int((now - self._last) * 1e6), 0), _MAX_DT_US)
+        # Advance by the encoded delta so rounding never accumulates
+        self._last += dt_us / 1e6
+        self._file.write(_RECORD.pack(dt_us, kind, index, len(payload)))
+        self._file.write(payload)
+        self.records += 1
+
+
+class RecordingSerial:
+    """
+    Serial port wrapper that records everything read from it.
+
+    Passes every attribute through to the wrapped serial.Serial, so the read
+    loops (select, poll, threads) work unchanged.
+    """
+
+    def __init__(self, serial_connection, writer, reader_id):
+        self._serial = serial_connection
+        self._writer = writer
+        self._reader_id = reader_id
+
+    def read(self, size=1):
+        data = self._serial.read(size)
+        self._writer.record(self._reader_id, data)
+        return data
+
+    def readinto(self, buffer):
+        count = self._serial.readinto(buffer)
+        if count:
+            self._writer.record(self._reader_id, bytes(memoryview(buffer)[:count]))
+        return count
+
+    def __getattr__(self, name):
+        return getattr(self._serial, name)
+
+
+def read_capture(path):
+    """
+    Iterate over a capture file.
+
+    Args:
+        path (str): Capture file
+
+    Yields:
+        tuple: (seconds since the first record, reader_id, bytes)
+    """
+    with open(path, 'rb') as f:
+        header = f.read(_HEADER.size)
+        if len(header) < _HEADER.size:
+            raise ValueError(f"{path}: not a capture file (too short)")
+        magic, version, _ = _HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: not a version {VERSION} capture file")
+        names = {}
+        elapsed_us = 0
+        while True:
+            record = f.read(_RECORD.size)
+            if len(record) < _RECORD.size:
+                return
+            dt_us, kind, index, length = _RECORD.unpack(record)
+            payload = f.read(length)
+            if len(payload) < length:
+                return  # Truncated tail (recording interrupted)
+            elapsed_us += dt_us
+            if kind == _KIND_READER:
+                names[index] = payload.decode()
+            elif kind == _KIND_DATA:
+                yield elapsed_us / 1e6, names.get(index, f'reader{index + 1}'), payload
+
+
+def is_capture(path):
+    """Return True if the file starts with the capture magic"""
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def replay(path, on_tags, speed=1.0, decoders=None):
+    """
+    Feed a capture through per-reader FrameDecoders.
+
+    Args:
+        path (str): Capture file
+        on_tags (callable): Called as on_tags(reader_id, tags, capture_time)
+            for every chunk that decoded at least one tag
+        speed (float): Replay speed; 1 is real time, 0 is unthrottled
+        decoders (dict): Optional dict of reader_id -> FrameDecoder to use
+
+    Returns:
+        dict: {'bytes', 'chunks', 'frames', 'seconds' (wall), 'capture_seconds',
+               'frames_per_sec', 'decoders'}
+    """
+    if decoders is None:
+        decoders = {}
+    total_bytes = chunks = frames = 0
+    capture_time = 0.0
+    start = time.perf_counter()
+    for capture_time, reader_id, data in read_capture(path):
+        if speed > 0:
+            delay = capture_time / speed - (time.perf_counter() - start)
+            if delay > 0:
+                time.sleep(delay)
+        decoder = decoders.get(reader_id)
+        if decoder is None:
+            decoder = decoders[reader_id] = FrameDecoder()
+        # A chunk can be larger than the ring (a hand-made or concatenated
+        # capture): feed it a free space at a time and decode in between,
+        # like FrameDecoder.drain(), so nothing is lost to overflow
+        view = memoryview(data)
+        tags = []
+        while view:
+            room = decoder.capacity - len(decoder) or decoder.capacity
+            decoder.feed(view[:room])
+            view = view[room:]
+            tags.extend(decoder.decode_all())
+        total_bytes += len(data)
+        chunks += 1
+        if tags:
+            frames += len(tags)
+            on_tags(reader_id, tags, capture_time)
+    elapsed = time.perf_counter() - start
+    return {
+        'bytes': total_bytes,
+        'chunks': chunks,
+        'frames': frames,
+        'seconds': elapsed,
+        'capture_seconds': capture_time,
+        'frames_per_sec': frames / elapsed if elapsed > 0 else 0.0,
+        'decoders': decoders,
+    }
+
+
+def summarize(path):
+    """Per-reader byte and chunk counts plus the capture duration"""
+    readers = {}
+    duration = 0.0
+    for duration, reader_id, data in read_capture(path):
+        stats = readers.setdefault(reader_id, {'bytes': 0, 'chunks': 0})
+        stats['bytes'] += len(data)
+        stats['chunks'] += 1
+    return readers, duration
+
+
+def make_emitter(backend_url=None):
+    """
+    Build the replay emitter.
+
+    Without a backend URL the scans are only built (build_scan_payload) and
+    counted, so replay measures the pipeline without network effects.
+
+    Returns:
+        tuple: (on_scan(reader_id, tag), close(), counters dict)
+    """
+    import rfid_service
+
+    counters = {'emitted': 0, 'failed': 0}
+    if backend_url:
+        rfid_service.sio.connect(backend_url)
+
+    def on_scan(reader_id, tag):
+        if backend_url:
+            sent = rfid_service.emit_rfid_scan(rfid_service.CART_ID, tag)
+        else:
+            rfid_service.build_scan_payload(rfid_service.CART_ID, tag)
+            sent = True
+        counters['emitted' if sent else 'failed'] += 1
+
+    def close():
+        if backend_url and rfid_service.sio.connected:
+            rfid_service.sio.disconnect()
+
+    return on_scan, close, counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record/replay harness for RDM6300 captures")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    info = commands.add_parser('info', help='summarize a capture')
+    info.add_argument('capture')
+
+    play = commands.add_parser('replay', help='replay a capture through the decoder and emitter')
+    play.add_argument('capture')
+    play.add_argument('--speed', type=float, default=1.0,
+                      help='replay speed: 1 = real time, N = N times faster, 0 = unthrottled')
+    play.add_argument('--backend', help='emit rfid_scan events to this backend URL (default: dry run)')
+    play.add_argument('--quiet', action='store_true', help='do not print each scan')
+    args = parser.parse_args()
+
+    if args.command == 'info':
+        readers, duration = summarize(args.capture)
+        print(f"Capture: {args.capture} ({duration:.3f}s)")
+        for reader_id, stats in readers.items():
+            rate = stats['bytes'] / duration if duration > 0 else 0.0
+            print(f"  {reader_id}: {stats['bytes']} bytes in {stats['chunks']} chunks ({rate:.0f} B/s)")
+        return 0
+
+    on_scan, close, counters = make_emitter(args.backend)
+
+    def on_tags(reader_id, tags, capture_time):
+        for tag in tags:
+            on_scan(reader_id, tag)
+            if not args.quiet:
+                print(f"[{capture_time:9.3f}s] [{reader_id}] {tag}")
+
+    try:
+        result = replay(args.capture, on_tags, speed=args.speed)
+    finally:
+        close()
+
+    speed = 'unthrottled' if args.speed <= 0 else f'{args.speed:g}x'
+    print("=" * 60)
+    print(f"Replay ({speed}): {result['bytes']} bytes, {result['chunks']} chunks, "
+          f"{result['capture_seconds']:.3f}s of capture in {result['seconds']:.3f}s")
+    print(f"Frames: {result['frames']} ({result['frames_per_sec']:.0f} frames/s), "
+          f"emitted: {counters['emitted']}, failed: {counters['failed']}")
+    for reader_id, decoder in result['decoders'].items():
+        rejected = ' '.join(f"{reason}={count}" for reason, count in decoder.rejected.items() if count)
+        print(f"  {reader_id}: {decoder.frames} frames, {decoder.bytes_in} bytes"
+              + (f", rejected: {rejected}" if rejected else ""))
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Cross-Reader Scan Fusion for SmartKart
+Merges reads of the same tag from several antennas into one scan
+
+With two or more readers, one tag passing the antennas is usually decoded
+by each of them within a few milliseconds. Emitting every decode doubles
+the backend's cart/item lookups and saves, and two rfid_scan events for one
+item can toggle it in and straight back out of the cart.
+
+ScanFusion opens a window at the first read of a tag. Reads of that tag
+from any reader inside the window join the same fused scan, which is
+released once the window closes and records which readers saw the tag and
+when each one first saw it.
+"""
+
+import time
+
+FUSION_WINDOW = 0.03  # Seconds to wait for other readers after the first read
+
+
+def single_scan(tag_id, reader, now=None):
+    """Wrap one unfused read in the same shape as a fused scan"""
+    if now is None:
+        now = time.monotonic()
+    return {'tagId': tag_id, 'time': now, 'readers': {reader: now}, 'reads': 1}
+
+
+class ScanFusion:
+    """Time-window merge of per-reader tag reads"""
+
+    def __init__(self, window=FUSION_WINDOW):
+        """
+        Args:
+            window (float): Seconds after a tag's first read during which
+                reads from any reader are merged into the same scan
+        """
+        self.window = window
+        self._open = {}        # tag_id -> fused scan still collecting reads
+        self.reads = 0         # Reads observed
+        self.scans = 0         # Fused scans released
+        self.merged = 0        # Reads merged into an already open scan
+
+    def __len__(self):
+        """Number of scans still collecting reads"""
+        return len(self._open)
+
+    def observe(self, tag_id, reader, now=None):
+        """
+        Record one decoded read.
+
+        Args:
+            tag_id (str): Decoded tag ID
+            reader (str): Reader that produced the read (e.g. 'Reader 1')
+            now (float): time.monotonic() of the read (default: now)
+        """
+        if now is None:
+            now = time.monotonic()
+        self.reads += 1
+
+        scan = self._open.get(tag_id)
+        if scan is None:
+            self._open[tag_id] = {
+                'tagId': tag_id,
+                'time': now,
+                'readers': {reader: now},
+                'reads': 1,
+            }
+            return
+        self.merged += 1
+        scan['reads'] += 1
+        scan['readers'].setdefault(reader, now)
+
+    def flush(self, now=None, force=False):
+        """
+        Release scans whose window has closed.
+
+        Args:
+            now (float): Current time.monotonic() (default: now)
+            force (bool): Release every open scan regardless of its window
+
+        Returns:
+            list: Fused scans in first-read order, each
+                {'tagId', 'time', 'readers': {reader: first read time}, 'reads'}
+        """
+        if not self._open:
+            return []
+        if now is None:
+            now = time.monotonic()
+        ready = [
+            tag_id for tag_id, scan in self._open.items()
+            if force or now - scan['time'] >= self.window
+        ]
+        scans = [self._open.pop(tag_id) for tag_id in ready]
+        self.scans += len(scans)
+        return scans
+
+    def next_deadline(self):
+        """
+        Earliest time.monotonic() at which flush() will release a scan.
+
+        Returns:
+            float: Deadline, or None when no scan is open
+        """
+        if not self._open:
+            return None
+        # Scans are opened in time order and dicts keep insertion order
+        return next(iter(self._open.values()))['time'] + self.window
+
+    def stats(self):
+        """Return read, fused scan and merge counters"""
+        return {
+            'reads': self.reads,
+            'scans': self.scans,
+            'merged': self.merged,
+            'open': len(self._open),
+        }
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Idle Governor for SmartKart
+Scales reader polling, weight sampling and the LCD to cart activity
+
+A cart parked in the corral does not need 20 reader polls and a weight
+upload every second. Every service marks activity (a tag frame, a weight
+change, a cart update from the backend) in one small memory-mapped file
+shared by all SmartKart processes on the Pi, so a tag read by the RFID
+service also wakes the weight service and the LCD. When nothing has
+touched the stamp for `idle_after` seconds the cart is idle: the services
+poll and sample at their low rates, weight uploads are held back while
+the weight is steady and the LCD backlight goes off. The next tag frame or
+weight change touches the stamp and every service is back at full rate on
+its next pass; a service that sleeps long while idle does so through
+wait(), which returns as soon as the stamp moves.
+
+The stamp is time.monotonic(), which on Linux is one clock for the whole
+system, stored as a double in a 16-byte file (magic + stamp).
+
+Each Governor also accounts where its own process spent its time and CPU
+(active vs idle) and what it skipped while idle, for the savings report.
+"""
+
+import mmap
+import os
+import struct
+import tempfile
+import time
+
+import metrics
+
+# Seconds without activity before the cart counts as idle; 0 disables
+IDLE_AFTER = float(os.getenv('GOVERNOR_IDLE_AFTER', '120'))
+# Shared activity stamp; tmpfs so touching it never writes to the SD card
+GOVERNOR_PATH = os.getenv(
+    'GOVERNOR_PATH',
+    os.path.join('/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'smartkart-activity'))
+
+TOUCH_INTERVAL = 0.05   # Min seconds between stamp writes from one process
+WAKE_INTERVAL = 0.1     # Seconds between stamp checks in wait()
+
+_MAGIC = b'SKA1'
+_STAMP = struct.Struct('<4s4xd')
+
+GOVERNOR_IDLE = metrics.gauge('smartkart_governor_idle', '1 while the cart is idle')
+GOVERNOR_SKIPPED = metrics.counter('smartkart_governor_skipped_total',
+                                   'Work skipped while idle (polls, samples, uploads)', ['kind'])
+
+
+class Governor:
+    """Process-side view of the shared activity stamp"""
+
+    def __init__(self, path=GOVERNOR_PATH, idle_after=IDLE_AFTER, name="Governor",
+                 clock=time.monotonic, cpu_clock=time.process_time):
+        """
+        Args:
+            path (str): Shared stamp file (created if missing)
+            idle_after (float): Seconds without activity before idle; 0 never idles
+            name (str): Label for reports
+            clock (callable): Monotonic time source (for tests)
+            cpu_clock (callable): Process CPU time source (for tests)
+        """
+        self.path = path
+        self.idle_after = idle_after
+        self.name = name
+        self._clock = clock
+        self._cpu_clock = cpu_clock
+        self._last_touch = None
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+        try:
+            if os.fstat(fd).st_size < _STAMP.size:
+                os.ftruncate(fd, _STAMP.size)
+            self._map = mmap.mmap(fd, _STAMP.size)
+        finally:
+            os.close(fd)
+        # A service (re)starting counts as activity; this also replaces a
+        # stamp left from before a reboot, when the monotonic clock restarted
+        self.touch()
+
+        now = clock()
+        self._idle = False
+        self.changed = False              # check() saw a transition
+        self._since = now
+        self._cpu_since = cpu_clock()
+        self.transitions = 0              # Active -> idle changes
+        self.time = {'active': 0.0, 'idle': 0.0}
+        self.cpu = {'active': 0.0, 'idle': 0.0}
+        self.skipped = {}                 # kind -> count
+        self.skipped_bytes = 0            # Uplink bytes not sent while idle
+
+    def close(self):
+        self.check()
+        if not self._map.closed:
+            self._map.close()
+
+    def touch(self, now=None):
+        """Mark activity now (a tag frame, a weight change, a cart update)"""
+        if now is None:
+            now = self._clock()
+        if self._last_touch is not None and now - self._last_touch < TOUCH_INTERVAL:
+            return
+        self._last_touch = now
+        _STAMP.pack_into(self._map, 0, _MAGIC, now)
+
+    def last_activity(self):
+        """time.monotonic() of the latest activity of any service"""
+        return _STAMP.unpack_from(self._map, 0)[1]
+
+    def wait(self, seconds, interval=WAKE_INTERVAL, sleep=time.sleep):
+        """
+        Sleep up to `seconds`, in slices of `interval`, returning early once
+        any service marks activity.
+
+        Returns:
+            bool: True if woken by activity
+        """
+        stamp = self.last_activity()
+        deadline = self._clock() + seconds
+        while True:
+            remaining = deadline - self._clock()
+            if remaining <= 0:
+                return False
+            sleep(min(interval, remaining))
+            if self.last_activity() != stamp:
+                return True
+
+    @property
+    def idle(self):
+        """Idle state as of the last check()"""
+        return self._idle
+
+    def check(self, now=None):
+        """
+        Re-evaluate the idle state and account the time since the last check.
+
+        Call once per loop pass; `changed` tells whether this call switched
+        between active and idle.
+
+        Returns:
+            bool: True if the cart is idle
+        """
+        if now is None:
+            now = self._clock()
+        idle = bool(self.idle_after) and now - self.last_activity() >= self.idle_after
+        state = 'idle' if self._idle else 'active'
+        cpu = self._cpu_clock()
+        self.time[state] += now - self._since
+        self.cpu[state] += cpu - self._cpu_since
+        self._since = now
+        self._cpu_since = cpu
+        self.changed = idle != self._idle
+        if self.changed:
+            self._idle = idle
+            GOVERNOR_IDLE.set(1 if idle else 0)
+            if idle:
+                self.transitions += 1
+        return idle
+
+    def skip(self, kind, count=1, nbytes=0):
+        """Record work skipped because the cart is idle"""
+        self.skipped[kind] = self.skipped.get(kind, 0) + count
+        self.skipped_bytes += nbytes
+        GOVERNOR_SKIPPED.labels(kind).inc(count)
+
+    def stats(self):
+        """
+        Time, CPU and skipped work, active vs idle.
+
+        Returns:
+            dict: idle (bool), idle_share (0-1 of the time accounted),
+                cpu_active / cpu_idle (CPU seconds per wall second in each
+                state), cpu_saved (CPU seconds the idle time would have
+                cost at the active rate, minus what it did cost),
+                transitions, skipped {kind: count}, skipped_bytes
+        """
+        total = self.time['active'] + self.time['idle']
+        cpu_active = self.cpu['active'] / self.time['active'] if self.time['active'] else 0.0
+        cpu_idle = self.cpu['idle'] / self.time['idle'] if self.time['idle'] else 0.0
+        return {
+            'idle': self._idle,
+            'idle_share': self.time['idle'] / total if total else 0.0,
+            'cpu_active': cpu_active,
+            'cpu_idle': cpu_idle,
+            'cpu_saved': max(0.0, (cpu_active - cpu_idle) * self.time['idle']),
+            'transitions': self.transitions,
+            'skipped': dict(self.skipped),
+            'skipped_bytes': self.skipped_bytes,
+        }
+
+
+def format_savings(stats):
+    """
+    Format Governor.stats() for the service log.
+
+    Returns:
+        str: e.g. 'idle 82% of the time, CPU 3.1% active / 0.4% idle (~95.2 CPU-s saved), skipped weight_update=2890 (231.2 KB)'
+    """
+    text = (f"idle {stats['idle_share'] * 100:.0f}% of the time, "
+            f"CPU {stats['cpu_active'] * 100:.1f}% active / {stats['cpu_idle'] * 100:.1f}% idle "
+            f"(~{stats['cpu_saved']:.1f} CPU-s saved)")
+    if stats['skipped']:
+        text += ", skipped " + ' '.join(f"{kind}={count}" for kind, count in sorted(stats['skipped'].items()))
+        if stats['skipped_bytes']:
+            text += f" ({stats['skipped_bytes'] / 1024:.1f} KB)"
+    return text
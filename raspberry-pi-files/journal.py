@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Store-and-Forward Journal for SmartKart
+Keeps events that could not be sent to the backend and replays them in
+order once the Socket.IO connection is back
+
+Each service owns one journal file: a fixed-size, memory-mapped circular
+log of JSON records. While the uplink is down (or a replay is still
+catching up) events are appended instead of emitted, so nothing made
+during a Wi-Fi blip is lost and live events never overtake older ones.
+Payloads are stored as built, so replayed events keep their original
+timestamps.
+
+File layout:
+- 64-byte header: magic, version, data size, head, tail, count, next seq
+- data area: records of [payload length u32][crc32 u32][seq u64][payload],
+  8-byte aligned. A length of 0xFFFFFFFF (or too little room for a record
+  header) marks the wrap back to the start of the data area.
+
+When the journal is full, a journal opened with evict_oldest=True (weight
+samples, where only recent values matter) drops its oldest records; one
+without (scans) refuses the new event instead of losing an older one.
+
+fsync policy (JOURNAL_FSYNC):
+- 'always': msync after every append and replay step
+- 'interval': msync at most every FSYNC_INTERVAL seconds (default)
+- 'never': leave writeback to the kernel
+"""
+
+import asyncio
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+
+import metrics
+import service_log
+
+JOURNAL_DIR = os.getenv('JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'journal'))
+JOURNAL_SIZE = int(os.getenv('JOURNAL_SIZE', str(1024 * 1024)))  # Bytes per journal file
+FSYNC_POLICY = os.getenv('JOURNAL_FSYNC', 'interval')
+FSYNC_INTERVAL = 1.0        # Seconds between msyncs ('interval' policy)
+REPLAY_RATE = float(os.getenv('JOURNAL_REPLAY_RATE', '50'))  # Events/sec during replay
+
+FSYNC_POLICIES = ('always', 'interval', 'never')
+
+_MAGIC = b'SKJ1'
+_VERSION = 1
+_HEADER = struct.Struct('<4sIQQQQQ')    # magic, version, size, head, tail, count, next seq
+_HEADER_SIZE = 64
+_RECORD = struct.Struct('<IIQ')         # payload length, crc32, seq
+_WRAP = 0xFFFFFFFF
+_ALIGN = 8
+
+
+def _aligned(size):
+    return (size + _ALIGN - 1) & ~(_ALIGN - 1)
+
+
+class Journal:
+    """Memory-mapped circular event log"""
+
+    def __init__(self, path, size=JOURNAL_SIZE, fsync=FSYNC_POLICY, evict_oldest=False):
+        """
+        Args:
+            path (str): Journal file; created (with its directory) if missing
+            size (int): Data area size in bytes for a new journal
+            fsync (str): 'always', 'interval' or 'never'
+            evict_oldest (bool): Drop the oldest records when full instead
+                of refusing new ones
+        """
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, got {fsync!r}")
+        self.path = path
+        self.fsync = fsync
+        self.evict_oldest = evict_oldest
+        self.appended = 0      # Records written
+        self.evicted = 0       # Old records dropped to make room
+        self.refused = 0       # New records refused because the journal was full
+        self.replayed = 0      # Records removed by pop() after a successful send
+        self._lock = threading.RLock()
+        self._last_flush = time.monotonic()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            existing = os.fstat(fd).st_size
+            if existing < _HEADER_SIZE:
+                os.ftruncate(fd, _HEADER_SIZE + _aligned(size))
+            self._map = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+
+        magic, version, stored_size, head, tail, count, seq = _HEADER.unpack_from(self._map, 0)
+        if magic == _MAGIC and version == _VERSION and stored_size == len(self._map) - _HEADER_SIZE:
+            self.size = stored_size
+            self._head, self._tail, self._count, self._seq = head, tail, count, seq
+            self._recover()
+        else:
+            self.size = len(self._map) - _HEADER_SIZE
+            self._head = self._tail = self._count = 0
+            self._seq = 1
+            self._write_header()
+
+    def __len__(self):
+        return self._count
+
+    def close(self):
+        with self._lock:
+            if self._map.closed:
+                return
+            self._map.flush()
+            self._map.close()
+
+    def append(self, event, data):
+        """
+        Append an event.
+
+        Args:
+            event (str): Socket.IO event name
+            data (dict): JSON-serializable payload
+
+        Returns:
+            bool: True if stored, False if the journal is full and does not evict
+        """
+        payload = json.dumps({'event': event, 'data': data}, separators=(',', ':')).encode()
+        record_size = _aligned(_RECORD.size + len(payload))
+        with self._lock:
+            if record_size > self.size:
+                self.refused += 1
+                return False
+            offset = self._room_for(record_size)
+            while offset is None and self.evict_oldest and self._count:
+                self._drop_head()
+                self.evicted += 1
+                offset = self._room_for(record_size)
+            if offset is None:
+                self.refused += 1
+                return False
+
+            if offset != self._tail and self.size - self._tail >= _RECORD.size:
+                _RECORD.pack_into(self._map, _HEADER_SIZE + self._tail, _WRAP, 0, 0)
+            start = _HEADER_SIZE + offset
+            _RECORD.pack_into(self._map, start, len(payload), zlib.crc32(payload), self._seq)
+            self._map[start + _RECORD.size:start + _RECORD.size + len(payload)] = payload
+            self._tail = (offset + record_size) % self.size
+            self._count += 1
+            self._seq += 1
+            self.appended += 1
+            self._write_header()
+            self._sync()
+            return True
+
+    def peek(self):
+        """
+        Return the oldest event without removing it.
+
+        Returns:
+            tuple: (seq, event, data), or None if the journal is empty
+        """
+        with self._lock:
+            if not self._count:
+                return None
+            offset = self._record_offset(self._head)
+            length, _, seq = _RECORD.unpack_from(self._map, _HEADER_SIZE + offset)
+            start = _HEADER_SIZE + offset + _RECORD.size
+            record = json.loads(self._map[start:start + length])
+            return seq, record['event'], record['data']
+
+    def pop(self, seq=None):
+        """
+        Remove the oldest event after it has been sent.
+
+        Args:
+            seq (int): Sequence number from peek(); if the oldest record has
+                changed since (evicted meanwhile), nothing is removed
+        """
+        with self._lock:
+            if not self._count:
+                return
+            if seq is not None:
+                offset = self._record_offset(self._head)
+                if _RECORD.unpack_from(self._map, _HEADER_SIZE + offset)[2] != seq:
+                    return
+            self._drop_head()
+            self.replayed += 1
+            self._write_header()
+            self._sync()
+
+    def stats(self):
+        return {
+            'pending': self._count,
+            'appended': self.appended,
+            'evicted': self.evicted,
+            'refused': self.refused,
+            'replayed': self.replayed,
+        }
+
+    def _room_for(self, record_size):
+        """Offset a record of record_size bytes can be written at, or None"""
+        if not self._count:
+            self._head = self._tail = 0
+            return 0
+        head, tail = self._head, self._tail
+        if tail > head:
+            if self.size - tail >= record_size:
+                return tail
+            if head >= record_size:
+                return 0
+            return None
+        if tail < head and head - tail >= record_size:
+            return tail
+        return None
+
+    def _record_offset(self, offset):
+        """Follow a wrap marker (or a too-short end) back to the start"""
+        if self.size - offset < _RECORD.size:
+            return 0
+        length, _, _ = _RECORD.unpack_from(self._map, _HEADER_SIZE + offset)
+        return 0 if length == _WRAP else offset
+
+    def _drop_head(self):
+        offset = self._record_offset(self._head)
+        length, _, _ = _RECORD.unpack_from(self._map, _HEADER_SIZE + offset)
+        self._head = (offset + _aligned(_RECORD.size + length)) % self.size
+        self._count -= 1
+        if not self._count:
+            self._head = self._tail = 0
+
+    def _recover(self):
+        """Trim the log at the first record that fails its CRC (torn write)"""
+        offset = self._head
+        valid = 0
+        for _ in range(self._count):
+            offset = self._record_offset(offset)
+            length, crc, _ = _RECORD.unpack_from(self._map, _HEADER_SIZE + offset)
+            start = _HEADER_SIZE + offset + _RECORD.size
+            if length > self.size or zlib.crc32(self._map[start:start + length]) != crc:
+                break
+            offset = (offset + _aligned(_RECORD.size + length)) % self.size
+            valid += 1
+        if valid != self._count:
+            self._count = valid
+            self._tail = offset if valid else self._head
+            self._write_header()
+
+    def _write_header(self):
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, self.size,
+                          self._head, self._tail, self._count, self._seq)
+
+    def _sync(self):
+        if self.fsync == 'always':
+            self._map.flush()
+        elif self.fsync == 'interval':
+            now = time.monotonic()
+            if now - self._last_flush >= FSYNC_INTERVAL:
+                self._map.flush()
+                self._last_flush = now
+
+
+EMIT_SECONDS = metrics.histogram('smartkart_emit_seconds', 'Duration of sio.emit() per event', ['event'])
+EVENTS = metrics.counter('smartkart_events_total', 'Events by outcome (sent, journaled, replayed, dropped)',
+                         ['event', 'outcome'])
+
+
+class Forwarder:
+    """Emits events live when possible, otherwise journals them for replay"""
+
+    def __init__(self, sio, journal, rate=REPLAY_RATE, name="Journal"):
+        """
+        Args:
+            sio (socketio.Client): Connected (or reconnecting) client
+            journal (Journal): Journal for events that cannot be sent
+            rate (float): Max replayed events per second
+            name (str): Logger label
+        """
+        self.sio = sio
+        self.journal = journal
+        self.rate = rate
+        self.name = name
+        self.log = service_log.get_logger(name)
+        self._replay_thread = None
+        self._lock = threading.Lock()
+        metrics.add_collector(self._collect)
+
+    def _collect(self):
+        return [('smartkart_journal_events', 'gauge', 'Events waiting in the journal for replay',
+                 [({'journal': os.path.basename(self.journal.path)}, len(self.journal))])]
+
+    def emit(self, event, data, callback=None):
+        """
+        Send an event now, or journal it.
+
+        Events are journaled while disconnected and while older journaled
+        events are still waiting, so the backend always sees them in order.
+
+        Args:
+            event (str): Socket.IO event name
+            data (dict): JSON-serializable payload
+            callback (callable): Optional Socket.IO ack callback for a live
+                send; a journaled event is replayed without one
+
+        Returns:
+            bool: True if sent live, False if journaled (or refused when full)
+        """
+        if self.sio.connected and not len(self.journal):
+            try:
+                start = time.perf_counter()
+                if callback is None:
+                    self.sio.emit(event, data)
+                else:
+                    self.sio.emit(event, data, callback=callback)
+                EMIT_SECONDS.labels(event).record(time.perf_counter() - start)
+                EVENTS.labels(event, 'sent').inc()
+                return True
+            except Exception as e:
+                self.log.warning(f"Emit failed, journaling {event}: {e}", extra={'kind': 'emit_failed'})
+        self._journal(event, data)
+        return False
+
+    def _journal(self, event, data):
+        if not self.journal.append(event, data):
+            EVENTS.labels(event, 'dropped').inc()
+            self.log.error(f"✗ Journal full, {event} dropped", extra={'kind': 'journal_full'})
+        else:
+            EVENTS.labels(event, 'journaled').inc()
+            if self.sio.connected:
+                self.start_replay()
+
+    def start_replay(self):
+        """Start replaying journaled events in the background (if any)"""
+        with self._lock:
+            if not len(self.journal) or self._replay_thread is not None:
+                return
+            self._replay_thread = threading.Thread(target=self._replay, name="journal-replay", daemon=True)
+            self._replay_thread.start()
+
+    def replaying(self):
+        return self._replay_thread is not None
+
+    def _replay(self):
+        self.log.info(f"Replaying {len(self.journal)} journaled event(s) at up to {self.rate:g}/s",
+                      extra={'kind': 'replay'})
+        interval = 1.0 / self.rate if self.rate > 0 else 0
+        sent = 0
+        while True:
+            record = self.journal.peek() if self.sio.connected else None
+            if record is None:
+                # Re-check under the lock so an event journaled just now is
+                # either picked up here or starts a new replay
+                with self._lock:
+                    if self.sio.connected and len(self.journal):
+                        continue
+                    self._replay_thread = None
+                break
+            seq, event, data = record
+            try:
+                start = time.perf_counter()
+                self.sio.emit(event, data)
+                EMIT_SECONDS.labels(event).record(time.perf_counter() - start)
+            except Exception as e:
+                self.log.warning(f"Replay paused: {e}", extra={'kind': 'replay'})
+                with self._lock:
+                    self._replay_thread = None
+                break
+            self.journal.pop(seq)
+            EVENTS.labels(event, 'replayed').inc()
+            sent += 1
+            if interval:
+                time.sleep(interval)
+        self.log.info(f"Replayed {sent} event(s), {len(self.journal)} still journaled", extra={'kind': 'replay'})
+
+
+class AsyncForwarder(Forwarder):
+    """Forwarder for socketio.AsyncClient: emit() is a coroutine and replay
+    runs as a task on the event loop instead of a thread"""
+
+    def __init__(self, sio, journal, rate=REPLAY_RATE, name="Journal"):
+        """
+        Args:
+            sio (socketio.AsyncClient): Connected (or reconnecting) client
+            journal (Journal): Journal for events that cannot be sent
+            rate (float): Max replayed events per second
+            name (str): Logger label
+        """
+        super().__init__(sio, journal, rate, name)
+        self._replay_task = None
+
+    async def emit(self, event, data, callback=None):
+        """Send an event now, or journal it (see Forwarder.emit)"""
+        if self.sio.connected and not len(self.journal):
+            try:
+                start = time.perf_counter()
+                if callback is None:
+                    await self.sio.emit(event, data)
+                else:
+                    await self.sio.emit(event, data, callback=callback)
+                EMIT_SECONDS.labels(event).record(time.perf_counter() - start)
+                EVENTS.labels(event, 'sent').inc()
+                return True
+            except Exception as e:
+                self.log.warning(f"Emit failed, journaling {event}: {e}", extra={'kind': 'emit_failed'})
+        self._journal(event, data)
+        return False
+
+    def start_replay(self):
+        """Start replaying journaled events in a task (call from the loop)"""
+        if not len(self.journal) or self._replay_task is not None:
+            return
+        self._replay_task = asyncio.get_running_loop().create_task(self._replay())
+
+    def stop_replay(self):
+        """Cancel a running replay; unsent events stay journaled"""
+        if self._replay_task is not None:
+            self._replay_task.cancel()
+            self._replay_task = None
+
+    def replaying(self):
+        return self._replay_task is not None
+
+    async def _replay(self):
+        self.log.info(f"Replaying {len(self.journal)} journaled event(s) at up to {self.rate:g}/s",
+                      extra={'kind': 'replay'})
+        interval = 1.0 / self.rate if self.rate > 0 else 0
+        sent = 0
+        try:
+            while True:
+                # No lock needed: emit() only journals between our awaits, and
+                # this check and clearing the task happen without one
+                record = self.journal.peek() if self.sio.connected else None
+                if record is None:
+                    break
+                seq, event, data = record
+                try:
+                    start = time.perf_counter()
+                    await self.sio.emit(event, data)
+                    EMIT_SECONDS.labels(event).record(time.perf_counter() - start)
+                except Exception as e:
+                    self.log.warning(f"Replay paused: {e}", extra={'kind': 'replay'})
+                    break
+                self.journal.pop(seq)
+                EVENTS.labels(event, 'replayed').inc()
+                sent += 1
+                await asyncio.sleep(interval)
+        finally:
+            if self._replay_task is asyncio.current_task():
+                self._replay_task = None
+        self.log.info(f"Replayed {sent} event(s), {len(self.journal)} still journaled", extra={'kind': 'replay'})
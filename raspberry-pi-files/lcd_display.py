@@ -6,6 +6,10 @@ Connected to GPIO pins: 3 (SDA), 5 (SCL), 4 (VCC), 39 (GND)
 """
 
 import time
+
+import metrics
+import service_log
+
 try:
     import smbus
     REAL_HARDWARE = True
@@ -31,10 +35,15 @@ E_DELAY = 0.0005
 
 # LCD Backlight
 LCD_BACKLIGHT = 0x08  # On
-# LCD_BACKLIGHT = 0x00  # Off
+LCD_NOBACKLIGHT = 0x00  # Off (dimmed while the cart is idle)
 
 ENABLE = 0b00000100  # Enable bit
 
+log = service_log.get_logger('LCD')
+
+# Duration of each screen update (16 characters per line over I2C)
+LCD_WRITE_SECONDS = metrics.histogram('smartkart_lcd_write_seconds', 'Duration of an LCD screen update', ['op'])
+
 class LCDDisplay:
     """Class to manage I2C LCD display operations"""
     
@@ -43,27 +52,28 @@ class LCDDisplay:
         self.initialized = False
         self.i2c_addr = i2c_addr
         self.bus = None
+        self.backlight = LCD_BACKLIGHT  # Sent with every byte; see set_backlight()
         
         if REAL_HARDWARE:
             try:
                 self.bus = smbus.SMBus(I2C_BUS)
                 self._initialize_lcd()
                 self.initialized = True
-                print(f"[LCD] I2C Display initialized at address 0x{i2c_addr:02X}")
+                log.info(f"I2C Display initialized at address 0x{i2c_addr:02X}")
             except Exception as e:
-                print(f"[LCD] Failed to initialize: {e}")
-                print("[LCD] Trying alternate I2C address 0x3F...")
+                log.error(f"Failed to initialize: {e}", extra={'kind': 'lcd_error'})
+                log.info("Trying alternate I2C address 0x3F...")
                 try:
                     self.i2c_addr = 0x3F
                     self.bus = smbus.SMBus(I2C_BUS)
                     self._initialize_lcd()
                     self.initialized = True
-                    print(f"[LCD] I2C Display initialized at address 0x{self.i2c_addr:02X}")
+                    log.info(f"I2C Display initialized at address 0x{self.i2c_addr:02X}")
                 except Exception as e2:
-                    print(f"[LCD] Failed with alternate address: {e2}")
+                    log.error(f"Failed with alternate address: {e2}", extra={'kind': 'lcd_error'})
                     self.initialized = False
         else:
-            print("[LCD] Running in simulation mode")
+            log.info("Running in simulation mode")
             self.initialized = True
     
     def _write_byte(self, data):
@@ -73,18 +83,18 @@ class LCDDisplay:
         try:
             self.bus.write_byte(self.i2c_addr, data)
         except Exception as e:
-            print(f"[LCD] I2C write error: {e}")
+            log.error(f"I2C write error: {e}", extra={'kind': 'lcd_error'})
     
     def _lcd_strobe(self, data):
         """Toggle enable pin"""
-        self._write_byte(data | ENABLE | LCD_BACKLIGHT)
+        self._write_byte(data | ENABLE | self.backlight)
         time.sleep(E_PULSE)
-        self._write_byte((data & ~ENABLE) | LCD_BACKLIGHT)
+        self._write_byte((data & ~ENABLE) | self.backlight)
         time.sleep(E_DELAY)
     
     def _lcd_write_four_bits(self, data):
         """Write 4 bits to LCD"""
-        self._write_byte(data | LCD_BACKLIGHT)
+        self._write_byte(data | self.backlight)
         self._lcd_strobe(data)
     
     def _lcd_byte(self, bits, mode):
@@ -93,11 +103,11 @@ class LCDDisplay:
             return
         
         # High bits
-        high_bits = mode | (bits & 0xF0) | LCD_BACKLIGHT
+        high_bits = mode | (bits & 0xF0) | self.backlight
         self._lcd_write_four_bits(high_bits)
         
         # Low bits
-        low_bits = mode | ((bits << 4) & 0xF0) | LCD_BACKLIGHT
+        low_bits = mode | ((bits << 4) & 0xF0) | self.backlight
         self._lcd_write_four_bits(low_bits)
     
     def _initialize_lcd(self):
@@ -124,7 +134,7 @@ class LCDDisplay:
         Line 2: Weight value and status
         """
         if not self.initialized:
-            print(f"[LCD Simulation] Weight: {weight:.2f}kg | Status: {status}")
+            log.info(f"Weight: {weight:.2f}kg | Status: {status}", extra={'kind': 'lcd_output'})
             return
         
         try:
@@ -132,13 +142,14 @@ class LCDDisplay:
             line2 = f"{weight:.2f}kg {status}"
             
             if REAL_HARDWARE:
-                self._lcd_string(line1, LCD_LINE_1)
-                self._lcd_string(line2, LCD_LINE_2)
+                with LCD_WRITE_SECONDS.labels('weight').time():
+                    self._lcd_string(line1, LCD_LINE_1)
+                    self._lcd_string(line2, LCD_LINE_2)
             else:
-                print(f"[LCD] {line1}")
-                print(f"[LCD] {line2}")
+                log.info(line1, extra={'kind': 'lcd_output'})
+                log.info(line2, extra={'kind': 'lcd_output'})
         except Exception as e:
-            print(f"[LCD] Error displaying weight: {e}")
+            log.error(f"Error displaying weight: {e}", extra={'kind': 'lcd_error'})
     
     def display_price(self, price, status="Ready"):
         """
@@ -147,7 +158,7 @@ class LCDDisplay:
         Line 2: Price value and status
         """
         if not self.initialized:
-            print(f"[LCD Simulation] Price: ₹{price:.2f} | Status: {status}")
+            log.info(f"Price: ₹{price:.2f} | Status: {status}", extra={'kind': 'lcd_output'})
             return
         
         try:
@@ -156,13 +167,14 @@ class LCDDisplay:
             line2 = f"Rs {price:.2f} {status}"
             
             if REAL_HARDWARE:
-                self._lcd_string(line1, LCD_LINE_1)
-                self._lcd_string(line2, LCD_LINE_2)
+                with LCD_WRITE_SECONDS.labels('price').time():
+                    self._lcd_string(line1, LCD_LINE_1)
+                    self._lcd_string(line2, LCD_LINE_2)
             else:
-                print(f"[LCD] {line1}")
-                print(f"[LCD] {line2}")
+                log.info(line1, extra={'kind': 'lcd_output'})
+                log.info(line2, extra={'kind': 'lcd_output'})
         except Exception as e:
-            print(f"[LCD] Error displaying price: {e}")
+            log.error(f"Error displaying price: {e}", extra={'kind': 'lcd_error'})
     
     def clear(self):
         """Clear LCD display"""
@@ -171,27 +183,56 @@ class LCDDisplay:
         
         try:
             if REAL_HARDWARE:
-                self._lcd_byte(0x01, LCD_CMD)
+                with LCD_WRITE_SECONDS.labels('clear').time():
+                    self._lcd_byte(0x01, LCD_CMD)
+            else:
+                log.info("Display cleared")
+        except Exception as e:
+            log.error(f"Error clearing display: {e}", extra={'kind': 'lcd_error'})
+    
+    def set_backlight(self, on):
+        """
+        Switch the backlight on or off, keeping the screen contents.
+        
+        Args:
+            on (bool): True for on
+        
+        Returns:
+            bool: True if the state changed
+        """
+        backlight = LCD_BACKLIGHT if on else LCD_NOBACKLIGHT
+        if backlight == self.backlight:
+            return False
+        self.backlight = backlight
+        if not self.initialized:
+            return True
+        try:
+            if REAL_HARDWARE:
+                with LCD_WRITE_SECONDS.labels('backlight').time():
+                    # The PCF8574 backpack latches the backlight bit of any write
+                    self._write_byte(self.backlight)
             else:
-                print("[LCD] Display cleared")
+                log.info(f"Backlight {'on' if on else 'off'}")
         except Exception as e:
-            print(f"[LCD] Error clearing display: {e}")
+            log.error(f"Error setting backlight: {e}", extra={'kind': 'lcd_error'})
+        return True
     
     def display_message(self, line1, line2=""):
         """Display custom message on LCD"""
         if not self.initialized:
-            print(f"[LCD Simulation] {line1} | {line2}")
+            log.info(f"{line1} | {line2}", extra={'kind': 'lcd_output'})
             return
         
         try:
             if REAL_HARDWARE:
-                self._lcd_string(line1, LCD_LINE_1)
-                self._lcd_string(line2, LCD_LINE_2)
+                with LCD_WRITE_SECONDS.labels('message').time():
+                    self._lcd_string(line1, LCD_LINE_1)
+                    self._lcd_string(line2, LCD_LINE_2)
             else:
-                print(f"[LCD] {line1}")
-                print(f"[LCD] {line2}")
+                log.info(line1, extra={'kind': 'lcd_output'})
+                log.info(line2, extra={'kind': 'lcd_output'})
         except Exception as e:
-            print(f"[LCD] Error displaying message: {e}")
+            log.error(f"Error displaying message: {e}", extra={'kind': 'lcd_error'})
     
     def cleanup(self):
         """Cleanup I2C resources"""
@@ -200,9 +241,9 @@ class LCDDisplay:
                 self.clear()
                 if self.bus:
                     self.bus.close()
-                print("[LCD] I2C cleanup completed")
+                log.info("I2C cleanup completed")
             except Exception as e:
-                print(f"[LCD] Error during cleanup: {e}")
+                log.error(f"Error during cleanup: {e}", extra={'kind': 'lcd_error'})
 
 
 # Module-level instance
@@ -230,6 +271,11 @@ def display_message(line1, line2=""):
     lcd = get_lcd()
     lcd.display_message(line1, line2)
 
+def set_backlight(on):
+    """Convenience function to switch the backlight"""
+    lcd = get_lcd()
+    return lcd.set_backlight(on)
+
 def cleanup():
     """Cleanup LCD resources"""
     global _lcd_instance
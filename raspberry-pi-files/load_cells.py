@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Load Cell Array for SmartKart
+Samples several HX711 channels (e.g. four corner load cells) concurrently
+and combines them into one time-aligned raw reading
+
+weight_sensor drove one HX711 on fixed pins. Larger trolleys have a load
+cell in every corner, each with its own HX711 (HX711_CHANNELS). Each
+channel gets its own reader thread, blocked in its own conversion, so the
+channels convert in parallel and the combined reading keeps the
+single-cell rate instead of dividing it by the number of cells.
+
+Every channel thread appends (timestamp, raw) to a small SampleRing. The
+combined reading is produced once every channel has a conversion newer
+than the last one combined: the reference time is the oldest of the
+channels' newest timestamps (the latest moment every channel has data
+for), each channel contributes its sample closest to it, and the values
+are summed. The sum is calibrated like a single cell (one zero offset and
+scale, calibrate_sensor.py), as with a junction box wiring the corners in
+parallel; the corners should be matched cells.
+
+LoadCellArray.read() has the same contract as weight_sensor.read_raw(), so
+HX711Sampler, calibration.measure() and calibrate_sensor.py work on the
+array unchanged. A channel that stops converting makes read() raise
+(naming the corner) rather than return a total that is missing a corner.
+
+Per-corner diagnostics: conversions, errors, rate, seconds since the last
+conversion, the latest raw value and, once tare() has recorded each
+corner's empty reading, its share of the load (a lopsided share with the
+load centered, or a share stuck at 0, points at a failing cell).
+"""
+
+import os
+import threading
+import time
+
+import metrics
+from weight_sampler import ERROR_BACKOFF, SAMPLE_RATE, SampleRing
+
+# HX711 channels as DOUT:SCK BCM pin pairs, comma separated, e.g. the four
+# corners "5:6,13:19,20:21,26:16"; empty means the single cell on DT_PIN/SCK_PIN
+HX711_CHANNELS = os.getenv('HX711_CHANNELS', '')
+CHANNEL_RING = 8            # Conversions kept per channel (power of two)
+ALIGN_TIMEOUT = 1.0         # Max wait for every channel to convert once
+SKEW_WARN = 0.5             # Fraction of a sample period; more skew is counted
+
+HX711_CHANNEL_SAMPLES = metrics.counter(
+    'smartkart_hx711_channel_samples_total', 'Raw conversions read per HX711 channel', ['channel'])
+HX711_CHANNEL_ERRORS = metrics.counter(
+    'smartkart_hx711_channel_errors_total', 'Failed reads per HX711 channel', ['channel'])
+HX711_ALIGN_SKEW = metrics.histogram(
+    'smartkart_hx711_align_skew_seconds', 'Spread of the channel timestamps combined into one reading')
+HX711_STALLS = metrics.counter(
+    'smartkart_hx711_stalls_total', 'Combined reads abandoned because a channel did not convert', ['channel'])
+
+
+def parse_channels(spec):
+    """
+    Args:
+        spec (str): "DOUT:SCK,DOUT:SCK,..." BCM pins
+
+    Returns:
+        list: (dout_pin, sck_pin) tuples
+
+    Raises:
+        ValueError: Malformed pair
+    """
+    channels = []
+    for pair in spec.split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        try:
+            dout, sck = (int(pin) for pin in pair.split(':'))
+        except ValueError:
+            raise ValueError(f"Bad HX711 channel {pair!r}: expected DOUT:SCK pin numbers") from None
+        channels.append((dout, sck))
+    return channels
+
+
+class Channel:
+    """One HX711 and its reader thread"""
+
+    def __init__(self, name, read, clock=time.monotonic):
+        """
+        Args:
+            name (str): Label, e.g. 'front-left' or 'gpio5'
+            read (callable): Blocking read returning a list of raw
+                conversions (or one number); raises on failure
+            clock (callable): Monotonic time source
+        """
+        self.name = name
+        self.read = read
+        self.ring = SampleRing(CHANNEL_RING)
+        self.errors = 0
+        self.last_error = None
+        self.zero = None            # Empty reading, set by LoadCellArray.tare()
+        self._clock = clock
+        self._samples = HX711_CHANNEL_SAMPLES.labels(name)
+        self._errors = HX711_CHANNEL_ERRORS.labels(name)
+        self._thread = None
+
+    def start(self, stop_event, on_sample):
+        self._thread = threading.Thread(target=self._run, args=(stop_event, on_sample),
+                                        name=f"hx711-{self.name}", daemon=True)
+        self._thread.start()
+
+    def join(self, timeout):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self, stop_event, on_sample):
+        period = 1.0 / SAMPLE_RATE
+        while not stop_event.is_set():
+            try:
+                values = self.read()
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                self._errors.inc()
+                stop_event.wait(ERROR_BACKOFF)
+                continue
+            if not isinstance(values, (list, tuple)):
+                values = [values]
+            now = self._clock()
+            for offset, value in enumerate(values):
+                self.ring.append(float(value), now - (len(values) - 1 - offset) * period)
+            self._samples.inc(len(values))
+            on_sample()
+
+
+class LoadCellArray:
+    """Several HX711 channels read in parallel and summed"""
+
+    def __init__(self, channels, timeout=ALIGN_TIMEOUT, clock=time.monotonic):
+        """
+        Args:
+            channels (list): Channel objects
+            timeout (float): Max seconds read() waits for every channel
+            clock (callable): Monotonic time source
+        """
+        if not channels:
+            raise ValueError("A load cell array needs at least one channel")
+        self.channels = list(channels)
+        self.timeout = timeout
+        self._clock = clock
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._combined_at = None    # Reference time of the last reading returned
+        self._used = [0] * len(self.channels)   # Each channel's ring.count at that reading
+        self._started_at = None
+        self.readings = 0
+        self.skewed = 0             # Readings whose channels were more than SKEW_WARN periods apart
+
+    def start(self):
+        self._started_at = self._clock()
+        for channel in self.channels:
+            channel.start(self._stop_event, self._notify)
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        with self._cond:
+            self._cond.notify_all()
+        for channel in self.channels:
+            channel.join(timeout)
+
+    def _notify(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def _fresh(self):
+        """Every channel has a conversion newer than the last reading"""
+        return not self._stalled()
+
+    def read(self):
+        """
+        Block until every channel has converted, then combine.
+
+        Returns:
+            list: [summed raw value] (same contract as weight_sensor.read_raw)
+
+        Raises:
+            RuntimeError: A channel produced nothing within the timeout
+        """
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._fresh() or self._stop_event.is_set(), self.timeout):
+                stalled = self._stalled()
+                for channel in stalled:
+                    HX711_STALLS.labels(channel.name).inc()
+                names = ', '.join(f"{channel.name} ({channel.last_error or 'no data'})" for channel in stalled)
+                raise RuntimeError(f"HX711 channel(s) not converting: {names}")
+            if self._stop_event.is_set():
+                raise RuntimeError("Load cell array stopped")
+        return [self.combine()]
+
+    def combine(self):
+        """
+        Sum of each channel's conversion nearest the common reference time.
+
+        Returns:
+            float: Summed raw value
+        """
+        self._used = [channel.ring.count for channel in self.channels]
+        samples = [channel.ring.last() for channel in self.channels]
+        reference = min(channel_samples[-1][0] for channel_samples in samples)
+        total = 0.0
+        times = []
+        for channel_samples in samples:
+            timestamp, value = min(channel_samples, key=lambda sample: abs(sample[0] - reference))
+            total += value
+            times.append(timestamp)
+        skew = max(times) - min(times)
+        HX711_ALIGN_SKEW.record(skew)
+        if skew > SKEW_WARN / SAMPLE_RATE:
+            self.skewed += 1
+        self._combined_at = reference
+        self.readings += 1
+        return total
+
+    def _stalled(self):
+        """Channels with no conversion since the last reading"""
+        return [channel for channel, used in zip(self.channels, self._used) if channel.ring.count <= used]
+
+    def tare(self):
+        """Record every channel's current reading as its empty reading (for the per-corner shares)"""
+        for channel in self.channels:
+            samples = channel.ring.last()
+            if samples:
+                channel.zero = sum(value for _, value in samples) / len(samples)
+
+    def diagnostics(self):
+        """
+        Per-corner state.
+
+        Returns:
+            list: {name, samples, errors, samples_per_sec, age, raw, share,
+                alive, last_error} per channel; share is the corner's part
+                of the load (0-1), None until tare()
+        """
+        now = self._clock()
+        elapsed = now - self._started_at if self._started_at is not None else 0.0
+        loads = []
+        for channel in self.channels:
+            latest = channel.ring.latest()
+            loads.append(latest[1] - channel.zero if latest is not None and channel.zero is not None else None)
+        total = sum(load for load in loads if load is not None)
+        result = []
+        for channel, load in zip(self.channels, loads):
+            latest = channel.ring.latest()
+            result.append({
+                'name': channel.name,
+                'samples': channel.ring.count,
+                'errors': channel.errors,
+                'samples_per_sec': channel.ring.count / elapsed if elapsed > 0 else 0.0,
+                'age': now - latest[0] if latest is not None else None,
+                'raw': latest[1] if latest is not None else None,
+                'share': load / total if load is not None and total else None,
+                'alive': channel.alive(),
+                'last_error': channel.last_error,
+            })
+        return result
+
+
+def format_diagnostics(diagnostics):
+    """
+    Format LoadCellArray.diagnostics() for the service log.
+
+    Returns:
+        str: e.g. 'gpio5 10.0/s 26% | gpio13 10.0/s 24% | gpio20 9.9/s 25% | gpio26 0.0/s 2 errors'
+    """
+    parts = []
+    for corner in diagnostics:
+        text = f"{corner['name']} {corner['samples_per_sec']:.1f}/s"
+        if corner['share'] is not None:
+            text += f" {corner['share']:.0%}"
+        if corner['errors']:
+            text += f" {corner['errors']} errors"
+        if not corner['alive']:
+            text += " (stopped)"
+        parts.append(text)
+    return ' | '.join(parts)
@@ -0,0 +1,351 @@
+#!/usr/bin/env python3
+"""
+Service Metrics for SmartKart
+Lightweight latency histograms and counters, served in Prometheus text
+format on a local HTTP endpoint
+
+Histograms are log-linear like HdrHistogram: every power of two is split
+into SUB_BUCKETS equal buckets, so any recorded value is known to within
+1/SUB_BUCKETS (~6%) from 1 µs to 2 minutes, in a fixed array of counters.
+Recording is a frexp(), some integer arithmetic and one increment - cheap
+enough for the per-frame RFID path (see bench_metrics.py).
+
+Metrics are get-or-create by name, so modules that share a metric (e.g.
+rfid_service and reader_pool both record reader timing) just declare it:
+
+    READ_SECONDS = metrics.histogram('smartkart_rfid_read_seconds', 'Read time', ['reader'])
+    READ_SECONDS.labels('reader1').record(elapsed)
+
+Serve the default registry (127.0.0.1 only unless METRICS_ADDR says otherwise):
+
+    metrics.serve(9101)
+    curl http://127.0.0.1:9101/metrics
+"""
+
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+METRICS_ADDR = os.getenv('METRICS_ADDR', '127.0.0.1')
+
+SUB_BUCKETS = 16      # Buckets per power of two (resolution 1/16)
+MIN_EXPONENT = -19    # Values below 2^-20 s (~1 µs) share the first bucket
+MAX_EXPONENT = 7      # Values from 2^7 s (128 s) up share the last bucket
+_BUCKETS = (MAX_EXPONENT - MIN_EXPONENT + 1) * SUB_BUCKETS
+_SCALE = 2 * SUB_BUCKETS
+_frexp = math.frexp
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def bucket_index(value):
+    """Histogram bucket for a value in seconds"""
+    if value <= 0:
+        return 0
+    mantissa, exponent = math.frexp(value)  # value = mantissa * 2**exponent, 0.5 <= mantissa < 1
+    index = (exponent - MIN_EXPONENT) * SUB_BUCKETS + int((mantissa - 0.5) * _SCALE)
+    if index < 0:
+        return 0
+    if index >= _BUCKETS:
+        return _BUCKETS - 1
+    return index
+
+
+def bucket_upper(index):
+    """Upper bound in seconds of a histogram bucket"""
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return (0.5 + (sub + 1) / (2 * SUB_BUCKETS)) * 2.0 ** (exponent + MIN_EXPONENT)
+
+
+class Histogram:
+    """
+    Log-linear latency histogram.
+
+    record() takes no lock: under the GIL an in-place increment with no call
+    in between is not interrupted by another thread, and scrapes tolerate a
+    count and sum that are one sample apart. A lock would double the cost.
+    """
+
+    __slots__ = ('_counts', '_sum', '_count')
+
+    def __init__(self):
+        self._counts = [0] * _BUCKETS
+        self._sum = 0.0
+        self._count = 0
+
+    def record(self, seconds):
+        # bucket_index() inlined: this runs for every frame
+        if seconds > 0:
+            mantissa, exponent = _frexp(seconds)
+            index = (exponent - MIN_EXPONENT) * SUB_BUCKETS + int((mantissa - 0.5) * _SCALE)
+            if index < 0:
+                index = 0
+            elif index >= _BUCKETS:
+                index = _BUCKETS - 1
+        else:
+            index = 0
+        self._counts[index] += 1
+        self._sum += seconds
+        self._count += 1
+
+    def time(self):
+        """Context manager recording the duration of its block"""
+        return _Timer(self)
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def sum(self):
+        return self._sum
+
+    def snapshot(self):
+        return list(self._counts), self._sum, self._count
+
+    def percentile(self, q):
+        """
+        Value at the q-th percentile (0-100).
+
+        Returns:
+            float: Upper bound of the bucket holding that rank (0.0 if empty)
+        """
+        counts, _, count = self.snapshot()
+        if not count:
+            return 0.0
+        rank = max(1, math.ceil(q / 100 * count))
+        seen = 0
+        for index, bucket in enumerate(counts):
+            seen += bucket
+            if seen >= rank:
+                return bucket_upper(index)
+        return bucket_upper(_BUCKETS - 1)
+
+    def samples(self, name, labels):
+        """Prometheus histogram lines with one 'le' bucket per power of two"""
+        counts, total, count = self.snapshot()
+        lines = []
+        cumulative = 0
+        for octave in range(MAX_EXPONENT - MIN_EXPONENT + 1):
+            cumulative += sum(counts[octave * SUB_BUCKETS:(octave + 1) * SUB_BUCKETS])
+            bound = 2.0 ** (octave + MIN_EXPONENT)
+            lines.append(f"{name}_bucket{_format_labels(labels, le=_format_value(bound))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, le='+Inf')} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class _Timer:
+    __slots__ = ('_histogram', '_start')
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._histogram.record(time.perf_counter() - self._start)
+
+
+class Counter:
+    """Monotonic counter (unlocked, like Histogram.record())"""
+
+    __slots__ = ('_value',)
+
+    def __init__(self):
+        self._value = 0
+
+    def inc(self, amount=1):
+        self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self._value)}"]
+
+
+class Gauge:
+    """Value that goes up and down"""
+
+    __slots__ = ('_value',)
+
+    def __init__(self):
+        self._value = 0
+
+    def set(self, value):
+        self._value = value
+
+    @property
+    def value(self):
+        return self._value
+
+    def samples(self, name, labels):
+        return [f"{name}{_format_labels(labels)} {_format_value(self._value)}"]
+
+
+_KINDS = {'counter': Counter, 'gauge': Gauge, 'histogram': Histogram}
+
+
+class Family:
+    """A named metric and its children, one per label value combination"""
+
+    def __init__(self, name, help_text, kind, labelnames):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """Child metric for these label values (created on first use)"""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, _KINDS[self.kind]())
+        return child
+
+    def collect(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for values, child in list(self._children.items()):
+            labels = dict(zip(self.labelnames, values))
+            lines.extend(child.samples(self.name, labels))
+        return lines
+
+
+class Registry:
+    """Metric families plus scrape-time collectors, rendered together"""
+
+    def __init__(self):
+        self._families = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name, help_text, kind, labelnames):
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = Family(name, help_text, kind, labelnames)
+            elif family.kind != kind or family.labelnames != tuple(labelnames):
+                raise ValueError(f"Metric {name} already registered as {family.kind} {family.labelnames}")
+        # Unlabeled metrics are used directly
+        return family if family.labelnames else family.labels()
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._get_or_create(name, help_text, 'counter', labelnames)
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._get_or_create(name, help_text, 'gauge', labelnames)
+
+    def histogram(self, name, help_text, labelnames=()):
+        return self._get_or_create(name, help_text, 'histogram', labelnames)
+
+    def add_collector(self, collector):
+        """
+        Add a callable run at every scrape.
+
+        Args:
+            collector (callable): Returns a list of (name, kind, help, samples)
+                where samples is a list of (labels dict, value); for values
+                that already live elsewhere, e.g. decoder rejection counters
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        with self._lock:
+            if collector in self._collectors:
+                self._collectors.remove(collector)
+
+    def render(self):
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            families = list(self._families.values())
+            collectors = list(self._collectors)
+        lines = []
+        for family in families:
+            lines.extend(family.collect())
+        for collector in collectors:
+            try:
+                collected = collector()
+            except Exception as e:
+                lines.append(f"# collector error: {e}")
+                continue
+            for name, kind, help_text, samples in collected:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, **extra):
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(str(value))}"' for key, value in items) + '}'
+
+
+def _format_value(value):
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+# Default registry used by the services
+REGISTRY = Registry()
+counter = REGISTRY.counter
+gauge = REGISTRY.gauge
+histogram = REGISTRY.histogram
+add_collector = REGISTRY.add_collector
+
+
+def serve(port, addr=None, registry=None):
+    """
+    Serve /metrics from a daemon thread.
+
+    Args:
+        port (int): TCP port (0 picks a free one)
+        addr (str): Address to bind (default: METRICS_ADDR, loopback)
+        registry (Registry): Registry to serve (default: REGISTRY)
+
+    Returns:
+        ThreadingHTTPServer: The running server (server_address has the port)
+    """
+    registry = registry if registry is not None else REGISTRY
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass  # Scrapes every few seconds would flood the service log
+
+    server = ThreadingHTTPServer((addr or METRICS_ADDR, port), Handler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True)
+    thread.start()
+    return server
@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Tag Presence Tracker for SmartKart
+Turns the continuous RDM6300 frame repeats into one enter and one exit
+event per physical tag presence
+
+An RDM6300 repeats a tag's frame for as long as the tag is in the field,
+so a tag held near the antenna for two seconds produces well over a
+hundred reads. The tracker runs on the Pi and only reports:
+
+- tag_enter: once the tag has been read confirm_reads times within
+  confirm_window seconds (N-of-M confirmation, so single ghost reads from
+  line noise never become events)
+- tag_exit: once the tag has not been read for leave_timeout seconds
+
+After an exit, reads of the same tag are ignored for hold_off seconds so a
+tag wobbling at the edge of the field does not flap enter/exit (the same
+purpose as the backend's COOLDOWN_MS).
+"""
+
+import time
+from collections import deque
+
+CONFIRM_READS = 2       # N: reads needed to confirm a presence
+CONFIRM_WINDOW = 0.3    # M: seconds the N reads must fall within
+LEAVE_TIMEOUT = 0.5     # Seconds without reads before a tag has left
+HOLD_OFF = 1.0          # Seconds after an exit before the tag can re-enter
+
+TAG_ENTER = 'tag_enter'
+TAG_EXIT = 'tag_exit'
+
+
+class _Presence:
+    __slots__ = ('reads', 'confirmed', 'first_seen', 'last_seen', 'count', 'readers')
+
+    def __init__(self, now):
+        self.reads = deque()
+        self.confirmed = False
+        self.first_seen = now
+        self.last_seen = now
+        self.count = 0
+        self.readers = set()
+
+
+class PresenceTracker:
+    """Edge-side presence state machine for a set of readers"""
+
+    def __init__(self, confirm_reads=CONFIRM_READS, confirm_window=CONFIRM_WINDOW,
+                 leave_timeout=LEAVE_TIMEOUT, hold_off=HOLD_OFF):
+        """
+        Args:
+            confirm_reads (int): Reads needed within confirm_window to enter
+            confirm_window (float): Confirmation window in seconds
+            leave_timeout (float): Seconds without reads before a tag exits
+            hold_off (float): Seconds after an exit during which re-reads are ignored
+        """
+        if confirm_reads < 1:
+            raise ValueError("confirm_reads must be at least 1")
+        self.confirm_reads = confirm_reads
+        self.confirm_window = confirm_window
+        self.leave_timeout = leave_timeout
+        self.hold_off = hold_off
+        self._tags = {}        # tag_id -> _Presence (candidate or confirmed)
+        self._exited = {}      # tag_id -> exit time (hold-off in progress)
+        self.reads = 0         # Frames observed
+        self.ghosts = 0        # Candidates that never confirmed
+        self.held_off = 0      # Reads ignored during hold-off
+        self.events = 0        # Events produced
+
+    def __len__(self):
+        """Number of confirmed tags currently present"""
+        return sum(1 for presence in self._tags.values() if presence.confirmed)
+
+    def present(self):
+        """Return the confirmed tag IDs currently in the field"""
+        return [tag for tag, presence in self._tags.items() if presence.confirmed]
+
+    def observe(self, tag_id, now=None, reader=None):
+        """
+        Record one decoded frame.
+
+        Args:
+            tag_id (str): Decoded tag ID
+            now (float): time.monotonic() of the read (default: now)
+            reader (str): Reader that produced the frame, or a list of
+                readers for a fused scan (optional)
+
+        Returns:
+            list: Events produced ([] or a single tag_enter event)
+        """
+        if now is None:
+            now = time.monotonic()
+        self.reads += 1
+
+        exited_at = self._exited.get(tag_id)
+        if exited_at is not None:
+            if now - exited_at < self.hold_off:
+                self.held_off += 1
+                return []
+            del self._exited[tag_id]
+
+        presence = self._tags.get(tag_id)
+        if presence is None:
+            presence = self._tags[tag_id] = _Presence(now)
+        presence.last_seen = now
+        presence.count += 1
+        if isinstance(reader, str):
+            presence.readers.add(reader)
+        elif reader is not None:
+            presence.readers.update(reader)
+        if presence.confirmed:
+            return []
+
+        reads = presence.reads
+        reads.append(now)
+        while now - reads[0] > self.confirm_window:
+            reads.popleft()
+        if len(reads) < self.confirm_reads:
+            return []
+
+        presence.confirmed = True
+        presence.reads = None
+        self.events += 1
+        return [self._event(TAG_ENTER, tag_id, presence, now)]
+
+    def expire(self, now=None):
+        """
+        Close presences whose tag has stopped being read.
+
+        Args:
+            now (float): Current time.monotonic() (default: now)
+
+        Returns:
+            list: tag_exit events for tags that left
+        """
+        if now is None:
+            now = time.monotonic()
+        events = []
+        for tag_id, presence in list(self._tags.items()):
+            if presence.confirmed:
+                if now - presence.last_seen >= self.leave_timeout:
+                    del self._tags[tag_id]
+                    self._exited[tag_id] = now
+                    self.events += 1
+                    events.append(self._event(TAG_EXIT, tag_id, presence, now))
+            elif now - presence.last_seen > self.confirm_window:
+                del self._tags[tag_id]
+                self.ghosts += 1
+        for tag_id, exited_at in list(self._exited.items()):
+            if now - exited_at >= self.hold_off:
+                del self._exited[tag_id]
+        return events
+
+    def next_deadline(self):
+        """
+        Earliest time.monotonic() at which expire() could produce a change.
+
+        Returns:
+            float: Deadline, or None when nothing is being tracked
+        """
+        deadlines = [
+            presence.last_seen + (self.leave_timeout if presence.confirmed else self.confirm_window)
+            for presence in self._tags.values()
+        ]
+        deadlines.extend(exited_at + self.hold_off for exited_at in self._exited.values())
+        return min(deadlines) if deadlines else None
+
+    def stats(self):
+        """Return counters, including the read-to-event reduction ratio"""
+        return {
+            'reads': self.reads,
+            'events': self.events,
+            'ghosts': self.ghosts,
+            'held_off': self.held_off,
+            'present': len(self),
+            'reduction': self.reads / self.events if self.events else 0.0,
+        }
+
+    @staticmethod
+    def _event(event_type, tag_id, presence, now):
+        return {
+            'type': event_type,
+            'tagId': tag_id,
+            'time': now,
+            'firstSeen': presence.first_seen,
+            'reads': presence.count,
+            'readers': sorted(presence.readers),
+        }
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""
+RDM6300 Frame Decoder for SmartKart
+Ring-buffer parser for the 14-byte RDM6300 serial frame
+
+Frame format (14 bytes):
+- Byte 0: STX (Start of Text) = 0x02
+- Bytes 1-10: 10-character ASCII hex tag ID
+- Bytes 11-12: 2-character ASCII hex checksum (XOR of the 5 tag ID bytes)
+- Byte 13: ETX (End of Text) = 0x03
+
+The decoder keeps pending bytes in a preallocated bytearray ring buffer, so
+appending and consuming data never rebuilds a bytes object. Frames are
+validated in place: each of the 12 tag ID and checksum characters is
+looked up in a 256-entry hex nibble table straight off the buffer, and
+the checksum XOR is folded in as the tag bytes are assembled. Nothing is
+sliced or copied; the only allocation per accepted frame is the returned
+tag ID string. A reader repeats the same frame while a tag stays in the
+field, so a frame identical to the last accepted one is recognised with
+one in-place comparison and returns the same tag ID string.
+"""
+
+STX = 0x02
+ETX = 0x03
+PACKET_SIZE = 14  # RDM6300 sends 14 bytes per read
+
+DEFAULT_CAPACITY = 256  # Must be a power of two
+
+# Rejection counters kept per decoder:
+# - garbage_bytes: bytes discarded while searching for STX
+# - no_etx: STX bytes without an ETX 13 bytes later (misaligned/truncated)
+# - bad_hex: aligned frames with non-hex tag ID or checksum characters
+# - bad_checksum: aligned frames whose XOR checksum does not match
+# - overflow_bytes: oldest bytes dropped by feed() when the buffer was full
+REJECT_REASONS = ('garbage_bytes', 'no_etx', 'bad_hex', 'bad_checksum', 'overflow_bytes')
+
+# ASCII byte -> hex nibble value; anything that is not a hex digit maps to
+# _BAD_NIBBLE, which survives OR-ing the nibbles of a frame together
+_BAD_NIBBLE = 0x10
+_NIBBLE = bytes(int(chr(byte), 16) if chr(byte) in '0123456789ABCDEFabcdef' else _BAD_NIBBLE
+                for byte in range(256))
+# Longer than a frame's 12 characters, so it matches nothing
+_NO_FIELD = bytes(13)
+
+
+def encode_frame(tag_id, checksum=None):
+    """
+    Build a 14-byte RDM6300 frame for a tag ID.
+
+    Used by tests, benchmarks and emulators to produce reader output.
+
+    Args:
+        tag_id (str): 10-character hex tag ID
+        checksum (int): Override the checksum byte (default: correct XOR)
+
+    Returns:
+        bytes: Encoded frame
+    """
+    tag_bytes = bytes.fromhex(tag_id)
+    if checksum is None:
+        checksum = 0
+        for byte in tag_bytes:
+            checksum ^= byte
+    return b'\x02' + tag_id.encode('ascii') + b'%02X' % checksum + b'\x03'
+
+
+class FrameDecoder:
+    """Per-reader RDM6300 decoder backed by a fixed-size ring buffer"""
+
+    __slots__ = ('_buf', '_view', '_mask', '_head', '_size', '_last_field', '_last_tag',
+                 'bytes_in', 'frames', 'rejected')
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        """
+        Create a decoder with a preallocated ring buffer.
+
+        Args:
+            capacity (int): Buffer size in bytes, a power of two >= PACKET_SIZE
+        """
+        if capacity < PACKET_SIZE or capacity & (capacity - 1):
+            raise ValueError(f"capacity must be a power of two >= {PACKET_SIZE}")
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self._mask = capacity - 1
+        self._head = 0
+        self._size = 0
+        # Characters 1-12 of the last accepted frame and its tag ID: a reader
+        # repeats the same frame while a tag stays in the field
+        self._last_field = _NO_FIELD
+        self._last_tag = None
+        self.bytes_in = 0  # Total bytes received
+        self.frames = 0  # Valid frames decoded
+        self.rejected = dict.fromkeys(REJECT_REASONS, 0)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def capacity(self):
+        return self._mask + 1
+
+    def clear(self):
+        """Discard all pending bytes"""
+        self._head = 0
+        self._size = 0
+
+    def pending(self):
+        """Return a copy of the pending bytes (for debugging only)"""
+        tail = self._head + self._size
+        if tail <= self.capacity:
+            return bytes(self._view[self._head:tail])
+        return bytes(self._view[self._head:]) + bytes(self._view[:tail & self._mask])
+
+    def hex(self):
+        """Return the pending bytes as a hex string (for debugging only)"""
+        return self.pending().hex()
+
+    def _consume(self, count):
+        self._head = (self._head + count) & self._mask
+        self._size -= count
+
+    def _free_segment(self):
+        """Return (start, length) of the contiguous free region after the tail"""
+        capacity = self._mask + 1
+        tail = (self._head + self._size) & self._mask
+        free = capacity - self._size
+        return tail, min(free, capacity - tail)
+
+    def feed(self, data):
+        """
+        Append raw bytes to the buffer.
+
+        If the buffer cannot hold everything, the oldest pending bytes are
+        discarded so the most recent data is kept.
+
+        Args:
+            data (bytes-like): Bytes received from the reader
+        """
+        count = len(data)
+        size = self._size
+        capacity = self._mask + 1
+        if size + count <= capacity:
+            # Fits: one or two slice copies into the free space
+            tail = (self._head + size) & self._mask
+            end = tail + count
+            if end <= capacity:
+                self._buf[tail:end] = data
+            else:
+                data = memoryview(data)
+                self._buf[tail:] = data[:capacity - tail]
+                self._buf[:end - capacity] = data[capacity - tail:]
+            self._size = size + count
+            self.bytes_in += count
+            return
+
+        data = memoryview(data)
+        self.bytes_in += len(data)
+        if len(data) >= capacity:
+            self.rejected['overflow_bytes'] += self._size + len(data) - capacity
+            self._view[:] = data[len(data) - capacity:]
+            self._head = 0
+            self._size = capacity
+            return
+
+        excess = self._size + len(data) - capacity
+        if excess > 0:
+            self.rejected['overflow_bytes'] += excess
+            self._consume(excess)
+
+        while len(data):
+            start, length = self._free_segment()
+            chunk = min(length, len(data))
+            self._view[start:start + chunk] = data[:chunk]
+            self._size += chunk
+            data = data[chunk:]
+
+    def fill_from(self, serial_connection, available=None):
+        """
+        Read waiting bytes from a serial port directly into the free space.
+
+        Reads at most the free space in the buffer; anything beyond that
+        stays queued in the serial driver for the next call.
+
+        Args:
+            serial_connection (serial.Serial): Open serial port (or any object
+                with in_waiting/readinto)
+            available (int): Bytes known to be waiting (default: query in_waiting)
+
+        Returns:
+            int: Number of bytes read
+        """
+        if available is None:
+            available = serial_connection.in_waiting
+        size = self._size
+        capacity = self._mask + 1
+        if available > capacity - size:
+            available = capacity - size
+        if available <= 0:
+            return 0
+
+        view = self._view
+        tail = (self._head + size) & self._mask
+        first = capacity - tail
+        if available <= first:
+            count = serial_connection.readinto(view[tail:tail + available]) or 0
+        else:
+            count = serial_connection.readinto(view[tail:]) or 0
+            if count == first:
+                count += serial_connection.readinto(view[:available - first]) or 0
+        self._size = size + count
+        self.bytes_in += count
+        return count
+
+    def next_frame(self):
+        """
+        Return the next valid tag ID in the buffer, resyncing past bad data.
+
+        Applies the original read_tag() framing rules in a single pass:
+        garbage before the next STX is dropped, an STX without ETX at byte
+        13 is skipped, and an aligned frame is consumed whether or not it
+        passes hex and checksum validation. Rejections are counted in
+        self.rejected by reason.
+
+        Returns:
+            str: Uppercase 10-character tag ID, or None once fewer than a
+                frame's worth of bytes remain
+        """
+        buf = self._buf
+        mask = self._mask
+        capacity = mask + 1
+        rejected = self.rejected
+        nibble = _NIBBLE
+
+        while True:
+            size = self._size
+            if size == 0:
+                return None
+            head = self._head
+
+            # Search for STX (0x02) in the (at most two) contiguous segments,
+            # unless the buffer already starts with one (the usual case)
+            if buf[head] == STX:
+                offset = 0
+            else:
+                end = head + size
+                if end <= capacity:
+                    stx_index = buf.find(STX, head, end)
+                    offset = stx_index - head if stx_index != -1 else size
+                else:
+                    stx_index = buf.find(STX, head)
+                    if stx_index != -1:
+                        offset = stx_index - head
+                    else:
+                        stx_index = buf.find(STX, 0, end & mask)
+                        offset = stx_index + capacity - head if stx_index != -1 else size
+
+            # Drop garbage before the STX (or everything if there is none)
+            if offset:
+                rejected['garbage_bytes'] += offset
+                if offset == size:
+                    self._head = 0
+                    self._size = 0
+                    return None
+                head = (head + offset) & mask
+                size -= offset
+                self._head = head
+                self._size = size
+
+            # Wait for a complete packet
+            if size < PACKET_SIZE:
+                return None
+
+            # STX found but ETX not in right position - skip this STX
+            if buf[(head + 13) & mask] != ETX:
+                rejected['no_etx'] += 1
+                self._head = (head + 1) & mask
+                self._size = size - 1
+                continue
+
+            # Aligned packet: consume it whether or not it validates
+            self._head = (head + PACKET_SIZE) & mask
+            self._size = size - PACKET_SIZE
+
+            # Tag ID + checksum characters (bytes 1-12), looked up in place
+            start = head + 1
+            contiguous = start + 12 <= capacity
+            if contiguous:
+                # The same frame as last time: compared in place, no copy
+                if buf.startswith(self._last_field, start, start + 12):
+                    self.frames += 1
+                    return self._last_tag
+                n0 = nibble[buf[start]]
+                n1 = nibble[buf[start + 1]]
+                n2 = nibble[buf[start + 2]]
+                n3 = nibble[buf[start + 3]]
+                n4 = nibble[buf[start + 4]]
+                n5 = nibble[buf[start + 5]]
+                n6 = nibble[buf[start + 6]]
+                n7 = nibble[buf[start + 7]]
+                n8 = nibble[buf[start + 8]]
+                n9 = nibble[buf[start + 9]]
+                n10 = nibble[buf[start + 10]]
+                n11 = nibble[buf[start + 11]]
+            else:
+                n0 = nibble[buf[start & mask]]
+                n1 = nibble[buf[(start + 1) & mask]]
+                n2 = nibble[buf[(start + 2) & mask]]
+                n3 = nibble[buf[(start + 3) & mask]]
+                n4 = nibble[buf[(start + 4) & mask]]
+                n5 = nibble[buf[(start + 5) & mask]]
+                n6 = nibble[buf[(start + 6) & mask]]
+                n7 = nibble[buf[(start + 7) & mask]]
+                n8 = nibble[buf[(start + 8) & mask]]
+                n9 = nibble[buf[(start + 9) & mask]]
+                n10 = nibble[buf[(start + 10) & mask]]
+                n11 = nibble[buf[(start + 11) & mask]]
+
+            # Reject any byte that is not an ASCII hex digit
+            if (n0 | n1 | n2 | n3 | n4 | n5 | n6 | n7 | n8 | n9 | n10 | n11) & _BAD_NIBBLE:
+                rejected['bad_hex'] += 1
+                continue
+
+            # Assemble the 5 tag bytes, folding the checksum XOR as we go
+            byte = n0 << 4 | n1
+            checksum = byte
+            tag_value = byte
+            byte = n2 << 4 | n3
+            checksum ^= byte
+            tag_value = tag_value << 8 | byte
+            byte = n4 << 4 | n5
+            checksum ^= byte
+            tag_value = tag_value << 8 | byte
+            byte = n6 << 4 | n7
+            checksum ^= byte
+            tag_value = tag_value << 8 | byte
+            byte = n8 << 4 | n9
+            checksum ^= byte
+            tag_value = tag_value << 8 | byte
+            if checksum != n10 << 4 | n11:
+                rejected['bad_checksum'] += 1
+                continue
+            self.frames += 1
+            tag = '%010X' % tag_value
+            if contiguous:
+                self._last_field = buf[start:start + 12]
+                self._last_tag = tag
+            return tag
+
+    def decode_all(self):
+        """
+        Decode every complete frame currently buffered.
+
+        Returns:
+            list: Tag IDs in arrival order (possibly empty)
+        """
+        tags = []
+        next_frame = self.next_frame
+        tag = next_frame()
+        while tag is not None:
+            tags.append(tag)
+            tag = next_frame()
+        return tags
+
+    def drain(self, serial_connection, available=None):
+        """
+        Read everything waiting on a serial port and decode all frames.
+
+        Data larger than the ring buffer is read in buffer-sized pieces and
+        decoded between reads, so a backlog never overflows or gets flushed.
+
+        Args:
+            serial_connection (serial.Serial): Open serial port
+            available (int): Bytes known to be waiting (default: query in_waiting)
+
+        Returns:
+            list: Tag IDs in arrival order (possibly empty)
+        """
+        if available is None:
+            available = serial_connection.in_waiting
+        tags = []
+        while available > 0:
+            count = self.fill_from(serial_connection, available)
+            tags.extend(self.decode_all())
+            if not count:
+                break
+            available -= count
+        return tags
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+RDM6300 Reader Emulator for SmartKart
+Pseudo-terminal readers that stream RDM6300 frames for scripted tag
+presences, with configurable noise and error injection
+
+Each EmulatedReader creates a pty pair and writes to the master side from
+its own thread; the slave side is a real tty that pyserial opens exactly
+like /dev/serial0 or /dev/ttyUSB0, so the unmodified rfid_service serial
+path can be tested, load-tested and profiled without hardware. pyserial
+flushes the input buffer when it opens a port, so open the readers before
+putting tags in the field (or before start()).
+
+While a tag is in the field the reader repeats its 14-byte frame back to
+back at the line rate (several tags in the field are read round robin).
+Per frame, errors are injected at configurable rates:
+
+- noise: 1-8 random line-noise bytes before the frame
+- truncate: only the first 1-13 bytes of the frame are sent
+- bad_checksum: the checksum field is corrupted
+- burst: the next 2-8 frames are held back and delivered in one write
+  (USB-serial adapters batch like this)
+
+Run standalone to serve readers for rfid_service:
+
+    python3 rdm6300_emulator.py --readers 2 --link /tmp/rdm6300- --tags 0A1B2C3D4E
+    RFID_READER_PORTS=/tmp/rdm6300-1,/tmp/rdm6300-2 python3 rfid_service.py
+"""
+
+import argparse
+import os
+import random
+import select
+import sys
+import threading
+import time
+import tty
+
+from rdm6300 import encode_frame, PACKET_SIZE
+
+DEFAULT_BAUD = 9600
+BITS_PER_BYTE = 10      # 8N1: start + 8 data + stop
+MAX_BURST = 8
+UNTHROTTLED_BATCH = 64  # Frame slots per write when speed is 0
+
+
+class EmulatedReader:
+    """One emulated RDM6300 on a pseudo-terminal"""
+
+    def __init__(self, name='reader1', link=None, baud=DEFAULT_BAUD, speed=1.0, frame_gap=0.0,
+                 noise=0.0, truncate=0.0, bad_checksum=0.0, burst=0.0, seed=None):
+        """
+        Args:
+            name (str): Reader name for logs and stats
+            link (str): Optional stable symlink to the pty (e.g. /tmp/rdm6300-1)
+            baud (int): Line rate the frame timing is derived from
+            speed (float): Frame rate multiplier; 0 streams as fast as the
+                pty accepts (extreme load)
+            frame_gap (float): Idle seconds between frames at speed 1
+            noise (float): Probability of line noise before a frame
+            truncate (float): Probability a frame is cut short
+            bad_checksum (float): Probability a frame has a wrong checksum
+            burst (float): Probability a frame starts a held-back burst
+            seed (int): Random seed for reproducible error patterns
+        """
+        self.name = name
+        self.link = link
+        self.speed = speed
+        self.frame_period = PACKET_SIZE * BITS_PER_BYTE / baud + frame_gap
+        self.noise = noise
+        self.truncate = truncate
+        self.bad_checksum = bad_checksum
+        self.burst = burst
+        self._rng = random.Random(seed)
+        self._tags = {}           # tag_id -> time.monotonic() it leaves (None: stays)
+        self._tags_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        self.frames = 0           # Intact frames generated
+        self.noise_bytes = 0
+        self.truncated = 0
+        self.bad_checksums = 0
+        self.bursts = 0
+        self.bytes_written = 0
+        self.overrun_bytes = 0    # Bytes dropped because nobody was reading
+
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._master)
+        tty.setraw(self._slave)
+        os.set_blocking(self._master, False)
+        self.port = os.ttyname(self._slave)
+        if link:
+            if os.path.islink(link):
+                os.unlink(link)
+            os.symlink(self.port, link)
+
+    @property
+    def path(self):
+        """Path to open with pyserial (the stable link if one was made)"""
+        return self.link or self.port
+
+    # ----- Tag presence script -----
+
+    def present(self, tag_id, duration=None):
+        """Put a tag in the field, for `duration` seconds or until removed"""
+        leaves = None if duration is None else time.monotonic() + duration
+        with self._tags_lock:
+            self._tags[tag_id] = leaves
+
+    def remove(self, tag_id):
+        with self._tags_lock:
+            self._tags.pop(tag_id, None)
+
+    def clear(self):
+        with self._tags_lock:
+            self._tags.clear()
+
+    def script(self, presences):
+        """
+        Schedule presences relative to now.
+
+        Args:
+            presences (list): (start seconds, tag_id, duration seconds) tuples
+        """
+        for start, tag_id, duration in presences:
+            timer = threading.Timer(start, self.present, args=(tag_id, duration))
+            timer.daemon = True
+            timer.start()
+
+    def in_field(self):
+        now = time.monotonic()
+        with self._tags_lock:
+            for tag_id, leaves in list(self._tags.items()):
+                if leaves is not None and now >= leaves:
+                    del self._tags[tag_id]
+            return list(self._tags)
+
+    # ----- Streaming -----
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name=f"emulator-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        for fd in (self._master, self._slave):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        if self.link and os.path.islink(self.link):
+            os.unlink(self.link)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def stats(self):
+        return {
+            'frames': self.frames,
+            'noise_bytes': self.noise_bytes,
+            'truncated': self.truncated,
+            'bad_checksums': self.bad_checksums,
+            'bursts': self.bursts,
+            'bytes_written': self.bytes_written,
+            'overrun_bytes': self.overrun_bytes,
+        }
+
+    def next_chunk(self, tag_id):
+        """
+        Build the bytes for one frame slot of a tag, with errors injected.
+
+        Returns:
+            tuple: (bytes, intact frame count in them)
+        """
+        rng = self._rng
+        parts = []
+        if self.noise and rng.random() < self.noise:
+            noise = bytes(rng.randrange(256) for _ in range(rng.randint(1, 8)))
+            parts.append(noise)
+            self.noise_bytes += len(noise)
+        if self.bad_checksum and rng.random() < self.bad_checksum:
+            frame = encode_frame(tag_id)
+            checksum = int(frame[11:13], 16) ^ rng.randint(1, 255)
+            parts.append(encode_frame(tag_id, checksum=checksum))
+            self.bad_checksums += 1
+            return b''.join(parts), 0
+        frame = encode_frame(tag_id)
+        if self.truncate and rng.random() < self.truncate:
+            parts.append(frame[:rng.randint(1, PACKET_SIZE - 1)])
+            self.truncated += 1
+            return b''.join(parts), 0
+        parts.append(frame)
+        return b''.join(parts), 1
+
+    def _write(self, data):
+        try:
+            written = os.write(self._master, data)
+        except BlockingIOError:
+            written = 0
+        except OSError:
+            # Port closed underneath us
+            self._stop_event.set()
+            return
+        self.bytes_written += written
+        self.overrun_bytes += len(data) - written
+
+    def _write_all(self, data):
+        """Write everything, waiting for the reader to make room (unthrottled mode)"""
+        view = memoryview(data)
+        while view and not self._stop_event.is_set():
+            try:
+                written = os.write(self._master, view)
+            except BlockingIOError:
+                select.select([], [self._master], [], 0.05)
+                continue
+            except OSError:
+                self._stop_event.set()
+                return
+            self.bytes_written += written
+            view = view[written:]
+
+    def _run(self):
+        period = self.frame_period / self.speed if self.speed > 0 else 0.0
+        next_slot = time.monotonic()
+        turn = 0
+        held = []
+        held_frames = 0
+        hold_for = 0
+        while not self._stop_event.is_set():
+            tags = self.in_field()
+            if not tags:
+                # Idle: nothing on the line; flush anything held back
+                if held:
+                    self._write(b''.join(held))
+                    self.frames += held_frames
+                    held, held_frames, hold_for = [], 0, 0
+                self._stop_event.wait(0.005)
+                next_slot = time.monotonic()
+                continue
+
+            if not period:
+                # Extreme load: fill the pty in large writes
+                chunks = []
+                intact = 0
+                for _ in range(UNTHROTTLED_BATCH):
+                    chunk, ok = self.next_chunk(tags[turn % len(tags)])
+                    turn += 1
+                    chunks.append(chunk)
+                    intact += ok
+                self._write_all(b''.join(chunks))
+                self.frames += intact
+                continue
+
+            tag_id = tags[turn % len(tags)]
+            turn += 1
+            chunk, intact = self.next_chunk(tag_id)
+
+            if not hold_for and self.burst and self._rng.random() < self.burst:
+                hold_for = self._rng.randint(2, MAX_BURST)
+                self.bursts += 1
+            if hold_for:
+                held.append(chunk)
+                held_frames += intact
+                hold_for -= 1
+                if not hold_for:
+                    self._write(b''.join(held))
+                    self.frames += held_frames
+                    held, held_frames = [], 0
+            else:
+                self._write(chunk)
+                self.frames += intact
+
+            next_slot += period
+            delay = next_slot - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            elif delay < -1.0:
+                next_slot = time.monotonic()  # Fell far behind; don't catch up in a rush
+
+
+class EmulatorFleet:
+    """Many emulated readers started and stopped together"""
+
+    def __init__(self, count, link_prefix=None, seed=None, **options):
+        """
+        Args:
+            count (int): Number of readers
+            link_prefix (str): Stable link prefix; reader N is at f"{prefix}{N}"
+            seed (int): Base random seed (reader N uses seed + N)
+            **options: EmulatedReader options shared by every reader
+        """
+        self.readers = []
+        for index in range(1, count + 1):
+            link = f"{link_prefix}{index}" if link_prefix else None
+            reader_seed = None if seed is None else seed + index
+            self.readers.append(EmulatedReader(f"reader{index}", link=link, seed=reader_seed, **options))
+
+    @property
+    def paths(self):
+        return [reader.path for reader in self.readers]
+
+    def start(self):
+        for reader in self.readers:
+            reader.start()
+        return self
+
+    def stop(self):
+        for reader in self.readers:
+            reader.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Emulate RDM6300 readers on pseudo-terminals")
+    parser.add_argument('--readers', type=int, default=2, help='number of emulated readers')
+    parser.add_argument('--link', help='stable symlink prefix, e.g. /tmp/rdm6300- -> /tmp/rdm6300-1 ...')
+    parser.add_argument('--tags', default='0A1B2C3D4E', help='comma-separated tags kept in every field')
+    parser.add_argument('--cycle', type=float, default=0.0,
+                        help='if set, each tag is present for this many seconds then absent as long')
+    parser.add_argument('--speed', type=float, default=1.0, help='frame rate multiplier (0 = unthrottled)')
+    parser.add_argument('--noise', type=float, default=0.0)
+    parser.add_argument('--truncate', type=float, default=0.0)
+    parser.add_argument('--bad-checksum', type=float, default=0.0)
+    parser.add_argument('--burst', type=float, default=0.0)
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    tags = [tag.strip() for tag in args.tags.split(',') if tag.strip()]
+    fleet = EmulatorFleet(args.readers, link_prefix=args.link, seed=args.seed, speed=args.speed,
+                          noise=args.noise, truncate=args.truncate,
+                          bad_checksum=args.bad_checksum, burst=args.burst)
+    print("=" * 60)
+    print("RDM6300 Emulator")
+    print("=" * 60)
+    for reader in fleet.readers:
+        print(f"{reader.name}: {reader.path}" + (f" -> {reader.port}" if reader.link else ""))
+    print(f"RFID_READER_PORTS={','.join(fleet.paths)}")
+    print("=" * 60)
+
+    fleet.start()
+    try:
+        present = True
+        while True:
+            for reader in fleet.readers:
+                for tag in tags:
+                    if present:
+                        reader.present(tag)
+                    else:
+                        reader.remove(tag)
+            if args.cycle > 0:
+                time.sleep(args.cycle)
+                present = not present
+            else:
+                time.sleep(5)
+                for reader in fleet.readers:
+                    print(f"[{reader.name}] {reader.stats()}")
+    except KeyboardInterrupt:
+        print("\nStopping emulator...")
+    finally:
+        fleet.stop()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+RFID Reader Pool for SmartKart
+One thread and one FrameDecoder per RDM6300 reader, all feeding a single
+bounded scan queue that is consumed by one emitter
+
+Each worker blocks in serial read() until bytes arrive, then drains the
+port through its decoder, so readers never wait on each other and adding
+antennas adds throughput instead of polling latency.
+"""
+
+import queue
+import threading
+import time
+
+import serial
+
+import metrics
+import service_log
+from rdm6300 import FrameDecoder
+
+SCAN_QUEUE_SIZE = 1024  # Max decoded scans waiting for the emitter
+
+# Shared with rfid_service.read_tags() (same metric, get-or-create by name)
+READ_SECONDS = metrics.histogram(
+    'smartkart_rfid_read_seconds', 'Serial read and frame decode time per batch of waiting bytes', ['reader'])
+
+log = service_log.get_logger('Reader Pool')
+
+
+def port_closed(serial_connection):
+    """
+    True once close() has started on the port.
+
+    pyserial releases the descriptor (fd = None) before clearing is_open,
+    so a read racing a close() from another thread can fail in between.
+    """
+    return not getattr(serial_connection, 'is_open', True) or getattr(serial_connection, 'fd', 0) is None
+
+
+class ReaderWorker(threading.Thread):
+    """Reads one serial port and puts decoded scans on the shared queue"""
+
+    def __init__(self, reader_id, label, serial_connection, scan_queue, decoder=None):
+        """
+        Args:
+            reader_id (str): Unique identifier for this reader (e.g. 'reader1')
+            label (str): Human-readable name for logging (e.g. 'Reader 1')
+            serial_connection (serial.Serial): Open port; its timeout bounds
+                how long stop() takes to be noticed
+            scan_queue (queue.Queue): Shared queue of (reader_id, label, tag, time)
+            decoder (FrameDecoder): Decoder to use (default: a new one)
+        """
+        super().__init__(name=f"rfid-{reader_id}", daemon=True)
+        self.reader_id = reader_id
+        self.label = label
+        self.serial = serial_connection
+        self.scan_queue = scan_queue
+        self.decoder = decoder if decoder is not None else FrameDecoder()
+        self.scans = 0     # Scans queued
+        self.dropped = 0   # Scans discarded because the queue was full
+        self.error = None  # Exception that stopped the worker, if any
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def _enqueue(self, tag, timestamp):
+        item = (self.reader_id, self.label, tag, timestamp)
+        try:
+            self.scan_queue.put_nowait(item)
+        except queue.Full:
+            # Keep the freshest scans: drop the oldest one and retry once
+            try:
+                self.scan_queue.get_nowait()
+            except queue.Empty:
+                pass
+            self.dropped += 1
+            try:
+                self.scan_queue.put_nowait(item)
+            except queue.Full:
+                self.dropped += 1
+                return
+        self.scans += 1
+
+    def run(self):
+        ser = self.serial
+        decoder = self.decoder
+        read_seconds = READ_SECONDS.labels(self.reader_id)
+        try:
+            while not self._stop_event.is_set():
+                waiting = ser.in_waiting
+                if waiting == 0:
+                    # Block until the first byte arrives (or the port timeout)
+                    first = ser.read(1)
+                    if not first:
+                        continue
+                    decoder.feed(first)
+                    waiting = ser.in_waiting
+                # Timed from the first byte, not the idle wait for it
+                start = time.perf_counter()
+                tags = decoder.drain(ser, waiting) if waiting else decoder.decode_all()
+                read_seconds.record(time.perf_counter() - start)
+                if tags:
+                    now = time.monotonic()
+                    for tag in tags:
+                        self._enqueue(tag, now)
+        except Exception as e:
+            if self._stop_event.is_set() or port_closed(ser):
+                return   # Port closed under the read (stop() or the supervisor)
+            if not isinstance(e, (OSError, serial.SerialException)):
+                raise
+            self.error = e
+            log.error(f"✗ {self.label} read error: {e} - worker stopped", extra={'kind': 'read_error'})
+            # Wake the consumer so the failure is noticed without waiting
+            # for its timeout
+            try:
+                self.scan_queue.put_nowait((self.reader_id, self.label, None, time.monotonic()))
+            except queue.Full:
+                pass
+
+
+class ReaderPool:
+    """Runs a ReaderWorker per reader and exposes their shared scan queue"""
+
+    def __init__(self, readers, decoders=None, queue_size=SCAN_QUEUE_SIZE):
+        """
+        Args:
+            readers (list): (reader_id, label, serial.Serial) tuples
+            decoders (dict): Optional dict to publish each reader's FrameDecoder in
+            queue_size (int): Capacity of the shared scan queue
+        """
+        self.scan_queue = queue.Queue(maxsize=queue_size)
+        self.decoders = decoders if decoders is not None else {}
+        self.workers = []
+        for reader_id, label, reader in readers:
+            decoder = self.decoders.setdefault(reader_id, FrameDecoder())
+            self.workers.append(ReaderWorker(reader_id, label, reader, self.scan_queue, decoder))
+        self._started_at = None
+
+    def start(self):
+        self._started_at = time.monotonic()
+        for worker in self.workers:
+            worker.start()
+
+    def stop(self, timeout=1.0):
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(timeout)
+
+    def set_readers(self, readers, timeout=1.0):
+        """
+        Replace the set of ports being read (after the supervisor reopened
+        or closed some).
+
+        Workers whose port is still in `readers` keep running; the others
+        are stopped, and a new worker with the reader's existing decoder is
+        started for each new port.
+
+        Args:
+            readers (list): (reader_id, label, serial.Serial) tuples
+            timeout (float): Max seconds to wait for each stopped worker
+        """
+        wanted = {id(reader) for _, _, reader in readers}
+        kept = []
+        for worker in self.workers:
+            if id(worker.serial) in wanted:
+                kept.append(worker)
+            else:
+                worker.stop()
+                worker.join(timeout)
+        running = {id(worker.serial) for worker in kept}
+        for reader_id, label, reader in readers:
+            if id(reader) not in running:
+                decoder = self.decoders.setdefault(reader_id, FrameDecoder())
+                worker = ReaderWorker(reader_id, label, reader, self.scan_queue, decoder)
+                worker.start()
+                kept.append(worker)
+        self.workers = kept
+
+    def failed(self):
+        """
+        Workers stopped by a read error.
+
+        Returns:
+            list: ReaderWorker objects with `error` set
+        """
+        return [worker for worker in self.workers if worker.error is not None]
+
+    def alive(self):
+        """Return True while at least one worker is still reading"""
+        return any(worker.is_alive() for worker in self.workers)
+
+    def get(self, timeout=None):
+        """
+        Wait for the next scan.
+
+        Returns:
+            tuple: (reader_id, label, tag, monotonic time), or None on timeout
+                or when a worker stopped on a read error
+        """
+        try:
+            scan = self.scan_queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return scan if scan[2] is not None else None   # A worker's failure wake-up
+
+    def stats(self):
+        """
+        Per-reader throughput counters.
+
+        Returns:
+            dict: reader_id -> {'bytes', 'frames', 'scans', 'dropped', 'scans_per_sec'}
+        """
+        elapsed = max(time.monotonic() - self._started_at, 1e-9) if self._started_at else 0
+        result = {}
+        for worker in self.workers:
+            result[worker.reader_id] = {
+                'bytes': worker.decoder.bytes_in,
+                'frames': worker.decoder.frames,
+                'scans': worker.scans,
+                'dropped': worker.dropped,
+                'scans_per_sec': worker.scans / elapsed if elapsed else 0.0,
+            }
+        return result
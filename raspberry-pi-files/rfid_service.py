@@ -1,9 +1,23 @@
 #!/usr/bin/env python3
 
+import os
+import selectors
 import serial
 import time
 import socketio
-from datetime import datetime
+from datetime import datetime, timezone
+import metrics
+import service_log
+from rdm6300 import FrameDecoder
+from reader_pool import ReaderPool
+from presence import PresenceTracker, TAG_ENTER
+from fusion import ScanFusion, single_scan
+from scan_batch import ScanBatcher
+from journal import Journal, Forwarder, JOURNAL_DIR
+from capture import CaptureWriter, RecordingSerial
+from acks import AckTracker, format_stats
+from governor import Governor, format_savings
+from supervisor import ReaderSupervisor, format_health
 
 # Configuration
 BACKEND_URL = "http://192.168.1.100:8001"
@@ -12,12 +26,82 @@ CART_ID = "1234"
 # Serial port configuration
 READER_1_PORT = "/dev/ttyUSB0"  # USB UART (swapped - now the good reader)
 READER_2_PORT = "/dev/serial0"  # GPIO UART (swapped - now the problematic reader)
+# All reader ports, in order. Override with a comma-separated list for carts
+# and checkout gates with more antennas, e.g.
+#   RFID_READER_PORTS=/dev/ttyUSB0,/dev/ttyUSB1,/dev/ttyUSB2,/dev/ttyUSB3
+READER_PORTS = [
+    port.strip()
+    for port in os.getenv('RFID_READER_PORTS', f"{READER_1_PORT},{READER_2_PORT}").split(',')
+    if port.strip()
+]
 BAUD_RATE = 9600
 SERIAL_TIMEOUT = 0.1  # 100ms timeout for non-blocking reads
 
 # RFID reader settings
 COOLDOWN_SECONDS = 1
-PACKET_SIZE = 14  # RDM6300 sends 14 bytes per read
+
+# Read loop settings
+# 'select' waits on the reader file descriptors and wakes only when bytes
+# arrive; 'threads' runs one blocking reader thread per port feeding a shared
+# queue (reader_pool.py); 'poll' is the original fixed-interval polling loop
+READ_MODE = os.getenv('RFID_READ_MODE', 'select')
+POLL_INTERVAL = 0.04        # Delay between poll cycles ('poll' mode)
+INTER_READER_DELAY = 0.01   # Delay between reader polls ('poll' mode)
+SELECT_TIMEOUT = 1.0        # Max sleep while idle ('select' mode)
+# While the cart is idle (governor.py: no tag or weight activity for
+# GOVERNOR_IDLE_AFTER seconds) the loops wait longer between passes; the
+# first tag frame brings them back to the rates above
+IDLE_POLL_INTERVAL = 0.25   # Delay between poll cycles on an idle cart ('poll' mode)
+IDLE_SELECT_TIMEOUT = 5.0   # Max sleep on an idle cart ('select' and 'threads' modes)
+REJECTION_REPORT_INTERVAL = 10.0  # Seconds between rejection counter reports
+# Watch each reader's byte rate, valid-frame ratio, checksum errors and
+# stalls, and reopen or quarantine a failing port in place instead of
+# losing it until the service restarts (supervisor.py)
+SUPERVISE_READERS = os.getenv('RFID_SUPERVISE', '1').lower() in ('1', 'true', 'yes')
+
+# Event settings
+# 'scan' emits an rfid_scan for every decoded frame (backend cooldown drops
+# the repeats); 'presence' runs presence.PresenceTracker on the Pi and emits
+# one tag_enter and one tag_exit per physical tag presence
+EVENT_MODE = os.getenv('RFID_EVENT_MODE', 'scan')
+# Reads of one tag by different readers within this many seconds are merged
+# into one scan (fusion.py). Only used with more than one reader; 0 disables
+FUSION_WINDOW = float(os.getenv('RFID_FUSION_WINDOW', '0.03'))
+# 'scan' mode only: collect scans for up to RFID_BATCH_WINDOW seconds or
+# RFID_BATCH_MAX scans and send them as one rfid_scan_batch (scan_batch.py).
+# 0 (default) sends every scan on its own
+BATCH_WINDOW = float(os.getenv('RFID_BATCH_WINDOW', '0'))
+BATCH_MAX_ITEMS = int(os.getenv('RFID_BATCH_MAX', '16'))
+
+# Record every reader's raw bytes with timestamps to this file for offline
+# replay (capture.py); unset to disable
+CAPTURE_PATH = os.getenv('RFID_CAPTURE')
+
+# Store-and-forward journal for events made while the backend is unreachable
+# (journal.py); replayed in order with their original timestamps on reconnect
+JOURNAL_PATH = os.path.join(JOURNAL_DIR, 'rfid.journal')
+
+# Local Prometheus-format metrics endpoint (metrics.py); 0 disables
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9101'))
+
+# Send scans with a scanId and a Socket.IO ack (acks.py): round-trip times to
+# the ack and to the updateCart / weightMismatch / unknownTag reply are
+# logged and exported, and unacknowledged scans are retransmitted. Off by
+# default (fire-and-forget)
+ACK_SCANS = os.getenv('RFID_ACK', '0').lower() in ('1', 'true', 'yes')
+ACKED_EVENTS = ('rfid_scan', 'tag_enter', 'rfid_scan_batch')
+REPLY_EVENTS = ('updateCart', 'weightMismatch', 'unknownTag')
+
+# Set up in main() once the journal file is open
+forwarder = None
+# Set up in main() when ACK_SCANS is on
+ack_tracker = None
+# Set up in main(); shared activity stamp (governor.py)
+governor = None
+# Set up in main() when SUPERVISE_READERS is on
+supervisor = None
+
+log = service_log.get_logger('RFID Service')
 
 # Socket.IO client with automatic reconnection
 sio = socketio.Client(
@@ -27,6 +111,17 @@ sio = socketio.Client(
     reconnection_delay_max=5   # Keep delay constant at 5 seconds
 )
 
+# Metrics
+READ_SECONDS = metrics.histogram(
+    'smartkart_rfid_read_seconds', 'Serial read and frame decode time per batch of waiting bytes', ['reader'])
+DECODE_TO_EMIT_SECONDS = metrics.histogram(
+    'smartkart_rfid_decode_to_emit_seconds',
+    'Time from frame decoded to event emitted, including fusion/batch/presence hold', ['event'])
+BACKEND_CONNECTS = metrics.counter('smartkart_backend_connects_total', 'Successful (re)connections to the backend')
+BACKEND_DISCONNECTS = metrics.counter('smartkart_backend_disconnects_total', 'Connections to the backend lost')
+BACKEND_CONNECT_ERRORS = metrics.counter('smartkart_backend_connect_errors_total', 'Failed connection attempts')
+BACKEND_CONNECTED = metrics.gauge('smartkart_backend_connected', '1 while connected to the backend')
+
 
 def initialize_reader(port, reader_name):
     """
@@ -48,41 +143,46 @@ def initialize_reader(port, reader_name):
             parity=serial.PARITY_NONE,
             stopbits=serial.STOPBITS_ONE
         )
-        print(f"[RFID Service] ✓ {reader_name} initialized on {port}")
+        log.info(f"✓ {reader_name} initialized on {port}")
         return ser
     except serial.SerialException as e:
-        print(f"[RFID Service] ✗ Failed to initialize {reader_name} on {port}: {e}")
+        log.error(f"✗ Failed to initialize {reader_name} on {port}: {e}")
         return None
     except Exception as e:
-        print(f"[RFID Service] ✗ Unexpected error initializing {reader_name}: {e}")
+        log.error(f"✗ Unexpected error initializing {reader_name}: {e}")
         return None
 
 
-def initialize_readers():
+def initialize_readers(ports=None):
     """
-    Initialize both RFID readers (Reader_1 and Reader_2).
+    Initialize every configured RFID reader.
+    
+    Args:
+        ports (list): Serial port paths (default: READER_PORTS)
     
     Returns:
-        tuple: (reader1, reader2) - Serial connections or None for failed readers
+        list: (reader_id, label, serial.Serial) tuples for the readers that
+            initialized, in port order ('reader1'/'Reader 1' first)
     """
-    print("[RFID Service] Initializing RFID readers...")
+    if ports is None:
+        ports = READER_PORTS
     
-    reader1 = initialize_reader(READER_1_PORT, "Reader 1 (GPIO UART)")
-    reader2 = initialize_reader(READER_2_PORT, "Reader 2 (USB UART)")
+    log.info(f"Initializing {len(ports)} RFID reader(s)...")
     
-    # Check if at least one reader initialized successfully
-    if reader1 is None and reader2 is None:
-        print("[RFID Service] ✗ CRITICAL: Both readers failed to initialize")
-        return None, None
-    
-    if reader1 is None:
-        print(f"[RFID Service] ⚠ Warning: Reader 1 unavailable, continuing with Reader 2 only")
+    readers = []
+    for index, port in enumerate(ports, start=1):
+        label = f"Reader {index}"
+        reader = initialize_reader(port, label)
+        if reader is None:
+            log.warning(f"⚠ Warning: {label} unavailable, continuing without it")
+        else:
+            readers.append((f"reader{index}", label, reader))
     
-    if reader2 is None:
-        print(f"[RFID Service] ⚠ Warning: Reader 2 unavailable, continuing with Reader 1 only")
+    if not readers:
+        log.error("✗ CRITICAL: All readers failed to initialize")
     
-    print("[RFID Service] Reader initialization complete")
-    return reader1, reader2
+    log.info("Reader initialization complete")
+    return readers
 
 
 def is_in_cooldown(tag_id, cache, cooldown=COOLDOWN_SECONDS):
@@ -164,9 +264,26 @@ def cleanup_cache(cache, cooldown=COOLDOWN_SECONDS):
     return len(expired_tags)
 
 
-def read_tag(serial_connection, buffer_dict, reader_id):
+def get_decoder(buffer_dict, reader_id):
     """
-    Read and parse RFID tag from RDM6300 reader with buffering.
+    Return the FrameDecoder for a reader, creating it on first use.
+    
+    Args:
+        buffer_dict (dict): Dictionary mapping reader IDs to their FrameDecoder
+        reader_id (str): Unique identifier for the reader
+    
+    Returns:
+        FrameDecoder: The reader's decoder
+    """
+    decoder = buffer_dict.get(reader_id)
+    if decoder is None:
+        decoder = buffer_dict[reader_id] = FrameDecoder()
+    return decoder
+
+
+def read_tags(serial_connection, buffer_dict, reader_id):
+    """
+    Read all waiting bytes from an RDM6300 reader and decode every tag.
     
     RDM6300 packet format (14 bytes):
     - Byte 0: STX (Start of Text) = 0x02
@@ -174,132 +291,344 @@ def read_tag(serial_connection, buffer_dict, reader_id):
     - Bytes 11-12: 2-character ASCII checksum
     - Byte 13: ETX (End of Text) = 0x03
     
+    Pending bytes for each reader are kept in a rdm6300.FrameDecoder ring
+    buffer stored in buffer_dict. Everything the serial driver has queued is
+    consumed in one call, resyncing past noise in a single pass, so no
+    backlog builds up between polls. Rejected frames are counted by reason
+    in the decoder's `rejected` dict.
+    
     Args:
         serial_connection (serial.Serial): Active serial connection to RFID reader
-        buffer_dict (dict): Dictionary to store partial data between reads
+        buffer_dict (dict): Dictionary mapping reader IDs to their FrameDecoder
         reader_id (str): Unique identifier for this reader ('reader1' or 'reader2')
     
     Returns:
-        str: 10-character tag ID if valid packet received, None otherwise
+        list: 10-character tag IDs in arrival order (empty if none decoded)
     """
     if serial_connection is None:
-        return None
+        return []
     
     try:
-        # Initialize buffer for this reader if it doesn't exist
-        if reader_id not in buffer_dict:
-            buffer_dict[reader_id] = b''
-        
-        # Check if any new data is available
-        if serial_connection.in_waiting > 0:
-            # Read new data and append to buffer
-            new_data = serial_connection.read(serial_connection.in_waiting)
-            buffer_dict[reader_id] += new_data
-        
-        # Get current buffer
-        data = buffer_dict[reader_id]
+        decoder = get_decoder(buffer_dict, reader_id)
+        waiting = serial_connection.in_waiting
+        if waiting == 0:
+            return []
+        start = time.perf_counter()
+        tags = decoder.drain(serial_connection, waiting)
+        READ_SECONDS.labels(reader_id).record(time.perf_counter() - start)
+        return tags
         
-        # If buffer is empty, nothing to process
-        if len(data) == 0:
-            return None
-        
-        # Search for STX (0x02) - start of valid packet
-        stx_index = data.find(0x02)
-        
-        # If no STX found, clear buffer (all garbage)
-        if stx_index == -1:
-            buffer_dict[reader_id] = b''
-            return None
+    except (OSError, serial.SerialException) as e:
+        # Serial port error - hand the port to the supervisor, or log it
+        if not reader_fault(reader_id, e):
+            log.error(f"Serial read error on {reader_id}: {e}", extra={'kind': 'read_error'})
+        return []
+    except Exception as e:
+        # Unexpected error - log but don't crash
+        log.error(f"Unexpected error reading tag on {reader_id}: {e}", extra={'kind': 'read_error'})
+        return []
+
+
+def format_rejections(decoder):
+    """
+    Format a decoder's non-zero rejection counters for logging.
+    
+    Args:
+        decoder (FrameDecoder): Decoder to summarize
+    
+    Returns:
+        str: e.g. 'no_etx=3 bad_checksum=1', or '' if nothing was rejected
+    """
+    return ' '.join(f"{reason}={count}" for reason, count in decoder.rejected.items() if count)
+
+
+def report_rejections(decoders, reported):
+    """
+    Log rejection counters for any reader whose counters changed.
+    
+    Args:
+        decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+        reported (dict): Last summary logged per reader (updated in place)
+    """
+    for reader_id, decoder in decoders.items():
+        summary = format_rejections(decoder)
+        if summary and summary != reported.get(reader_id):
+            reported[reader_id] = summary
+            log.info(f"{reader_id} rejected: {summary} (valid frames: {decoder.frames})",
+                     extra={'kind': 'rejections'})
+
+
+def decoder_metrics(decoders):
+    """
+    Scrape-time collector for the decoders' own counters (metrics.py).
+    
+    Args:
+        decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+    
+    Returns:
+        callable: Collector for metrics.add_collector()
+    """
+    def collect():
+        items = list(decoders.items())
+        return [
+            ('smartkart_rfid_frames_total', 'counter', 'Valid frames decoded',
+             [({'reader': reader_id}, decoder.frames) for reader_id, decoder in items]),
+            ('smartkart_rfid_bytes_total', 'counter', 'Bytes received from the reader',
+             [({'reader': reader_id}, decoder.bytes_in) for reader_id, decoder in items]),
+            ('smartkart_rfid_rejected_total', 'counter', 'Frames or bytes rejected by the decoder, by reason',
+             [({'reader': reader_id, 'reason': reason}, count)
+              for reader_id, decoder in items for reason, count in decoder.rejected.items()]),
+        ]
+    return collect
+
+
+def reader_fault(reader_id, error):
+    """
+    Report a reader's read error to the supervisor.
+    
+    Args:
+        reader_id (str): Reader that failed
+        error (Exception): The read error
+    
+    Returns:
+        bool: True if the supervisor closed the port and will reopen it;
+            False without a supervisor
+    """
+    if supervisor is None:
+        return False
+    supervisor.fault(reader_id, 'read_error', error)
+    return True
+
+
+def active_readers(readers, cached):
+    """
+    Readers a loop should be reading now.
+    
+    Args:
+        readers (list): The loop's (reader_id, label, serial.Serial) tuples
+        cached (tuple): (generation, readers) from the previous call, or None
+    
+    Returns:
+        tuple: (generation, readers); without a supervisor the generation
+            stays 0 and the list is `readers`
+    """
+    if supervisor is None:
+        return 0, readers
+    if cached is not None and cached[0] == supervisor.generation:
+        return cached
+    return supervisor.generation, supervisor.readers()
+
+
+def wait_timeout(on_tick, timeout):
+    """
+    Run a loop's timer callback and shorten its wait to the next deadline.
+    
+    Args:
+        on_tick (callable): Called with no arguments once per loop pass;
+            returns the time.monotonic() deadline it next needs to run by,
+            or None. May be None itself.
+        timeout (float): The loop's normal maximum wait in seconds
+    
+    Returns:
+        float: Seconds the loop may wait before calling on_tick again
+    """
+    if on_tick is None:
+        return timeout
+    deadline = on_tick()
+    if deadline is None:
+        return timeout
+    return min(timeout, max(0.0, deadline - time.monotonic()))
+
+
+def cart_idle():
+    """
+    Check the governor once per loop pass and log active/idle changes.
+    
+    Returns:
+        bool: True if the cart is idle (False without a governor)
+    """
+    if governor is None:
+        return False
+    idle = governor.check()
+    if governor.changed:
+        if idle:
+            log.info(f"Cart idle for {governor.idle_after:g}s - slowing reader loop", extra={'kind': 'governor'})
+        else:
+            log.info(f"Activity - reader loop back to full rate ({format_savings(governor.stats())})",
+                     extra={'kind': 'governor'})
+    return idle
+
+
+def poll_readers(readers, decoders, on_tags, stop_event=None, on_tick=None):
+    """
+    Read loop that polls every reader on a fixed interval (original behavior).
+    
+    Adds up to INTER_READER_DELAY + POLL_INTERVAL of latency to each scan and
+    wakes the CPU on every cycle even when no tag is present; on an idle
+    cart the cycle stretches to IDLE_POLL_INTERVAL.
+    
+    Args:
+        readers (list): (reader_id, label, serial.Serial) tuples
+        decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+        on_tags (callable): Called as on_tags(label, tags) for each non-empty read
+        stop_event (threading.Event): Optional event that ends the loop when set
+        on_tick (callable): Optional timer callback, see wait_timeout()
+    """
+    reported = {}
+    next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    active = None
+    
+    while stop_event is None or not stop_event.is_set():
+        active = active_readers(readers, active)
+        for index, (reader_id, label, reader) in enumerate(active[1]):
+            # Small delay between reader polls to prevent interference
+            if index > 0:
+                time.sleep(INTER_READER_DELAY)
+            tags = read_tags(reader, decoders, reader_id)
+            if tags:
+                on_tags(label, tags)
         
-        # If STX found but not at start, remove garbage before it
-        if stx_index > 0:
-            buffer_dict[reader_id] = data[stx_index:]
-            data = buffer_dict[reader_id]
+        if on_tick is not None:
+            on_tick()
         
-        # Check if we have enough data for a complete packet
-        if len(data) < PACKET_SIZE:
-            # Keep buffer, wait for more data
-            # But limit buffer size to prevent memory issues
-            if len(buffer_dict[reader_id]) > 50:
-                # If buffer is too large and still incomplete, it's corrupted
-                buffer_dict[reader_id] = b''
-            return None
+        if time.monotonic() >= next_report:
+            report_rejections(decoders, reported)
+            next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
         
-        # We have at least 14 bytes starting with STX
-        # Check if byte 13 is ETX
-        if data[13] == 0x03:
-            # Valid packet structure found
-            packet = data[0:PACKET_SIZE]
-            
-            # Extract 10-character tag ID (bytes 1-10)
-            try:
-                tag_id = packet[1:11].decode('ascii')
-            except UnicodeDecodeError:
-                # Invalid data, remove this packet and continue
-                buffer_dict[reader_id] = data[PACKET_SIZE:]
-                return None
-            
-            # Validate tag ID contains only valid hexadecimal characters
-            if not all(c in '0123456789ABCDEFabcdef' for c in tag_id):
-                # Invalid tag ID, remove this packet and continue
-                buffer_dict[reader_id] = data[PACKET_SIZE:]
-                return None
-            
-            # Extract 2-character checksum (bytes 11-12)
-            try:
-                checksum_str = packet[11:13].decode('ascii')
-            except UnicodeDecodeError:
-                # Invalid checksum, remove this packet and continue
-                buffer_dict[reader_id] = data[PACKET_SIZE:]
-                return None
+        if cart_idle():
+            governor.skip('reader_poll', round(IDLE_POLL_INTERVAL / POLL_INTERVAL) - 1)
+            time.sleep(IDLE_POLL_INTERVAL)
+        else:
+            time.sleep(POLL_INTERVAL)
+
+
+def register_readers(selector, readers):
+    """
+    Make a selector watch exactly `readers`.
+    
+    Handles no longer in the list (closed by the supervisor) are dropped
+    first, so a reopened port that got the same descriptor number is
+    registered cleanly.
+    
+    Args:
+        selector (selectors.BaseSelector): The read loop's selector
+        readers (list): (reader_id, label, serial.Serial) tuples
+    """
+    wanted = {id(reader) for _, _, reader in readers}
+    for key in list(selector.get_map().values()):
+        if id(key.data[2]) not in wanted:
+            selector.unregister(key.fd)
+    registered = {id(key.data[2]) for key in selector.get_map().values()}
+    for reader_id, label, reader in readers:
+        if id(reader) not in registered:
+            selector.register(reader.fileno(), selectors.EVENT_READ, (reader_id, label, reader))
+
+
+def select_readers(readers, decoders, on_tags, stop_event=None, on_tick=None):
+    """
+    Event-driven read loop using selectors (epoll on Linux).
+    
+    Registers each reader's file descriptor and sleeps until bytes arrive,
+    so scans are handled as soon as the frame is received and an idle cart
+    only wakes every SELECT_TIMEOUT seconds for housekeeping. A reader that
+    reports readiness but returns no data (USB adapter unplugged) is
+    removed from the loop instead of spinning; with a supervisor it is
+    handed over for reopening and re-registered once it is back.
+    
+    Args:
+        readers (list): (reader_id, label, serial.Serial) tuples
+        decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+        on_tags (callable): Called as on_tags(label, tags) for each non-empty read
+        stop_event (threading.Event): Optional event that ends the loop when set
+        on_tick (callable): Optional timer callback, see wait_timeout()
+    """
+    selector = selectors.DefaultSelector()
+    active = active_readers(readers, None)
+    register_readers(selector, active[1])
+    
+    reported = {}
+    next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    
+    try:
+        while ((selector.get_map() or supervisor is not None)
+               and (stop_event is None or not stop_event.is_set())):
+            timeout = wait_timeout(on_tick, IDLE_SELECT_TIMEOUT if cart_idle() else SELECT_TIMEOUT)
+            generation = active[0]
+            active = active_readers(readers, active)
+            if active[0] != generation:
+                register_readers(selector, active[1])
+            for key, _ in selector.select(timeout=timeout):
+                reader_id, label, reader = key.data
+                try:
+                    if reader.in_waiting == 0:
+                        # Readable with nothing queued: read() raises on hangup
+                        get_decoder(decoders, reader_id).feed(reader.read(1))
+                except (OSError, serial.SerialException) as e:
+                    selector.unregister(key.fd)
+                    if not reader_fault(reader_id, e):
+                        log.error(f"✗ {label} read error: {e} - removing from read loop",
+                                  extra={'kind': 'read_error'})
+                    continue
+                tags = read_tags(reader, decoders, reader_id)
+                if tags:
+                    on_tags(label, tags)
             
-            # Validate checksum format (should be hex characters)
-            if not all(c in '0123456789ABCDEFabcdef' for c in checksum_str):
-                # Invalid checksum format, remove this packet and continue
-                buffer_dict[reader_id] = data[PACKET_SIZE:]
-                return None
+            if time.monotonic() >= next_report:
+                report_rejections(decoders, reported)
+                next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    finally:
+        selector.close()
+
+
+def thread_readers(readers, decoders, on_tags, stop_event=None, on_tick=None):
+    """
+    Read loop with one blocking reader thread per port (reader_pool.py).
+    
+    All workers feed one bounded queue; this function is the single consumer
+    and hands each scan to on_tags in arrival order. Per-reader throughput
+    is logged with the rejection counters. With a supervisor, a worker
+    stopped by a read error is reported to it and replaced once the port
+    is reopened.
+    
+    Args:
+        readers (list): (reader_id, label, serial.Serial) tuples
+        decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+        on_tags (callable): Called as on_tags(label, tags) for each scan
+        stop_event (threading.Event): Optional event that ends the loop when set
+        on_tick (callable): Optional timer callback, see wait_timeout()
+    """
+    active = active_readers(readers, None)
+    pool = ReaderPool(active[1], decoders)
+    pool.start()
+    
+    reported = {}
+    next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    
+    try:
+        while ((pool.alive() or supervisor is not None)
+               and (stop_event is None or not stop_event.is_set())):
+            scan = pool.get(timeout=wait_timeout(on_tick, IDLE_SELECT_TIMEOUT if cart_idle() else SELECT_TIMEOUT))
+            if scan is not None:
+                _, label, tag, _ = scan
+                on_tags(label, [tag])
             
-            # Verify checksum (XOR of tag ID bytes)
-            try:
-                # Convert tag ID from hex string to bytes
-                tag_bytes = bytes.fromhex(tag_id)
-                
-                # Calculate XOR checksum
-                calculated_checksum = 0
-                for byte in tag_bytes:
-                    calculated_checksum ^= byte
-                
-                # Convert received checksum from hex string to int
-                received_checksum = int(checksum_str, 16)
-                
-                # Verify checksum matches
-                if calculated_checksum != received_checksum:
-                    # Checksum mismatch, remove this packet and continue
-                    buffer_dict[reader_id] = data[PACKET_SIZE:]
-                    return None
-            except ValueError:
-                # Error in checksum calculation, remove this packet and continue
-                buffer_dict[reader_id] = data[PACKET_SIZE:]
-                return None
+            if supervisor is not None:
+                for worker in pool.failed():
+                    reader_fault(worker.reader_id, worker.error)
+                generation = active[0]
+                active = active_readers(readers, active)
+                if active[0] != generation:
+                    pool.set_readers(active[1])
             
-            # Valid packet found - remove it from buffer and return tag ID
-            buffer_dict[reader_id] = data[PACKET_SIZE:]
-            return tag_id.upper()
-        else:
-            # STX found but ETX not in right position
-            # This might be a partial packet or corrupted data
-            # Remove the STX and look for the next one
-            buffer_dict[reader_id] = data[1:]
-            return None
-        
-    except serial.SerialException as e:
-        # Serial port error - log but don't crash
-        print(f"[RFID Service] Serial read error: {e}")
-        return None
-    except Exception as e:
-        # Unexpected error - log but don't crash
-        print(f"[RFID Service] Unexpected error reading tag: {e}")
-        return None
+            if time.monotonic() >= next_report:
+                report_rejections(decoders, reported)
+                for reader_id, stats in pool.stats().items():
+                    log.info(f"{reader_id}: {stats['scans']} scans "
+                             f"({stats['scans_per_sec']:.1f}/s), {stats['bytes']} bytes, "
+                             f"{stats['dropped']} dropped", extra={'kind': 'pool_stats'})
+                next_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    finally:
+        pool.stop()
 
 
 @sio.event
@@ -310,8 +639,12 @@ def connect():
     Called when the RFID service successfully connects to the backend server.
     Logs connection status and cart ID for monitoring.
     """
-    print(f"[RFID Service] ✓ Connected to backend at {BACKEND_URL}")
-    print(f"[RFID Service] Cart ID: {CART_ID}")
+    BACKEND_CONNECTS.inc()
+    BACKEND_CONNECTED.set(1)
+    log.info(f"✓ Connected to backend at {BACKEND_URL}", extra={'kind': 'connect'})
+    log.info(f"Cart ID: {CART_ID}", extra={'kind': 'connect'})
+    if forwarder is not None:
+        forwarder.start_replay()
 
 
 @sio.event
@@ -323,8 +656,10 @@ def disconnect():
     automatically attempt to reconnect every 5 seconds due to the
     reconnection configuration.
     """
-    print("[RFID Service] ✗ Disconnected from backend")
-    print("[RFID Service] Will attempt reconnection every 5 seconds...")
+    BACKEND_DISCONNECTS.inc()
+    BACKEND_CONNECTED.set(0)
+    log.warning("✗ Disconnected from backend")
+    log.warning("Will attempt reconnection every 5 seconds...")
 
 
 @sio.event
@@ -342,134 +677,478 @@ def connect_error(data):
     Args:
         data: Error information from Socket.IO client
     """
-    print(f"[RFID Service] ✗ Connection error: {data}")
-    print("[RFID Service] Retrying in 5 seconds...")
+    BACKEND_CONNECT_ERRORS.inc()
+    log.warning(f"✗ Connection error: {data}", extra={'kind': 'connect_error'})
+    log.warning("Retrying in 5 seconds...", extra={'kind': 'connect_error'})
 
 
-def emit_rfid_scan(cart_id, tag_id):
+def build_scan_payload(cart_id, tag_id, scan=None):
     """
-    Emit an RFID scan event to the backend server.
-    
-    This function sends the scanned tag information to the backend via Socket.IO.
-    The backend will use this data to look up the product and update the cart.
+    Build the rfid_scan event payload expected by the backend.
     
     Args:
         cart_id (str): The 4-digit cart identifier
         tag_id (str): The 10-character RFID tag ID
+        scan (dict): Optional fused scan from fusion.ScanFusion; adds the
+            readers that saw the tag and each one's first-read offset
     
     Returns:
-        bool: True if emission successful, False if not connected or error occurred
+        dict: Payload with cartId, tagId and ISO UTC timestamp
     """
+    payload = {
+        'cartId': cart_id,
+        'tagId': tag_id,
+        'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    }
+    if scan is not None:
+        payload.update(fusion_fields(scan))
+    return payload
+
+
+def fusion_fields(scan):
+    """
+    Payload fields describing which readers saw a fused scan.
+    
+    Args:
+        scan (dict): Fused scan from fusion.ScanFusion
+    
+    Returns:
+        dict: 'readers' in first-read order and 'readerOffsetsMs', each
+            reader's first read relative to the scan's first read
+    """
+    return {
+        'readers': list(scan['readers']),
+        'readerOffsetsMs': {
+            reader: round((first_seen - scan['time']) * 1000, 1)
+            for reader, first_seen in scan['readers'].items()
+        }
+    }
+
+
+def emit_event(event, payload, callback=None):
+    """
+    Emit one event through the journal forwarder (or directly if there is none).
+    
+    Args:
+        event (str): Socket.IO event name
+        payload (dict): Event payload
+        callback (callable): Optional Socket.IO ack callback
+    
+    Returns:
+        bool: True if sent now, False if journaled for replay or not sent
+    """
+    if forwarder is not None:
+        return forwarder.emit(event, payload, callback=callback)
+    
     if not sio.connected:
-        print(f"[RFID Service] Cannot emit scan - not connected to backend")
+        log.warning(f"Cannot emit {event} - not connected to backend", extra={'kind': 'emit_error'})
         return False
     
     try:
-        sio.emit('rfid_scan', {
-            'cartId': cart_id,
-            'tagId': tag_id,
-            'timestamp': datetime.now().isoformat()
-        })
+        if callback is None:
+            sio.emit(event, payload)
+        else:
+            sio.emit(event, payload, callback=callback)
         return True
     except Exception as e:
-        print(f"[RFID Service] Error emitting rfid_scan event: {e}")
+        log.error(f"Error emitting {event} event: {e}", extra={'kind': 'emit_error'})
         return False
 
 
+def send_event(event, payload):
+    """
+    Send an event to the backend, journaling it while offline.
+    
+    With ACK_SCANS on, scan events get a scanId and are tracked by
+    ack_tracker until acknowledged. Journaled events are not tracked: the
+    replay sends them without an ack, and the backend still drops a replayed
+    scanId it has already processed.
+    
+    Args:
+        event (str): Socket.IO event name
+        payload (dict): Event payload (timestamps are kept as built)
+    
+    Returns:
+        bool: True if sent now, False if journaled for replay or not sent
+    """
+    if ack_tracker is None or event not in ACKED_EVENTS:
+        return emit_event(event, payload)
+    
+    scan_id = payload.setdefault('scanId', ack_tracker.new_id())
+    # Tracked before the emit so an ack arriving at once finds the entry
+    ack_tracker.sent(scan_id, event, payload)
+    sent = emit_event(event, payload, callback=ack_tracker.acked)
+    if not sent:
+        ack_tracker.forget(scan_id)
+    return sent
+
+
+def retransmit_unacked(tracker=None):
+    """
+    Send again every tracked scan whose ack is overdue.
+    
+    Args:
+        tracker (AckTracker): Tracker to check (default: ack_tracker)
+    
+    Returns:
+        int: Number of scans retransmitted
+    """
+    tracker = tracker if tracker is not None else ack_tracker
+    if tracker is None:
+        return 0
+    retransmit, lost = tracker.expire()
+    for scan_id, event, payload in retransmit:
+        log.warning(f"⚠ No ack for {event} {scan_id}, retransmitting", extra={'kind': 'retransmit'})
+        if not emit_event(event, payload, callback=tracker.acked):
+            tracker.forget(scan_id)
+    for scan_id in lost:
+        log.error(f"✗ {scan_id} never acknowledged after {tracker.retries} retransmits",
+                  extra={'kind': 'ack_lost'})
+    return len(retransmit)
+
+
+def on_reply(reply_event):
+    """
+    Socket.IO handler matching a backend broadcast to a tracked scan.
+    
+    Broadcasts go to every client; those without a scanId of this
+    service's tracker are ignored.
+    
+    Args:
+        reply_event (str): 'updateCart', 'weightMismatch' or 'unknownTag'
+    
+    Returns:
+        callable: Handler for sio.on(reply_event)
+    """
+    def handler(data):
+        if ack_tracker is not None and isinstance(data, dict) and data.get('scanId'):
+            ack_tracker.replied_to(reply_event, data['scanId'])
+    return handler
+
+
+for _reply_event in REPLY_EVENTS:
+    sio.on(_reply_event, on_reply(_reply_event))
+
+
+def emit_rfid_scan(cart_id, tag_id, scan=None):
+    """
+    Emit an RFID scan event to the backend server.
+    
+    This function sends the scanned tag information to the backend via Socket.IO.
+    The backend will use this data to look up the product and update the cart.
+    
+    Args:
+        cart_id (str): The 4-digit cart identifier
+        tag_id (str): The 10-character RFID tag ID
+        scan (dict): Optional fused scan (see build_scan_payload)
+    
+    Returns:
+        bool: True if sent now, False if journaled for replay or not sent
+    """
+    return send_event('rfid_scan', build_scan_payload(cart_id, tag_id, scan))
+
+
+def build_batch_payload(cart_id, scans, fused=False, now=None):
+    """
+    Build the rfid_scan_batch event payload expected by the backend.
+    
+    The batch carries one ISO UTC timestamp; each scan records how long before
+    it that the tag was read.
+    
+    Args:
+        cart_id (str): The 4-digit cart identifier
+        scans (list): Scans (fusion.ScanFusion / fusion.single_scan shape)
+        fused (bool): Include each scan's readers and first-read offsets
+        now (float): time.monotonic() the batch is sent at (default: now)
+    
+    Returns:
+        dict: Payload with cartId, timestamp and scans [{tagId, ageMs, ...}]
+    """
+    if now is None:
+        now = time.monotonic()
+    entries = []
+    for scan in scans:
+        entry = {
+            'tagId': scan['tagId'],
+            'ageMs': round((now - scan['time']) * 1000, 1)
+        }
+        if fused:
+            entry.update(fusion_fields(scan))
+        entries.append(entry)
+    return {
+        'cartId': cart_id,
+        'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+        'scans': entries
+    }
+
+
+def emit_rfid_scan_batch(cart_id, scans, fused=False):
+    """
+    Emit a batch of RFID scans to the backend server as one message.
+    
+    Args:
+        cart_id (str): The 4-digit cart identifier
+        scans (list): Scans to send (see build_batch_payload)
+        fused (bool): Include reader fusion details per scan
+    
+    Returns:
+        bool: True if sent now, False if journaled for replay or not sent
+    """
+    return send_event('rfid_scan_batch', build_batch_payload(cart_id, scans, fused))
+
+
+def build_presence_payload(cart_id, event):
+    """
+    Build a tag_enter / tag_exit event payload.
+    
+    Carries the same fields as build_scan_payload() so the backend can run a
+    tag_enter through its rfid_scan handler unchanged.
+    
+    Args:
+        cart_id (str): The 4-digit cart identifier
+        event (dict): Event from presence.PresenceTracker
+    
+    Returns:
+        dict: Payload with cartId, tagId, timestamp, reads, readers and duration
+    """
+    payload = build_scan_payload(cart_id, event['tagId'])
+    payload['reads'] = event['reads']
+    payload['readers'] = event['readers']
+    payload['duration'] = round(event['time'] - event['firstSeen'], 3)
+    return payload
+
+
+def emit_presence_event(cart_id, event):
+    """
+    Emit a tag_enter or tag_exit event to the backend server.
+    
+    Args:
+        cart_id (str): The 4-digit cart identifier
+        event (dict): Event from presence.PresenceTracker
+    
+    Returns:
+        bool: True if sent now, False if journaled for replay or not sent
+    """
+    return send_event(event['type'], build_presence_payload(cart_id, event))
+
+
 def main():
+    global forwarder, ack_tracker, governor, supervisor
+    
     print("=" * 60)
-    print("SmartKart RFID Service - Dual Reader")
+    print("SmartKart RFID Service")
     print("=" * 60)
-    print(f"Reader 1: {READER_1_PORT} (USB UART - SWAPPED)")
-    print(f"Reader 2: {READER_2_PORT} (GPIO UART - SWAPPED)")
+    for index, port in enumerate(READER_PORTS, start=1):
+        print(f"Reader {index}: {port}")
     print(f"Baud Rate: {BAUD_RATE}")
     print(f"Cooldown: {COOLDOWN_SECONDS}s")
+    print(f"Read Mode: {READ_MODE}")
+    print(f"Event Mode: {EVENT_MODE}")
+    print(f"Fusion Window: {FUSION_WINDOW * 1000:.0f}ms")
+    if BATCH_WINDOW > 0:
+        print(f"Batching: {BATCH_WINDOW * 1000:.0f}ms / {BATCH_MAX_ITEMS} scans")
+    print(f"Acknowledged Scans: {'on' if ACK_SCANS else 'off'}")
     print("=" * 60)
     
+    # From here on, output goes through the background log writer
+    service_log.setup()
+    
     # Initialize readers
-    reader1, reader2 = initialize_readers()
+    readers = initialize_readers()
     
-    if reader1 is None and reader2 is None:
-        print("[RFID Service] Cannot start service without any working readers")
+    if not readers:
+        log.error("Cannot start service without any working readers")
+        service_log.shutdown()
         return 1
     
+    capture = None
+    if CAPTURE_PATH:
+        capture = CaptureWriter(CAPTURE_PATH)
+        readers = [(reader_id, label, RecordingSerial(reader, capture, reader_id))
+                   for reader_id, label, reader in readers]
+        log.info(f"Recording raw reader bytes to {CAPTURE_PATH}")
+    
+    def open_reader(port, label):
+        reader = initialize_reader(port, label)
+        if reader is not None and capture is not None:
+            reader = RecordingSerial(reader, capture, f"reader{READER_PORTS.index(port) + 1}")
+        return reader
+    
+    # Open the journal before connecting so the connect handler can replay
+    journal = Journal(JOURNAL_PATH)
+    forwarder = Forwarder(sio, journal, name="RFID Service")
+    if len(journal):
+        log.info(f"{len(journal)} journaled event(s) waiting for replay")
+    if ACK_SCANS:
+        ack_tracker = AckTracker()
+    governor = Governor(name="RFID Service")
+    
+    if METRICS_PORT:
+        try:
+            metrics.serve(METRICS_PORT)
+            log.info(f"Metrics on http://{metrics.METRICS_ADDR}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            log.warning(f"Metrics endpoint unavailable: {e}")
+    
     # Connect to backend with automatic reconnection
     try:
-        print(f"[RFID Service] Connecting to backend at {BACKEND_URL}...")
+        log.info(f"Connecting to backend at {BACKEND_URL}...")
         sio.connect(BACKEND_URL)
-        print("[RFID Service] Initial connection successful")
+        log.info("Initial connection successful")
     except Exception as e:
-        print(f"[RFID Service] Initial connection failed: {e}")
-        print("[RFID Service] Service will continue and retry connection automatically every 5 seconds...")
+        log.warning(f"Initial connection failed: {e}")
+        log.info("Service will continue and retry connection automatically every 5 seconds...")
+    
+    log.info("Service started successfully")
+    log.info("Ready to scan RFID tags...")
+    log.info("Note: Cooldown handled by backend (5s)")
+    
+    # Frame decoders (separate for each reader)
+    decoders = {}
+    metrics.add_collector(decoder_metrics(decoders))
     
-    print("[RFID Service] Service started successfully")
-    print("[RFID Service] Ready to scan RFID tags...")
-    print("[RFID Service] Note: Cooldown handled by backend (5s)")
+    if SUPERVISE_READERS:
+        ports = [(f"reader{index}", f"Reader {index}", port) for index, port in enumerate(READER_PORTS, start=1)]
+        supervisor = ReaderSupervisor(ports, decoders, open_reader, readers)
     
-    # Initialize read buffers (separate for each reader)
-    read_buffers = {}
-    debug_counter = 0
+    # One physical read seen by several antennas becomes one scan
+    fusion = ScanFusion(FUSION_WINDOW) if FUSION_WINDOW > 0 and len(readers) > 1 else None
+    tracker = PresenceTracker() if EVENT_MODE == 'presence' else None
+    batcher = ScanBatcher(BATCH_WINDOW, BATCH_MAX_ITEMS) if BATCH_WINDOW > 0 and tracker is None else None
+    
+    def emit_scan(scan):
+        # Emit to backend immediately - backend handles cooldown
+        tag = scan['tagId']
+        label = ', '.join(scan['readers'])
+        sent = emit_rfid_scan(CART_ID, tag, scan if fusion is not None else None)
+        DECODE_TO_EMIT_SECONDS.labels('rfid_scan').record(time.monotonic() - scan['time'])
+        if sent:
+            log.info(f"✓ Scanned: {tag}", extra={'kind': 'scan', 'fields': {'readers': label}})
+        else:
+            log.info(f"⚠ Scanned: {tag} (queued, backend offline)",
+                     extra={'kind': 'scan', 'fields': {'readers': label}})
+    
+    def emit_batch(scans):
+        if not scans:
+            return
+        tags = ', '.join(scan['tagId'] for scan in scans)
+        sent = emit_rfid_scan_batch(CART_ID, scans, fused=fusion is not None)
+        now = time.monotonic()
+        for scan in scans:
+            DECODE_TO_EMIT_SECONDS.labels('rfid_scan_batch').record(now - scan['time'])
+        if sent:
+            log.info(f"✓ Scanned batch of {len(scans)}: {tags}", extra={'kind': 'scan'})
+        else:
+            log.info(f"⚠ Scanned batch of {len(scans)}: {tags} (queued, backend offline)", extra={'kind': 'scan'})
+    
+    def batch_scan(scan):
+        emit_batch(batcher.add(scan, scan['time']))
+    
+    def emit_events(events):
+        for event in events:
+            sent = emit_presence_event(CART_ID, event)
+            DECODE_TO_EMIT_SECONDS.labels(event['type']).record(time.monotonic() - event['time'])
+            if event['type'] == TAG_ENTER:
+                note = "" if sent else " (queued, backend offline)"
+                log.info(f"{'✓' if sent else '⚠'} Entered: {event['tagId']}{note}",
+                         extra={'kind': 'scan', 'fields': {'readers': ', '.join(event['readers'])}})
+            else:
+                log.info(f"Left: {event['tagId']} "
+                         f"({event['reads']} reads, reduction {tracker.stats()['reduction']:.0f}x)",
+                         extra={'kind': 'scan'})
+    
+    def observe_scan(scan):
+        emit_events(tracker.observe(scan['tagId'], now=scan['time'], reader=list(scan['readers'])))
+    
+    if tracker is not None:
+        handle_scan = observe_scan
+    elif batcher is not None:
+        handle_scan = batch_scan
+    else:
+        handle_scan = emit_scan
+    
+    def on_tags(label, tags):
+        now = time.monotonic()
+        governor.touch(now)
+        for tag in tags:
+            if fusion is None:
+                handle_scan(single_scan(tag, label, now))
+            else:
+                fusion.observe(tag, label, now)
+    
+    next_ack_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+    reported_acks = 0
+    
+    def on_tick():
+        nonlocal next_ack_report, reported_acks
+        deadlines = []
+        if fusion is not None:
+            for scan in fusion.flush():
+                handle_scan(scan)
+            deadlines.append(fusion.next_deadline())
+        if batcher is not None:
+            emit_batch(batcher.flush())
+            deadlines.append(batcher.next_deadline())
+        if tracker is not None:
+            emit_events(tracker.expire())
+            deadlines.append(tracker.next_deadline())
+        if supervisor is not None:
+            supervisor.check()
+            deadlines.append(supervisor.next_deadline())
+        if ack_tracker is not None:
+            retransmit_unacked()
+            deadlines.append(ack_tracker.next_deadline())
+            # Round-trip report, only when new acks came in
+            if time.monotonic() >= next_ack_report:
+                stats = ack_tracker.stats()
+                if stats['acked'] != reported_acks:
+                    reported_acks = stats['acked']
+                    log.info(f"Scan round trip: {format_stats(stats)}", extra={'kind': 'ack_stats'})
+                next_ack_report = time.monotonic() + REJECTION_REPORT_INTERVAL
+        deadlines = [deadline for deadline in deadlines if deadline is not None]
+        return min(deadlines) if deadlines else None
     
-    # Main polling loop - continuously poll both readers
     try:
-        while True:
-            debug_counter += 1
-            
-            # Poll Reader 1 (GPIO UART)
-            if reader1 is not None:
-                tag1 = read_tag(reader1, read_buffers, 'reader1')
-                if tag1 is not None:
-                    # Emit to backend immediately - backend handles cooldown
-                    if emit_rfid_scan(CART_ID, tag1):
-                        print(f"[Reader 1] ✓ Scanned: {tag1}")
-                    else:
-                        print(f"[Reader 1] ⚠ Scanned: {tag1} (not connected to backend)")
-            
-            # Small delay between reader polls to prevent interference
-            time.sleep(0.01)
-            
-            # Poll Reader 2 (USB UART)
-            if reader2 is not None:
-                # Force clear any stale data in serial buffer if it's been sitting too long
-                if reader2.in_waiting > 100:
-                    print(f"[Debug] Reader 2 buffer overflow detected, clearing {reader2.in_waiting} bytes")
-                    reader2.reset_input_buffer()
-                    read_buffers['reader2'] = b''
-                
-                tag2 = read_tag(reader2, read_buffers, 'reader2')
-                if tag2 is not None:
-                    # Emit to backend immediately - backend handles cooldown
-                    if emit_rfid_scan(CART_ID, tag2):
-                        print(f"[Reader 2] ✓ Scanned: {tag2}")
-                    else:
-                        print(f"[Reader 2] ⚠ Scanned: {tag2} (not connected to backend)")
-            
-            # Debug: Show Reader 2 status every 200 iterations
-            if debug_counter % 200 == 0 and reader2 is not None:
-                r2_waiting = reader2.in_waiting
-                r2_buffer_size = len(read_buffers.get('reader2', b''))
-                if r2_waiting > 0 or r2_buffer_size > 0:
-                    print(f"[Debug] Reader 2: serial_waiting={r2_waiting}, buffer={r2_buffer_size} bytes")
-                    # Show buffer content for debugging
-                    if r2_buffer_size > 0:
-                        print(f"[Debug] Reader 2 buffer content: {read_buffers['reader2'].hex()}")
-            
-            # 40ms delay between poll cycles (reduced from 50ms since we added 10ms above)
-            time.sleep(0.04)
+        if READ_MODE == 'poll':
+            poll_readers(readers, decoders, on_tags, on_tick=on_tick)
+        elif READ_MODE == 'threads':
+            thread_readers(readers, decoders, on_tags, on_tick=on_tick)
+            log.error("✗ No reader threads left running")
+        else:
+            select_readers(readers, decoders, on_tags, on_tick=on_tick)
+            log.error("✗ No readers left in read loop")
             
     except KeyboardInterrupt:
-        print("\n[RFID Service] Shutting down...")
+        log.info("Shutting down...")
     finally:
+        # Send scans still waiting in the fusion window or batch
+        if fusion is not None:
+            for scan in fusion.flush(force=True):
+                handle_scan(scan)
+        if batcher is not None:
+            emit_batch(batcher.flush(force=True))
+        
         # Cleanup
-        if reader1:
-            reader1.close()
-            print("[RFID Service] Reader 1 closed")
-        if reader2:
-            reader2.close()
-            print("[RFID Service] Reader 2 closed")
+        if supervisor is not None:
+            for reader_id, health in supervisor.health().items():
+                log.info(f"{reader_id}: {format_health(health)}")
+            supervisor.close()
+        else:
+            for _, label, reader in readers:
+                reader.close()
+                log.info(f"{label} closed")
         if sio.connected:
             sio.disconnect()
-        print("[RFID Service] Stopped")
+        journal.close()
+        if ack_tracker is not None:
+            log.info(f"Scan round trip: {format_stats(ack_tracker.stats())}")
+        governor.close()
+        log.info(f"Idle governor: {format_savings(governor.stats())}")
+        if capture is not None:
+            capture.close()
+            log.info(f"Capture saved: {capture.bytes} bytes in {capture.records} records")
+        log.info("Stopped")
+        service_log.shutdown()
     
     return 0
 
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+SmartKart RFID Service - asyncio edition
+
+Same readers, frame format and rfid_scan payload as rfid_service.py, but
+everything runs in one asyncio event loop:
+
+- Each serial port is registered with loop.add_reader(), so frames are
+  decoded as soon as bytes arrive (no polling, no sleeps)
+- Tags pass an edge cooldown and go onto a bounded queue
+- A single emitter task sends them through socketio.AsyncClient, so a slow
+  backend only delays the queue and never stalls reading
+- While the backend is unreachable scans go to the same journal as
+  rfid_service.py (journal.AsyncForwarder) and are replayed in order on
+  reconnect
+
+Run with: python3 rfid_service_async.py
+"""
+
+import asyncio
+import signal
+
+import serial
+import socketio
+
+import service_log
+from journal import AsyncForwarder, Journal
+from rfid_service import (
+    BACKEND_URL,
+    CART_ID,
+    COOLDOWN_SECONDS,
+    JOURNAL_PATH,
+    REJECTION_REPORT_INTERVAL,
+    build_scan_payload,
+    cleanup_cache,
+    get_decoder,
+    initialize_readers,
+    is_in_cooldown,
+    read_tags,
+    report_rejections,
+    update_cache,
+)
+
+# Max scans waiting for the emitter; the oldest is dropped when full
+EMIT_QUEUE_SIZE = 256
+
+log = service_log.get_logger('RFID Async')
+
+# Async Socket.IO client with the same reconnection policy as rfid_service
+sio = socketio.AsyncClient(
+    reconnection=True,
+    reconnection_attempts=0,  # Infinite retry attempts
+    reconnection_delay=5,      # 5-second delay between retries
+    reconnection_delay_max=5   # Keep delay constant at 5 seconds
+)
+
+# Journals scans while the backend is unreachable (set up in main_async)
+forwarder = None
+
+
+@sio.event
+async def connect():
+    """Called when the service connects to the backend"""
+    log.info(f"✓ Connected to backend at {BACKEND_URL}", extra={'kind': 'connect'})
+    log.info(f"Cart ID: {CART_ID}", extra={'kind': 'connect'})
+    if forwarder is not None:
+        forwarder.start_replay()
+
+
+@sio.event
+async def disconnect():
+    """Called when the connection to the backend is lost"""
+    log.warning("✗ Disconnected from backend")
+    log.warning("Will attempt reconnection every 5 seconds...")
+
+
+@sio.event
+async def connect_error(data):
+    """Called when a connection attempt fails"""
+    log.warning(f"✗ Connection error: {data}", extra={'kind': 'connect_error'})
+
+
+class AsyncReaderService:
+    """Reads all readers, applies cooldown and emits scans in one event loop"""
+
+    def __init__(self, readers, cart_id=CART_ID, cooldown=COOLDOWN_SECONDS, forwarder=None):
+        """
+        Args:
+            readers (list): (reader_id, label, serial.Serial) tuples
+            cart_id (str): Cart identifier sent with every scan
+            cooldown (float): Seconds before the same tag is emitted again
+            forwarder (AsyncForwarder): Journals scans while disconnected;
+                without one they are emitted directly, or dropped offline
+        """
+        self.readers = readers
+        self.forwarder = forwarder
+        self.cart_id = cart_id
+        self.cooldown = cooldown
+        self.decoders = {}
+        self.cooldown_cache = {}
+        self.queue = asyncio.Queue(maxsize=EMIT_QUEUE_SIZE)
+        self.dropped = 0
+        self._reported = {}
+        self._loop = None
+        self._active = set()
+
+    def start(self):
+        """Register every reader's file descriptor with the running loop"""
+        self._loop = asyncio.get_running_loop()
+        for reader_id, label, reader in self.readers:
+            self._loop.add_reader(reader.fileno(), self._on_readable, reader_id, label, reader)
+            self._active.add(reader.fileno())
+        self._loop.call_later(REJECTION_REPORT_INTERVAL, self._housekeeping)
+
+    def stop(self):
+        """Unregister all readers from the loop"""
+        for fd in list(self._active):
+            self._loop.remove_reader(fd)
+        self._active.clear()
+
+    def _on_readable(self, reader_id, label, reader):
+        """Event loop callback: drain the port and queue decoded tags"""
+        try:
+            if reader.in_waiting == 0:
+                # Readable with nothing queued: read() raises on hangup
+                get_decoder(self.decoders, reader_id).feed(reader.read(1))
+        except (OSError, serial.SerialException) as e:
+            log.error(f"✗ {label} read error: {e} - removing from event loop", extra={'kind': 'read_error'})
+            self._loop.remove_reader(reader.fileno())
+            self._active.discard(reader.fileno())
+            return
+
+        for tag in read_tags(reader, self.decoders, reader_id):
+            if is_in_cooldown(tag, self.cooldown_cache, self.cooldown):
+                continue
+            update_cache(tag, self.cooldown_cache)
+            payload = build_scan_payload(self.cart_id, tag)
+            if self.queue.full():
+                self.queue.get_nowait()
+                self.dropped += 1
+                log.warning(f"⚠ Emit queue full, dropped oldest scan ({self.dropped} total)",
+                            extra={'kind': 'scan_dropped', 'fields': {'readers': label}})
+            self.queue.put_nowait((label, payload))
+
+    def _housekeeping(self):
+        """Periodic cache cleanup and rejection report (timer callback)"""
+        cleanup_cache(self.cooldown_cache, self.cooldown)
+        report_rejections(self.decoders, self._reported)
+        self._loop.call_later(REJECTION_REPORT_INTERVAL, self._housekeeping)
+
+    async def run_emitter(self):
+        """Send queued scans to the backend in order"""
+        while True:
+            label, payload = await self.queue.get()
+            tag = payload['tagId']
+            if self.forwarder is not None:
+                if await self.forwarder.emit('rfid_scan', payload):
+                    log.info(f"✓ Scanned: {tag}", extra={'kind': 'scan', 'fields': {'readers': label}})
+                else:
+                    log.info(f"⚠ Scanned: {tag} (queued, backend offline)",
+                             extra={'kind': 'scan', 'fields': {'readers': label}})
+                continue
+            if not sio.connected:
+                log.info(f"⚠ Scanned: {tag} (not connected to backend)",
+                         extra={'kind': 'scan', 'fields': {'readers': label}})
+                continue
+            try:
+                await sio.emit('rfid_scan', payload)
+                log.info(f"✓ Scanned: {tag}", extra={'kind': 'scan', 'fields': {'readers': label}})
+            except Exception as e:
+                log.error(f"Error emitting rfid_scan event: {e}", extra={'kind': 'emit_failed'})
+
+
+async def connect_backend():
+    """Initial connection attempt; AsyncClient handles reconnects afterwards"""
+    try:
+        log.info(f"Connecting to backend at {BACKEND_URL}...")
+        await sio.connect(BACKEND_URL)
+        log.info("Initial connection successful")
+    except Exception as e:
+        log.warning(f"Initial connection failed: {e}")
+
+
+async def main_async():
+    global forwarder
+
+    print("=" * 60)
+    print("SmartKart RFID Service - asyncio edition")
+    print("=" * 60)
+
+    # From here on, output goes through the background log writer; the
+    # event loop never blocks on stdout
+    service_log.setup()
+
+    readers = initialize_readers()
+    if not readers:
+        log.error("Cannot start service without any working readers")
+        service_log.shutdown()
+        return 1
+
+    # Open the journal before connecting so the connect handler can replay
+    journal = Journal(JOURNAL_PATH)
+    forwarder = AsyncForwarder(sio, journal, name="RFID Async")
+    if len(journal):
+        log.info(f"{len(journal)} journaled event(s) waiting for replay")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    service = AsyncReaderService(readers, forwarder=forwarder)
+    service.start()
+    emitter = asyncio.create_task(service.run_emitter())
+    # Connect in the background so scans are read while the backend is down
+    connector = asyncio.create_task(connect_backend())
+    log.info("Ready to scan RFID tags...")
+
+    try:
+        await stop.wait()
+    finally:
+        log.info("Shutting down...")
+        service.stop()
+        emitter.cancel()
+        connector.cancel()
+        forwarder.stop_replay()
+        for _, label, reader in readers:
+            reader.close()
+            log.info(f"{label} closed")
+        if sio.connected:
+            await sio.disconnect()
+        journal.close()
+        log.info("Stopped")
+        service_log.shutdown()
+    return 0
+
+
+def main():
+    return asyncio.run(main_async())
+
+
+if __name__ == '__main__':
+    exit(main())
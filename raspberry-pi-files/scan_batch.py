@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Scan Batching for SmartKart
+Collects scans for a short window and sends them as one message
+
+A shopper dropping an armful of tagged items into the cart produces a
+burst of scans within a few tens of milliseconds. Sending them as one
+rfid_scan_batch lets the backend load and save the cart once instead of
+once per item. A batch is released when its first scan is `window`
+seconds old or when it holds `max_items` scans, whichever comes first, so
+batching adds at most `window` of latency.
+"""
+
+import time
+
+BATCH_WINDOW = 0.02    # Max seconds a scan waits for the batch to fill
+BATCH_MAX_ITEMS = 16   # Scans per batch before it is sent immediately
+
+
+class ScanBatcher:
+    """Bounded-latency batch of scans"""
+
+    def __init__(self, window=BATCH_WINDOW, max_items=BATCH_MAX_ITEMS):
+        """
+        Args:
+            window (float): Max seconds between a batch's first scan and its release
+            max_items (int): Batch size that triggers an immediate release
+        """
+        if max_items < 1:
+            raise ValueError("max_items must be at least 1")
+        self.window = window
+        self.max_items = max_items
+        self._items = []
+        self._opened_at = None
+        self.batches = 0       # Batches released
+        self.items = 0         # Scans released in batches
+
+    def __len__(self):
+        return len(self._items)
+
+    def add(self, item, now=None):
+        """
+        Add a scan to the current batch.
+
+        Args:
+            item: Scan to batch (passed through unchanged)
+            now (float): time.monotonic() of the scan (default: now)
+
+        Returns:
+            list: The full batch if this scan filled it, otherwise []
+        """
+        if now is None:
+            now = time.monotonic()
+        if not self._items:
+            self._opened_at = now
+        self._items.append(item)
+        if len(self._items) >= self.max_items:
+            return self._release()
+        return []
+
+    def flush(self, now=None, force=False):
+        """
+        Release the batch if its window has closed.
+
+        Args:
+            now (float): Current time.monotonic() (default: now)
+            force (bool): Release whatever is pending regardless of the window
+
+        Returns:
+            list: The released batch, or [] if nothing is due
+        """
+        if not self._items:
+            return []
+        if now is None:
+            now = time.monotonic()
+        if force or now - self._opened_at >= self.window:
+            return self._release()
+        return []
+
+    def next_deadline(self):
+        """
+        time.monotonic() at which the pending batch is due.
+
+        Returns:
+            float: Deadline, or None when nothing is pending
+        """
+        if not self._items:
+            return None
+        return self._opened_at + self.window
+
+    def _release(self):
+        batch = self._items
+        self._items = []
+        self._opened_at = None
+        self.batches += 1
+        self.items += len(batch)
+        return batch
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+"""
+Service Logging for SmartKart
+Non-blocking, rate-limited logging for the Pi services
+
+Under systemd, stdout is a pipe to journald; a print() blocks the calling
+thread whenever journald falls behind. Here a log call only formats the
+record and puts it on a bounded in-memory queue; a background thread
+(logging.handlers.QueueListener) does the actual write. If the writer
+stalls and the queue fills, new records are dropped and counted rather
+than blocking the read loop.
+
+Repeated messages are rate-limited per message type before they are even
+queued: each type (the `kind` passed in extra, or else the call site of
+the log statement, so f-string messages share one bucket) gets a token
+bucket of `burst` messages refilled at `rate` per second. Suppressed
+messages are counted and reported with the next one that gets through
+("suppressed=N"), and by report_suppressed(). Buckets that have refilled
+and have nothing to report are dropped, and at most MAX_BUCKETS are kept.
+
+Verbosity can be changed without a restart:
+
+    LOG_LEVEL=DEBUG python3 rfid_service.py      # initial level (default INFO)
+    kill -USR1 <pid>                             # one level more verbose
+    kill -USR2 <pid>                             # one level less verbose
+
+Usage:
+
+    log = service_log.get_logger('RFID Service')
+    service_log.setup()
+    log.info("Scanned %s", tag, extra={'kind': 'scan', 'fields': {'reader': label}})
+
+LOG_FORMAT=json writes one JSON object per line instead of text.
+"""
+
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+ROOT = 'smartkart'
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+QUEUE_SIZE = 1000       # Records buffered for the writer thread
+RATE = 5.0              # Messages per second per message type (sustained)
+BURST = 20              # Messages per message type let through in a burst
+MAX_BUCKETS = 256       # Message types tracked at once (least recently used evicted)
+STOP_TIMEOUT = 2.0      # Seconds shutdown waits for the writer to drain the queue
+
+# Levels stepped through by SIGUSR1 (more verbose) / SIGUSR2 (less verbose)
+LEVELS = (logging.DEBUG, logging.INFO, logging.WARNING, logging.ERROR)
+
+LOG_DROPPED = metrics.counter('smartkart_log_dropped_total', 'Log records dropped because the log queue was full')
+LOG_SUPPRESSED = metrics.counter('smartkart_log_suppressed_total', 'Log records suppressed by rate limiting')
+
+
+def get_logger(label):
+    """
+    Logger for one component; its records are shown as '[label] message'.
+
+    Args:
+        label (str): Component name, e.g. 'RFID Service'
+
+    Returns:
+        logging.Logger: Child of the 'smartkart' logger
+    """
+    return logging.getLogger(f"{ROOT}.{label}")
+
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per message type; counts what it suppresses"""
+
+    def __init__(self, rate=RATE, burst=BURST, clock=time.monotonic, max_buckets=MAX_BUCKETS):
+        """
+        Args:
+            rate (float): Sustained messages per second per type
+            burst (int): Messages per type allowed at once
+            clock (callable): Time source (for tests)
+            max_buckets (int): Message types tracked at once
+        """
+        super().__init__()
+        self.rate = rate
+        self.burst = burst
+        self.max_buckets = max_buckets
+        self._clock = clock
+        # A bucket idle this long has refilled and is the same as a new one
+        self._idle_seconds = burst / rate if rate > 0 else float('inf')
+        self._buckets = OrderedDict()   # kind -> [tokens, last refill, suppressed], least recently used first
+        self._lock = threading.Lock()
+        self.suppressed = 0
+
+    def filter(self, record):
+        kind = getattr(record, 'kind', None) or (record.name, record.pathname, record.lineno)
+        now = self._clock()
+        with self._lock:
+            buckets = self._buckets
+            bucket = buckets.get(kind)
+            if bucket is None:
+                self._evict(now)
+                bucket = buckets[kind] = [float(self.burst), now, 0]
+            else:
+                buckets.move_to_end(kind)
+                bucket[0] = min(float(self.burst), bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+            if bucket[0] < 1.0:
+                bucket[2] += 1
+                self.suppressed += 1
+                LOG_SUPPRESSED.inc()
+                return False
+            bucket[0] -= 1.0
+            if bucket[2]:
+                record.suppressed = bucket[2]
+                bucket[2] = 0
+        return True
+
+    def _evict(self, now):
+        # Buckets are in order of last use, so the idle ones come first:
+        # drop those that have refilled and have nothing left to report
+        buckets = self._buckets
+        for kind, bucket in list(buckets.items()):
+            if now - bucket[1] < self._idle_seconds:
+                break
+            if not bucket[2]:
+                del buckets[kind]
+        # Still at the cap: drop the least recently used
+        while len(buckets) >= self.max_buckets:
+            buckets.popitem(last=False)
+
+    def pending(self):
+        """
+        Suppressed counts not reported yet, and reset them.
+
+        Returns:
+            dict: kind -> suppressed count
+        """
+        with self._lock:
+            counts = {}
+            for kind, bucket in self._buckets.items():
+                if bucket[2]:
+                    counts[kind] = bucket[2]
+                    bucket[2] = 0
+            return counts
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_DROPPED.inc()
+
+
+class BoundedListener(logging.handlers.QueueListener):
+    """QueueListener whose stop() gives up on a stalled writer after a timeout"""
+
+    def stop(self, timeout=STOP_TIMEOUT):
+        thread = self._thread
+        if thread is None:
+            return
+        try:
+            self.queue.put(self._sentinel, timeout=timeout)
+        except queue.Full:
+            pass
+        # The writer thread is a daemon; if it is still stuck it is abandoned
+        thread.join(timeout)
+        self._thread = None
+
+
+def _field_value(value):
+    text = str(value)
+    return json.dumps(text) if not text or ' ' in text or '"' in text else text
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    '[label] message key=value ...' (or one JSON object with LOG_FORMAT=json).
+
+    Fields come from extra={'fields': {...}}; a rate-limited record also
+    carries suppressed=N.
+    """
+
+    def __init__(self, json_lines=False):
+        super().__init__()
+        self.json_lines = json_lines
+
+    def format(self, record):
+        label = record.name[len(ROOT) + 1:] if record.name.startswith(ROOT + '.') else record.name
+        fields = dict(getattr(record, 'fields', None) or {})
+        if getattr(record, 'suppressed', 0):
+            fields['suppressed'] = record.suppressed
+        message = record.getMessage()
+        if record.exc_info:
+            message = f"{message}\n{self.formatException(record.exc_info)}"
+        if self.json_lines:
+            entry = {'time': round(record.created, 3), 'level': record.levelname,
+                     'service': label, 'message': message}
+            entry.update(fields)
+            return json.dumps(entry, default=str)
+        prefix = '' if record.levelno == logging.INFO else f"{record.levelname} "
+        text = f"{prefix}[{label}] {message}"
+        if fields:
+            text += ' ' + ' '.join(f"{key}={_field_value(value)}" for key, value in fields.items())
+        return text
+
+
+class PrintHandler(logging.Handler):
+    """
+    Synchronous handler writing to the current sys.stdout, like print().
+
+    Used until setup() is called, so tests, benchmarks and the interactive
+    tools that import service modules still show their output.
+    """
+
+    def emit(self, record):
+        try:
+            print(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+_direct_handler = PrintHandler()
+_direct_handler.setFormatter(StructuredFormatter())
+
+
+def _use_direct_output(enabled):
+    logger = logging.getLogger(ROOT)
+    if enabled:
+        logger.addHandler(_direct_handler)
+    else:
+        logger.removeHandler(_direct_handler)
+
+
+logging.getLogger(ROOT).setLevel(LOG_LEVEL if isinstance(logging.getLevelName(LOG_LEVEL), int) else logging.INFO)
+logging.getLogger(ROOT).propagate = False
+_use_direct_output(True)
+
+
+class ServiceLog:
+    """The queue, writer thread and filter installed by setup()"""
+
+    def __init__(self, stream=None, level=LOG_LEVEL, json_lines=None, rate=RATE, burst=BURST,
+                 queue_size=QUEUE_SIZE, handler=None):
+        """
+        Args:
+            stream: Where the writer thread writes (default: sys.stdout)
+            level (str or int): Initial level
+            json_lines (bool): JSON output (default: LOG_FORMAT == 'json')
+            rate (float): Rate limit per message type, messages/s
+            burst (int): Burst allowed per message type
+            queue_size (int): Records buffered before dropping
+            handler (logging.Handler): Writer-side handler (default: a
+                StreamHandler on stream); for tests
+        """
+        if json_lines is None:
+            json_lines = LOG_FORMAT == 'json'
+        self.logger = logging.getLogger(ROOT)
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.rate_limit = RateLimitFilter(rate, burst)
+        self.queue_handler = DroppingQueueHandler(self.queue)
+        self.queue_handler.addFilter(self.rate_limit)
+        if handler is None:
+            handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+            handler.setFormatter(StructuredFormatter(json_lines))
+        self.handler = handler
+        self.listener = BoundedListener(self.queue, handler, respect_handler_level=True)
+        self.set_level(level)
+
+    def start(self):
+        _use_direct_output(False)
+        self.logger.addHandler(self.queue_handler)
+        self.listener.start()
+
+    def stop(self):
+        """Report pending suppressed counts, flush the queue and stop the writer"""
+        self.report_suppressed()
+        self.logger.removeHandler(self.queue_handler)
+        self.listener.stop()
+        _use_direct_output(True)
+
+    @property
+    def level(self):
+        return self.logger.level
+
+    def set_level(self, level):
+        if isinstance(level, str):
+            level = logging.getLevelName(level.upper())
+            if not isinstance(level, int):
+                level = logging.INFO
+        self.logger.setLevel(level)
+
+    def step_level(self, more_verbose):
+        """Move one step along LEVELS; returns the new level"""
+        levels = list(LEVELS)
+        current = self.logger.level
+        index = min(range(len(levels)), key=lambda i: abs(levels[i] - current))
+        index = max(0, index - 1) if more_verbose else min(len(levels) - 1, index + 1)
+        self.logger.setLevel(levels[index])
+        # Bypasses the filter so a level change is always visible
+        self._announce(f"Log level {logging.getLevelName(levels[index])}")
+        return levels[index]
+
+    def report_suppressed(self):
+        """Log one summary line per message type with suppressed messages"""
+        for kind, count in self.rate_limit.pending().items():
+            name = kind if isinstance(kind, str) else f"{os.path.basename(kind[1])}:{kind[2]}"
+            self._announce(f"Suppressed {count} message(s): {name}")
+
+    def stats(self):
+        return {
+            'level': logging.getLevelName(self.logger.level),
+            'queued': self.queue.qsize(),
+            'dropped': self.queue_handler.dropped,
+            'suppressed': self.rate_limit.suppressed,
+        }
+
+    def _announce(self, message):
+        record = self.logger.makeRecord(f"{ROOT}.Log", logging.INFO, __file__, 0, message, (), None)
+        self.queue_handler.enqueue(self.queue_handler.prepare(record))
+
+
+_service_log = None
+
+
+def setup(stream=None, level=LOG_LEVEL, signals=True, **kwargs):
+    """
+    Route every smartkart logger through the background writer.
+
+    Args:
+        stream: Output stream (default: sys.stdout, i.e. journald under systemd)
+        level (str or int): Initial level (default: LOG_LEVEL)
+        signals (bool): Install SIGUSR1/SIGUSR2 level switching (main thread only)
+        **kwargs: Passed to ServiceLog
+
+    Returns:
+        ServiceLog: The running log (also kept for shutdown())
+    """
+    global _service_log
+    if _service_log is not None:
+        return _service_log
+    service_log = ServiceLog(stream=stream, level=level, **kwargs)
+    service_log.start()
+    if signals and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: service_log.step_level(more_verbose=True))
+        signal.signal(signal.SIGUSR2, lambda signum, frame: service_log.step_level(more_verbose=False))
+    _service_log = service_log
+    return service_log
+
+
+def shutdown():
+    """Flush and stop the writer set up by setup() (safe to call twice)"""
+    global _service_log
+    if _service_log is not None:
+        _service_log.stop()
+        _service_log = None
@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Simulated HX711 for SmartKart
+A load cell model (noise, settling dynamics, creep and warm-up drift) at
+the ADC's sample rate, with items put in and taken out by scripted
+scenarios that drive the emulated RFID readers as well
+
+Off the Pi, weight_sensor used to return a uniform random 0.3-0.4 kg,
+which nothing downstream (filters, step detection, the backend's weight
+checks) could be tested against. SimulatedHX711 returns raw counts with
+the same calibration as the real cell:
+
+- the cart platform is a damped spring: a load change rings at
+  natural_hz and settles with the given damping ratio, and a dropped item
+  adds an impact transient on top (bump() jostles the cart without
+  changing the load)
+- the load cell creeps: a load change grows by `creep` of itself with time
+  constant creep_seconds
+- the zero drifts by warmup_kg over warmup_seconds after power-up
+- Gaussian noise, and a rare spike of spike_kg
+
+add_item() / remove_item() change the load, now or at a given time.
+Scenarios are lists of events (load_scenario() reads them from JSON,
+shopping_scenario() makes a random shopping trip); ScenarioRunner plays
+one, putting each item's tag in the field of the emulated readers
+(rdm6300_emulator.py) as the item passes them, so the weight service,
+the RFID service and the backend see the same shopping trip:
+
+    python3 sim_hx711.py --shop 20 --products 0A1B2C3D4E:0.5,0B2C3D4E5F:1.2 --link /tmp/rdm6300-
+    RFID_READER_PORTS=/tmp/rdm6300-1,/tmp/rdm6300-2 python3 rfid_service.py
+
+The first command runs weight_sensor_service in-process on the simulated
+HX711; --dry-run prints the filtered weight instead. Use tags that are in
+the backend's product catalogue.
+
+Scenario JSON:
+
+    {"events": [{"at": 2.0, "action": "add", "tag": "0A1B2C3D4E", "kg": 0.5},
+                {"at": 9.0, "action": "bump", "kg": 0.3},
+                {"at": 15.0, "action": "remove", "tag": "0A1B2C3D4E"}]}
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+import service_log
+
+SIM_HX711_LOAD = float(os.getenv('SIM_HX711_LOAD', '0'))   # kg on the platform at start
+
+RAW_LIMIT = 2 ** 23 - 1     # HX711 output is 24-bit two's complement
+SETTLED_ENVELOPE = 1e-4     # Transients below this fraction are folded into the load
+LAND_DELAY = 0.4            # Seconds between a tag passing the reader and the item landing
+TAG_READ_SECONDS = 0.5      # Seconds a passing tag stays in a reader's field
+REMOVE_MIN_AGE = 2.0        # Seconds an item stays in before a random trip takes it out
+
+log = service_log.get_logger('Simulated HX711')
+
+
+class SimulatedHX711:
+    """Raw HX711 conversions from a simulated load cell"""
+
+    def __init__(self, zero_offset, scale_factor, rate=10.0, load_kg=0.0, noise_kg=0.003, natural_hz=3.0,
+                 damping=0.25, impact=0.3, creep=0.001, creep_seconds=120.0, warmup_kg=0.01,
+                 warmup_seconds=600.0, spike_rate=0.001, spike_kg=2.0, seed=None,
+                 clock=time.monotonic, sleep=time.sleep):
+        """
+        Args:
+            zero_offset (float): Raw reading of the empty platform
+            scale_factor (float): Raw counts per kg
+            rate (float): Conversions per second (HX711: 10 or 80)
+            load_kg (float): Load on the platform at start
+            noise_kg (float): Standard deviation of the conversion noise
+            natural_hz (float): Platform oscillation frequency
+            damping (float): Damping ratio, between 0 and 1
+            impact (float): Impact transient of a load change, as a
+                fraction of the change
+            creep (float): Creep of a load change, as a fraction of it
+            creep_seconds (float): Creep time constant
+            warmup_kg (float): Zero drift after power-up
+            warmup_seconds (float): Warm-up drift time constant
+            spike_rate (float): Probability a conversion is a spike
+            spike_kg (float): Spike size
+            seed (int): Random seed for reproducible noise
+            clock (callable): Monotonic time source
+            sleep (callable): Waits between conversions in read()
+        """
+        if not 0 < damping < 1:
+            raise ValueError("Damping ratio must be between 0 and 1")
+        self.zero_offset = zero_offset
+        self.scale_factor = scale_factor
+        self.rate = rate
+        self.noise_kg = noise_kg
+        self.impact = impact
+        self.creep = creep
+        self.creep_seconds = creep_seconds
+        self.warmup_kg = warmup_kg
+        self.warmup_seconds = warmup_seconds
+        self.spike_rate = spike_rate
+        self.spike_kg = spike_kg
+        self._omega = 2 * math.pi * natural_hz
+        self._decay = damping * self._omega
+        self._omega_d = self._omega * math.sqrt(1 - damping ** 2)
+        self._ratio = damping / math.sqrt(1 - damping ** 2)
+        self._horizon = math.log(1 / SETTLED_ENVELOPE) / self._decay
+        self._rng = random.Random(seed)
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._events = []           # (time, delta kg, impulse kg), transient still ringing
+        self._load = load_kg        # Load of the settled events
+        # Creep of the settled events: creep_target - creep_pending * exp(-(t - creep_at) / creep_seconds)
+        self._creep_target = 0.0
+        self._creep_pending = 0.0
+        self._creep_at = 0.0
+        self._started_at = clock()
+        self._next = None
+        self.items = {}             # tag_id -> kg on the platform (or about to land)
+        self.conversions = 0
+
+    # ----- Items -----
+
+    def add_item(self, tag_id, kg, at=None):
+        """Put an item on the platform, now or at time `at` (clock())"""
+        self.items[tag_id] = kg
+        self._change(kg, kg * self.impact, at)
+
+    def remove_item(self, tag_id, at=None):
+        """
+        Take an item off the platform.
+
+        Returns:
+            float: Its weight in kg
+
+        Raises:
+            ValueError: The item is not on the platform
+        """
+        if tag_id not in self.items:
+            raise ValueError(f"{tag_id} is not on the load cell")
+        kg = self.items.pop(tag_id)
+        self._change(-kg, -kg * self.impact, at)
+        return kg
+
+    def bump(self, kg, at=None):
+        """Jostle the cart: a transient of about kg, no load change"""
+        self._change(0.0, kg, at)
+
+    def _change(self, delta, impulse, at):
+        with self._lock:
+            self._events.append((self._clock() if at is None else at, delta, impulse))
+
+    # ----- Conversions -----
+
+    def load_at(self, now):
+        """
+        Load the cell sees at `now` (no noise); times should not go back.
+
+        Returns:
+            float: kg, including transients, creep and warm-up drift
+        """
+        with self._lock:
+            ringing = []
+            load = 0.0
+            for event in self._events:
+                at, delta, impulse = event
+                age = now - at
+                if age < 0:
+                    ringing.append(event)
+                elif age > self._horizon:
+                    self._settle(at, delta)
+                else:
+                    ringing.append(event)
+                    envelope = math.exp(-self._decay * age)
+                    phase = self._omega_d * age
+                    load += delta * (1 - envelope * (math.cos(phase) + self._ratio * math.sin(phase)))
+                    load += impulse * envelope * math.sin(phase)
+                    load += delta * self.creep * (1 - math.exp(-age / self.creep_seconds))
+            self._events = ringing
+            load += self._load
+            load += self._creep_target - self._creep_pending * math.exp(-(now - self._creep_at) / self.creep_seconds)
+        load += self.warmup_kg * (1 - math.exp(-(now - self._started_at) / self.warmup_seconds))
+        return load
+
+    def _settle(self, at, delta):
+        """Fold a settled event into the load and the shared creep term"""
+        self._load += delta
+        # Bring the pending creep to the event's time, then add what is left of its own
+        now = at + self._horizon
+        self._creep_pending *= math.exp(-(now - self._creep_at) / self.creep_seconds)
+        self._creep_at = now
+        self._creep_target += delta * self.creep
+        self._creep_pending += delta * self.creep * math.exp(-self._horizon / self.creep_seconds)
+
+    def sample(self, now=None):
+        """
+        One conversion at `now` (default: clock()), without waiting.
+
+        Returns:
+            float: Raw counts
+        """
+        now = self._clock() if now is None else now
+        kg = self.load_at(now) + self._rng.gauss(0, self.noise_kg)
+        if self.spike_rate and self._rng.random() < self.spike_rate:
+            kg += self._rng.choice((-1, 1)) * self.spike_kg
+        self.conversions += 1
+        raw = self.zero_offset + self.scale_factor * kg
+        return max(-RAW_LIMIT - 1, min(RAW_LIMIT, raw))
+
+    def series(self, seconds, start=None):
+        """
+        Conversions over `seconds` at the sample rate, without waiting.
+
+        Returns:
+            list: (time, raw) tuples
+        """
+        start = self._started_at if start is None else start
+        return [(start + n / self.rate, self.sample(start + n / self.rate)) for n in range(int(seconds * self.rate))]
+
+    def read(self):
+        """
+        Block until the next conversion, like weight_sensor.read_raw().
+
+        Returns:
+            list: [raw counts]
+        """
+        period = 1.0 / self.rate
+        now = self._clock()
+        if self._next is None or self._next < now - period:
+            self._next = now        # First read, or the reader fell behind
+        delay = self._next - now
+        if delay > 0:
+            self._sleep(delay)
+        at = self._next
+        self._next += period
+        return [self.sample(at)]
+
+
+# ----- Scenarios -----
+
+ACTIONS = ('add', 'remove', 'bump')
+
+
+class ScenarioEvent:
+    """One scripted action, `at` seconds into the scenario"""
+
+    __slots__ = ('at', 'action', 'tag_id', 'kg', 'reader')
+
+    def __init__(self, at, action, tag_id=None, kg=None, reader=None):
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown scenario action {action!r}")
+        if action == 'add' and (tag_id is None or kg is None):
+            raise ValueError("An add needs a tag and its weight")
+        if action == 'remove' and tag_id is None:
+            raise ValueError("A remove needs a tag")
+        if action == 'bump' and kg is None:
+            raise ValueError("A bump needs its size in kg")
+        self.at = at
+        self.action = action
+        self.tag_id = tag_id
+        self.kg = kg
+        self.reader = reader        # 1-based reader the tag passes; None: every reader
+
+    def __repr__(self):
+        return f"ScenarioEvent({self.at:.1f}s, {self.action}, {self.tag_id}, {self.kg})"
+
+
+def load_scenario(path):
+    """
+    Read a scenario from JSON (see the module docstring).
+
+    Returns:
+        list: ScenarioEvent, in time order
+
+    Raises:
+        ValueError: Not a valid scenario
+    """
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Scenario {path} is not valid JSON: {e}") from None
+    try:
+        events = [ScenarioEvent(float(event['at']), event['action'], event.get('tag'), event.get('kg'),
+                                event.get('reader')) for event in data['events']]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"Scenario {path} has a malformed event: {e}") from None
+    return sorted(events, key=lambda event: event.at)
+
+
+def shopping_scenario(products, actions, interval=5.0, remove_share=0.2, seed=None):
+    """
+    A random shopping trip: actions arrive as a Poisson process.
+
+    Args:
+        products (list): (tag_id, kg) of the products to pick from
+        actions (int): Number of adds and removes
+        interval (float): Mean seconds between actions
+        remove_share (float): Probability an action takes an item out
+            (of those in for at least REMOVE_MIN_AGE)
+        seed (int): Random seed
+
+    Returns:
+        list: ScenarioEvent, in time order
+    """
+    rng = random.Random(seed)
+    basket = {}                 # tag_id -> time added
+    events = []
+    at = 0.0
+    for _ in range(actions):
+        at += rng.expovariate(1.0 / interval)
+        removable = [tag_id for tag_id, added in basket.items() if at - added >= REMOVE_MIN_AGE]
+        choices = [(tag_id, kg) for tag_id, kg in products if tag_id not in basket]
+        if removable and (rng.random() < remove_share or not choices):
+            tag_id = rng.choice(removable)
+            del basket[tag_id]
+            events.append(ScenarioEvent(at, 'remove', tag_id))
+        elif choices:
+            tag_id, kg = rng.choice(choices)
+            basket[tag_id] = at
+            events.append(ScenarioEvent(at, 'add', tag_id, kg))
+    return events
+
+
+class ScenarioRunner:
+    """Plays a scenario on a SimulatedHX711 and the emulated readers"""
+
+    def __init__(self, events, device, readers=(), delay=0.0, land_delay=LAND_DELAY,
+                 read_seconds=TAG_READ_SECONDS):
+        """
+        Args:
+            events (list): ScenarioEvent
+            device (SimulatedHX711): Load cell the items go on
+            readers (list): rdm6300_emulator.EmulatedReader (or anything
+                with present() and script())
+            delay (float): Seconds before the scenario's time 0
+            land_delay (float): Seconds between a tag passing the readers
+                and the item landing (or leaving and passing them)
+            read_seconds (float): Seconds a passing tag is in the field
+        """
+        self.events = sorted(events, key=lambda event: event.at)
+        self.device = device
+        self.readers = list(readers)
+        self.delay = delay
+        self.land_delay = land_delay
+        self.read_seconds = read_seconds
+        self.applied = 0
+        self.skipped = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="scenario", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self.wait()
+
+    def wait(self, timeout=None):
+        """Wait for the scenario to finish; True if it did"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def _readers_for(self, event):
+        if event.reader is None:
+            return self.readers
+        return self.readers[event.reader - 1:event.reader]
+
+    def apply(self, event):
+        """Carry out one event now"""
+        device = self.device
+        now = device._clock()
+        kg = event.kg
+        if event.action == 'add':
+            for reader in self._readers_for(event):
+                reader.present(event.tag_id, self.read_seconds)
+            device.add_item(event.tag_id, event.kg, at=now + self.land_delay)
+        elif event.action == 'remove':
+            try:
+                kg = device.remove_item(event.tag_id, at=now)
+            except ValueError as e:
+                self.skipped += 1
+                log.warning(f"Scenario at {event.at:.1f}s skipped: {e}", extra={'kind': 'scenario'})
+                return
+            for reader in self._readers_for(event):
+                reader.script([(self.land_delay, event.tag_id, self.read_seconds)])
+        else:
+            device.bump(event.kg, at=now)
+        self.applied += 1
+        log.info(f"Scenario {event.action} {event.tag_id or f'{event.kg}kg'} at {event.at:.1f}s",
+                 extra={'kind': 'scenario', 'fields': {'kg': kg, 'load_kg': round(sum(device.items.values()), 3)}})
+
+    def _run(self):
+        start = time.monotonic() + self.delay
+        for event in self.events:
+            if self._stop_event.wait(max(0.0, start + event.at - time.monotonic())):
+                return
+            self.apply(event)
+
+
+def parse_products(spec):
+    """
+    Args:
+        spec (str): "TAG:KG,TAG:KG,..."
+
+    Returns:
+        list: (tag_id, kg) tuples
+
+    Raises:
+        ValueError: Malformed product
+    """
+    products = []
+    for pair in spec.split(','):
+        pair = pair.strip()
+        if not pair:
+            continue
+        try:
+            tag_id, kg = pair.split(':')
+            products.append((tag_id.strip(), float(kg)))
+        except ValueError:
+            raise ValueError(f"Bad product {pair!r}: expected TAG:KG") from None
+    return products
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--scenario', help='scenario JSON to play')
+    parser.add_argument('--shop', type=int, default=0, help='play a random shopping trip of this many actions')
+    parser.add_argument('--products', default='0A1B2C3D4E:0.5',
+                        help='TAG:KG pairs a random trip picks from, comma separated')
+    parser.add_argument('--interval', type=float, default=5.0, help='mean seconds between random actions')
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--readers', type=int, default=2, help='emulated RFID readers (0: none)')
+    parser.add_argument('--link', help='stable symlink prefix for the readers, e.g. /tmp/rdm6300-')
+    parser.add_argument('--delay', type=float, default=10.0,
+                        help='seconds before the scenario starts (time for the services to connect)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help="print the filtered weight instead of running the weight service")
+    args = parser.parse_args()
+
+    if args.scenario:
+        events = load_scenario(args.scenario)
+    elif args.shop:
+        events = shopping_scenario(parse_products(args.products), args.shop, args.interval, seed=args.seed)
+    else:
+        parser.error("give --scenario or --shop")
+
+    import weight_sensor
+    if weight_sensor.REAL_HARDWARE:
+        print("Error: a real HX711 is connected; the simulation only runs off the Pi")
+        return 1
+
+    fleet = None
+    if args.readers:
+        from rdm6300_emulator import EmulatorFleet
+        fleet = EmulatorFleet(args.readers, link_prefix=args.link, seed=args.seed).start()
+        print(f"RFID_READER_PORTS={','.join(fleet.paths)}")
+    runner = ScenarioRunner(events, weight_sensor.simulated, fleet.readers if fleet else (), delay=args.delay)
+    print(f"Playing {len(events)} events over {events[-1].at + args.delay:.0f}s" if events else "Empty scenario")
+
+    runner.start()
+    try:
+        if args.dry_run:
+            weight_sensor.start_sampler()
+            while not runner.wait(1.0):
+                print(f"{weight_sensor.get_weight():.3f} kg  ({len(weight_sensor.simulated.items)} items)")
+            time.sleep(3.0)
+            print(f"{weight_sensor.get_weight():.3f} kg at the end")
+            weight_sensor.stop_sampler()
+        else:
+            import weight_sensor_service
+            weight_sensor_service.main()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        runner.stop()
+        if fleet is not None:
+            fleet.stop()
+    print(f"{runner.applied} events played, {runner.skipped} skipped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
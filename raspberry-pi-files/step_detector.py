@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Weight Step Detector for SmartKart
+Online change-point detection on the filtered weight: one weight_step
+event per item added or removed, with the settled delta and a confidence
+
+The backend used to infer add/remove from whatever measuredWeight it last
+stored when an RFID scan arrived, which may predate the item landing in
+the cart. The detector runs a two-sided CUSUM over the weight stream:
+
+    g+ = max(0, g+ + (x - level) - drift)
+    g- = max(0, g- - (x - level) - drift)
+
+and raises a change when either sum exceeds `threshold` (a large step at
+once, a small one after a few samples; noise within `drift` of the level
+never accumulates). The change starts at the last sample where that sum
+was 0. The first level after start is only learned, not reported. It
+then waits for the weight to settle - every sample within settle_kg for
+settle_seconds - and reports the step from the old level to the mean of
+the settled samples:
+
+    delta          settled level - level before (kg, negative for a removal)
+    settleSeconds  change start -> settled
+    confidence     0-1: z^2 / (z^2 + CONFIDENCE_Z^2), z being the delta over
+                   its standard error (noise before and while settling);
+                   halved if the weight never settled (settle_timeout)
+
+Changes smaller than min_step once settled (drift, a bump) are dropped.
+Between changes the level follows slow drift.
+"""
+
+import math
+import time
+
+import metrics
+
+MIN_STEP_KG = 0.02          # Smallest step reported
+CUSUM_DRIFT = 0.01          # kg per sample ignored by the sums (half the smallest step)
+CUSUM_THRESHOLD = 0.05      # kg-samples before a change is raised
+SETTLE_KG = 0.01            # Max movement while settled
+SETTLE_SECONDS = 0.3        # Time within SETTLE_KG to count as settled
+SETTLE_TIMEOUT = 3.0        # Report an unsettled step after this long
+LEVEL_ALPHA = 0.05          # Level drift tracking while stable
+NOISE_FLOOR_KG = 0.005      # Minimum noise estimate
+NOISE_SAMPLES = 32          # Samples the level's standard error is taken over
+WARMUP_SAMPLES = 8          # Samples before the first level counts
+CONFIDENCE_Z = 5.0          # z giving confidence 0.5
+
+
+class WeightStep:
+    """One detected step"""
+
+    __slots__ = ('delta', 'before', 'after', 'started_at', 'settled_at', 'confidence', 'settled')
+
+    def __init__(self, delta, before, after, started_at, settled_at, confidence, settled):
+        self.delta = delta
+        self.before = before
+        self.after = after
+        self.started_at = started_at
+        self.settled_at = settled_at
+        self.confidence = confidence
+        self.settled = settled
+
+    @property
+    def settle_seconds(self):
+        return self.settled_at - self.started_at
+
+    def __repr__(self):
+        return (f"WeightStep({self.delta:+.3f}kg, {self.before:.3f}->{self.after:.3f}, "
+                f"settle {self.settle_seconds:.2f}s, confidence {self.confidence:.2f})")
+
+
+class StepDetector:
+    """Two-sided CUSUM over one weight stream"""
+
+    def __init__(self, min_step=MIN_STEP_KG, drift=CUSUM_DRIFT, threshold=CUSUM_THRESHOLD,
+                 settle_kg=SETTLE_KG, settle_seconds=SETTLE_SECONDS, settle_timeout=SETTLE_TIMEOUT,
+                 registry=None):
+        """
+        Args:
+            min_step (float): Smallest settled change reported (kg)
+            drift (float): CUSUM allowance per sample (kg)
+            threshold (float): CUSUM alarm level (kg-samples)
+            settle_kg (float): Max movement while settled (kg)
+            settle_seconds (float): Time within settle_kg to count as settled
+            settle_timeout (float): Seconds after the change start before an
+                unsettled step is reported anyway
+            registry (metrics.Registry): Where the counters live (default: metrics.REGISTRY)
+        """
+        registry = registry if registry is not None else metrics.REGISTRY
+        self.min_step = min_step
+        self.drift = drift
+        self.threshold = threshold
+        self.settle_kg = settle_kg
+        self.settle_seconds = settle_seconds
+        self.settle_timeout = settle_timeout
+        self.level = None
+        self._variance = NOISE_FLOOR_KG ** 2
+        self._stable_samples = 0
+        self._pos = 0.0
+        self._neg = 0.0
+        self._pos_zero_at = None    # Last sample where each sum was 0
+        self._neg_zero_at = None
+        self._samples = 0
+        self._established = False   # Warm-up samples seen since start
+        self._changed_at = None     # Start of the change being settled (None while stable)
+        self._run = []              # Settling run: samples within settle_kg of its first
+        self._run_at = None
+        self.steps = 0
+        self.dropped = 0
+        self._steps_counter = registry.counter(
+            'smartkart_weight_steps_total', 'Weight steps detected', ['direction'])
+        self._settle_seconds = registry.histogram(
+            'smartkart_weight_step_settle_seconds', 'Time from a weight change starting to the weight settling')
+
+    def update(self, weight, now=None):
+        """
+        Feed one sample.
+
+        Args:
+            weight (float): kg
+            now (float): time.monotonic() of the sample (default: now)
+
+        Returns:
+            WeightStep: When a step has settled, else None
+        """
+        if now is None:
+            now = time.monotonic()
+        if self.level is None:
+            self.level = weight
+            self._pos_zero_at = self._neg_zero_at = now
+            return None
+        if self._changed_at is not None:
+            return self._settle(weight, now)
+
+        self._samples += 1
+        if self._samples >= WARMUP_SAMPLES:
+            self._established = True
+        residual = weight - self.level
+        self._pos = max(0.0, self._pos + residual - self.drift)
+        self._neg = max(0.0, self._neg - residual - self.drift)
+        if self._pos == 0.0:
+            self._pos_zero_at = now
+        if self._neg == 0.0:
+            self._neg_zero_at = now
+        if self._pos == 0.0 and self._neg == 0.0:
+            # Stable: follow slow drift and learn the noise
+            self.level += LEVEL_ALPHA * residual
+            self._variance += LEVEL_ALPHA * (residual * residual - self._variance)
+            self._stable_samples += 1
+        elif self._pos > self.threshold or self._neg > self.threshold:
+            self._changed_at = self._pos_zero_at if self._pos > self.threshold else self._neg_zero_at
+            self._run = [weight]
+            self._run_at = now
+        return None
+
+    def _settle(self, weight, now):
+        if abs(weight - self._run[0]) > self.settle_kg:
+            self._run = [weight]
+            self._run_at = now
+        else:
+            self._run.append(weight)
+        if now - self._run_at >= self.settle_seconds:
+            return self._finish(now, settled=True)
+        if now - self._changed_at >= self.settle_timeout:
+            return self._finish(now, settled=False)
+        return None
+
+    def _finish(self, now, settled):
+        run = self._run
+        after = sum(run) / len(run)
+        before = self.level
+        delta = after - before
+        started_at = self._changed_at
+        # Standard error of the delta: noise over the level's recent samples
+        # and over the settled run
+        run_variance = sum((value - after) ** 2 for value in run) / len(run)
+        noise = max(math.sqrt(max(self._variance, run_variance)), NOISE_FLOOR_KG)
+        stable_samples = max(1, min(self._stable_samples, NOISE_SAMPLES))
+        stderr = noise * math.sqrt(1.0 / stable_samples + 1.0 / len(run))
+
+        self.level = after
+        self._stable_samples = len(run)
+        self._pos = self._neg = 0.0
+        self._changed_at = None
+        self._pos_zero_at = self._neg_zero_at = now
+        self._run = []
+        if not self._established:
+            # Start-up transient: the settled level is the first real one
+            self._established = True
+            return None
+        if abs(delta) < self.min_step:
+            self.dropped += 1
+            return None
+
+        z = abs(delta) / stderr
+        confidence = z * z / (z * z + CONFIDENCE_Z * CONFIDENCE_Z)
+        if not settled:
+            confidence /= 2
+        step = WeightStep(delta, before, after, started_at, now, confidence, settled)
+        self.steps += 1
+        self._steps_counter.labels('added' if delta > 0 else 'removed').inc()
+        self._settle_seconds.record(step.settle_seconds)
+        return step
+
+    def reset(self):
+        """Forget the level (e.g. after a re-zero moved it); the next sample starts a new one"""
+        self.level = None
+        self._pos = self._neg = 0.0
+        self._changed_at = None
+        self._run = []
+
+    def stats(self):
+        """
+        Returns:
+            dict: steps, dropped (changes under min_step), level (kg),
+                noise_kg and settling (True while a change is settling)
+        """
+        return {
+            'steps': self.steps,
+            'dropped': self.dropped,
+            'level': self.level,
+            'noise_kg': math.sqrt(self._variance),
+            'settling': self._changed_at is not None,
+        }
+
+
+def build_step_payload(cart_id, step, timestamp):
+    """
+    weight_step payload.
+
+    Args:
+        cart_id (str): Cart ID
+        step (WeightStep): Detected step
+        timestamp (str): UTC ISO time the step settled
+    """
+    return {
+        'cartId': cart_id,
+        'delta': round(step.delta, 3),
+        'weightBefore': round(step.before, 3),
+        'weightAfter': round(step.after, 3),
+        'settleSeconds': round(step.settle_seconds, 2),
+        'confidence': round(step.confidence, 2),
+        'settled': step.settled,
+        'timestamp': timestamp,
+    }
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+RFID Reader Supervisor for SmartKart
+Per-reader health tracking with in-place reopen and quarantine
+
+The read loops used to open every port once at startup. A USB UART that
+is unplugged (or whose adapter resets) left the loop holding a dead
+handle, and a reader that started emitting garbage kept feeding the
+decoder until systemd restarted the whole service - dropping the
+Socket.IO session and every other reader with it.
+
+The supervisor owns the open handles instead. Every `check_interval` it
+samples each reader's FrameDecoder counters and works out:
+
+    bytes/s          bytes received per second over the interval
+    valid ratio      share of those bytes that were intact frames
+    checksum rate    bad checksums / (valid frames + bad checksums)
+    stall            seconds since the last byte arrived
+
+A reader is faulted when the read loop hits a read error, its port
+disappears, the valid ratio falls below `min_valid_ratio` (garbage on the
+line), the checksum rate exceeds `max_checksum_rate`, or it stops for
+`stall_timeout` seconds in the middle of a frame. A faulted reader is
+closed and reopened in place: at once the first time, then with
+exponential backoff, and after `quarantine_after` faults in a row it is
+quarantined (left closed) for `quarantine_seconds` before the next try.
+The other readers and the backend connection are never touched.
+
+The read loops ask readers() for the current handles and resync whenever
+`generation` changes.
+"""
+
+import os
+import time
+
+import metrics
+import service_log
+from rdm6300 import PACKET_SIZE
+
+CHECK_INTERVAL = 1.0          # Seconds between health checks
+MIN_BYTES = 4 * PACKET_SIZE   # Bytes an interval needs before its ratios are judged
+MIN_VALID_RATIO = 0.5         # Fault below this share of bytes in intact frames
+MAX_CHECKSUM_RATE = 0.5       # Fault above this share of frames with a bad checksum
+STALL_TIMEOUT = float(os.getenv('RFID_STALL_TIMEOUT', '5'))  # Mid-frame silence before a fault; 0 disables
+REOPEN_BACKOFF = 0.5          # Delay before the second reopen attempt, doubled after each fault
+REOPEN_MAX = 30.0             # Longest delay between reopen attempts
+QUARANTINE_AFTER = 3          # Faults in a row before a reader is quarantined
+QUARANTINE_SECONDS = float(os.getenv('RFID_QUARANTINE_SECONDS', '60'))
+HEALTHY_AFTER = 30.0          # Seconds without a fault that reset the fault count
+
+OK = 'ok'
+DOWN = 'down'                 # Closed, reopen scheduled
+QUARANTINED = 'quarantined'   # Closed for quarantine_seconds
+
+READER_UP = metrics.gauge('smartkart_rfid_reader_up', '1 while the reader port is open and healthy', ['reader'])
+READER_FAULTS = metrics.counter('smartkart_rfid_reader_faults_total', 'Reader faults by reason', ['reader', 'reason'])
+READER_REOPENS = metrics.counter('smartkart_rfid_reader_reopens_total', 'Reader ports reopened in place', ['reader'])
+READER_RECOVERY_SECONDS = metrics.histogram(
+    'smartkart_rfid_reader_recovery_seconds', 'Time from a reader fault to its port reopened', ['reader'])
+
+log = service_log.get_logger('Reader Supervisor')
+
+
+class SupervisedReader:
+    """One configured port and its health state"""
+
+    def __init__(self, reader_id, label, port, serial_connection=None, now=0.0):
+        self.reader_id = reader_id
+        self.label = label
+        self.port = port
+        self.serial = serial_connection
+        self.state = OK if serial_connection is not None else DOWN
+        self.failures = 0             # Faults in a row
+        self.faults = 0               # Faults ever
+        self.reopens = 0
+        self.last_fault = None        # Reason of the latest fault
+        self.fault_at = None if serial_connection is not None else now
+        self.retry_at = now
+        self.opened_at = now
+        self.last_recovery = None     # Seconds from the latest fault to reopen
+        # Counter snapshot at the last health check
+        self.sample_at = now
+        self.sample = None
+        self.last_byte_at = now
+        self.bytes_per_sec = 0.0
+        self.valid_ratio = None
+        self.checksum_rate = None
+
+
+def _counters(decoder):
+    return decoder.bytes_in, decoder.frames, decoder.rejected['bad_checksum']
+
+
+class ReaderSupervisor:
+    """Opens, watches and reopens the reader ports for the read loops"""
+
+    def __init__(self, ports, decoders, open_reader, readers=(), check_interval=CHECK_INTERVAL,
+                 min_bytes=MIN_BYTES, min_valid_ratio=MIN_VALID_RATIO, max_checksum_rate=MAX_CHECKSUM_RATE,
+                 stall_timeout=STALL_TIMEOUT, reopen_backoff=REOPEN_BACKOFF, reopen_max=REOPEN_MAX,
+                 quarantine_after=QUARANTINE_AFTER, quarantine_seconds=QUARANTINE_SECONDS,
+                 healthy_after=HEALTHY_AFTER, clock=time.monotonic):
+        """
+        Args:
+            ports (list): (reader_id, label, port path) for every configured reader
+            decoders (dict): Dictionary mapping reader IDs to their FrameDecoder
+                (shared with the read loop)
+            open_reader (callable): open_reader(port, label) -> serial.Serial or None
+            readers (list): (reader_id, label, serial.Serial) already opened;
+                configured ports missing here are opened on the first check()
+            check_interval (float): Seconds between health checks
+            min_bytes (int): Bytes an interval needs before its ratios count
+            min_valid_ratio (float): Lowest healthy share of bytes in intact frames
+            max_checksum_rate (float): Highest healthy bad-checksum share
+            stall_timeout (float): Mid-frame silence before a fault; 0 disables
+            reopen_backoff (float): Delay before the second reopen attempt
+            reopen_max (float): Longest delay between reopen attempts
+            quarantine_after (int): Faults in a row before quarantine
+            quarantine_seconds (float): How long a quarantined reader stays closed
+            healthy_after (float): Seconds without a fault that reset the count
+            clock (callable): Monotonic time source (for tests)
+        """
+        self.decoders = decoders
+        self.open_reader = open_reader
+        self.check_interval = check_interval
+        self.min_bytes = min_bytes
+        self.min_valid_ratio = min_valid_ratio
+        self.max_checksum_rate = max_checksum_rate
+        self.stall_timeout = stall_timeout
+        self.reopen_backoff = reopen_backoff
+        self.reopen_max = reopen_max
+        self.quarantine_after = quarantine_after
+        self.quarantine_seconds = quarantine_seconds
+        self.healthy_after = healthy_after
+        self._clock = clock
+
+        now = clock()
+        opened = {reader_id: reader for reader_id, _, reader in readers}
+        self._readers = [SupervisedReader(reader_id, label, port, opened.get(reader_id), now)
+                         for reader_id, label, port in ports]
+        for entry in self._readers:
+            READER_UP.labels(entry.reader_id).set(1 if entry.state == OK else 0)
+            if entry.state != OK:
+                entry.retry_at = now + reopen_backoff   # Failed to open at startup: retry soon
+        self._next_check = now + check_interval
+        self.generation = 0           # Bumped whenever the set of open handles changes
+
+    def readers(self):
+        """
+        Open, healthy readers in port order.
+
+        Returns:
+            list: (reader_id, label, serial.Serial) tuples
+        """
+        return [(entry.reader_id, entry.label, entry.serial) for entry in self._readers if entry.state == OK]
+
+    def _entry(self, reader_id):
+        for entry in self._readers:
+            if entry.reader_id == reader_id:
+                return entry
+        return None
+
+    def fault(self, reader_id, reason, detail=None, now=None):
+        """
+        Close a reader and schedule its reopen.
+
+        Called by the read loops on a read error and by check() on a failed
+        health check. Faults reported for a reader that is already closed
+        are ignored.
+
+        Returns:
+            bool: True if the reader was open and is now closed
+        """
+        entry = self._entry(reader_id)
+        if entry is None or entry.state != OK:
+            return False
+        if now is None:
+            now = self._clock()
+        entry.failures += 1
+        entry.faults += 1
+        entry.last_fault = reason
+        entry.fault_at = now
+        READER_FAULTS.labels(reader_id, reason).inc()
+        READER_UP.labels(reader_id).set(0)
+        self._close(entry)
+        note = f": {detail}" if detail else ""
+        if entry.failures >= self.quarantine_after:
+            entry.state = QUARANTINED
+            entry.retry_at = now + self.quarantine_seconds
+            log.error(f"✗ {entry.label} quarantined for {self.quarantine_seconds:g}s after "
+                      f"{entry.failures} faults in a row ({reason}{note})", extra={'kind': 'reader_fault'})
+        else:
+            entry.state = DOWN
+            entry.retry_at = now + self._backoff(entry.failures)
+            log.warning(f"⚠ {entry.label} fault ({reason}{note}) - reopening {entry.port}",
+                        extra={'kind': 'reader_fault'})
+        return True
+
+    def _backoff(self, failures):
+        if failures <= 1:
+            return 0.0
+        return min(self.reopen_max, self.reopen_backoff * 2 ** (failures - 2))
+
+    def _close(self, entry):
+        self.generation += 1
+        serial_connection, entry.serial = entry.serial, None
+        try:
+            serial_connection.close()
+        except Exception:
+            pass
+
+    def _reopen(self, entry, now):
+        if not os.path.exists(entry.port):
+            entry.retry_at = now + self._backoff(max(entry.failures, 2))
+            return
+        serial_connection = self.open_reader(entry.port, entry.label)
+        if serial_connection is None:
+            entry.failures += 1
+            entry.retry_at = now + self._backoff(max(entry.failures, 2))
+            return
+        entry.serial = serial_connection
+        entry.state = OK
+        entry.opened_at = now
+        entry.reopens += 1
+        decoder = self.decoders.get(entry.reader_id)
+        if decoder is not None:
+            decoder.clear()   # Drop a partial frame from the old handle
+        entry.sample = None
+        entry.last_byte_at = now
+        self.generation += 1
+        READER_REOPENS.labels(entry.reader_id).inc()
+        READER_UP.labels(entry.reader_id).set(1)
+        if entry.fault_at is not None:
+            entry.last_recovery = now - entry.fault_at
+            READER_RECOVERY_SECONDS.labels(entry.reader_id).record(entry.last_recovery)
+            log.info(f"✓ {entry.label} reopened after {entry.last_recovery:.2f}s", extra={'kind': 'reader_recovered'})
+
+    def _judge(self, entry, now):
+        """Sample the decoder counters; returns a (reason, detail) fault or None"""
+        if not os.path.exists(entry.port):
+            return 'port_missing', entry.port
+        decoder = self.decoders.get(entry.reader_id)
+        if decoder is None:
+            return None
+        counters = _counters(decoder)
+        previous, entry.sample = entry.sample, counters
+        elapsed, entry.sample_at = now - entry.sample_at, now
+        if previous is None:
+            return None
+        nbytes, frames, bad = (current - last for current, last in zip(counters, previous))
+        entry.bytes_per_sec = nbytes / elapsed if elapsed > 0 else 0.0
+        if nbytes:
+            entry.last_byte_at = now
+        if nbytes >= self.min_bytes:
+            entry.valid_ratio = min(1.0, frames * PACKET_SIZE / nbytes)
+            entry.checksum_rate = bad / (frames + bad) if frames + bad else 0.0
+            if entry.checksum_rate > self.max_checksum_rate:
+                return 'bad_checksum', f"{entry.checksum_rate:.0%} of frames"
+            if entry.valid_ratio < self.min_valid_ratio:
+                return 'garbage', f"{entry.valid_ratio:.0%} valid at {entry.bytes_per_sec:.0f} B/s"
+        stall = now - entry.last_byte_at
+        if self.stall_timeout and stall >= self.stall_timeout and len(decoder):
+            return 'stall', f"{stall:.1f}s mid-frame"
+        return None
+
+    def check(self, now=None):
+        """
+        Reopen readers that are due and run the health checks when due.
+
+        Call once per loop pass (from the loop's on_tick); then resync the
+        loop if `generation` changed.
+        """
+        if now is None:
+            now = self._clock()
+        for entry in self._readers:
+            if entry.state != OK and now >= entry.retry_at:
+                self._reopen(entry, now)
+        if now < self._next_check:
+            return
+        self._next_check = now + self.check_interval
+        for entry in self._readers:
+            if entry.state != OK:
+                continue
+            found = self._judge(entry, now)
+            if found is not None:
+                self.fault(entry.reader_id, *found, now=now)
+            elif entry.failures and now - entry.opened_at >= self.healthy_after:
+                entry.failures = 0
+
+    def next_deadline(self):
+        """time.monotonic() by which check() next has work to do"""
+        deadlines = [self._next_check]
+        deadlines.extend(entry.retry_at for entry in self._readers if entry.state != OK)
+        return min(deadlines)
+
+    def health(self, now=None):
+        """
+        Per-reader health as of the last check.
+
+        Returns:
+            dict: reader_id -> {'state', 'bytes_per_sec', 'valid_ratio',
+                'checksum_rate', 'stall', 'faults', 'last_fault', 'reopens',
+                'last_recovery'}
+        """
+        if now is None:
+            now = self._clock()
+        return {
+            entry.reader_id: {
+                'state': entry.state,
+                'bytes_per_sec': entry.bytes_per_sec,
+                'valid_ratio': entry.valid_ratio,
+                'checksum_rate': entry.checksum_rate,
+                'stall': now - entry.last_byte_at if entry.state == OK else None,
+                'faults': entry.faults,
+                'last_fault': entry.last_fault,
+                'reopens': entry.reopens,
+                'last_recovery': entry.last_recovery,
+            }
+            for entry in self._readers
+        }
+
+    def close(self):
+        """Close every open port"""
+        for entry in self._readers:
+            if entry.serial is not None:
+                self._close(entry)
+                log.info(f"{entry.label} closed")
+
+
+def format_health(health):
+    """
+    Format one reader's health() entry for the service log.
+
+    Returns:
+        str: e.g. 'ok 140 B/s, 100% valid, 0% bad checksum, 2 fault(s), last 0.31s to recover'
+    """
+    text = f"{health['state']} {health['bytes_per_sec']:.0f} B/s"
+    if health['valid_ratio'] is not None:
+        text += f", {health['valid_ratio']:.0%} valid, {health['checksum_rate']:.0%} bad checksum"
+    if health['faults']:
+        text += f", {health['faults']} fault(s) (last {health['last_fault']})"
+    if health['last_recovery'] is not None:
+        text += f", last {health['last_recovery']:.2f}s to recover"
+    return text
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Test script for acknowledged scans (acks.py) and their use in rfid_service.
+"""
+
+import os
+import sys
+import tempfile
+
+import metrics
+import rfid_service
+from acks import AckTracker, format_stats
+from journal import Journal, Forwarder
+
+
+class AckingBackend:
+    """
+    Stand-in for socketio.Client talking to the backend's withAck() handler.
+
+    Broadcasts updateCart to the service's reply handler, then acks; repeats
+    of a scanId are acked as duplicates without a broadcast. Acks for the
+    first `drop_acks` sends are lost on the way back.
+    """
+
+    def __init__(self, drop_acks=0, connected=True):
+        self.connected = connected
+        self.drop_acks = drop_acks
+        self.emitted = []
+        self.processed = {}
+
+    def emit(self, event, data, callback=None):
+        if not self.connected:
+            raise ConnectionError("not connected")
+        self.emitted.append((event, dict(data)))
+        scan_id = data.get('scanId')
+        if scan_id in self.processed:
+            response = {'scanId': scan_id, 'status': self.processed[scan_id], 'duplicate': True}
+        else:
+            self.processed[scan_id] = 'added'
+            rfid_service.on_reply('updateCart')({'cartId': data['cartId'], 'scanId': scan_id})
+            response = {'scanId': scan_id, 'status': 'added'}
+        if self.drop_acks:
+            self.drop_acks -= 1
+        elif callback is not None:
+            callback(response)
+
+
+def test_ack_and_reply_rtt():
+    """Test that acks and broadcasts are matched and timed from the first send"""
+    tracker = AckTracker(registry=metrics.Registry(), prefix='t')
+    for index in range(100):
+        scan_id = tracker.new_id()
+        tracker.sent(scan_id, 'rfid_scan', {'scanId': scan_id}, now=index)
+        assert tracker.replied_to('updateCart', scan_id, now=index + 0.010)
+        assert tracker.acked({'scanId': scan_id, 'status': 'added'}, now=index + 0.002 + index * 0.0001) == 'added'
+    assert len(tracker) == 0, "Acked and replied scans are done"
+    assert not tracker.replied_to('updateCart', 't-1'), "Late broadcast is ignored"
+    assert tracker.acked({'scanId': 't-1', 'status': 'added'}) is None, "Repeated ack is ignored"
+    stats = tracker.stats()
+    assert stats['acked'] == 100 and stats['replied'] == 100
+    assert 0.0019 < stats['ack']['p50'] < 0.0075, stats['ack']
+    assert stats['ack']['p50'] <= stats['ack']['p95'] <= stats['ack']['p99'] < 0.0125
+    assert 0.0095 < stats['replies']['updateCart']['p99'] < 0.0107
+    assert 'ack p50/p95/p99' in format_stats(stats) and 'updateCart' in format_stats(stats)
+    print(f"✓ PASS: 100 scans timed ({format_stats(stats)})")
+
+
+def test_statuses_without_reply():
+    """Test that scans the backend does not broadcast for finish on the ack"""
+    tracker = AckTracker(registry=metrics.Registry(), prefix='t')
+    tracker.sent('t-1', 'rfid_scan', {}, now=0.0)
+    tracker.sent('t-2', 'rfid_scan', {}, now=0.0)
+    assert tracker.acked({'scanId': 't-1', 'status': 'cooldown'}, now=0.01) == 'cooldown'
+    assert tracker.acked({'scanId': 't-2', 'status': 'added'}, now=0.01) == 'added'
+    assert len(tracker) == 1, "Added scan still waits for its updateCart"
+    assert tracker.next_deadline() == 0.01 + tracker.reply_timeout
+    assert tracker.expire(now=10.0) == ([], [])
+    assert len(tracker) == 0 and tracker.no_reply == 1
+    assert tracker.statuses == {'cooldown': 1, 'added': 1}
+    print("✓ PASS: cooldown ack finishes a scan, missing broadcast counted")
+
+
+def test_retransmit_backoff():
+    """Test retransmits with a doubling timeout, then giving up"""
+    tracker = AckTracker(timeout=1.0, retries=2, registry=metrics.Registry(), prefix='t')
+    tracker.sent('t-1', 'rfid_scan', {'scanId': 't-1'}, now=0.0)
+    assert tracker.expire(now=0.9) == ([], [])
+    assert tracker.expire(now=1.0) == ([('t-1', 'rfid_scan', {'scanId': 't-1'})], [])
+    assert tracker.next_deadline() == 3.0, "Second wait is twice as long"
+    assert tracker.expire(now=2.9) == ([], [])
+    assert len(tracker.expire(now=3.0)[0]) == 1
+    assert tracker.next_deadline() == 7.0
+    assert tracker.expire(now=7.0) == ([], ['t-1'])
+    assert len(tracker) == 0
+    assert tracker.retransmits == 2 and tracker.lost == 1
+    print("✓ PASS: retransmitted after 1s and 2s more, lost after 2 retries")
+
+
+def test_service_retransmits_lost_ack():
+    """Test send_event with a lost ack: one retransmit, applied once"""
+    backend = AckingBackend(drop_acks=1)
+    with tempfile.TemporaryDirectory() as directory:
+        journal = Journal(os.path.join(directory, 'rfid.journal'), fsync='never')
+        rfid_service.forwarder = Forwarder(backend, journal)
+        rfid_service.ack_tracker = tracker = AckTracker(timeout=0.0, registry=metrics.Registry(), prefix='t')
+        try:
+            assert rfid_service.emit_rfid_scan('1234', '0A1B2C3D4E')
+            assert len(tracker) == 1, "Ack was lost"
+            assert tracker.replied == 1, "Broadcast still arrived"
+            assert rfid_service.retransmit_unacked() == 1
+            assert len(tracker) == 0
+            assert rfid_service.retransmit_unacked() == 0
+        finally:
+            rfid_service.forwarder = None
+            rfid_service.ack_tracker = None
+            journal.close()
+    assert [event for event, _ in backend.emitted] == ['rfid_scan', 'rfid_scan']
+    assert backend.emitted[0][1]['scanId'] == backend.emitted[1][1]['scanId'] == 't-1'
+    assert len(backend.processed) == 1, "Retransmit was a duplicate, not a second toggle"
+    assert tracker.retransmits == 1 and tracker.lost == 0
+    print("✓ PASS: lost ack retransmitted with the same scanId, applied once")
+
+
+def test_journaled_scan_untracked():
+    """Test that a scan journaled while offline is not tracked"""
+    backend = AckingBackend(connected=False)
+    with tempfile.TemporaryDirectory() as directory:
+        journal = Journal(os.path.join(directory, 'rfid.journal'), fsync='never')
+        rfid_service.forwarder = Forwarder(backend, journal)
+        rfid_service.ack_tracker = tracker = AckTracker(registry=metrics.Registry(), prefix='t')
+        try:
+            assert not rfid_service.emit_rfid_scan('1234', '0A1B2C3D4E')
+            assert len(tracker) == 0
+            _, event, data = journal.peek()
+            assert event == 'rfid_scan' and data['scanId'] == 't-1', "Journaled with its scanId"
+            assert not rfid_service.send_event('weight_update', {'cartId': '1234'})
+            journal.pop()
+            _, event, data = journal.peek()
+            assert event == 'weight_update' and 'scanId' not in data, "Only scan events get a scanId"
+        finally:
+            rfid_service.forwarder = None
+            rfid_service.ack_tracker = None
+            journal.close()
+    print("✓ PASS: offline scan journaled with scanId, not tracked")
+
+
+def main():
+    print("=" * 60)
+    print("Acknowledged Scan Tests")
+    print("=" * 60)
+    tests = [
+        test_ack_and_reply_rtt,
+        test_statuses_without_reply,
+        test_retransmit_backoff,
+        test_service_retransmits_lost_ack,
+        test_journaled_scan_untracked,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for the vectorized capture analyzer (analyze_capture.py).
+
+The analyzer's results must be identical to streaming the same bytes
+through rdm6300.FrameDecoder, which matches the original read_tag().
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+import numpy as np
+
+from analyze_capture import decode_capture, format_tag, inter_read_histograms, load_capture, tag_counts
+from rdm6300 import FrameDecoder, encode_frame
+from test_rdm6300 import noisy_stream
+
+
+def stream_decode(stream, chunk_size=64):
+    """Reference: feed the stream through FrameDecoder in chunks"""
+    decoder = FrameDecoder()
+    tags = []
+    for offset in range(0, len(stream), chunk_size):
+        decoder.feed(stream[offset:offset + chunk_size])
+        tags.extend(decoder.decode_all())
+    return tags, decoder
+
+
+def test_matches_frame_decoder():
+    """Test tags, rejection counters and pending bytes against FrameDecoder"""
+    rng = random.Random(6)
+    for trial in range(100):
+        stream = noisy_stream(rng, rng.randrange(0, 200))
+        expected_tags, decoder = stream_decode(stream)
+        result = decode_capture(np.frombuffer(stream, dtype=np.uint8))
+        tags = [format_tag(value) for value in result['tags']]
+        assert tags == expected_tags, f"Tag mismatch on trial {trial}"
+        assert result['rejected'] == decoder.rejected, \
+            f"Rejections mismatch on trial {trial}: {result['rejected']} != {decoder.rejected}"
+        assert result['pending_bytes'] == len(decoder), f"Pending mismatch on trial {trial}"
+    print("✓ PASS: analyzer matches FrameDecoder on 100 noisy streams")
+
+
+def test_overlapping_candidates():
+    """Test that STX/ETX pairs inside a consumed frame are not decoded"""
+    inner = encode_frame('1234567890')
+    # An invalid aligned frame whose payload hides another aligned STX...ETX
+    outer = b'\x02' + b'\x02' * 12 + b'\x03' + inner[1:] + encode_frame('ABCDEF0123')
+    expected_tags, decoder = stream_decode(outer)
+    result = decode_capture(np.frombuffer(outer, dtype=np.uint8))
+    assert [format_tag(v) for v in result['tags']] == expected_tags
+    assert result['rejected'] == decoder.rejected
+    print("✓ PASS: overlapping candidates resolved like the sequential decoder")
+
+
+def test_counts_and_histograms():
+    """Test per-tag counts and inter-read gap histograms"""
+    stream = (encode_frame('AAAAAAAAAA') * 3 + encode_frame('BBBBBBBBBB')) * 2
+    result = decode_capture(np.frombuffer(stream, dtype=np.uint8))
+    counts = tag_counts(result)
+    assert counts == {'AAAAAAAAAA': 6, 'BBBBBBBBBB': 2}
+    times = np.arange(len(result['tags']), dtype=float) * 0.015  # one frame every 15 ms
+    histograms = inter_read_histograms(result, times, bin_edges_ms=(0, 20, 50, 100))
+    assert histograms['AAAAAAAAAA'] == [4, 1, 0]   # four 15 ms gaps, one 30 ms gap
+    assert histograms['BBBBBBBBBB'] == [0, 0, 1]   # one 60 ms gap
+    print("✓ PASS: per-tag counts and inter-read histograms")
+
+
+def test_empty_capture():
+    """Test that a capture with no traffic loads and decodes to 0 frames"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'empty.bin')
+        open(path, 'wb').close()
+        data = load_capture(path)
+        assert data.dtype == np.uint8 and len(data) == 0
+        result = decode_capture(data)
+    assert len(result['tags']) == 0 and tag_counts(result) == {}
+    print("✓ PASS: empty capture decodes to 0 frames")
+
+
+def main():
+    print("=" * 60)
+    print("Capture Analyzer Tests")
+    print("=" * 60)
+    test_matches_frame_decoder()
+    test_overlapping_candidates()
+    test_counts_and_histograms()
+    test_empty_capture()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Test script for the calibration engine (calibration.py) and weight_sensor.rezero().
+"""
+
+import os
+import random
+import sys
+import tempfile
+
+import weight_sensor
+from calibration import AutoZero, CalibrationProfile, Measurement, fit, load_profile, measure, save_profile
+
+ZERO = -121613.47
+SCALE = 14.16 * 1000       # Raw counts per kg
+
+
+class LoadCell:
+    """Simulated HX711 reads: the load in kg, Gaussian noise and rare spikes"""
+
+    def __init__(self, kg=0.0, noise_kg=0.01, spike_rate=0.0, seed=23):
+        self.kg = kg
+        self.noise_kg = noise_kg
+        self.spike_rate = spike_rate
+        self.rng = random.Random(seed)
+        self.reads = 0
+
+    def read(self):
+        self.reads += 1
+        kg = self.kg + self.rng.gauss(0, self.noise_kg)
+        if self.rng.random() < self.spike_rate:
+            kg += 5.0
+        return [ZERO + SCALE * kg]
+
+
+def test_measure_stops_when_converged():
+    """Test that the sample count follows the noise and spikes are ignored"""
+    target = 0.002 * SCALE
+    quiet = LoadCell(noise_kg=0.004)
+    quiet_point = measure(quiet.read, target)
+    noisy = LoadCell(noise_kg=0.02, spike_rate=0.05)
+    noisy_point = measure(noisy.read, target)
+    assert quiet_point.converged and noisy_point.converged
+    assert quiet_point.samples <= 20, quiet_point
+    assert noisy_point.samples > 3 * quiet_point.samples, (quiet_point, noisy_point)
+    assert noisy_point.rejected > 0 and abs((noisy_point.mean - ZERO) / SCALE) < 0.006, noisy_point
+    capped = measure(LoadCell(noise_kg=1.0).read, target, max_samples=50)
+    assert not capped.converged and capped.samples + capped.rejected == 50
+    print(f"✓ PASS: quiet cell done in {quiet_point.samples} samples, noisy in {noisy_point.samples} "
+          f"({noisy_point.rejected} spikes ignored)")
+
+
+def test_measure_resumes():
+    """Test a provisional read resumed to a target once the scale is known"""
+    cell = LoadCell(kg=1.0, noise_kg=0.02, seed=9)
+    values = []
+    provisional = measure(cell.read, 0.0, max_samples=30, values=values)
+    assert provisional.samples == 30 and len(values) == 30
+    target = 0.002 * SCALE
+    assert provisional.stderr > target, "Too few samples for the target"
+    resumed = measure(cell.read, target, values=values)
+    assert resumed.converged and resumed.stderr <= target
+    assert cell.reads == len(values) == resumed.samples, "The provisional samples are kept"
+    print(f"✓ PASS: 30 provisional samples resumed to {resumed.samples} for ±{target:.0f} counts")
+
+
+def test_multi_point_fit():
+    """Test that a least-squares fit through several weights recovers the calibration"""
+    cell = LoadCell(noise_kg=0.01, seed=4)
+    points = []
+    for kg in (0.0, 0.5, 1.0, 2.5):
+        cell.kg = kg
+        points.append((kg, measure(cell.read, 0.001 * SCALE)))
+    zero_offset, scale_factor, residual_kg = fit(points)
+    assert abs(zero_offset - ZERO) / SCALE < 0.003, zero_offset
+    assert abs(scale_factor / SCALE - 1) < 0.003, scale_factor
+    assert residual_kg < 0.003
+    bent = points[:-1] + [(2.5, Measurement(ZERO + SCALE * 2.4, 10.0, 30, 0, 1.0, True))]
+    assert fit(bent)[2] > 0.01, "A bad point shows in the residual"
+    try:
+        fit([(0.0, points[0][1]), (0.0, points[0][1])])
+        assert False, "One known weight accepted"
+    except ValueError:
+        pass
+    print(f"✓ PASS: 4-point fit within 0.3%, residual {residual_kg * 1000:.1f}g")
+
+
+def test_profile_round_trip():
+    """Test saving, loading and rejecting broken profiles"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'calibration-7.json')
+        assert load_profile(path) is None
+        points = [(0.0, Measurement(ZERO, 2.0, 16, 0, 1.6, True)), (1.0, Measurement(ZERO + SCALE, 3.0, 20, 1, 2.0, True))]
+        profile = CalibrationProfile.from_points(points, cart_id='7')
+        save_profile(profile, path)
+        loaded = load_profile(path)
+        assert loaded.cart_id == '7' and abs(loaded.scale_factor - SCALE) < 1e-6
+        assert abs(loaded.to_kg(ZERO + SCALE * 0.25) - 0.25) < 1e-9
+        assert loaded.points[1]['samples'] == 20 and not os.path.exists(path + '.tmp')
+        with open(path, 'w') as f:
+            f.write('{"version": 1, "zero_offset": 1')
+        try:
+            load_profile(path)
+            assert False, "Truncated profile accepted"
+        except ValueError:
+            pass
+    print("✓ PASS: profile saved atomically, loaded, broken file rejected")
+
+
+def test_auto_rezero():
+    """Test that only an empty, steady cart is re-zeroed, and only for drift"""
+    profile = CalibrationProfile(ZERO, SCALE)
+    autozero = AutoZero(seconds=10.0)
+    drifted = [ZERO + SCALE * 0.008 + offset for offset in (-20.0, 0.0, 20.0) * 10]
+    assert not autozero.update(0.008, empty=True, now=0.0)
+    assert not autozero.update(0.008, empty=False, now=5.0), "Not empty"
+    assert not autozero.update(0.008, empty=True, now=6.0)
+    assert not autozero.update(0.009, empty=True, now=12.0), "Not steady for long enough"
+    assert autozero.update(0.008, empty=True, now=16.0)
+    zero = autozero.shift(drifted, profile)
+    assert zero is not None and abs(profile.to_kg(zero) - 0.008) < 1e-3
+    assert not autozero.update(0.0, empty=True, now=17.0), "Starts over after a re-zero"
+    assert autozero.shift([ZERO + SCALE * 0.5] * 30, profile) is None, "A load is not drift"
+    assert autozero.shift([ZERO + SCALE * 0.001] * 30, profile) is None, "Too small to bother"
+
+    old = (weight_sensor.ZERO_OFFSET, weight_sensor.profile.zero_offset, weight_sensor.calibration_source)
+    try:
+        weight_sensor.calibration_source = 'defaults'         # Nothing written to disk
+        weight_sensor.rezero(weight_sensor.ZERO_OFFSET + weight_sensor.SCALE_FACTOR * 0.01)
+        assert abs(weight_sensor.raw_to_weight(old[0] + weight_sensor.SCALE_FACTOR * 0.01)) < 1e-9
+        assert weight_sensor.profile.rezeroed_at is not None
+    finally:
+        weight_sensor.ZERO_OFFSET, weight_sensor.profile.zero_offset, weight_sensor.calibration_source = old
+    print("✓ PASS: empty steady cart re-zeroed for drift; loads and tiny shifts left alone")
+
+
+def main():
+    print("=" * 60)
+    print("Calibration Tests")
+    print("=" * 60)
+    tests = [
+        test_measure_stops_when_converged,
+        test_measure_resumes,
+        test_multi_point_fit,
+        test_profile_round_trip,
+        test_auto_rezero,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Test script for the serial capture record/replay harness (capture.py).
+"""
+
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import rfid_service
+from analyze_capture import load_timed_capture, decode_capture, chunk_times
+from bench_read_latency import open_pty_reader
+from capture import CaptureWriter, RecordingSerial, read_capture, replay
+from rdm6300 import encode_frame
+from test_rdm6300 import noisy_stream
+
+
+def test_round_trip():
+    """Test that chunks, readers and timestamps survive a round trip"""
+    rng = random.Random(11)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.skc')
+        writer = CaptureWriter(path)
+        written = []
+        now = 100.0
+        for _ in range(500):
+            now += rng.uniform(0, 0.05)
+            reader_id = rng.choice(['reader1', 'reader2', 'reader3'])
+            data = bytes(rng.randrange(256) for _ in range(rng.randrange(1, 40)))
+            writer.record(reader_id, data, now)
+            written.append((now - 100.0, reader_id, data))
+        big = bytes(200000)
+        writer.record('reader1', big, now + 1)
+        writer.close()
+
+        records = list(read_capture(path))
+        assert [r[1:] for r in records[:500]] == [w[1:] for w in written]
+        first = written[0][0]
+        assert max(abs(r[0] - (w[0] - first)) for r, w in zip(records, written)) < 2e-6
+        assert b''.join(r[2] for r in records[500:]) == big, "Large chunk split and rejoined"
+    print("✓ PASS: capture round trip (500 chunks, 3 readers, 200 KB chunk)")
+
+
+def test_record_live_and_replay():
+    """Test recording through the select loop and replaying the same tags"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.skc')
+        writer = CaptureWriter(path)
+        masters, readers = [], []
+        for index in range(2):
+            master, (reader_id, label, reader) = open_pty_reader(index)
+            masters.append(master)
+            readers.append((reader_id, label, RecordingSerial(reader, writer, reader_id)))
+
+        live = []
+        stop = threading.Event()
+        thread = threading.Thread(
+            target=rfid_service.select_readers,
+            args=(readers, {}, lambda label, tags: live.extend((label, tag) for tag in tags), stop))
+        thread.start()
+        rng = random.Random(2)
+        stream = noisy_stream(rng, 60)
+        for offset in range(0, len(stream), 20):
+            os.write(masters[1], stream[offset:offset + 20])
+            os.write(masters[0], encode_frame('0A1B2C3D4E'))
+            time.sleep(0.005)
+        time.sleep(0.2)
+        stop.set()
+        thread.join()
+        writer.close()
+        for master in masters:
+            os.close(master)
+        for _, _, reader in readers:
+            reader.close()
+
+        replayed = []
+        labels = {'reader1': 'Reader 1', 'reader2': 'Reader 2'}
+        result = replay(path, lambda reader_id, tags, _: replayed.extend((labels[reader_id], tag) for tag in tags),
+                        speed=0)
+        assert sorted(replayed) == sorted(live), "Replay must decode exactly what was seen live"
+        assert result['frames'] == len(live) > 0
+    print(f"✓ PASS: {len(live)} live tags reproduced by replay")
+
+
+def test_replay_speed():
+    """Test that 1x replay follows capture timing and 0 is unthrottled"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.skc')
+        writer = CaptureWriter(path)
+        frame = encode_frame('1234567890')
+        for index in range(21):
+            writer.record('reader1', frame, index * 0.01)
+        writer.close()
+        real = replay(path, lambda *_: None, speed=1)
+        fast = replay(path, lambda *_: None, speed=0)
+        assert real['frames'] == fast['frames'] == 21
+        assert real['seconds'] >= 0.19, f"1x replay too fast: {real['seconds']:.3f}s"
+        assert fast['seconds'] < 0.1, f"Unthrottled replay too slow: {fast['seconds']:.3f}s"
+    print(f"✓ PASS: 1x replay took {real['seconds']:.3f}s for 0.2s of capture")
+
+
+def test_replay_large_chunk():
+    """Test that a chunk larger than the decoder's ring loses no frames"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.skc')
+        writer = CaptureWriter(path)
+        tags = [f"{index:010X}" for index in range(100)]
+        writer.record('reader1', b''.join(encode_frame(tag) for tag in tags), 0.0)
+        writer.close()
+        seen = []
+        result = replay(path, lambda reader_id, found, _: seen.extend(found), speed=0)
+    decoder = result['decoders']['reader1']
+    assert result['chunks'] == 1 and len(tags) * 14 > decoder.capacity
+    assert seen == tags and decoder.rejected['overflow_bytes'] == 0, (len(seen), decoder.rejected)
+    print(f"✓ PASS: {len(tags) * 14}-byte chunk replayed through a {decoder.capacity}-byte ring, no frame lost")
+
+
+def test_analyzer_timed_capture():
+    """Test that the vectorized analyzer uses real chunk times"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'capture.skc')
+        writer = CaptureWriter(path)
+        frame = encode_frame('1234567890')
+        # Each frame arrives split over two chunks; the second one completes it
+        for index in range(10):
+            writer.record('reader2', frame[:5], index * 0.1)
+            writer.record('reader2', frame[5:], index * 0.1 + 0.003)
+        writer.close()
+        data, ends, times = load_timed_capture(path)['reader2']
+        result = decode_capture(data)
+        frame_times = chunk_times(result['offsets'], ends, times)
+        assert result['frames'] == 10
+        assert np.allclose(frame_times, np.arange(10) * 0.1 + 0.003, atol=2e-6)
+    print("✓ PASS: analyzer assigns each frame its completing chunk's time")
+
+
+def main():
+    print("=" * 60)
+    print("Capture Record/Replay Tests")
+    print("=" * 60)
+    tests = [
+        test_round_trip,
+        test_record_live_and_replay,
+        test_replay_speed,
+        test_replay_large_chunk,
+        test_analyzer_timed_capture,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for cross-reader scan fusion (fusion.py).
+"""
+
+import sys
+
+from fusion import ScanFusion, single_scan
+
+
+def test_merges_readers():
+    """Test that one tag seen by two readers becomes one scan"""
+    fusion = ScanFusion(window=0.03)
+    fusion.observe('AAAAAAAAAA', 'Reader 1', now=1.000)
+    fusion.observe('AAAAAAAAAA', 'Reader 2', now=1.004)
+    fusion.observe('AAAAAAAAAA', 'Reader 1', now=1.015)
+    assert fusion.flush(now=1.020) == [], "Window still open"
+    scans = fusion.flush(now=1.030)
+    assert len(scans) == 1
+    scan = scans[0]
+    assert scan['tagId'] == 'AAAAAAAAAA'
+    assert list(scan['readers']) == ['Reader 1', 'Reader 2']
+    assert scan['readers'] == {'Reader 1': 1.000, 'Reader 2': 1.004}
+    assert scan['reads'] == 3
+    assert len(fusion) == 0
+    print("✓ PASS: reads from two readers fuse into one scan")
+
+
+def test_separate_tags_and_windows():
+    """Test that different tags and later windows stay separate"""
+    fusion = ScanFusion(window=0.03)
+    fusion.observe('AAAAAAAAAA', 'Reader 1', now=1.00)
+    fusion.observe('BBBBBBBBBB', 'Reader 2', now=1.01)
+    assert abs(fusion.next_deadline() - 1.03) < 1e-9
+    first = fusion.flush(now=1.035)
+    assert [scan['tagId'] for scan in first] == ['AAAAAAAAAA']
+    fusion.observe('AAAAAAAAAA', 'Reader 2', now=1.036)
+    second = fusion.flush(now=1.1)
+    assert [scan['tagId'] for scan in second] == ['BBBBBBBBBB', 'AAAAAAAAAA']
+    assert fusion.next_deadline() is None
+    print("✓ PASS: distinct tags and windows produce distinct scans")
+
+
+def test_force_flush():
+    """Test that force releases open scans immediately"""
+    fusion = ScanFusion(window=10.0)
+    fusion.observe('AAAAAAAAAA', 'Reader 1', now=0.0)
+    assert len(fusion.flush(now=0.0, force=True)) == 1
+    assert single_scan('AAAAAAAAAA', 'Reader 1', 2.0)['readers'] == {'Reader 1': 2.0}
+    print("✓ PASS: force flush and single_scan")
+
+
+def test_dual_antenna_stream():
+    """Test that a tag passing two antennas yields one scan per pass"""
+    fusion = ScanFusion(window=0.03)
+    scans = []
+    # 20 passes, 1 s apart; Reader 2 decodes each pass 2-6 ms after Reader 1
+    for index in range(20):
+        start = index * 1.0
+        fusion.observe('CCCCCCCCCC', 'Reader 1', now=start)
+        fusion.observe('CCCCCCCCCC', 'Reader 2', now=start + 0.002 + (index % 5) * 0.001)
+        scans.extend(fusion.flush(now=start + 0.5))
+    assert len(scans) == 20, f"Expected 20 scans, got {len(scans)}"
+    assert all(len(scan['readers']) == 2 for scan in scans)
+    stats = fusion.stats()
+    assert stats['reads'] == 40 and stats['merged'] == 20
+    print("✓ PASS: 40 dual-antenna reads -> 20 scans")
+
+
+def main():
+    print("=" * 60)
+    print("Scan Fusion Tests")
+    print("=" * 60)
+    tests = [
+        test_merges_readers,
+        test_separate_tags_and_windows,
+        test_force_flush,
+        test_dual_antenna_stream,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
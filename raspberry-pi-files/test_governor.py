@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test script for the idle governor (governor.py) and its use by the services.
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import lcd_display
+import rfid_service
+from governor import Governor, format_savings
+from rdm6300 import encode_frame
+from test_rdm6300 import FakeSerial
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def touch_from_child(path):
+    Governor(path, idle_after=60).touch()
+
+
+def test_shared_stamp():
+    """Test that activity marked by one service wakes the others"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'activity')
+        clock = Clock()
+        rfid = Governor(path, idle_after=60, clock=clock)
+        weight = Governor(path, idle_after=60, clock=clock)
+        assert not weight.check()
+        clock.now += 60
+        assert weight.check() and weight.changed, "Idle after 60s without activity"
+        assert weight.check() and not weight.changed
+        clock.now += 1
+        rfid.touch()
+        assert weight.last_activity() == clock.now
+        assert not weight.check() and weight.changed, "Tag read by the RFID service wakes the weight service"
+        rfid.close()
+        weight.close()
+    print("✓ PASS: idle after 60s, woken by another service's activity")
+
+
+def test_wait_wakes_on_activity():
+    """Test that an idle wait ends within one slice of another service's activity"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'activity')
+        clock = Clock()
+        rfid = Governor(path, idle_after=60, clock=clock)
+        weight = Governor(path, idle_after=60, clock=clock)
+        slept = []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            clock.now += seconds
+            if len(slept) == 12:
+                rfid.touch()            # Tag frame 1.2s into a 5s idle wait
+
+        assert weight.wait(5.0, 0.1, sleep=sleep)
+        assert len(slept) == 12 and all(seconds <= 0.1 for seconds in slept)
+        start = clock.now
+
+        def quiet(seconds):
+            clock.now += seconds
+
+        assert not weight.wait(5.0, 0.3, sleep=quiet), "No activity: the full wait"
+        assert abs(clock.now - start - 5.0) < 1e-9
+        rfid.close()
+        weight.close()
+    print("✓ PASS: 5s idle wait ended 0.1s after a tag frame")
+
+
+def test_cross_process():
+    """Test the mmap'd stamp between two processes"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'activity')
+        parent = Governor(path, idle_after=0.2)
+        time.sleep(0.3)
+        assert parent.check(), "Idle before the child touches"
+        child = multiprocessing.get_context('fork').Process(target=touch_from_child, args=(path,))
+        child.start()
+        child.join(10)
+        assert child.exitcode == 0
+        assert not parent.check(), "Child process activity seen through the shared stamp"
+        parent.close()
+    print("✓ PASS: activity from another process seen through the mmap'd stamp")
+
+
+def test_savings_accounting():
+    """Test time, CPU and skipped work accounting"""
+    with tempfile.TemporaryDirectory() as directory:
+        clock, cpu = Clock(), Clock(0.0)
+        gov = Governor(os.path.join(directory, 'activity'), idle_after=10, clock=clock, cpu_clock=cpu)
+        clock.now += 10
+        cpu.now += 1.0                  # 10% CPU while active
+        assert gov.check()
+        for _ in range(90):
+            clock.now += 1
+            cpu.now += 0.01             # 1% CPU while idle
+            gov.check()
+            gov.skip('weight_update', nbytes=80)
+        stats = gov.stats()
+        gov.close()
+    assert abs(stats['idle_share'] - 0.9) < 1e-9
+    assert abs(stats['cpu_active'] - 0.1) < 1e-9 and abs(stats['cpu_idle'] - 0.01) < 1e-9
+    assert abs(stats['cpu_saved'] - 0.09 * 90) < 1e-9
+    assert stats['skipped'] == {'weight_update': 90} and stats['skipped_bytes'] == 7200
+    assert stats['transitions'] == 1
+    text = format_savings(stats)
+    assert text == ("idle 90% of the time, CPU 10.0% active / 1.0% idle (~8.1 CPU-s saved), "
+                    "skipped weight_update=90 (7.0 KB)"), text
+    print(f"✓ PASS: savings report ({text})")
+
+
+def test_poll_loop_slows_when_idle():
+    """Test that the poll loop stretches its cycle when idle and recovers on a tag"""
+
+    class CountingSerial(FakeSerial):
+        polls = 0
+
+        @property
+        def in_waiting(self):
+            CountingSerial.polls += 1
+            return self.available
+
+    with tempfile.TemporaryDirectory() as directory:
+        reader = CountingSerial(encode_frame('0A1B2C3D4E'), 14)
+        rfid_service.governor = gov = Governor(os.path.join(directory, 'activity'), idle_after=0.4)
+        tags = []
+        stop = threading.Event()
+
+        def on_tags(label, found):
+            gov.touch()
+            tags.extend(found)
+
+        thread = threading.Thread(target=rfid_service.poll_readers,
+                                  args=([('reader1', 'Reader 1', reader)], {}, on_tags, stop))
+        try:
+            thread.start()
+            time.sleep(0.6)             # Goes idle after 0.4s
+            CountingSerial.polls = 0
+            time.sleep(0.6)
+            idle_polls = CountingSerial.polls
+            reader.poll()               # A tag arrives
+            time.sleep(0.3)
+            assert tags == ['0A1B2C3D4E'], tags
+            assert not gov.idle, "Back to full rate after the tag"
+        finally:
+            stop.set()
+            thread.join()
+            rfid_service.governor = None
+            gov.close()
+    expected = 0.6 / rfid_service.IDLE_POLL_INTERVAL
+    assert idle_polls <= expected + 1, f"{idle_polls} polls in 0.6s while idle"
+    assert gov.skipped['reader_poll'] > 0
+    print(f"✓ PASS: {idle_polls} polls in 0.6s while idle, tag read and full rate restored")
+
+
+def test_lcd_backlight():
+    """Test that the backlight is an LCD attribute switched by set_backlight()"""
+    lcd = lcd_display.LCDDisplay()
+    assert lcd.backlight == lcd_display.LCD_BACKLIGHT
+    assert lcd.set_backlight(False) and lcd.backlight == lcd_display.LCD_NOBACKLIGHT
+    assert not lcd.set_backlight(False), "No change, nothing written"
+    assert lcd.set_backlight(True) and lcd.backlight == lcd_display.LCD_BACKLIGHT
+    print("✓ PASS: LCD backlight dims and restores")
+
+
+def main():
+    print("=" * 60)
+    print("Idle Governor Tests")
+    print("=" * 60)
+    tests = [
+        test_shared_stamp,
+        test_wait_wakes_on_activity,
+        test_cross_process,
+        test_savings_accounting,
+        test_poll_loop_slows_when_idle,
+        test_lcd_backlight,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
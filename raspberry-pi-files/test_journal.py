@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Test script for the store-and-forward journal (journal.py).
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from journal import AsyncForwarder, Journal, Forwarder
+
+
+class RecordingClient:
+    """Stand-in for socketio.Client that records emitted events"""
+
+    def __init__(self, connected=False):
+        self.connected = connected
+        self.emitted = []
+        self.times = []
+
+    def emit(self, event, data):
+        if not self.connected:
+            raise ConnectionError("not connected")
+        self.emitted.append((event, data))
+        self.times.append(time.monotonic())
+
+
+class AsyncRecordingClient(RecordingClient):
+    """Stand-in for socketio.AsyncClient"""
+
+    async def emit(self, event, data):
+        await asyncio.sleep(0)
+        RecordingClient.emit(self, event, data)
+
+
+def drain(journal):
+    out = []
+    while True:
+        record = journal.peek()
+        if record is None:
+            return out
+        out.append(record[1:])
+        journal.pop(record[0])
+
+
+def test_order_and_persistence():
+    """Test FIFO order across wraparound and reopening the file"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rfid.journal')
+        rng = random.Random(10)
+        journal = Journal(path, size=4096, fsync='never')
+        expected = []
+        for step in range(5000):
+            if rng.random() < 0.55:
+                data = {'n': step, 'pad': 'x' * rng.randrange(200)}
+                if journal.append('rfid_scan', data):
+                    expected.append(('rfid_scan', data))
+            elif expected:
+                seq, event, data = journal.peek()
+                assert (event, data) == expected.pop(0)
+                journal.pop(seq)
+            if step % 500 == 0:
+                journal.close()
+                journal = Journal(path, size=4096, fsync='never')
+            assert len(journal) == len(expected)
+        assert drain(journal) == expected
+        journal.close()
+    print("✓ PASS: FIFO order kept across wraparound and reopen")
+
+
+def test_full_policies():
+    """Test eviction for weight samples and refusal for scans"""
+    with tempfile.TemporaryDirectory() as directory:
+        weights = Journal(os.path.join(directory, 'weight.journal'), size=2048, evict_oldest=True)
+        for index in range(500):
+            assert weights.append('weight_update', {'n': index})
+        kept = [data['n'] for _, data in drain(weights)]
+        assert kept == list(range(kept[0], 500)), "Newest samples kept in order"
+        assert weights.evicted == 500 - len(kept)
+
+        scans = Journal(os.path.join(directory, 'rfid.journal'), size=2048)
+        stored = 0
+        while scans.append('rfid_scan', {'n': stored}):
+            stored += 1
+        assert scans.refused == 1
+        assert [data['n'] for _, data in drain(scans)] == list(range(stored))
+        weights.close()
+        scans.close()
+    print(f"✓ PASS: weight journal evicts oldest, scan journal refuses when full ({stored} kept)")
+
+
+def test_torn_record_recovery():
+    """Test that a corrupted last record is dropped on reopen"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'rfid.journal')
+        journal = Journal(path, size=4096, fsync='always')
+        for index in range(3):
+            journal.append('rfid_scan', {'tagId': f'{index:010d}'})
+        journal.close()
+        # Flip a payload byte of the last record
+        with open(path, 'r+b') as f:
+            data = bytearray(f.read())
+            last = data.rfind(b'0000000002')
+            data[last] ^= 0xFF
+            f.seek(0)
+            f.write(data)
+        journal = Journal(path, size=4096)
+        assert [data['tagId'] for _, data in drain(journal)] == ['0000000000', '0000000001']
+        journal.close()
+    print("✓ PASS: torn record trimmed on reopen")
+
+
+def test_forwarder_replay():
+    """Test offline journaling, ordered replay and replay rate"""
+    with tempfile.TemporaryDirectory() as directory:
+        client = RecordingClient(connected=False)
+        journal = Journal(os.path.join(directory, 'rfid.journal'))
+        forwarder = Forwarder(client, journal, rate=200, name="Test")
+        for index in range(20):
+            stamp = f'2025-01-01T00:00:{index:02d}'
+            assert forwarder.emit('rfid_scan', {'n': index, 'timestamp': stamp}) is False
+        assert len(journal) == 20 and client.emitted == []
+
+        client.connected = True
+        forwarder.start_replay()
+        # Live events during replay are queued behind the backlog
+        for index in range(20, 25):
+            forwarder.emit('rfid_scan', {'n': index})
+        deadline = time.monotonic() + 5
+        while (len(journal) or forwarder.replaying()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [data['n'] for _, data in client.emitted] == list(range(25))
+        assert client.emitted[3][1]['timestamp'] == '2025-01-01T00:00:03', "Original timestamp kept"
+        elapsed = client.times[-1] - client.times[0]
+        assert elapsed >= 23 / 200 * 0.9, f"Replay ran faster than its rate ({elapsed:.3f}s)"
+
+        # Once drained, events go out live again
+        assert forwarder.emit('rfid_scan', {'n': 25}) is True
+        journal.close()
+    print(f"✓ PASS: 25 events replayed in order at ≤200/s ({elapsed * 1000:.0f} ms)")
+
+
+def test_concurrent_append_during_replay():
+    """Test that no event is lost or reordered while replay races appends"""
+    with tempfile.TemporaryDirectory() as directory:
+        client = RecordingClient(connected=True)
+        journal = Journal(os.path.join(directory, 'rfid.journal'))
+        forwarder = Forwarder(client, journal, rate=0, name="Test")
+        client.connected = False
+        forwarder.emit('rfid_scan', {'n': 0})
+        client.connected = True
+
+        def producer():
+            for index in range(1, 2000):
+                forwarder.emit('rfid_scan', {'n': index})
+
+        thread = threading.Thread(target=producer)
+        forwarder.start_replay()
+        thread.start()
+        thread.join()
+        deadline = time.monotonic() + 5
+        while (len(journal) or forwarder.replaying()) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert [data['n'] for _, data in client.emitted] == list(range(2000))
+        journal.close()
+    print("✓ PASS: 2000 events in order with replay racing live emits")
+
+
+def test_async_forwarder():
+    """Test journaling and ordered replay on the event loop with an AsyncClient"""
+    async def run(forwarder, client):
+        for index in range(10):
+            assert await forwarder.emit('rfid_scan', {'n': index}) is False
+        client.connected = True
+        forwarder.start_replay()
+        assert forwarder.replaying()
+        # Live events while the backlog replays are queued behind it
+        for index in range(10, 15):
+            assert await forwarder.emit('rfid_scan', {'n': index}) is False
+        while forwarder.replaying():
+            await asyncio.sleep(0.001)
+        assert await forwarder.emit('rfid_scan', {'n': 15}) is True
+
+        # A replay cut short by a disconnect resumes from where it stopped
+        client.connected = False
+        for index in range(16, 20):
+            await forwarder.emit('rfid_scan', {'n': index})
+        client.connected = True
+        forwarder.start_replay()
+        await asyncio.sleep(0)
+        forwarder.stop_replay()
+        assert not forwarder.replaying() and len(forwarder.journal)
+        forwarder.start_replay()
+        while forwarder.replaying():
+            await asyncio.sleep(0.001)
+
+    with tempfile.TemporaryDirectory() as directory:
+        client = AsyncRecordingClient(connected=False)
+        journal = Journal(os.path.join(directory, 'rfid.journal'))
+        forwarder = AsyncForwarder(client, journal, rate=0, name="Test")
+        asyncio.run(run(forwarder, client))
+        assert [data['n'] for _, data in client.emitted] == list(range(20))
+        assert len(journal) == 0
+        journal.close()
+    print("✓ PASS: async forwarder journals offline and replays 20 events in order")
+
+
+def main():
+    print("=" * 60)
+    print("Store-and-Forward Journal Tests")
+    print("=" * 60)
+    tests = [
+        test_order_and_persistence,
+        test_full_policies,
+        test_torn_record_recovery,
+        test_forwarder_replay,
+        test_concurrent_append_during_replay,
+        test_async_forwarder,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Test script for the parallel multi-load-cell reader (load_cells.py).
+"""
+
+import sys
+import time
+
+from load_cells import Channel, LoadCellArray, format_diagnostics, parse_channels
+from weight_filters import MeanFilter
+from weight_sampler import HX711Sampler
+
+PERIOD = 0.01               # Simulated conversion time per channel
+
+
+class FakeHX711:
+    """One corner's HX711: blocks for a conversion, returns its raw load"""
+
+    def __init__(self, raw, period=PERIOD):
+        self.raw = raw
+        self.period = period
+        self.reads = 0
+        self.fail = False
+
+    def read(self):
+        time.sleep(self.period)
+        if self.fail:
+            raise RuntimeError("HX711 returned no data")
+        self.reads += 1
+        return [self.raw]
+
+
+def make_array(raws, timeout=0.5, **kwargs):
+    cells = [FakeHX711(raw, **kwargs) for raw in raws]
+    channels = [Channel(f"corner{number}", cell.read) for number, cell in enumerate(cells)]
+    return LoadCellArray(channels, timeout=timeout), cells
+
+
+def test_parallel_rate_and_sum():
+    """Test that four cells keep the single-cell rate and are summed"""
+    array, _ = make_array([1000.0, 2000.0, 3000.0, 4000.0])
+    array.start()
+    try:
+        start = time.monotonic()
+        readings = [array.read() for _ in range(40)]
+        elapsed = time.monotonic() - start
+    finally:
+        array.stop()
+    assert all(reading == [10000.0] for reading in readings), readings[:5]
+    rate = len(readings) / elapsed
+    # Read one after another the four cells would manage 1 / (4 * PERIOD) = 25/s;
+    # a reading never reuses a conversion, so it cannot beat one cell either
+    assert 0.6 / PERIOD < rate < 1.1 / PERIOD, f"{rate:.0f} readings/s"
+    print(f"✓ PASS: 4 cells summed at {rate:.0f} readings/s (one cell: {1 / PERIOD:.0f}/s)")
+
+
+def test_alignment():
+    """Test that staggered channels are combined from samples at most a period apart"""
+    clock = [0.0]
+    channels = [Channel(f"corner{number}", None, clock=lambda: clock[0]) for number in range(3)]
+    array = LoadCellArray(channels)
+    # Corner 0 converts every 0.1 s, corner 1 is 0.02 s behind, corner 2 is
+    # 0.01 s ahead and has one more conversion than the others
+    for step in range(5):
+        channels[0].ring.append(100.0 + step, step * 0.1)
+        channels[1].ring.append(200.0 + step, step * 0.1 - 0.02)
+        channels[2].ring.append(300.0 + step, step * 0.1 + 0.01)
+    channels[2].ring.append(305.0, 0.51)
+    assert not array._stalled()
+    total = array.combine()
+    # Reference is corner 1's newest (0.38 s): corner 0 at 0.4, corner 2 at
+    # 0.41 (its newest, 0.51, is a period too late)
+    assert total == 104.0 + 204.0 + 304.0, total
+    assert abs(array._combined_at - 0.38) < 1e-9 and array.skewed == 0
+    assert len(array._stalled()) == 3, "Each reading waits for a new conversion from every channel"
+    channels[1].ring.append(205.0, 0.48)
+    assert [channel.name for channel in array._stalled()] == ['corner0', 'corner2']
+    print("✓ PASS: staggered channels combined at the nearest conversion")
+
+
+def test_stalled_channel():
+    """Test that a channel that stops converting is named, not silently dropped"""
+    array, cells = make_array([1000.0, 2000.0, 3000.0], timeout=0.3)
+    array.start()
+    try:
+        assert array.read() == [6000.0]
+        cells[2].fail = True
+        try:
+            for _ in range(50):
+                array.read()
+            assert False, "Read a total without corner2"
+        except RuntimeError as e:
+            assert 'corner2' in str(e) and 'no data' in str(e) and 'corner0' not in str(e), e
+        diagnostics = {corner['name']: corner for corner in array.diagnostics()}
+        assert diagnostics['corner2']['errors'] > 0 and diagnostics['corner0']['errors'] == 0
+        assert diagnostics['corner2']['last_error'] == "HX711 returned no data"
+        assert diagnostics['corner2']['age'] > diagnostics['corner0']['age']
+        cells[2].fail = False
+        time.sleep(0.6)                 # Past the channel's error backoff
+        assert array.read() == [6000.0], "Recovers once the channel converts again"
+    finally:
+        array.stop()
+    assert not any(corner['alive'] for corner in array.diagnostics())
+    print("✓ PASS: stalled corner named in the error and counted in the diagnostics")
+
+
+def test_tare_shares_and_sampler():
+    """Test per-corner load shares after tare, and the array behind HX711Sampler"""
+    array, cells = make_array([1000.0, 1000.0, 1000.0, 1000.0])
+    array.start()
+    try:
+        array.read()
+        array.tare()
+        # 4 kg placed off-center: more of it on corners 0 and 1
+        for cell, load in zip(cells, (1500.0, 1500.0, 500.0, 500.0)):
+            cell.raw += load
+        time.sleep(5 * PERIOD)
+        assert array.read() == [8000.0]
+        shares = [corner['share'] for corner in array.diagnostics()]
+        assert [round(share, 3) for share in shares] == [0.375, 0.375, 0.125, 0.125], shares
+        text = format_diagnostics(array.diagnostics())
+        assert 'corner0' in text and '38%' in text and 'errors' not in text, text
+
+        sampler = HX711Sampler(array.read, MeanFilter(lambda raw: (raw - 4000.0) / 1000.0)).start()
+        try:
+            deadline = time.monotonic() + 2.0
+            while sampler.raw.count < 20 and time.monotonic() < deadline:
+                time.sleep(PERIOD)
+            assert sampler.raw.count >= 20 and sampler.get_weight() == 4.0, sampler.stats()
+        finally:
+            sampler.stop()
+    finally:
+        array.stop()
+    print("✓ PASS: shares 38/38/12/12% for an off-center load; HX711Sampler reads 4.0kg from the array")
+
+
+def test_parse_channels():
+    """Test the HX711_CHANNELS format"""
+    assert parse_channels('') == []
+    assert parse_channels('5:6, 13:19,20:21,26:16,') == [(5, 6), (13, 19), (20, 21), (26, 16)]
+    for bad in ('5', '5:6:7', 'a:b'):
+        try:
+            parse_channels(bad)
+            assert False, f"Accepted {bad!r}"
+        except ValueError:
+            pass
+    try:
+        LoadCellArray([])
+        assert False, "Empty array accepted"
+    except ValueError:
+        pass
+    print("✓ PASS: channel pin pairs parsed, malformed ones rejected")
+
+
+def main():
+    print("=" * 60)
+    print("Load Cell Array Tests")
+    print("=" * 60)
+    tests = [
+        test_parallel_rate_and_sum,
+        test_alignment,
+        test_stalled_channel,
+        test_tare_shares_and_sampler,
+        test_parse_channels,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+"""
+Test script for the service metrics (metrics.py).
+"""
+
+import random
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+import metrics
+import rfid_service
+from rdm6300 import FrameDecoder, encode_frame
+
+
+def test_histogram_accuracy():
+    """Test that percentiles land within one bucket of the exact value"""
+    rng = random.Random(14)
+    histogram = metrics.Histogram()
+    values = sorted(rng.lognormvariate(-7, 1.5) for _ in range(20000))
+    for value in values:
+        histogram.record(value)
+    for q in (50, 90, 99, 99.9):
+        exact = values[int(q / 100 * len(values)) - 1]
+        estimate = histogram.percentile(q)
+        assert exact <= estimate * 1.0001 and estimate <= exact * (1 + 2 / metrics.SUB_BUCKETS), \
+            f"p{q}: {estimate} vs {exact}"
+    assert histogram.count == 20000
+    assert abs(histogram.sum - sum(values)) < 1e-9
+    print("✓ PASS: p50-p99.9 within one bucket (~6%) of the exact values")
+
+
+def test_histogram_range():
+    """Test bucket edges, zero and out-of-range values"""
+    for value in (1e-6, 0.001, 0.5, 1.0, 100.0):
+        index = metrics.bucket_index(value)
+        assert metrics.bucket_upper(index - 1) <= value < metrics.bucket_upper(index), value
+    assert metrics.bucket_index(0) == 0
+    assert metrics.bucket_index(1e-12) == 0
+    assert metrics.bucket_index(1e9) == metrics.bucket_index(1e12), "Large values share the last bucket"
+    histogram = metrics.Histogram()
+    histogram.record(0.0)
+    histogram.record(1e9)
+    assert histogram.count == 2
+    print("✓ PASS: bucket edges, zero and overflow handled")
+
+
+def test_prometheus_format():
+    """Test the text exposition: HELP/TYPE, cumulative buckets, labels"""
+    registry = metrics.Registry()
+    histogram = registry.histogram('test_read_seconds', 'Read time', ['reader'])
+    counter = registry.counter('test_events_total', 'Events', ['event', 'outcome'])
+    gauge = registry.gauge('test_connected', 'Connected')
+    for value in (0.0001, 0.0002, 0.003, 2.0):
+        histogram.labels('reader1').record(value)
+    counter.labels('rfid_scan', 'sent').inc(3)
+    gauge.set(1)
+    registry.add_collector(lambda: [('test_rejected_total', 'counter', 'Rejected',
+                                     [({'reader': 'reader"2'}, 5)])])
+    text = registry.render()
+    lines = text.splitlines()
+
+    assert '# TYPE test_read_seconds histogram' in lines
+    buckets = [line for line in lines if line.startswith('test_read_seconds_bucket')]
+    counts = [int(line.rsplit(' ', 1)[1]) for line in buckets]
+    assert counts == sorted(counts), "Buckets are cumulative"
+    assert buckets[-1] == 'test_read_seconds_bucket{reader="reader1",le="+Inf"} 4'
+    assert 'test_read_seconds_bucket{reader="reader1",le="0.000244140625"} 2' in lines
+    assert 'test_read_seconds_count{reader="reader1"} 4' in lines
+    assert 'test_events_total{event="rfid_scan",outcome="sent"} 3' in lines
+    assert 'test_connected 1' in lines
+    assert 'test_rejected_total{reader="reader\\"2"} 5' in lines, "Label values are escaped"
+    print(f"✓ PASS: Prometheus text format ({len(lines)} lines)")
+
+
+def test_get_or_create():
+    """Test that modules declaring the same metric share it"""
+    registry = metrics.Registry()
+    first = registry.histogram('shared_seconds', 'Shared', ['reader'])
+    second = registry.histogram('shared_seconds', 'Shared', ['reader'])
+    assert first is second
+    try:
+        registry.counter('shared_seconds', 'Shared', ['reader'])
+        assert False, "Type mismatch must raise"
+    except ValueError:
+        pass
+    try:
+        first.labels('reader1', 'extra')
+        assert False, "Wrong label count must raise"
+    except ValueError:
+        pass
+    print("✓ PASS: get-or-create by name, mismatches rejected")
+
+
+def test_concurrent_recording():
+    """Test that per-thread children lose no samples"""
+    registry = metrics.Registry()
+    histogram = registry.histogram('threads_seconds', 'Threads', ['reader'])
+    counter = registry.counter('threads_total', 'Threads')
+
+    def worker(name):
+        child = histogram.labels(name)
+        for index in range(20000):
+            child.record(index * 1e-6)
+            counter.inc()
+
+    threads = [threading.Thread(target=worker, args=(f'reader{n}',)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(histogram.labels(f'reader{n}').count == 20000 for n in range(4))
+    assert counter.value == 80000
+    print("✓ PASS: 4 threads x 20000 samples, none lost")
+
+
+def test_endpoint_and_decoder_collector():
+    """Test the HTTP endpoint serving service counters"""
+    registry = metrics.Registry()
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame('0A1B2C3D4E') + b'\x99\x98' + encode_frame('0A1B2C3D4E', checksum=0))
+    decoder.decode_all()
+    registry.add_collector(rfid_service.decoder_metrics({'reader1': decoder}))
+    server = metrics.serve(0, addr='127.0.0.1', registry=registry)
+    try:
+        port = server.server_address[1]
+        with urllib.request.urlopen(f'http://127.0.0.1:{port}/metrics', timeout=5) as response:
+            assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+            text = response.read().decode()
+        try:
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/other', timeout=5)
+            assert False, "Unknown path must 404"
+        except urllib.error.HTTPError as e:
+            assert e.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'smartkart_rfid_frames_total{reader="reader1"} 1' in text
+    assert 'smartkart_rfid_rejected_total{reader="reader1",reason="garbage_bytes"} 2' in text
+    assert 'smartkart_rfid_rejected_total{reader="reader1",reason="bad_checksum"} 1' in text
+    print("✓ PASS: /metrics serves decoder frames and rejections")
+
+
+def main():
+    print("=" * 60)
+    print("Service Metrics Tests")
+    print("=" * 60)
+    tests = [
+        test_histogram_accuracy,
+        test_histogram_range,
+        test_prometheus_format,
+        test_get_or_create,
+        test_concurrent_recording,
+        test_endpoint_and_decoder_collector,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
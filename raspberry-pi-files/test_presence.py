@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for the tag presence tracker (presence.py).
+"""
+
+import random
+import sys
+
+from presence import PresenceTracker, TAG_ENTER, TAG_EXIT
+
+FRAME_PERIOD = 0.0146  # One 14-byte frame at 9600 baud
+
+
+def repeats(start, duration, period=FRAME_PERIOD):
+    """Read times of a tag held in the field for `duration` seconds"""
+    count = int(duration / period)
+    return [start + i * period for i in range(count)]
+
+
+def run(tracker, reads, end, step=0.05):
+    """Feed (time, tag) reads in order, expiring on a timer; return events"""
+    events = []
+    now = 0.0
+    for read_time, tag in sorted(reads):
+        while now + step <= read_time:
+            now += step
+            events.extend(tracker.expire(now))
+        events.extend(tracker.observe(tag, read_time))
+    while now < end:
+        now += step
+        events.extend(tracker.expire(now))
+    return events
+
+
+def test_single_presence():
+    """Test one enter and one exit for a tag held near the antenna"""
+    tracker = PresenceTracker()
+    reads = [(t, 'AAAAAAAAAA') for t in repeats(1.0, 2.0)]
+    events = run(tracker, reads, end=5.0)
+    assert [e['type'] for e in events] == [TAG_ENTER, TAG_EXIT], events
+    enter, leave = events
+    assert enter['time'] - 1.0 < 0.05, "Enter should follow the second read"
+    assert 0.5 <= leave['time'] - reads[-1][0] < 0.6, "Exit should follow leave_timeout"
+    assert leave['reads'] == len(reads)
+    print("✓ PASS: one enter and one exit per presence")
+
+
+def test_ghost_reads():
+    """Test that isolated reads never confirm"""
+    tracker = PresenceTracker(confirm_reads=3, confirm_window=0.2)
+    reads = [(t, 'BBBBBBBBBB') for t in (1.0, 1.5, 2.0, 2.5)]
+    reads += [(1.0, 'CCCCCCCCCC'), (1.1, 'CCCCCCCCCC')]
+    events = run(tracker, reads, end=4.0)
+    assert events == [], events
+    assert tracker.ghosts == 5
+    print("✓ PASS: ghost reads are filtered by N-of-M confirmation")
+
+
+def test_hold_off():
+    """Test that a tag wobbling at the field edge does not flap"""
+    tracker = PresenceTracker(leave_timeout=0.3, hold_off=1.0)
+    # In field, gone 0.4s (exits), back during hold-off, then held past it
+    reads = [(t, 'DDDDDDDDDD') for t in repeats(1.0, 1.0)]
+    reads += [(t, 'DDDDDDDDDD') for t in repeats(2.4, 2.0)]
+    events = run(tracker, reads, end=6.0)
+    assert [e['type'] for e in events] == [TAG_ENTER, TAG_EXIT, TAG_ENTER, TAG_EXIT], events
+    exit_time = events[1]['time']
+    assert events[2]['time'] - exit_time >= 1.0, "Re-entry must wait for hold-off"
+    assert tracker.held_off > 0
+    print("✓ PASS: re-entry is held off after an exit")
+
+
+def test_next_deadline():
+    """Test that the deadline tracks the earliest pending timeout"""
+    tracker = PresenceTracker(leave_timeout=0.5)
+    assert tracker.next_deadline() is None
+    tracker.observe('EEEEEEEEEE', 1.0)
+    tracker.observe('EEEEEEEEEE', 1.01)
+    assert abs(tracker.next_deadline() - 1.51) < 1e-9
+    assert tracker.expire(1.5) == []
+    assert len(tracker.expire(1.51)) == 1
+    print("✓ PASS: next_deadline matches the leave timeout")
+
+
+def test_reduction():
+    """Test uplink reduction over a shopping trip of long scans"""
+    rng = random.Random(7)
+    tracker = PresenceTracker()
+    reads = []
+    start = 0.0
+    for index in range(30):
+        tag = '%010X' % index
+        # Held 1-3 s, with 5% of frames lost to noise
+        reads += [(t, tag) for t in repeats(start, rng.uniform(1.0, 3.0)) if rng.random() > 0.05]
+        start = reads[-1][0] + rng.uniform(2.0, 4.0)
+    events = run(tracker, reads, end=start + 2.0)
+    assert sum(e['type'] == TAG_ENTER for e in events) == 30
+    assert sum(e['type'] == TAG_EXIT for e in events) == 30
+    stats = tracker.stats()
+    assert stats['reduction'] >= 10, stats
+    print(f"✓ PASS: {stats['reads']} reads -> {stats['events']} events "
+          f"({stats['reduction']:.0f}x fewer uplink messages)")
+
+
+def main():
+    print("=" * 60)
+    print("Presence Tracker Tests")
+    print("=" * 60)
+    tests = [
+        test_single_presence,
+        test_ghost_reads,
+        test_hold_off,
+        test_next_deadline,
+        test_reduction,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Test script for the RDM6300 ring-buffer frame decoder (rdm6300.py).
+
+The original bytes-based read_tag() parser is copied inline below as the
+reference implementation; the decoder must produce exactly the same tags.
+"""
+
+import random
+import sys
+
+from rdm6300 import FrameDecoder, encode_frame, PACKET_SIZE
+
+
+def legacy_parse(buffer_dict, reader_id):
+    """Parsing half of the original rfid_service.read_tag() (reference copy)"""
+    data = buffer_dict[reader_id]
+    if len(data) == 0:
+        return None
+    stx_index = data.find(0x02)
+    if stx_index == -1:
+        buffer_dict[reader_id] = b''
+        return None
+    if stx_index > 0:
+        buffer_dict[reader_id] = data[stx_index:]
+        data = buffer_dict[reader_id]
+    if len(data) < PACKET_SIZE:
+        return None
+    if data[13] == 0x03:
+        packet = data[0:PACKET_SIZE]
+        buffer_dict[reader_id] = data[PACKET_SIZE:]
+        try:
+            tag_id = packet[1:11].decode('ascii')
+            checksum_str = packet[11:13].decode('ascii')
+        except UnicodeDecodeError:
+            return None
+        if not all(c in '0123456789ABCDEFabcdef' for c in tag_id):
+            return None
+        if not all(c in '0123456789ABCDEFabcdef' for c in checksum_str):
+            return None
+        calculated_checksum = 0
+        for byte in bytes.fromhex(tag_id):
+            calculated_checksum ^= byte
+        if calculated_checksum != int(checksum_str, 16):
+            return None
+        return tag_id.upper()
+    buffer_dict[reader_id] = data[1:]
+    return None
+
+
+class FakeSerial:
+    """Minimal stand-in for serial.Serial that serves a byte stream in chunks"""
+
+    def __init__(self, data, chunk_size):
+        self.data = data
+        self.pos = 0
+        self.chunk_size = chunk_size
+        self.available = 0
+
+    def poll(self):
+        """Make the next chunk of the stream 'arrive' in the driver buffer"""
+        self.available = min(self.available + self.chunk_size, len(self.data) - self.pos)
+
+    @property
+    def in_waiting(self):
+        return self.available
+
+    def read(self, size):
+        size = min(size, self.available)
+        out = self.data[self.pos:self.pos + size]
+        self.pos += size
+        self.available -= size
+        return out
+
+    def readinto(self, buffer):
+        out = self.read(len(buffer))
+        buffer[:len(out)] = out
+        return len(out)
+
+
+def noisy_stream(rng, frames):
+    """Build a stream of valid frames mixed with typical line noise"""
+    tags = ['%010X' % rng.getrandbits(40) for _ in range(5)]
+    parts = []
+    for _ in range(frames):
+        kind = rng.random()
+        tag = rng.choice(tags)
+        if kind < 0.6:
+            parts.append(encode_frame(tag))
+        elif kind < 0.7:
+            parts.append(encode_frame(tag.lower()))
+        elif kind < 0.8:
+            parts.append(encode_frame(tag, checksum=rng.randrange(256)))
+        elif kind < 0.9:
+            parts.append(encode_frame(tag)[:rng.randrange(1, PACKET_SIZE)])
+        else:
+            parts.append(bytes(rng.choice(b'\x00\x02\x03\xff0A') for _ in range(rng.randrange(1, 20))))
+    return b''.join(parts)
+
+
+def run_legacy(stream, chunk_size):
+    ser = FakeSerial(stream, chunk_size)
+    buffers = {'r': b''}
+    tags = []
+    while ser.pos < len(stream) or buffers['r']:
+        ser.poll()
+        if ser.in_waiting > 0:
+            buffers['r'] += ser.read(ser.in_waiting)
+        before = buffers['r']
+        tag = legacy_parse(buffers, 'r')
+        if tag is not None:
+            tags.append(tag)
+        elif ser.pos >= len(stream) and buffers['r'] == before:
+            break
+    return tags
+
+
+def run_decoder(stream, chunk_size, capacity=256):
+    ser = FakeSerial(stream, chunk_size)
+    decoder = FrameDecoder(capacity)
+    tags = []
+    while ser.pos < len(stream) or len(decoder):
+        ser.poll()
+        if ser.in_waiting > 0:
+            decoder.fill_from(ser)
+        before = (len(decoder), decoder.pending())
+        tag = decoder.next_frame()
+        if tag is not None:
+            tags.append(tag)
+        elif ser.pos >= len(stream) and (len(decoder), decoder.pending()) == before:
+            break
+    return tags
+
+
+def test_encode_frame():
+    """Test that encode_frame produces the documented layout"""
+    frame = encode_frame('0A1B2C3D4E')
+    assert len(frame) == PACKET_SIZE
+    assert frame[0] == 0x02 and frame[13] == 0x03
+    assert frame[1:11] == b'0A1B2C3D4E'
+    assert frame[11:13] == b'%02X' % (0x0A ^ 0x1B ^ 0x2C ^ 0x3D ^ 0x4E)
+    print("✓ PASS: encode_frame layout")
+
+
+def test_single_frame():
+    """Test a clean frame, lowercase hex and a bad checksum"""
+    decoder = FrameDecoder()
+    decoder.feed(encode_frame('0a1b2c3d4e'))
+    assert decoder.next_frame() == '0A1B2C3D4E'
+    assert len(decoder) == 0
+
+    decoder.feed(encode_frame('0A1B2C3D4E', checksum=0x00))
+    assert decoder.next_frame() is None
+    assert len(decoder) == 0, "Rejected aligned frame should be consumed"
+    print("✓ PASS: single frame decode and checksum rejection")
+
+
+def test_wraparound():
+    """Test frames that straddle the end of the ring buffer"""
+    decoder = FrameDecoder(capacity=16)
+    frame = encode_frame('1234567890')
+    for _ in range(20):
+        decoder.feed(frame[:5])
+        assert decoder.next_frame() is None
+        decoder.feed(frame[5:])
+        assert decoder.next_frame() == '1234567890'
+    # A frame starting at every position, including STX in the last slot
+    for position in range(16):
+        decoder = FrameDecoder(capacity=16)
+        decoder.feed(b'\xff' * position)
+        decoder.next_frame()
+        decoder.feed(encode_frame('0A1B2C3D4E'))
+        assert decoder.next_frame() == '0A1B2C3D4E', position
+    print("✓ PASS: frames decode across ring wraparound")
+
+
+def test_repeated_frames():
+    """Test that a repeated frame is accepted from the cache and a changed one revalidated"""
+    decoder = FrameDecoder()
+    frame = encode_frame('0A1B2C3D4E')
+    decoder.feed(frame * 3)
+    first = decoder.next_frame()
+    assert first == '0A1B2C3D4E' and decoder.next_frame() is first and decoder.next_frame() is first
+    decoder.feed(encode_frame('0A1B2C3D4E', checksum=0x55) + encode_frame('0a1b2c3d4e') + b'\x02' + b'G' * 12 + b'\x03')
+    assert decoder.next_frame() == '0A1B2C3D4E', "Lowercase copy decoded after the bad checksum"
+    assert decoder.next_frame() is None
+    assert decoder.rejected['bad_checksum'] == 1 and decoder.rejected['bad_hex'] == 1 and decoder.frames == 4
+    print("✓ PASS: repeated frames reuse the tag ID; changed frames are validated")
+
+
+def test_overflow_keeps_newest():
+    """Test that a full buffer drops the oldest bytes"""
+    decoder = FrameDecoder(capacity=16)
+    decoder.feed(b'\xff' * 40 + encode_frame('ABCDEF0123')[:2])
+    assert len(decoder) == 16
+    assert decoder.rejected['overflow_bytes'] == 26
+    assert decoder.pending().endswith(b'\x02A')
+    print("✓ PASS: overflow keeps newest bytes")
+
+
+def run_drain(stream, chunk_size):
+    ser = FakeSerial(stream, chunk_size)
+    decoder = FrameDecoder()
+    tags = []
+    while ser.pos < len(stream):
+        ser.poll()
+        tags.extend(decoder.drain(ser))
+    return tags
+
+
+def test_rejection_counters():
+    """Test that every rejected frame is counted by reason"""
+    decoder = FrameDecoder()
+    decoder.feed(b'\xff\xfe'                                 # 2 garbage bytes
+                 + encode_frame('0A1B2C3D4E')[:6]            # truncated -> no_etx
+                 + encode_frame('0A1B2C3D4E', checksum=0)    # bad_checksum
+                 + b'\x02' + b'0A1B2C3D4G' + b'00\x03'      # bad_hex
+                 + encode_frame('0A1B2C3D4E'))
+    assert decoder.decode_all() == ['0A1B2C3D4E']
+    assert decoder.frames == 1
+    assert decoder.rejected['no_etx'] == 1
+    assert decoder.rejected['bad_checksum'] == 1
+    assert decoder.rejected['bad_hex'] == 1
+    # 2 leading bytes + the 5 bytes of the truncated frame after its STX
+    assert decoder.rejected['garbage_bytes'] == 7
+    print("✓ PASS: rejected frames counted by reason")
+
+
+def test_drain_backlog():
+    """Test that a backlog far larger than the ring buffer decodes fully"""
+    stream = encode_frame('1234567890') * 500
+    ser = FakeSerial(stream, len(stream))
+    ser.poll()
+    decoder = FrameDecoder(capacity=64)
+    tags = decoder.drain(ser)
+    assert len(tags) == 500, f"Expected 500 tags, got {len(tags)}"
+    assert ser.in_waiting == 0
+    assert decoder.rejected['overflow_bytes'] == 0
+    print("✓ PASS: drain decodes a 7000-byte backlog without overflow")
+
+
+def test_matches_legacy_parser():
+    """Test decoder output against the original parser on noisy streams"""
+    rng = random.Random(6300)
+    for trial in range(200):
+        stream = noisy_stream(rng, 40)
+        chunk_size = rng.choice([1, 3, 7, 14, 28, 100])
+        expected = run_legacy(stream, chunk_size)
+        actual = run_decoder(stream, chunk_size)
+        assert actual == expected, f"Mismatch on trial {trial}: {actual} != {expected}"
+        drained = run_drain(stream, chunk_size)
+        assert drained == expected, f"Drain mismatch on trial {trial}: {drained} != {expected}"
+    print("✓ PASS: decoder matches legacy read_tag on 200 noisy streams")
+
+
+def main():
+    print("=" * 60)
+    print("RDM6300 Frame Decoder Tests")
+    print("=" * 60)
+    tests = [
+        test_encode_frame,
+        test_single_frame,
+        test_wraparound,
+        test_repeated_frames,
+        test_overflow_keeps_newest,
+        test_rejection_counters,
+        test_drain_backlog,
+        test_matches_legacy_parser,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
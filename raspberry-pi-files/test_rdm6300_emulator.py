@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the pseudo-terminal RDM6300 emulator (rdm6300_emulator.py).
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import rfid_service
+from rdm6300_emulator import EmulatedReader, EmulatorFleet
+
+
+def run_service_loop(presences, seconds, loop=rfid_service.select_readers):
+    """
+    Open the emulators like rfid_service does and collect (label, tag) reads.
+
+    Tags are put in the field only once the ports are open, since pyserial
+    flushes the input buffer on open.
+    """
+    emulators = list(dict.fromkeys(emulator for emulator, _ in presences))
+    readers = rfid_service.initialize_readers([emulator.path for emulator in emulators])
+    decoders = {}
+    seen = []
+    stop = threading.Event()
+    thread = threading.Thread(
+        target=loop, args=(readers, decoders, lambda label, tags: seen.extend((label, t) for t in tags), stop))
+    thread.start()
+    for emulator, tag_id in presences:
+        emulator.present(tag_id)
+    time.sleep(seconds)
+    return readers, decoders, seen, stop, thread
+
+
+def drain(emulators, decoders, timeout=5.0):
+    """Stop generating and wait until the service has read every byte written"""
+    for emulator in emulators:
+        emulator.clear()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        written = sum(emulator.bytes_written for emulator in emulators)
+        read = sum(decoder.bytes_in for decoder in decoders.values())
+        if read == written:
+            return
+
+
+def finish(readers, stop, thread):
+    stop.set()
+    thread.join()
+    for _, _, reader in readers:
+        reader.close()
+
+
+def test_clean_frames_reach_service():
+    """Test that every emulated frame is decoded by the unmodified service path"""
+    with EmulatorFleet(2, seed=1) as fleet:
+        presences = [(fleet.readers[0], '0A1B2C3D4E'), (fleet.readers[1], '1122334455')]
+        readers, decoders, seen, stop, thread = run_service_loop(presences, 0.5)
+        drain(fleet.readers, decoders)
+        finish(readers, stop, thread)
+        generated = [emulator.frames for emulator in fleet.readers]
+    assert set(seen) == {('Reader 1', '0A1B2C3D4E'), ('Reader 2', '1122334455')}
+    assert [sum(1 for label, _ in seen if label == f'Reader {n}') for n in (1, 2)] == generated
+    # 9600 baud, 14-byte frames: ~68 frames/s per reader
+    assert 20 <= generated[0] <= 40, f"Frame pacing off: {generated[0]} frames in 0.5s"
+    print(f"✓ PASS: {sum(generated)} paced frames decoded, none lost")
+
+
+def test_error_injection_counts():
+    """Test that injected errors match the decoder's rejection counters"""
+    emulator = EmulatedReader(seed=7, speed=0, truncate=0.1, bad_checksum=0.1, noise=0.2, burst=0.2)
+    with emulator:
+        readers, decoders, seen, stop, thread = run_service_loop([(emulator, 'ABCDEF0123')], 0.3)
+        drain([emulator], decoders)
+        finish(readers, stop, thread)
+    decoder = decoders['reader1']
+    assert len(seen) == emulator.frames > 0, "Every intact frame decoded"
+    assert emulator.truncated and emulator.bad_checksums and emulator.noise_bytes
+    assert decoder.rejected['bad_checksum'] >= emulator.bad_checksums
+    assert decoder.bytes_in == emulator.bytes_written
+    print(f"✓ PASS: {emulator.frames} intact frames decoded among {emulator.truncated} truncated, "
+          f"{emulator.bad_checksums} bad-checksum frames and {emulator.noise_bytes} noise bytes")
+
+
+def test_scripted_presence():
+    """Test that scripted presences start and end on time"""
+    emulator = EmulatedReader(seed=3)
+    emulator.script([(0.0, '0000000001', 0.2), (0.3, '0000000002', 0.2)])
+    time.sleep(0.1)
+    assert emulator.in_field() == ['0000000001']
+    time.sleep(0.3)
+    assert emulator.in_field() == ['0000000002']
+    time.sleep(0.25)
+    assert emulator.in_field() == []
+    emulator.stop()
+    print("✓ PASS: scripted presences enter and leave on schedule")
+
+
+def test_stable_links():
+    """Test that readers can be reached through stable symlinks"""
+    with tempfile.TemporaryDirectory() as directory:
+        prefix = os.path.join(directory, 'rdm6300-')
+        fleet = EmulatorFleet(3, link_prefix=prefix)
+        assert fleet.paths == [f'{prefix}{n}' for n in (1, 2, 3)]
+        assert all(os.path.realpath(reader.link) == reader.port for reader in fleet.readers)
+        fleet.start()
+        fleet.stop()
+        assert not any(os.path.exists(path) for path in fleet.paths), "Links removed on stop"
+    print("✓ PASS: stable symlinks created and cleaned up")
+
+
+def test_many_readers_threads_loop():
+    """Test a larger fleet through the thread-per-reader loop"""
+    with EmulatorFleet(8, seed=5, speed=4) as fleet:
+        presences = [(emulator, '%010X' % index) for index, emulator in enumerate(fleet.readers)]
+        readers, decoders, seen, stop, thread = run_service_loop(
+            presences, 0.4, loop=rfid_service.thread_readers)
+        drain(fleet.readers, decoders)
+        finish(readers, stop, thread)
+        generated = sum(emulator.frames for emulator in fleet.readers)
+    assert len(seen) == generated
+    assert len({label for label, _ in seen}) == 8
+    print(f"✓ PASS: 8 readers at 4x line rate, {generated} frames decoded")
+
+
+def main():
+    print("=" * 60)
+    print("RDM6300 Emulator Tests")
+    print("=" * 60)
+    tests = [
+        test_clean_frames_reach_service,
+        test_error_injection_counts,
+        test_scripted_presence,
+        test_stable_links,
+        test_many_readers_threads_loop,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for the threaded RFID reader pool (reader_pool.py).
+"""
+
+import queue
+import sys
+import threading
+import time
+
+import serial
+
+from rdm6300 import encode_frame
+from reader_pool import ReaderPool, ReaderWorker
+
+
+class FakeSerial:
+    """Stand-in for serial.Serial: blocking read() with a timeout, fed by the test"""
+
+    def __init__(self, timeout=0.05):
+        self.timeout = timeout
+        self.buffer = bytearray()
+        self.fail = None
+        self.is_open = True
+        self.fd = 3
+        self._cond = threading.Condition()
+
+    def feed(self, data):
+        with self._cond:
+            self.buffer.extend(data)
+            self._cond.notify_all()
+
+    def break_port(self, error):
+        with self._cond:
+            self.fail = error
+            self._cond.notify_all()
+
+    @property
+    def in_waiting(self):
+        with self._cond:
+            if self.fail is not None:
+                raise self.fail
+            return len(self.buffer)
+
+    def read(self, size=1):
+        with self._cond:
+            if not self.buffer and self.fail is None:
+                self._cond.wait(self.timeout)
+            if self.fail is not None:
+                raise self.fail
+            data = bytes(self.buffer[:size])
+            del self.buffer[:size]
+            return data
+
+    def readinto(self, view):
+        data = self.read(len(view))
+        view[:len(data)] = data
+        return len(data)
+
+
+def collect(pool, count, timeout=2.0):
+    scans = []
+    deadline = time.monotonic() + timeout
+    while len(scans) < count and time.monotonic() < deadline:
+        scan = pool.get(timeout=0.05)
+        if scan is not None:
+            scans.append(scan)
+    return scans
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_queue_drops_oldest():
+    """Test that a full scan queue drops its oldest scan and counts it"""
+    scan_queue = queue.Queue(maxsize=3)
+    worker = ReaderWorker('reader1', 'Reader 1', FakeSerial(), scan_queue)
+    for number in range(5):
+        worker._enqueue(f"TAG{number}", float(number))
+    kept = [scan_queue.get_nowait()[2] for _ in range(scan_queue.qsize())]
+    assert kept == ['TAG2', 'TAG3', 'TAG4'], kept
+    assert worker.dropped == 2 and worker.scans == 5
+    print("✓ PASS: full queue keeps the 3 newest scans, 2 dropped and counted")
+
+
+def test_decode_and_stats():
+    """Test that every worker decodes its own port and the per-reader counters"""
+    ports = [FakeSerial(), FakeSerial()]
+    pool = ReaderPool([(f"reader{n}", f"Reader {n}", port) for n, port in enumerate(ports, start=1)])
+    pool.start()
+    try:
+        ports[0].feed(b''.join(encode_frame(f"00000000{n:02X}") for n in range(3)))
+        ports[1].feed(b'\xff' + encode_frame('0A1B2C3D4E'))
+        scans = collect(pool, 4)
+    finally:
+        pool.stop()
+    assert sorted((reader_id, tag) for reader_id, _, tag, _ in scans) == [
+        ('reader1', '0000000000'), ('reader1', '0000000001'), ('reader1', '0000000002'),
+        ('reader2', '0A1B2C3D4E')], scans
+    stats = pool.stats()
+    assert stats['reader1']['bytes'] == 42 and stats['reader1']['frames'] == 3
+    assert stats['reader2']['bytes'] == 15 and stats['reader2']['frames'] == 1
+    assert stats['reader1']['scans'] == 3 and stats['reader2']['scans'] == 1
+    assert stats['reader1']['dropped'] == stats['reader2']['dropped'] == 0
+    assert stats['reader1']['scans_per_sec'] > stats['reader2']['scans_per_sec'] > 0
+    assert not pool.alive()
+    print("✓ PASS: 2 workers decode their own ports; bytes, frames and scans counted per reader")
+
+
+def test_set_readers():
+    """Test that set_readers() keeps, stops and starts workers by port"""
+    first, second, third = FakeSerial(), FakeSerial(), FakeSerial()
+    decoders = {}
+    pool = ReaderPool([('reader1', 'Reader 1', first), ('reader2', 'Reader 2', second)], decoders)
+    pool.start()
+    try:
+        kept, removed = pool.workers
+        pool.set_readers([('reader1', 'Reader 1', first), ('reader3', 'Reader 3', third)])
+        assert pool.workers[0] is kept and kept.is_alive()
+        assert not removed.is_alive(), "Worker of the dropped port stopped"
+        added = pool.workers[1]
+        assert added.reader_id == 'reader3' and added.is_alive() and added.decoder is decoders['reader3']
+        assert set(pool.stats()) == {'reader1', 'reader3'}
+
+        second.feed(encode_frame('0000000002'))
+        third.feed(encode_frame('0000000003'))
+        scans = collect(pool, 1)
+        assert [(reader_id, tag) for reader_id, _, tag, _ in scans] == [('reader3', '0000000003')], scans
+        assert pool.get(timeout=0.1) is None, "Nothing read from the removed port"
+    finally:
+        pool.stop()
+    print("✓ PASS: set_readers() kept 1 worker, stopped 1 and started 1 with its decoder")
+
+
+def test_failed_worker():
+    """Test that a read error stops only that worker and is reported by failed()"""
+    good, bad = FakeSerial(), FakeSerial()
+    pool = ReaderPool([('reader1', 'Reader 1', good), ('reader2', 'Reader 2', bad)])
+    pool.start()
+    try:
+        bad.break_port(serial.SerialException("device reports readiness to read but returned no data"))
+        start = time.monotonic()
+        assert pool.get(timeout=2.0) is None, "Failure wake-up is not a scan"
+        assert time.monotonic() - start < 1.0, "Consumer woken without waiting out its timeout"
+        assert wait_for(lambda: pool.failed())
+        failed = pool.failed()
+        assert [worker.reader_id for worker in failed] == ['reader2']
+        assert isinstance(failed[0].error, serial.SerialException)
+        assert pool.alive(), "The other reader keeps reading"
+
+        good.feed(encode_frame('0A1B2C3D4E'))
+        assert [scan[2] for scan in collect(pool, 1)] == ['0A1B2C3D4E']
+
+        # A port closed under the read (supervisor reopening it) is not a failure
+        good.is_open = False
+        good.break_port(OSError(9, "Bad file descriptor"))
+        assert wait_for(lambda: not pool.workers[0].is_alive())
+        assert [worker.reader_id for worker in pool.failed()] == ['reader2']
+    finally:
+        pool.stop()
+    print("✓ PASS: failed() reports the worker whose read raised; a closed port is not a failure")
+
+
+def main():
+    print("=" * 60)
+    print("Reader Pool Tests")
+    print("=" * 60)
+    tests = [
+        test_queue_drops_oldest,
+        test_decode_and_stats,
+        test_set_readers,
+        test_failed_worker,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Test script for the asyncio RFID service (rfid_service_async.py), driven by
+pseudo-terminal RDM6300 emulators (rdm6300_emulator.py).
+"""
+
+import asyncio
+import sys
+import time
+
+import rfid_service
+import rfid_service_async
+from rdm6300_emulator import EmulatedReader, EmulatorFleet
+from rfid_service_async import AsyncReaderService
+
+
+def open_service(emulators, **kwargs):
+    """Open the emulators like main_async() does and wrap them in a service"""
+    readers = rfid_service.initialize_readers([emulator.path for emulator in emulators])
+    return AsyncReaderService(readers, cart_id='1234', **kwargs), readers
+
+
+async def run_service(service, emulators, presences, seconds):
+    """
+    Register the readers with the running loop, put tags in the field and
+    let the loop read for `seconds`, then wait until every byte written
+    has been decoded.
+    """
+    service.start()
+    for emulator, tag_id in presences:
+        emulator.present(tag_id)
+    await asyncio.sleep(seconds)
+    for emulator in emulators:
+        emulator.clear()
+    deadline = time.monotonic() + 5.0
+    while time.monotonic() < deadline:
+        await asyncio.sleep(0.05)
+        written = sum(emulator.bytes_written for emulator in emulators)
+        if sum(decoder.bytes_in for decoder in service.decoders.values()) == written:
+            break
+    service.stop()
+
+
+def queued(service):
+    scans = []
+    while not service.queue.empty():
+        scans.append(service.queue.get_nowait())
+    return scans
+
+
+def close(readers):
+    for _, _, reader in readers:
+        reader.close()
+
+
+def test_decode_and_cooldown():
+    """Test that frames are decoded from the loop callback and held back by the cooldown"""
+    with EmulatorFleet(2, seed=1) as fleet:
+        service, readers = open_service(fleet.readers, cooldown=10.0)
+        presences = [(fleet.readers[0], '0A1B2C3D4E'), (fleet.readers[1], '1122334455')]
+        asyncio.run(run_service(service, fleet.readers, presences, 0.5))
+        close(readers)
+        generated = [emulator.frames for emulator in fleet.readers]
+    frames = [service.decoders[f'reader{n}'].frames for n in (1, 2)]
+    assert frames == generated and min(frames) >= 20, f"{frames} decoded, {generated} generated"
+    scans = queued(service)
+    assert sorted((label, payload['tagId']) for label, payload in scans) == [
+        ('Reader 1', '0A1B2C3D4E'), ('Reader 2', '1122334455')], scans
+    assert all(payload['cartId'] == '1234' for _, payload in scans)
+    assert service.dropped == 0
+    print(f"✓ PASS: {sum(frames)} frames decoded, 2 scans after the cooldown")
+
+
+def test_emit_queue_drops_oldest():
+    """Test that a full emit queue drops its oldest scans and counts them"""
+    queue_size = rfid_service_async.EMIT_QUEUE_SIZE
+    rfid_service_async.EMIT_QUEUE_SIZE = 3
+    try:
+        with EmulatedReader(seed=2) as emulator:
+            service, readers = open_service([emulator], cooldown=0)
+            asyncio.run(run_service(service, [emulator], [(emulator, '0A1B2C3D4E')], 0.3))
+            close(readers)
+    finally:
+        rfid_service_async.EMIT_QUEUE_SIZE = queue_size
+    frames = service.decoders['reader1'].frames
+    assert service.queue.qsize() == 3 and frames > 3
+    assert service.dropped == frames - 3, f"{service.dropped} dropped of {frames}"
+    print(f"✓ PASS: queue of 3 kept the newest scans, {service.dropped} of {frames} dropped and counted")
+
+
+def test_hangup_removes_reader():
+    """Test that a hung-up port is taken off the loop and the others keep reading"""
+    async def scenario(service, fleet):
+        service.start()
+        loop = asyncio.get_running_loop()
+        gone = service.readers[0][2].fileno()
+        fleet.readers[0].stop()                     # Closes the pty: the port hangs up
+        deadline = time.monotonic() + 2.0
+        while gone in service._active and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        assert gone not in service._active, "Hung-up reader still registered"
+        assert not loop.remove_reader(gone), "Descriptor still watched by the loop"
+        assert len(service._active) == 1
+
+        fleet.readers[1].present('1122334455')
+        deadline = time.monotonic() + 2.0
+        while service.queue.empty() and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        service.stop()
+
+    with EmulatorFleet(2, seed=3) as fleet:
+        service, readers = open_service(fleet.readers)
+        asyncio.run(scenario(service, fleet))
+        close(readers)
+    assert [(label, payload['tagId']) for label, payload in queued(service)] == [('Reader 2', '1122334455')]
+    print("✓ PASS: hung-up reader removed from the loop, the other kept scanning")
+
+
+def main():
+    print("=" * 60)
+    print("Asyncio RFID Service Tests")
+    print("=" * 60)
+    tests = [
+        test_decode_and_cooldown,
+        test_emit_queue_drops_oldest,
+        test_hangup_removes_reader,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
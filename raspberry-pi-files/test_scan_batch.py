@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for scan batching (scan_batch.py) and the rfid_scan_batch payload.
+"""
+
+import sys
+
+from fusion import single_scan
+from scan_batch import ScanBatcher
+from rfid_service import build_batch_payload
+
+
+def test_window_release():
+    """Test that a batch is released once its first scan is window old"""
+    batcher = ScanBatcher(window=0.02, max_items=16)
+    assert batcher.add('A', now=1.000) == []
+    assert batcher.add('B', now=1.010) == []
+    assert batcher.next_deadline() == 1.020
+    assert batcher.flush(now=1.015) == []
+    assert batcher.flush(now=1.020) == ['A', 'B']
+    assert batcher.next_deadline() is None
+    assert batcher.flush(now=2.0) == []
+    print("✓ PASS: batch released after the window")
+
+
+def test_max_items():
+    """Test that a full batch is released immediately"""
+    batcher = ScanBatcher(window=1.0, max_items=3)
+    assert batcher.add('A', now=0.0) == []
+    assert batcher.add('B', now=0.0) == []
+    assert batcher.add('C', now=0.0) == ['A', 'B', 'C']
+    assert len(batcher) == 0
+    batcher.add('D', now=0.5)
+    assert batcher.next_deadline() == 1.5, "New batch opens its own window"
+    assert batcher.flush(now=0.5, force=True) == ['D']
+    assert batcher.batches == 2 and batcher.items == 4
+    print("✓ PASS: batch released at max_items and on force")
+
+
+def test_armful_burst():
+    """Test that a burst of scans becomes a handful of messages"""
+    batcher = ScanBatcher(window=0.02, max_items=16)
+    batches = []
+    # 12 items dropped in within 60 ms, one scan every 5 ms
+    for index in range(12):
+        now = index * 0.005
+        batches.extend(batch for batch in [batcher.flush(now)] if batch)
+        batches.extend(batch for batch in [batcher.add(index, now)] if batch)
+    batches.append(batcher.flush(now=1.0))
+    assert sum(len(batch) for batch in batches) == 12
+    assert len(batches) == 3, f"Expected 3 batches, got {len(batches)}"
+    print("✓ PASS: 12-item burst -> 3 rfid_scan_batch messages")
+
+
+def test_payload():
+    """Test the rfid_scan_batch payload shape"""
+    scans = [single_scan('AAAAAAAAAA', 'Reader 1', 1.000), single_scan('BBBBBBBBBB', 'Reader 2', 1.015)]
+    payload = build_batch_payload('1234', scans, now=1.020)
+    assert payload['cartId'] == '1234'
+    assert 'timestamp' in payload
+    assert payload['scans'] == [
+        {'tagId': 'AAAAAAAAAA', 'ageMs': 20.0},
+        {'tagId': 'BBBBBBBBBB', 'ageMs': 5.0},
+    ]
+    fused = build_batch_payload('1234', scans[:1], fused=True, now=1.020)
+    assert fused['scans'][0]['readers'] == ['Reader 1']
+    print("✓ PASS: rfid_scan_batch payload")
+
+
+def main():
+    print("=" * 60)
+    print("Scan Batching Tests")
+    print("=" * 60)
+    tests = [
+        test_window_release,
+        test_max_items,
+        test_armful_burst,
+        test_payload,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
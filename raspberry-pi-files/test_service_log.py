@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Test script for the non-blocking service logging (service_log.py).
+"""
+
+import json
+import logging
+import os
+import signal
+import sys
+import threading
+import time
+
+import service_log
+
+
+class ListHandler(logging.Handler):
+    """Writer-side handler that keeps formatted lines, optionally stalled"""
+
+    def __init__(self, stalled=False):
+        super().__init__()
+        self.lines = []
+        self.gate = threading.Event()
+        if not stalled:
+            self.gate.set()
+        self.setFormatter(service_log.StructuredFormatter())
+
+    def emit(self, record):
+        self.gate.wait()
+        self.lines.append(self.format(record))
+
+
+def make_record(msg, kind=None, name='smartkart.RFID Service', level=logging.INFO, lineno=0):
+    record = logging.LogRecord(name, level, __file__, lineno, msg, (), None)
+    if kind is not None:
+        record.kind = kind
+    return record
+
+
+def test_rate_limit():
+    """Test the per-type token bucket and the suppressed count"""
+    now = [0.0]
+    limiter = service_log.RateLimitFilter(rate=5.0, burst=20, clock=lambda: now[0])
+    passed = sum(limiter.filter(make_record(f"Scanned {n}", kind='scan')) for n in range(100))
+    assert passed == 20, f"Burst lets 20 through, got {passed}"
+    assert limiter.filter(make_record("Serial read error", kind='read_error')), "Other types are unaffected"
+    now[0] = 1.0
+    records = [make_record(f"Scanned {n}", kind='scan') for n in range(10)]
+    passed = [record for record in records if limiter.filter(record)]
+    assert len(passed) == 5, "5/s refill"
+    assert passed[0].suppressed == 80 and not hasattr(passed[1], 'suppressed')
+    assert limiter.suppressed == 85
+    assert limiter.pending() == {'scan': 5}
+    assert limiter.pending() == {}
+    # Without a kind, the call site is the type, however the message was built
+    assert sum(limiter.filter(make_record(f"Tick {n}", lineno=7)) for n in range(30)) == 20
+    assert limiter.filter(make_record("Tick", lineno=8)), "Another call site is another type"
+    print("✓ PASS: burst 20, then 5/s; suppressed count reported with the next line")
+
+
+def test_rate_limit_buckets_bounded():
+    """Test that idle buckets are dropped and the bucket count is capped"""
+    now = [0.0]
+    limiter = service_log.RateLimitFilter(rate=5.0, burst=20, clock=lambda: now[0], max_buckets=100)
+    for n in range(10000):
+        now[0] = n * 0.001
+        limiter.filter(make_record(f"Scanned {n}", kind=f"scan-{n}"))
+    assert len(limiter._buckets) == 100, len(limiter._buckets)
+    # Once refilled (burst / rate = 4s idle) a bucket is dropped, unless it
+    # still has a suppressed count to report
+    for _ in range(25):
+        limiter.filter(make_record("Busy", kind='busy'))
+    now[0] += 5.0
+    limiter.filter(make_record("Next", kind='next'))
+    assert set(limiter._buckets) == {'busy', 'next'}
+    assert limiter.pending() == {'busy': 5}
+    print("✓ PASS: 10000 message types tracked in at most 100 buckets; idle ones dropped")
+
+
+def test_stalled_writer_does_not_block():
+    """Test that a stuck writer drops records instead of blocking callers"""
+    handler = ListHandler(stalled=True)
+    log = service_log.ServiceLog(handler=handler, queue_size=50, rate=1e9, burst=10 ** 9)
+    logger = service_log.get_logger('Test')
+    log.start()
+    try:
+        start = time.perf_counter()
+        for n in range(5000):
+            logger.info("Scanned %d", n)
+        elapsed = time.perf_counter() - start
+        assert elapsed < 1.0, f"5000 log calls took {elapsed:.2f}s with a stalled writer"
+        assert log.stats()['dropped'] >= 5000 - 51, log.stats()
+    finally:
+        handler.gate.set()
+        log.stop()
+    assert 0 < len(handler.lines) <= 51
+    assert handler.lines[0] == '[Test] Scanned 0'
+    print(f"✓ PASS: 5000 calls in {elapsed * 1000:.0f}ms against a stalled writer, "
+          f"{log.stats()['dropped']} dropped")
+
+
+def test_signal_level_switch():
+    """Test SIGUSR1/SIGUSR2 stepping the level at runtime"""
+    handler = ListHandler()
+    log = service_log.setup(level='INFO', handler=handler)
+    logger = service_log.get_logger('Test')
+    try:
+        logger.debug("hidden")
+        os.kill(os.getpid(), signal.SIGUSR1)
+        assert log.level == logging.DEBUG
+        logger.debug("shown")
+        os.kill(os.getpid(), signal.SIGUSR2)
+        os.kill(os.getpid(), signal.SIGUSR2)
+        assert log.level == logging.WARNING
+        logger.info("hidden again")
+        logger.warning("warned")
+    finally:
+        service_log.shutdown()
+        signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+        signal.signal(signal.SIGUSR2, signal.SIG_DFL)
+        logging.getLogger(service_log.ROOT).setLevel(logging.INFO)
+    assert handler.lines == [
+        '[Log] Log level DEBUG',
+        'DEBUG [Test] shown',
+        '[Log] Log level INFO',
+        '[Log] Log level WARNING',
+        'WARNING [Test] warned',
+    ], handler.lines
+    print("✓ PASS: SIGUSR1 -> DEBUG, SIGUSR2 x2 -> WARNING")
+
+
+def test_structured_format():
+    """Test key=value fields and the JSON line format"""
+    record = make_record("✓ Scanned: 0A1B2C3D4E")
+    record.fields = {'readers': 'Reader 1, Reader 2', 'reads': 3}
+    record.suppressed = 4
+    text = service_log.StructuredFormatter().format(record)
+    assert text == '[RFID Service] ✓ Scanned: 0A1B2C3D4E readers="Reader 1, Reader 2" reads=3 suppressed=4', text
+    entry = json.loads(service_log.StructuredFormatter(json_lines=True).format(record))
+    assert entry['service'] == 'RFID Service' and entry['level'] == 'INFO'
+    assert entry['readers'] == 'Reader 1, Reader 2' and entry['suppressed'] == 4
+    print("✓ PASS: text and JSON line formats")
+
+
+def main():
+    print("=" * 60)
+    print("Service Logging Tests")
+    print("=" * 60)
+    tests = [
+        test_rate_limit,
+        test_rate_limit_buckets_bounded,
+        test_stalled_writer_does_not_block,
+        test_signal_level_switch,
+        test_structured_format,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Test script for the simulated HX711 and its scenarios (sim_hx711.py).
+"""
+
+import json
+import math
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+import metrics
+from sim_hx711 import ScenarioRunner, SimulatedHX711, load_scenario, shopping_scenario
+from step_detector import StepDetector
+from test_weight_filters import SCALE_FACTOR, ZERO_OFFSET, run_filter
+from weight_filters import make_filter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def make_device(**kwargs):
+    clock = FakeClock()
+    device = SimulatedHX711(ZERO_OFFSET, SCALE_FACTOR, clock=clock, sleep=clock.sleep, **kwargs)
+    return device, clock
+
+
+def kg(series):
+    return np.array([(raw - ZERO_OFFSET) / SCALE_FACTOR for _, raw in series])
+
+
+def test_noise_and_settling():
+    """Test the noise level and an item drop ringing down to its weight"""
+    device, _ = make_device(rate=80, seed=3, spike_rate=0.0, warmup_kg=0.0, creep=0.0)
+    quiet = kg(device.series(10.0))
+    assert len(quiet) == 800
+    assert abs(np.std(quiet) - 0.003) < 0.0005 and abs(np.mean(quiet)) < 0.001
+    device, _ = make_device(rate=80, noise_kg=0.0, spike_rate=0.0, warmup_kg=0.0, creep=0.0)
+    device.add_item('0A1B2C3D4E', 0.5, at=1.0)
+    weights = kg(device.series(5.0))
+    times = np.arange(len(weights)) / 80
+    assert np.all(weights[times < 1.0] == 0.0), "Nothing before the item lands"
+    peak = weights.max()
+    assert 0.6 < peak < 0.9, f"Overshoot to {peak:.3f}kg"
+    settled = times[np.flatnonzero(np.abs(weights - 0.5) > 0.01)[-1]] - 1.0
+    assert 0.5 < settled < 2.0, f"Settled {settled:.2f}s after landing"
+    assert abs(weights[-1] - 0.5) < 1e-4
+    print(f"✓ PASS: 3g noise; 0.5kg drop overshoots to {peak:.2f}kg and settles in {settled:.1f}s")
+
+
+def test_creep_and_drift():
+    """Test creep and warm-up drift, and that settled events are folded without a jump"""
+    device, _ = make_device(rate=10, noise_kg=0.0, spike_rate=0.0, creep=0.01, creep_seconds=60.0,
+                            warmup_kg=0.02, warmup_seconds=300.0)
+    device.add_item('A', 1.0, at=5.0)
+    device.add_item('B', 2.0, at=100.0)
+    device.remove_item('A', at=400.0)
+    series = device.series(1500.0)
+    weights = kg(series)
+    times = np.array([t for t, _ in series])
+
+    def expected(t):
+        load = 0.02 * (1 - math.exp(-t / 300.0))
+        for at, delta in ((5.0, 1.0), (100.0, 2.0), (400.0, -1.0)):
+            if t >= at:
+                load += delta * (1 + 0.01 * (1 - math.exp(-(t - at) / 60.0)))
+        return load
+
+    settled = [index for index, t in enumerate(times) if all(abs(t - at) > 5.0 for at in (5.0, 100.0, 400.0))]
+    error = max(abs(weights[index] - expected(times[index])) for index in settled)
+    assert error < 1e-4, f"{error * 1000:.2f}g from the creep and drift model"
+    assert not device._events, "Settled events folded away"
+    assert abs(weights[-1] - (2.0 * 1.01 + 0.02)) < 1e-3
+    print(f"✓ PASS: creep and warm-up drift follow the model within {error * 1e6:.0f}mg after folding")
+
+
+def test_filter_and_step_detector():
+    """Test that the Kalman chain and the step detector see the simulated drops"""
+    deltas = []
+    for seed in range(10):
+        device, _ = make_device(rate=10, seed=seed, spike_rate=0.01)
+        device.add_item('A', 0.5, at=3.0)
+        device.bump(0.3, at=10.0)
+        device.add_item('B', 1.2, at=15.0)
+        device.remove_item('A', at=22.0)
+        raw = np.array([raw for _, raw in device.series(30.0)])
+        weights = run_filter(make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman'), raw)
+        detector = StepDetector(registry=metrics.Registry())
+        steps = [detector.update(float(weight), n / 10) for n, weight in enumerate(weights)]
+        steps = [step for step in steps if step is not None]
+        assert len(steps) == 3, f"Seed {seed}: {steps}"
+        deltas.append([step.delta for step in steps])
+    assert np.allclose(deltas, [[0.5, 1.2, -0.5]] * 10, atol=0.02), deltas
+    print("✓ PASS: 10 seeds: +0.5, +1.2, -0.5 kg steps found, the bump ignored")
+
+
+def test_read_pacing():
+    """Test that read() blocks for the sample period like the real HX711"""
+    device, clock = make_device(rate=10)
+    for _ in range(50):
+        assert len(device.read()) == 1
+    assert abs(clock.now - 4.9) < 1e-9, clock.now
+    clock.now += 5.0                    # Reader stalled: no burst of catch-up reads
+    device.read()
+    before = clock.now
+    device.read()
+    assert abs(clock.now - before - 0.1) < 1e-9
+    print("✓ PASS: one conversion per sample period")
+
+
+class RecordingReader:
+    """Stands in for an EmulatedReader"""
+
+    def __init__(self):
+        self.calls = []
+
+    def present(self, tag_id, duration=None):
+        self.calls.append(('present', tag_id, duration))
+
+    def script(self, presences):
+        self.calls.extend(('script', tag_id, start) for start, tag_id, _ in presences)
+
+
+def test_scenarios():
+    """Test scenario files, random trips and the runner driving both sides"""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'trip.json')
+        with open(path, 'w') as f:
+            json.dump({'events': [{'at': 0.06, 'action': 'remove', 'tag': 'A'},
+                                  {'at': 0.0, 'action': 'add', 'tag': 'A', 'kg': 0.5, 'reader': 2},
+                                  {'at': 0.03, 'action': 'bump', 'kg': 0.2},
+                                  {'at': 0.09, 'action': 'remove', 'tag': 'B'}]}, f)
+        events = load_scenario(path)
+        with open(path, 'w') as f:
+            json.dump({'events': [{'at': 1.0, 'action': 'add', 'tag': 'A'}]}, f)
+        try:
+            load_scenario(path)
+            assert False, "Add without a weight accepted"
+        except ValueError:
+            pass
+    assert [event.action for event in events] == ['add', 'bump', 'remove', 'remove']
+
+    device = SimulatedHX711(ZERO_OFFSET, SCALE_FACTOR, seed=1)
+    readers = [RecordingReader(), RecordingReader()]
+    runner = ScenarioRunner(events, device, readers, land_delay=0.4).start()
+    assert runner.wait(2.0)
+    assert runner.applied == 3 and runner.skipped == 1, "B was never in the cart"
+    assert readers[0].calls == [('script', 'A', 0.4)]
+    assert readers[1].calls == [('present', 'A', 0.5), ('script', 'A', 0.4)]
+    assert device.items == {} and [delta for _, delta, _ in device._events] == [0.5, 0.0, -0.5]
+
+    products = [(f"TAG{n}", 0.1 * (n + 1)) for n in range(5)]
+    trip = shopping_scenario(products, 200, interval=3.0, remove_share=0.3, seed=8)
+    basket = {}
+    for event in trip:
+        if event.action == 'add':
+            assert event.tag_id not in basket
+            basket[event.tag_id] = event.at
+        else:
+            assert event.at - basket.pop(event.tag_id) >= 2.0
+    assert len(trip) == 200 and 40 < sum(event.action == 'remove' for event in trip) < 100
+    assert 400 < trip[-1].at < 800
+    print("✓ PASS: scenario played on the load cell and the readers; random trip is consistent")
+
+
+def main():
+    print("=" * 60)
+    print("Simulated HX711 Tests")
+    print("=" * 60)
+    tests = [
+        test_noise_and_settling,
+        test_creep_and_drift,
+        test_filter_and_step_detector,
+        test_read_pacing,
+        test_scenarios,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Test script for the weight step detector (step_detector.py).
+"""
+
+import sys
+
+import numpy as np
+
+import metrics
+from step_detector import StepDetector, build_step_payload
+from test_weight_filters import SCALE_FACTOR, ZERO_OFFSET, run_filter, synthetic_signal, to_raw
+from weight_filters import make_filter
+
+RATE = 10.0
+
+
+def detect(weights, **kwargs):
+    """Feed weights at RATE; returns [(time, WeightStep)]"""
+    detector = StepDetector(registry=metrics.Registry(), **kwargs)
+    steps = []
+    for index, weight in enumerate(weights):
+        now = index / RATE
+        step = detector.update(float(weight), now)
+        if step is not None:
+            steps.append((round(now, 2), step))
+    return steps, detector
+
+
+def filtered(kg, seed=5, noise_kg=0.005):
+    """Kalman chain output for a true load profile plus noise"""
+    rng = np.random.default_rng(seed)
+    raw = to_raw(np.asarray(kg, dtype=float) + rng.normal(0, noise_kg, len(kg)))
+    return run_filter(make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman'), raw)
+
+
+def test_item_drops():
+    """Test one step per noisy, overshooting item drop, with its delta and settle time"""
+    deltas = []
+    settle = []
+    chain = make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman')
+    for seed in range(20):
+        times, truth, raw = synthetic_signal(seed=seed)
+        steps, _ = detect(run_filter(chain, raw))
+        assert len(steps) == 1, f"Seed {seed}: {steps}"
+        step = steps[0][1]
+        deltas.append(step.delta)
+        settle.append(step.settle_seconds)
+        assert step.settled and step.confidence > 0.9, step
+        assert 2.8 <= step.started_at <= 3.1, f"Change start {step.started_at:.1f}s (item dropped at 3.0s)"
+    assert max(abs(delta - 0.5) for delta in deltas) < 0.02, deltas
+    assert max(settle) < 2.0, settle
+    print(f"✓ PASS: 20 drops, delta 0.5kg ±{max(abs(d - 0.5) for d in deltas) * 1000:.0f}g, "
+          f"settled in {np.median(settle):.1f}s (worst {max(settle):.1f}s)")
+
+
+def test_add_and_remove_sequence():
+    """Test back-to-back steps in both directions"""
+    profile = [1.0] * 20 + [1.35] * 15 + [1.6] * 20 + [1.25] * 20
+    steps, detector = detect(filtered(profile))
+    assert len(steps) == 3, steps
+    assert np.allclose([step.delta for _, step in steps], [0.35, 0.25, -0.35], atol=0.01), steps
+    assert all(step.confidence > 0.9 for _, step in steps)
+    assert abs(steps[-1][1].after - 1.25) < 0.01 and detector.stats()['steps'] == 3
+    print("✓ PASS: +0.35, +0.25, -0.35 kg steps detected in order")
+
+
+def test_small_step_and_noise():
+    """Test that noise and drift raise nothing and a 30 g step is found with lower confidence"""
+    drifting = np.linspace(1.0, 1.015, 300)           # 15 g over 30 s
+    steps, detector = detect(filtered(drifting, noise_kg=0.008))
+    assert steps == [], steps
+    small = [1.0] * 30 + [1.03] * 30
+    steps, _ = detect(filtered(small, noise_kg=0.008))
+    assert len(steps) == 1 and abs(steps[0][1].delta - 0.03) < 0.008, steps
+    large, _ = detect(filtered([1.0] * 30 + [1.5] * 30, noise_kg=0.008))
+    assert steps[0][1].confidence < large[0][1].confidence, (steps, large)
+    print(f"✓ PASS: drift ignored, 30g step found (confidence {steps[0][1].confidence:.2f} "
+          f"vs {large[0][1].confidence:.2f} for 500g)")
+
+
+def test_unsettled_and_payload():
+    """Test the settle timeout and the weight_step payload"""
+    wobble = [1.0] * 20 + [1.5 + 0.05 * (-1) ** n for n in range(60)]
+    steps, _ = detect(wobble, settle_timeout=2.0)
+    assert len(steps) == 1 and not steps[0][1].settled, steps
+    step = steps[0][1]
+    assert step.confidence <= 0.5 and abs(step.settle_seconds - 2.0) < 0.15
+    payload = build_step_payload('1234', step, '2026-01-01T00:00:00Z')
+    assert payload['cartId'] == '1234' and payload['settled'] is False
+    assert set(payload) == {'cartId', 'delta', 'weightBefore', 'weightAfter', 'settleSeconds',
+                            'confidence', 'settled', 'timestamp'}
+    print("✓ PASS: unsettled step reported after the timeout at half confidence")
+
+
+def main():
+    print("=" * 60)
+    print("Weight Step Detector Tests")
+    print("=" * 60)
+    tests = [
+        test_item_drops,
+        test_add_and_remove_sequence,
+        test_small_step_and_noise,
+        test_unsettled_and_payload,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Test script for the reader supervisor (supervisor.py) and its use by the
+read loops, with failover times measured against emulated readers.
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import rfid_service
+from rdm6300 import FrameDecoder, encode_frame
+from rdm6300_emulator import EmulatedReader
+from supervisor import ReaderSupervisor, DOWN, OK, QUARANTINED, format_health
+
+
+class Clock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Port:
+    """Stand-in serial handle that records close()"""
+
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def wait_for(condition, timeout=5.0):
+    """Poll condition() until true; returns the seconds it took"""
+    start = time.monotonic()
+    while not condition():
+        if time.monotonic() - start > timeout:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.005)
+    return time.monotonic() - start
+
+
+def test_health_faults_and_quarantine():
+    """Test garbage detection, immediate reopen, backoff and quarantine"""
+    with tempfile.NamedTemporaryFile() as port:
+        clock = Clock()
+        decoders = {'reader1': FrameDecoder()}
+        opened = []
+
+        def open_reader(path, label):
+            opened.append(Port())
+            return opened[-1]
+
+        sup = ReaderSupervisor([('reader1', 'Reader 1', port.name)], decoders, open_reader,
+                               [('reader1', 'Reader 1', Port())], check_interval=1.0,
+                               reopen_backoff=0.5, quarantine_after=3, quarantine_seconds=60, clock=clock)
+        decoder = decoders['reader1']
+
+        def second(data):
+            decoder.feed(data)
+            decoder.decode_all()
+            clock.now += 1.0
+            sup.check()
+
+        second(encode_frame('0A1B2C3D4E') * 10)
+        second(encode_frame('0A1B2C3D4E') * 10)
+        assert sup.health()['reader1']['state'] == OK
+        assert sup.health()['reader1']['valid_ratio'] == 1.0
+
+        second(b'\xff' * 200)                       # Garbage on the line
+        health = sup.health()['reader1']
+        assert health['state'] == DOWN and health['last_fault'] == 'garbage', health
+        assert sup.readers() == []
+        sup.check()
+        assert len(opened) == 1 and sup.readers()[0][2] is opened[0], "First reopen is immediate"
+        assert sup.health()['reader1']['last_recovery'] == 0.0
+
+        second(b'')                                 # Fresh baseline after the reopen
+        second(b'\xff' * 200)
+        assert sup.next_deadline() == clock.now + 0.5, "Second reopen waits reopen_backoff"
+        clock.now += 0.5
+        sup.check()
+        second(b'')
+        second(b'\xff' * 200)
+        health = sup.health()['reader1']
+        assert health['state'] == QUARANTINED and health['faults'] == 3, health
+        assert opened[-1].closed
+        clock.now += 59
+        sup.check()
+        assert len(opened) == 2, "Left closed during quarantine"
+        clock.now += 1
+        sup.check()
+        assert len(opened) == 3 and sup.health()['reader1']['state'] == OK
+    print(f"✓ PASS: garbage faulted, reopened, quarantined after 3 ({format_health(health)})")
+
+
+def test_checksum_and_read_error_faults():
+    """Test the checksum rate check and faults reported by the read loop"""
+    with tempfile.NamedTemporaryFile() as port:
+        clock = Clock()
+        decoders = {'reader1': FrameDecoder()}
+        first = Port()
+        sup = ReaderSupervisor([('reader1', 'Reader 1', port.name)], decoders, lambda path, label: Port(),
+                               [('reader1', 'Reader 1', first)], clock=clock)
+        generation = sup.generation
+        assert sup.fault('reader1', 'read_error', OSError(5, 'Input/output error'))
+        assert first.closed and sup.generation != generation
+        assert not sup.fault('reader1', 'read_error'), "Already closed"
+        sup.check()
+        decoder = decoders['reader1']
+        clock.now += 1
+        sup.check()
+        decoder.feed(encode_frame('0A1B2C3D4E') + encode_frame('0A1B2C3D4E', checksum=0) * 5)
+        decoder.decode_all()
+        clock.now += 1
+        sup.check()
+        health = sup.health()['reader1']
+    assert health['last_fault'] == 'bad_checksum' and health['faults'] == 2, health
+    assert abs(health['checksum_rate'] - 5 / 6) < 1e-9
+    print("✓ PASS: read error and checksum rate faults")
+
+
+def supervised_loop(loop, emulators, check_interval=0.1, **options):
+    """
+    Run a read loop over the emulators with a supervisor, the way main() does.
+
+    Returns:
+        tuple: (supervisor, decoders, seen, stop, thread)
+    """
+    ports = [(f"reader{index}", f"Reader {index}", emulator.path)
+             for index, emulator in enumerate(emulators, start=1)]
+    readers = rfid_service.initialize_readers([emulator.path for emulator in emulators])
+    decoders = {}
+    sup = ReaderSupervisor(ports, decoders, rfid_service.initialize_reader, readers,
+                           check_interval=check_interval, **options)
+    rfid_service.supervisor = sup
+    seen = []
+    stop = threading.Event()
+
+    def on_tick():
+        sup.check()
+        return sup.next_deadline()
+
+    thread = threading.Thread(
+        target=loop, args=(sup.readers(), decoders, lambda label, tags: seen.extend((label, t) for t in tags),
+                           stop, on_tick))
+    thread.start()
+    return sup, decoders, seen, stop, thread
+
+
+def finish(sup, stop, thread):
+    stop.set()
+    thread.join()
+    rfid_service.supervisor = None
+    sup.close()
+
+
+def count(seen, label):
+    return sum(1 for reader, _ in seen if reader == label)
+
+
+def test_unplug_and_replug_failover():
+    """Test that an unplugged reader is dropped and reopened in place (select loop)"""
+    with tempfile.TemporaryDirectory() as directory:
+        links = [os.path.join(directory, f'rdm6300-{n}') for n in (1, 2)]
+        first = EmulatedReader('reader1', link=links[0], seed=1).start()
+        second = EmulatedReader('reader2', link=links[1], seed=2).start()
+        sup, decoders, seen, stop, thread = supervised_loop(rfid_service.select_readers, [first, second])
+        try:
+            first.present('0A1B2C3D4E')
+            second.present('1122334455')
+            wait_for(lambda: count(seen, 'Reader 1') and count(seen, 'Reader 2'))
+
+            first.stop()                            # USB adapter unplugged
+            detect = wait_for(lambda: sup.health()['reader1']['state'] != OK)
+            before = count(seen, 'Reader 2')
+            time.sleep(0.2)
+            assert count(seen, 'Reader 2') > before, "Other reader kept reading"
+
+            first = EmulatedReader('reader1', link=links[0], seed=3).start()   # Plugged back in
+            replugged = time.monotonic()
+            wait_for(lambda: sup.health()['reader1']['state'] == OK)
+            first.present('0A1B2C3D4E')
+            before = count(seen, 'Reader 1')
+            wait_for(lambda: count(seen, 'Reader 1') > before)
+            restore = time.monotonic() - replugged
+        finally:
+            finish(sup, stop, thread)
+            first.stop()
+            second.stop()
+    health = sup.health()['reader1']
+    assert health['reopens'] == 1 and health['faults'] == 1, health
+    assert detect < 1.0 and restore < 2.0, (detect, restore)
+    print(f"✓ PASS: unplug detected in {detect * 1000:.0f}ms ({health['last_fault']}), "
+          f"reading again {restore * 1000:.0f}ms after replug")
+
+
+def test_corrupt_reader_quarantined():
+    """Test that a reader sending corrupted frames is quarantined (threads loop)"""
+    first = EmulatedReader('reader1', seed=1).start()
+    second = EmulatedReader('reader2', seed=2).start()
+    sup, decoders, seen, stop, thread = supervised_loop(
+        rfid_service.thread_readers, [first, second], quarantine_after=2, reopen_backoff=0.1)
+    try:
+        first.present('0A1B2C3D4E')
+        second.present('1122334455')
+        wait_for(lambda: count(seen, 'Reader 1') and count(seen, 'Reader 2'))
+
+        first.noise = 0.5                           # Reader starts sending corrupted frames
+        first.bad_checksum = 1.0
+        detect = wait_for(lambda: sup.health()['reader1']['faults'] >= 1)
+        quarantine = wait_for(lambda: sup.health()['reader1']['state'] == QUARANTINED) + detect
+        before = count(seen, 'Reader 2')
+        time.sleep(0.2)
+        assert count(seen, 'Reader 2') > before, "Other reader kept reading"
+        assert [reader_id for reader_id, _, _ in sup.readers()] == ['reader2']
+    finally:
+        finish(sup, stop, thread)
+        first.stop()
+        second.stop()
+    assert sup.health()['reader1']['last_fault'] == 'bad_checksum'
+    assert detect < 0.5 and quarantine < 1.5, (detect, quarantine)
+    print(f"✓ PASS: corrupted frames detected in {detect * 1000:.0f}ms, quarantined after {quarantine * 1000:.0f}ms")
+
+
+def main():
+    print("=" * 60)
+    print("Reader Supervisor Tests")
+    print("=" * 60)
+    tests = [
+        test_health_faults_and_quarantine,
+        test_checksum_and_read_error_faults,
+        test_unplug_and_replug_failover,
+        test_corrupt_reader_quarantined,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test script for change-driven weight_update emission (weight_emitter.py).
+"""
+
+import sys
+
+import numpy as np
+
+import metrics
+from test_weight_filters import SCALE_FACTOR, ZERO_OFFSET, run_filter, synthetic_signal
+from weight_emitter import FIRST, HEARTBEAT, INTERVAL, STEP, UNSETTLED, WeightEmitter, format_stats
+from weight_filters import make_filter
+
+POLL = 0.1
+
+
+def make_emitter(**kwargs):
+    kwargs.setdefault('heartbeat', 30.0)
+    return WeightEmitter(registry=metrics.Registry(), clock=lambda: 0.0, **kwargs)
+
+
+def feed(emitter, samples, start=0.0):
+    """Poll every POLL seconds; returns [(time, weight, reason)] for the samples sent"""
+    sent = []
+    for index, weight in enumerate(samples):
+        now = start + index * POLL
+        reason = emitter.decide(weight, now)
+        if reason is not None:
+            emitter.mark_sent(weight, reason, now)
+            sent.append((round(now, 3), weight, reason))
+    return sent
+
+
+def test_steady_weight_held():
+    """Test that noise inside the dead-band is held and only heartbeats go out"""
+    emitter = make_emitter(deadband=0.02, heartbeat=30.0)
+    rng = np.random.default_rng(3)
+    sent = feed(emitter, 1.0 + rng.normal(0, 0.004, 1200))      # Two minutes at 10 polls/s
+    assert [reason for _, _, reason in sent] == [FIRST, HEARTBEAT, HEARTBEAT, HEARTBEAT], sent
+    assert emitter.saved >= 110, "Fixed 1s rate would have sent 120"
+    print(f"✓ PASS: steady cart sent {emitter.sent} updates in 120s, {emitter.saved} saved")
+
+
+def test_step_sent_once_settled():
+    """Test that a step goes out once, after it settles, with its delivery latency"""
+    emitter = make_emitter(deadband=0.02, settle_kg=0.01, settle_seconds=0.3)
+    ramp = [0.0] * 10 + [0.2, 0.45, 0.52, 0.5, 0.5, 0.5, 0.5] + [0.5] * 20
+    sent = feed(emitter, ramp)
+    assert [(weight, reason) for _, weight, reason in sent] == [(0.0, FIRST), (0.5, STEP)], sent
+    assert sent[1][0] == 1.6, "Settled at 1.3s, sent 0.3s later"
+    delivery = emitter.stats()['step_delivery']
+    assert delivery['count'] == 1 and 0.6 <= delivery['p50'] <= 0.7, delivery
+    # A blip that comes back inside the band before settling is never sent
+    sent = feed(emitter, [0.5, 0.53, 0.5, 0.5, 0.5], start=10.0)
+    assert sent == []
+    print("✓ PASS: step sent once after settling, delivery latency recorded, blip held")
+
+
+def test_unsettled_and_fixed_rate():
+    """Test the settle timeout and the deadband 0 fixed-rate mode"""
+    emitter = make_emitter(deadband=0.02, settle_kg=0.01, settle_seconds=0.3, settle_timeout=2.0)
+    wobble = [0.0] + [0.5 + 0.05 * (-1) ** n for n in range(40)]
+    sent = feed(emitter, wobble)
+    assert [reason for _, _, reason in sent] == [FIRST, UNSETTLED], sent
+    assert sent[1][0] == 2.1, "Sent 2s after leaving the dead-band"
+    emitter = make_emitter(deadband=0, interval=1.0)
+    sent = feed(emitter, [1.0] * 31)
+    assert [reason for _, _, reason in sent] == [FIRST] + [INTERVAL] * 3 and emitter.saved == 0
+    print("✓ PASS: unsettled change sent after the timeout; deadband 0 sends every interval")
+
+
+def test_item_drops_end_to_end():
+    """Test the emitter on the filtered weight of noisy item drops"""
+    filter_chain = make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman')
+    steps = []
+    for seed in range(10):
+        times, truth, raw = synthetic_signal(seed=seed)
+        estimates = run_filter(filter_chain, raw)
+        emitter = make_emitter(deadband=0.02)
+        sent = feed(emitter, estimates)
+        reasons = [reason for _, _, reason in sent]
+        assert reasons[0] == FIRST and reasons.count(STEP) + reasons.count(UNSETTLED) >= 1, sent
+        assert len(sent) <= 4, f"Seed {seed}: {sent}"
+        final = sent[-1][1]
+        assert abs(final - 0.5) < 0.03, f"Seed {seed}: settled update {final:.3f}kg"
+        steps.append(next(at for at, _, reason in sent if reason != FIRST) - 3.0)
+    stats = format_stats(emitter.stats())
+    assert 'saved' in stats
+    assert max(steps) < 2.5, steps
+    print(f"✓ PASS: 10 item drops, step delivered {np.median(steps):.1f}s after the drop (worst {max(steps):.1f}s)")
+
+
+def main():
+    print("=" * 60)
+    print("Weight Emitter Tests")
+    print("=" * 60)
+    tests = [
+        test_steady_weight_held,
+        test_step_sent_once_settled,
+        test_unsettled_and_fixed_rate,
+        test_item_drops_end_to_end,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
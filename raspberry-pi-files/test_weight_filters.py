@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for the weight filter chain (weight_filters.py).
+"""
+
+import random
+import sys
+
+import numpy as np
+
+from weight_filters import (
+    AdaptiveWindow, Calibrate, Despike, Ema, FilterChain, Kalman, MeanFilter, RangeReject, make_filter)
+
+ZERO_OFFSET = -121613.47
+SCALE_FACTOR = 14.16
+RATE = 10.0          # HX711 samples per second
+
+
+def to_raw(kg):
+    return kg * SCALE_FACTOR + ZERO_OFFSET
+
+
+def to_weight(raw):
+    return max(0.0, (raw - ZERO_OFFSET) / SCALE_FACTOR)
+
+
+def synthetic_signal(seconds=8.0, rate=RATE, step_at=3.0, step_kg=0.5, noise_kg=0.01,
+                     spike_rate=0.02, overshoot=0.3, seed=711):
+    """
+    Load cell samples for an item dropped into the cart.
+
+    The true load steps from 0 to step_kg at step_at, with a damped
+    overshoot as the item settles; Gaussian noise and occasional large
+    spikes are added.
+
+    Returns:
+        tuple: (times, true kg, raw samples) NumPy arrays
+    """
+    rng = random.Random(seed)
+    times = np.arange(int(seconds * rate)) / rate
+    after = np.clip(times - step_at, 0, None)
+    settling = overshoot * np.exp(-after / 0.25) * np.cos(2 * np.pi * 3 * after)
+    truth = np.where(times >= step_at, step_kg, 0.0)
+    measured = truth + np.where(times >= step_at, step_kg * settling, 0.0)
+    measured = measured + np.array([rng.gauss(0, noise_kg) for _ in times])
+    for index in range(len(times)):
+        if rng.random() < spike_rate:
+            measured[index] += rng.choice((-1, 1)) * rng.uniform(0.5, 3.0)
+    return times, truth, to_raw(measured)
+
+
+def run_filter(weight_filter, raw):
+    """Feed samples one by one, like the sampler; returns the estimate after each"""
+    estimates = []
+    for end in range(1, len(raw) + 1):
+        estimate = weight_filter(raw[max(0, end - weight_filter.history):end])
+        estimates.append(np.nan if estimate is None else estimate)
+    return np.array(estimates)
+
+
+def step_latency(times, truth, estimates, step_at, tolerance=0.02):
+    """Seconds after the step until the estimate stays within tolerance of the truth"""
+    outside = np.flatnonzero((times >= step_at) & ~(np.abs(estimates - truth) <= tolerance))
+    if not len(outside):
+        return 0.0
+    return times[outside[-1]] + 1 / RATE - step_at
+
+
+def test_despike():
+    """Test that spikes are replaced and a real step is kept"""
+    values = np.array([1.0, 1.01, 0.99, 5.0, 1.0, 1.02, 0.98, 1.0])
+    cleaned = Despike()(values)
+    assert abs(cleaned[3] - 1.0) < 0.02 and np.allclose(np.delete(cleaned, 3), np.delete(values, 3))
+    newest = Despike()(np.array([1.0, 1.01, 0.99, 1.0, 1.02, 7.0]))
+    assert newest[-1] < 1.1, "Spike in the newest sample caught at once"
+    step = np.array([1.0, 1.01, 0.99, 1.0, 2.0, 2.01, 1.99, 2.0])
+    assert np.allclose(Despike()(step), step), "Step is not a spike"
+    assert len(RangeReject()(np.array([0.5, 1e6, -1e6, 0.7]))) == 2
+    print("✓ PASS: spikes replaced by the rolling median, steps kept")
+
+
+def test_back_to_back_spikes():
+    """Test that two spikes in a row at the newest end are not taken for a step"""
+    base = [0.5, 0.51, 0.49, 0.5, 0.52, 0.48, 0.5]
+    for pair in ((2.8, 1.5), (-1.2, 1.9), (3.0, 3.0)):
+        for after in range(3):
+            values = np.array(base + list(pair) + [0.5] * after)
+            cleaned = Despike()(values)
+            assert np.all(np.abs(cleaned - 0.5) < 0.03), (pair, after, cleaned)
+    # Through the whole chain, fed one sample at a time: an empty cart and a
+    # loaded one read their load at every sample
+    chain = make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman')
+    for load in (0.0, 0.5):
+        kg = [load] * 10 + [load + 2.8, load + 1.5] + [load] * 10 + [load - 1.2, load + 1.9] + [load] * 10
+        estimates = run_filter(chain, to_raw(np.array(kg)))
+        assert np.all(np.abs(estimates - load) < 0.01), (load, estimates)
+    # A real step still gets through, once it is most of the newest window
+    stepped = run_filter(chain, to_raw(np.array([0.0] * 10 + [0.5] * 5)))
+    assert stepped[11] < 0.01 and abs(stepped[-1] - 0.5) < 0.01, stepped
+    print("✓ PASS: back-to-back spikes at the newest end rejected; a held step still passes")
+
+
+def test_adaptive_window():
+    """Test that the window shrinks after a step and grows back"""
+    window = AdaptiveWindow(min_samples=3, max_samples=32, step=0.03)
+    stable = np.full(40, 1.0)
+    assert len(window(stable)) == 32
+    stepped = np.concatenate([np.full(30, 1.0), np.full(4, 1.5)])
+    assert len(window(stepped)) == 4, "Only the samples since the step"
+    assert len(window(np.concatenate([np.full(30, 1.0), np.full(1, 1.5)]))) == 3, "Never below min_samples"
+    print("✓ PASS: window shrinks to the samples since a step")
+
+
+def test_ema_and_kalman_weights():
+    """Test the vectorized estimators against their recursive definitions"""
+    rng = np.random.default_rng(1)
+    values = rng.normal(1.0, 0.02, 25)
+    kalman = Kalman()
+    estimate, variance = values[0], kalman.measurement_var
+    for value in values[1:]:
+        prior = variance + kalman.process_var
+        gain = prior / (prior + kalman.measurement_var)
+        estimate += gain * (value - estimate)
+        variance = (1 - gain) * prior
+    assert abs(kalman(values)[0] - estimate) < 1e-12
+    ema = Ema(0.25)
+    weights = 0.75 ** np.arange(24, -1, -1)
+    assert abs(ema(values)[0] - np.dot(weights, values) / weights.sum()) < 1e-12
+    assert abs(Ema(0.25)(np.array([1.0, 2.0]))[0] - (0.75 + 2.0) / 1.75) < 1e-12
+    print("✓ PASS: EMA and Kalman weights match the recursions")
+
+
+def test_chain_beats_plain_mean():
+    """Test spike rejection, noise and step response against the old 5-sample mean"""
+    times, truth, raw = synthetic_signal()
+    old = run_filter(MeanFilter(to_weight), raw)
+    new = run_filter(make_filter(ZERO_OFFSET, SCALE_FACTOR, 'kalman'), raw)
+    stable = (times >= 5.0)
+    old_error = np.abs(old - truth)[stable].max()
+    new_error = np.abs(new - truth)[stable].max()
+    old_latency = step_latency(times, truth, old, 3.0)
+    new_latency = step_latency(times, truth, new, 3.0)
+    assert new_error < 0.03, f"Settled error {new_error:.3f}kg"
+    assert old_error > 0.1, f"Baseline should show the spikes ({old_error:.3f}kg)"
+    assert new_latency <= old_latency, (new_latency, old_latency)
+    assert new_latency < 1.5, f"Step response {new_latency:.1f}s"
+    print(f"✓ PASS: settled error {new_error * 1000:.0f}g vs {old_error * 1000:.0f}g, "
+          f"step settles in {new_latency:.1f}s vs {old_latency:.1f}s")
+
+
+def test_chain_output():
+    """Test calibration, clamping at zero and the no-sample case"""
+    chain = FilterChain([Calibrate(ZERO_OFFSET, SCALE_FACTOR), RangeReject(), Ema()])
+    assert abs(chain([to_raw(0.25)] * 4) - 0.25) < 1e-9
+    assert chain([to_raw(-0.01)] * 4) == 0.0, "Clamped once, at the end"
+    assert chain([to_raw(500.0)]) is None, "Nothing survived the range check"
+    assert make_filter(ZERO_OFFSET, SCALE_FACTOR, 'mean').history == 5
+    try:
+        make_filter(ZERO_OFFSET, SCALE_FACTOR, 'lowpass')
+        assert False, "Unknown filter accepted"
+    except ValueError:
+        pass
+    print("✓ PASS: chain output calibrated, clamped and None without samples")
+
+
+def main():
+    print("=" * 60)
+    print("Weight Filter Tests")
+    print("=" * 60)
+    tests = [
+        test_despike,
+        test_back_to_back_spikes,
+        test_adaptive_window,
+        test_ema_and_kalman_weights,
+        test_chain_beats_plain_mean,
+        test_chain_output,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
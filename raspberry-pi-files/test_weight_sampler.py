@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Test script for the background HX711 sampler (weight_sampler.py) and the
+non-blocking weight_sensor.get_weight().
+"""
+
+import sys
+import threading
+import time
+
+import weight_sensor
+from weight_filters import MeanFilter
+from weight_sampler import HX711Sampler, SampleRing
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("Timed out waiting for condition")
+        time.sleep(0.001)
+
+
+def test_ring_wraps():
+    """Test ring order, wrap-around and last(n)"""
+    ring = SampleRing(8)
+    assert ring.latest() is None and ring.last() == []
+    for n in range(20):
+        ring.append(n * 10.0, float(n))
+    assert len(ring) == 8 and ring.count == 20
+    assert ring.latest() == (19.0, 190.0)
+    assert ring.last(3) == [(17.0, 170.0), (18.0, 180.0), (19.0, 190.0)]
+    assert [value for _, value in ring.last()] == [n * 10.0 for n in range(12, 20)]
+    assert len(ring.last(100)) == 8
+    assert list(ring.values(3)) == [170.0, 180.0, 190.0]
+    assert list(ring.values()) == [value for _, value in ring.last()], "values() across the wrap"
+    try:
+        SampleRing(100)
+        assert False, "Non power of two accepted"
+    except ValueError:
+        pass
+    print("✓ PASS: ring keeps the newest 8 of 20 samples in order")
+
+
+def test_lock_free_readers():
+    """Test that readers never see a torn or out-of-order copy while the writer laps them"""
+    ring = SampleRing(16)
+    stop = threading.Event()
+
+    def writer():
+        n = 0
+        while not stop.is_set():
+            ring.append(n * 2.0, float(n))
+            n += 1
+
+    thread = threading.Thread(target=writer)
+    thread.start()
+    copies = 0
+    try:
+        deadline = time.monotonic() + 0.3
+        while time.monotonic() < deadline:
+            samples = ring.last()
+            for timestamp, value in samples:
+                assert value == timestamp * 2.0, "Torn sample"
+            times = [timestamp for timestamp, _ in samples]
+            assert times == sorted(times) and len(set(times)) == len(times), "Out of order copy"
+            copies += 1
+    finally:
+        stop.set()
+        thread.join()
+    print(f"✓ PASS: {copies} lock-free copies during {ring.count} writes, none torn")
+
+
+def test_get_weight_never_blocks():
+    """Test that the weight is read without waiting for a slow conversion"""
+    release = threading.Event()
+    calls = []
+
+    def slow_read():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait()            # Every read after the first takes "forever"
+        return [100.0, 110.0, 120.0, 130.0, 140.0]
+
+    sampler = HX711Sampler(slow_read, MeanFilter(lambda raw: raw / 100.0)).start()
+    try:
+        wait_for(lambda: sampler.get_weight() is not None)
+        start = time.perf_counter()
+        for _ in range(1000):
+            weight = sampler.get_weight()
+        per_call = (time.perf_counter() - start) / 1000
+        assert weight == 1.2, weight
+        samples = sampler.get_raw_samples(5)
+        assert [raw for _, raw in samples] == [100.0, 110.0, 120.0, 130.0, 140.0]
+        times = [timestamp for timestamp, _ in samples]
+        assert times == sorted(times) and times[-1] - times[0] > 0, "Conversions spaced at the ADC rate"
+    finally:
+        release.set()
+        sampler.stop()
+    assert per_call < 1e-4, f"get_weight() took {per_call * 1e6:.1f}us"
+    print(f"✓ PASS: get_weight() in {per_call * 1e6:.2f}us while the HX711 read blocks")
+
+
+def test_data_ready_and_errors():
+    """Test data-ready gating and read error counting"""
+    ready = threading.Event()
+    results = [RuntimeError("HX711 returned no data"), [500.0]]
+
+    def read():
+        result = results.pop(0) if results else [500.0]
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    sampler = HX711Sampler(read, MeanFilter(lambda raw: raw / 100.0), data_ready=ready)
+    sampler.start()
+    try:
+        time.sleep(0.05)
+        assert sampler.reads == 0 and sampler.errors == 0, "No read before the data-ready edge"
+        ready.set()                    # Edge: this read fails
+        wait_for(lambda: sampler.errors == 1)
+        ready.set()
+        wait_for(lambda: sampler.get_weight() == 5.0)
+        assert sampler.stats()['samples'] == 1
+    finally:
+        sampler.stop()
+    print("✓ PASS: reads wait for data-ready; a failed read is counted and retried")
+
+
+def test_throttle_cut_short():
+    """Test that lowering the throttle ends an idle wait at once"""
+    sampler = HX711Sampler(lambda: [100.0], MeanFilter(lambda raw: raw / 100.0))
+    sampler.throttle = 5.0
+    sampler.start()
+    try:
+        wait_for(lambda: sampler.reads == 1)
+        time.sleep(0.05)
+        assert sampler.reads == 1, "Throttled: no read for 5s"
+        start = time.monotonic()
+        sampler.throttle = 0.0          # Cart active again
+        wait_for(lambda: sampler.reads > 10)
+        elapsed = time.monotonic() - start
+    finally:
+        sampler.stop()
+    assert elapsed < 1.0, f"Full rate after {elapsed:.2f}s"
+    print(f"✓ PASS: throttled wait cut short, full rate {elapsed * 1000:.0f}ms after activity")
+
+
+def test_weight_sensor_sampler():
+    """Test the weight_sensor sampler API in simulation mode"""
+    if weight_sensor.REAL_HARDWARE:
+        print("- SKIP: real hardware present")
+        return
+    assert weight_sensor.get_raw_samples() == []
+    simulated = weight_sensor.simulated
+    settled = time.monotonic() - 10.0       # Long enough ago to have stopped ringing
+    simulated.add_item('TEST', 0.35, at=settled)
+    spike_rate, simulated.spike_rate = simulated.spike_rate, 0.0
+    weight_sensor.start_sampler()
+    try:
+        wait_for(lambda: len(weight_sensor.get_raw_samples()) >= 2)
+        weight = weight_sensor.get_weight()
+        assert 0.3 <= weight <= 0.4, weight
+        raw = weight_sensor.get_raw_samples(2)
+        assert all(0.3 <= weight_sensor.raw_to_weight(value) <= 0.4 for _, value in raw)
+    finally:
+        weight_sensor.stop_sampler()
+        simulated.remove_item('TEST', at=settled)
+        simulated.spike_rate = spike_rate
+    assert weight_sensor.sampler is None
+    print(f"✓ PASS: simulated sampler running, get_weight() = {weight:.3f}kg")
+
+
+def main():
+    print("=" * 60)
+    print("HX711 Sampler Tests")
+    print("=" * 60)
+    tests = [
+        test_ring_wraps,
+        test_lock_free_readers,
+        test_get_weight_never_blocks,
+        test_data_ready_and_errors,
+        test_throttle_cut_short,
+        test_weight_sensor_sampler,
+    ]
+    for test in tests:
+        test()
+    print("=" * 60)
+    print("All tests passed! ✓")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except AssertionError as e:
+        print(f"\n✗ FAIL: {e}")
+        sys.exit(1)
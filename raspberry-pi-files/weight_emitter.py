@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+"""
+Weight Update Emitter for SmartKart
+Decides when the weight service sends a weight_update: on a settled change
+outside a dead-band, otherwise only as a low-rate heartbeat
+
+Every weight_update costs the backend a Cart.findOne, a cart.save() and an
+io.emit broadcast, so sending one per WEIGHT_UPDATE_INTERVAL from every
+parked cart was most of the database write load. The emitter polls the
+sampler's filtered weight cheaply and sends only:
+
+- first      the first weight after start
+- step       the weight left the dead-band around the last value sent and
+             then stayed within settle_kg for settle_seconds
+- unsettled  the weight has been outside the dead-band for settle_timeout
+             without settling (someone leaning on the cart): sent anyway so
+             the backend's scan check never waits on it for long
+- heartbeat  nothing sent for heartbeat seconds (liveness, and a refresh
+             for a backend that restarted)
+
+The backend keeps the last measuredWeight, so a held sample loses nothing.
+
+With deadband 0 the emitter sends every `interval` seconds (the previous
+fixed-rate behavior). Messages saved are counted against that fixed rate;
+step delivery latency is measured from the first sample outside the
+dead-band to the send.
+"""
+
+import os
+import time
+
+import metrics
+
+# Settled weight must differ from the last one sent by this much; 0 sends
+# at the fixed WEIGHT_UPDATE_INTERVAL instead
+WEIGHT_DEADBAND_KG = float(os.getenv('WEIGHT_DEADBAND', '0.02'))
+WEIGHT_SETTLE_KG = 0.01         # Max movement while settling
+WEIGHT_SETTLE_SECONDS = 0.3     # Time within WEIGHT_SETTLE_KG before a change is sent
+WEIGHT_SETTLE_TIMEOUT = 2.0     # Send an unsettled change after this long
+WEIGHT_HEARTBEAT = float(os.getenv('WEIGHT_HEARTBEAT', '30'))
+
+FIRST = 'first'
+STEP = 'step'
+UNSETTLED = 'unsettled'
+HEARTBEAT = 'heartbeat'
+INTERVAL = 'interval'
+
+
+class WeightEmitter:
+    """Change-driven weight_update decisions for one cart"""
+
+    def __init__(self, deadband=WEIGHT_DEADBAND_KG, settle_kg=WEIGHT_SETTLE_KG,
+                 settle_seconds=WEIGHT_SETTLE_SECONDS, settle_timeout=WEIGHT_SETTLE_TIMEOUT,
+                 heartbeat=WEIGHT_HEARTBEAT, interval=1.0, registry=None, clock=time.monotonic):
+        """
+        Args:
+            deadband (float): kg a settled weight must move before it is sent;
+                0 sends every `interval` seconds
+            settle_kg (float): Max movement (kg) while settling
+            settle_seconds (float): Time within settle_kg before a change is sent
+            settle_timeout (float): Seconds outside the dead-band before an
+                unsettled weight is sent anyway
+            heartbeat (float): Max seconds between updates; 0 disables
+            interval (float): The fixed-rate sender's period (baseline for
+                messages saved)
+            registry (metrics.Registry): Where the counters live (default: metrics.REGISTRY)
+            clock (callable): Monotonic time source (for tests)
+        """
+        registry = registry if registry is not None else metrics.REGISTRY
+        self.deadband = deadband
+        self.settle_kg = settle_kg
+        self.settle_seconds = settle_seconds
+        self.settle_timeout = settle_timeout
+        self.heartbeat = heartbeat
+        self.interval = interval
+        self._clock = clock
+        self._started = clock()
+        self.last_sent = None       # kg
+        self._sent_at = None
+        self._changed_at = None     # First sample outside the dead-band
+        self._anchor = None         # Start of the current settling run
+        self._anchor_at = None
+        self.sent = 0
+        self.saved = 0
+        self.reasons = {}
+        self._updates = registry.counter('smartkart_weight_updates_total', 'weight_update messages sent', ['reason'])
+        self._saved_counter = registry.counter(
+            'smartkart_weight_updates_saved_total', 'weight_update messages not sent compared to the fixed-rate sender')
+        self._step_delivery = registry.histogram(
+            'smartkart_weight_step_delivery_seconds',
+            'Time from a weight change leaving the dead-band to its weight_update')
+
+    def decide(self, weight, now=None):
+        """
+        Look at one filtered sample.
+
+        Args:
+            weight (float): kg
+            now (float): time.monotonic() of the sample (default: now)
+
+        Returns:
+            str: Reason to send (FIRST, STEP, UNSETTLED, HEARTBEAT or
+                INTERVAL), or None to hold the sample
+        """
+        if now is None:
+            now = self._clock()
+        self._count_saved(now)
+        if self.last_sent is None:
+            return FIRST
+        if not self.deadband:
+            return INTERVAL if now - self._sent_at >= self.interval else None
+
+        if self._anchor is None or abs(weight - self._anchor) > self.settle_kg:
+            self._anchor, self._anchor_at = weight, now
+        if abs(weight - self.last_sent) >= self.deadband:
+            if self._changed_at is None:
+                self._changed_at = now
+            if now - self._anchor_at >= self.settle_seconds:
+                return STEP
+            if now - self._changed_at >= self.settle_timeout:
+                return UNSETTLED
+        else:
+            self._changed_at = None     # Back inside the band before it settled
+        if self.heartbeat and now - self._sent_at >= self.heartbeat:
+            return HEARTBEAT
+        return None
+
+    def mark_sent(self, weight, reason, now=None):
+        """
+        Record a weight_update that was sent (or journaled for replay).
+
+        Args:
+            weight (float): kg sent
+            reason (str): decide()'s reason
+            now (float): time.monotonic() of the send (default: now)
+        """
+        if now is None:
+            now = self._clock()
+        if reason in (STEP, UNSETTLED) and self._changed_at is not None:
+            self._step_delivery.record(now - self._changed_at)
+        self.last_sent = weight
+        self._sent_at = now
+        self._changed_at = None
+        self.sent += 1
+        self.reasons[reason] = self.reasons.get(reason, 0) + 1
+        self._updates.labels(reason).inc()
+
+    def _count_saved(self, now):
+        due = int((now - self._started) / self.interval) if self.interval > 0 else 0
+        saved = max(self.saved, due - self.sent)
+        if saved > self.saved:
+            self._saved_counter.inc(saved - self.saved)
+            self.saved = saved
+
+    def stats(self):
+        """
+        Returns:
+            dict: sent, saved (vs one per interval), reasons {reason: count}
+                and step_delivery {count, p50, p95} in seconds
+        """
+        return {
+            'sent': self.sent,
+            'saved': self.saved,
+            'reasons': dict(self.reasons),
+            'step_delivery': {
+                'count': self._step_delivery.count,
+                'p50': self._step_delivery.percentile(50),
+                'p95': self._step_delivery.percentile(95),
+            },
+        }
+
+
+def format_stats(stats):
+    """
+    Format WeightEmitter.stats() for the service log.
+
+    Returns:
+        str: e.g. '12 update(s) sent (step 4, heartbeat 7, first 1), 288 saved | step delivery p50/p95 0.41/0.62s (4)'
+    """
+    reasons = ', '.join(f"{reason} {count}" for reason, count in sorted(stats['reasons'].items()))
+    text = f"{stats['sent']} update(s) sent"
+    if reasons:
+        text += f" ({reasons})"
+    text += f", {stats['saved']} saved"
+    delivery = stats['step_delivery']
+    if delivery['count']:
+        text += f" | step delivery p50/p95 {delivery['p50']:.2f}/{delivery['p95']:.2f}s ({delivery['count']})"
+    return text
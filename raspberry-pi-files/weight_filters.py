@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Weight Filters for SmartKart
+Composable, vectorized filter chain run over the HX711 sample ring
+
+Averaging whatever one hx.get_raw_data() call returned let a single spike
+(a glitched conversion, a knock on the cart) or the settling transient
+after an item is dropped in straight through to the backend's 0.3 kg
+tolerance check, which then raised a false weightMismatch. The sampler now
+runs a FilterChain over the newest raw samples after every read:
+
+    Calibrate       raw ADC counts -> kg (no clamping per sample)
+    RangeReject     drop physically impossible values (saturated reads)
+    Despike         Hampel filter: replace samples more than `threshold`
+                    scaled MADs from their rolling median with the median
+    AdaptiveWindow  keep only the samples since the last step change, between
+                    `min_samples` and `max_samples`: a short window right
+                    after an item is added, a long one while the load is stable
+    Ema / Kalman    exponentially weighted estimate over that window
+    Mean / Median   plain estimates, for comparison
+
+Every stage maps a NumPy array to a NumPy array, so the chain is a handful
+of vectorized operations per read instead of a Python loop per sample; the
+last stage reduces the window to the estimate. The result is clamped to
+>= 0 once, at the end.
+
+Without NumPy (minimal installs) make_filter() falls back to the mean of
+the last FALLBACK_SAMPLES samples, the behavior before this module.
+
+Chains are configured with WEIGHT_FILTER:
+
+    kalman (default)  Calibrate, RangeReject, Despike, AdaptiveWindow, Kalman
+    ema               ... AdaptiveWindow, Ema
+    median            ... AdaptiveWindow, Median
+    mean              Calibrate, Mean over FALLBACK_SAMPLES (previous behavior)
+
+bench_weight_filters.py measures per-sample cost and step-response latency.
+"""
+
+import os
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    HAVE_NUMPY = False
+
+WEIGHT_FILTER = os.getenv('WEIGHT_FILTER', 'kalman')
+
+FALLBACK_SAMPLES = 5        # Samples averaged without NumPy (or WEIGHT_FILTER=mean)
+MAX_KG = 100.0              # Heavier than any cart load: a saturated or glitched read
+DESPIKE_WINDOW = 5          # Rolling median width (odd)
+DESPIKE_THRESHOLD = 3.0     # Scaled MADs from the median that make a spike
+DESPIKE_MIN_KG = 0.005      # MAD floor so a perfectly steady signal is not "all spikes"
+MIN_WINDOW = 3              # Samples kept right after a step
+MAX_WINDOW = 32             # Samples kept while stable (3.2s at 10 SPS)
+STEP_KG = 0.03              # A sample this far from the newest samples' median starts a new window
+EMA_ALPHA = 0.25            # Weight of the newest sample
+KALMAN_PROCESS_VAR = 1e-5   # kg^2 per sample: how fast the true load may drift
+KALMAN_MEASUREMENT_VAR = 4e-4  # kg^2: HX711 + load cell noise (about 20 g RMS)
+
+# Samples a chain needs from the ring: the adaptive window plus the
+# despike filter's half width on the old side
+HISTORY = MAX_WINDOW + DESPIKE_WINDOW
+
+
+class Calibrate:
+    """Raw ADC counts -> kg"""
+
+    def __init__(self, zero_offset, scale_factor):
+        self.zero_offset = zero_offset
+        self.scale_factor = scale_factor
+
+    def __call__(self, values):
+        if self.scale_factor == 0:
+            return values / 1000.0   # No calibration yet
+        return (values - self.zero_offset) / self.scale_factor
+
+
+class RangeReject:
+    """Drop samples outside [low, high] kg"""
+
+    def __init__(self, low=-MAX_KG, high=MAX_KG):
+        self.low = low
+        self.high = high
+
+    def __call__(self, values):
+        return values[(values >= self.low) & (values <= self.high)]
+
+
+class Despike:
+    """Hampel filter: replace outliers by their rolling median"""
+
+    def __init__(self, window=DESPIKE_WINDOW, threshold=DESPIKE_THRESHOLD, floor=DESPIKE_MIN_KG):
+        """
+        Args:
+            window (int): Rolling median width (odd)
+            threshold (float): Scaled MADs from the median that make a spike
+            floor (float): Minimum scaled MAD in kg
+        """
+        self.window = window | 1
+        self.threshold = threshold
+        self.floor = floor
+
+    def __call__(self, values):
+        half = self.window // 2
+        if len(values) < self.window:
+            # Too few for a rolling window (just started): judge against all
+            if len(values) < 3:
+                return values
+            median = np.median(values)
+            mad = np.median(np.abs(values - median)) * 1.4826
+            return np.where(np.abs(values - median) > self.threshold * max(mad, self.floor), median, values)
+        # Centered windows, reflected at the old end. The newest `half`
+        # samples have no newer neighbours yet; rather than reflect them (two
+        # spikes in a row would then be most of the window and pass as the
+        # median) they are judged against the newest full window. A real
+        # step passes once it fills half of that window.
+        padded = np.pad(values, (half, 0), mode='reflect')
+        windows = np.lib.stride_tricks.sliding_window_view(padded, self.window)
+        medians = np.median(windows, axis=1)
+        mad = np.median(np.abs(windows - medians[:, None]), axis=1) * 1.4826
+        medians = np.append(medians, np.repeat(medians[-1], half))
+        mad = np.append(mad, np.repeat(mad[-1], half))
+        spikes = np.abs(values - medians) > self.threshold * np.maximum(mad, self.floor)
+        return np.where(spikes, medians, values)
+
+
+class AdaptiveWindow:
+    """Keep the samples since the last step change"""
+
+    def __init__(self, min_samples=MIN_WINDOW, max_samples=MAX_WINDOW, step=STEP_KG):
+        """
+        Args:
+            min_samples (int): Samples kept right after a step
+            max_samples (int): Samples kept while the load is stable
+            step (float): kg from the newest samples' median that marks a step
+        """
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.step = step
+
+    def __call__(self, values):
+        values = values[-self.max_samples:]
+        if len(values) <= self.min_samples:
+            return values
+        reference = np.median(values[-self.min_samples:])
+        away = np.flatnonzero(np.abs(values - reference) > self.step)
+        if not len(away):
+            return values
+        start = min(away[-1] + 1, len(values) - self.min_samples)
+        return values[start:]
+
+
+class Ema:
+    """
+    Exponential moving average over the window.
+
+    The weights are normalized to sum to 1, so a short window (just after a
+    step) is close to its plain mean instead of being dominated by its
+    oldest sample.
+    """
+
+    def __init__(self, alpha=EMA_ALPHA):
+        self.alpha = alpha
+        self._weights = {}
+
+    def weights(self, count):
+        weights = self._weights.get(count)
+        if weights is None:
+            weights = (1.0 - self.alpha) ** np.arange(count - 1, -1, -1, dtype=float)
+            weights = self._weights[count] = weights / weights.sum()
+        return weights
+
+    def __call__(self, values):
+        if not len(values):
+            return values
+        return np.array([np.dot(self.weights(len(values)), values)])
+
+
+class Kalman(Ema):
+    """
+    Scalar random-walk Kalman filter, restarted at the start of the window.
+
+    With a fixed process and measurement variance the gain sequence depends
+    only on the sample's position in the window, so the estimate is a dot
+    product with per-length weights computed once: the first samples are
+    averaged almost evenly (gain 1, 1/2, ...) and the gain then settles at
+    its steady state.
+    """
+
+    def __init__(self, process_var=KALMAN_PROCESS_VAR, measurement_var=KALMAN_MEASUREMENT_VAR):
+        super().__init__()
+        self.process_var = process_var
+        self.measurement_var = measurement_var
+
+    def weights(self, count):
+        weights = self._weights.get(count)
+        if weights is None:
+            gains = np.empty(count)
+            gains[0] = 1.0                       # No prior: take the first sample
+            variance = self.measurement_var
+            for index in range(1, count):
+                prior = variance + self.process_var
+                gains[index] = prior / (prior + self.measurement_var)
+                variance = (1.0 - gains[index]) * prior
+            # Sample i keeps gain_i times (1 - gain_j) for every later j
+            keep = np.append(np.cumprod((1.0 - gains[:0:-1]))[::-1], 1.0)
+            weights = self._weights[count] = gains * keep
+        return weights
+
+
+class Mean:
+    """Mean of the window"""
+
+    def __call__(self, values):
+        return np.array([values.mean()]) if len(values) else values
+
+
+class Median:
+    """Median of the window"""
+
+    def __call__(self, values):
+        return np.array([np.median(values)]) if len(values) else values
+
+
+class FilterChain:
+    """Stages applied in order to the newest raw samples; returns kg"""
+
+    def __init__(self, stages, history=HISTORY):
+        """
+        Args:
+            stages (list): Callables mapping a NumPy array to a NumPy array;
+                the last element of the final array is the estimate
+            history (int): Raw samples the chain wants from the ring
+        """
+        self.stages = list(stages)
+        self.history = history
+
+    def __call__(self, raw):
+        """
+        Args:
+            raw (sequence): Raw samples, oldest first (array.array, list or ndarray)
+
+        Returns:
+            float: Weight in kg (>= 0), or None if no sample survived
+        """
+        values = np.asarray(raw, dtype=float)
+        for stage in self.stages:
+            values = stage(values)
+        if not len(values):
+            return None
+        return max(0.0, float(values[-1]))
+
+
+class MeanFilter:
+    """Pure Python mean of the newest samples, calibrated (fallback without NumPy)"""
+
+    def __init__(self, to_weight, samples=FALLBACK_SAMPLES):
+        self.to_weight = to_weight
+        self.history = samples
+
+    def __call__(self, raw):
+        raw = list(raw)[-self.history:]
+        if not raw:
+            return None
+        return self.to_weight(sum(raw) / len(raw))
+
+
+def make_filter(zero_offset, scale_factor, name=WEIGHT_FILTER, to_weight=None):
+    """
+    Build the configured filter.
+
+    Args:
+        zero_offset (float): Calibration zero offset (raw counts)
+        scale_factor (float): Calibration scale (raw counts per kg)
+        name (str): 'kalman', 'ema', 'median' or 'mean'
+        to_weight (callable): Raw -> kg for the fallback (default: the same
+            calibration, clamped at 0)
+
+    Returns:
+        callable: filter(raw samples) -> kg or None, with a `history` attribute
+    """
+    if to_weight is None:
+        def to_weight(raw):
+            if scale_factor == 0:
+                return raw / 1000.0
+            return max(0.0, (raw - zero_offset) / scale_factor)
+    if not HAVE_NUMPY or name == 'mean':
+        return MeanFilter(to_weight)
+    estimators = {'kalman': Kalman, 'ema': Ema, 'median': Median}
+    if name not in estimators:
+        raise ValueError(f"Unknown WEIGHT_FILTER {name!r}")
+    return FilterChain([
+        Calibrate(zero_offset, scale_factor),
+        RangeReject(),
+        Despike(),
+        AdaptiveWindow(),
+        estimators[name](),
+    ])
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+HX711 Sampler for SmartKart
+Reads the load cell on a background thread into a timestamped ring buffer
+
+The weight service used to read the HX711 from its main loop, so one slow
+conversion batch (hx.get_raw_data() waits for every conversion it
+returns) delayed the upload, the LCD and everything else in the loop. The
+sampler thread reads the ADC at its native rate instead - waiting on the
+DOUT data-ready edge when one is given, otherwise on the blocking read
+itself - and appends every raw conversion to a SampleRing. After each
+read it runs the weight filter (weight_filters.py) over the newest raw
+samples and publishes the result with one reference swap, so get_weight()
+never blocks.
+
+SampleRing is two preallocated arrays (timestamps and values) indexed by a
+sample counter. There is one writer; readers copy without a lock and drop
+any slot the writer overwrote while they were copying.
+"""
+
+import array
+import os
+import threading
+import time
+
+import metrics
+import service_log
+
+# HX711 output data rate: 10 SPS, or 80 SPS with the RATE pin high
+SAMPLE_RATE = float(os.getenv('HX711_RATE', '10'))
+RING_SIZE = 256         # Raw samples kept (power of two)
+READY_TIMEOUT = 1.0     # Max wait for a data-ready edge before reading anyway
+ERROR_BACKOFF = 0.5     # Seconds to wait after a failed read
+
+HX711_READ_SECONDS = metrics.histogram('smartkart_hx711_read_seconds', 'Duration of one HX711 raw read')
+HX711_SAMPLES = metrics.counter('smartkart_hx711_samples_total', 'Raw HX711 conversions read')
+HX711_ERRORS = metrics.counter('smartkart_hx711_errors_total', 'Failed HX711 reads')
+HX711_FILTER_SECONDS = metrics.histogram('smartkart_hx711_filter_seconds', 'Weight filter run time per read')
+
+log = service_log.get_logger('Weight Sampler')
+
+
+class SampleRing:
+    """Fixed-size ring of timestamped samples; one writer, lock-free readers"""
+
+    def __init__(self, size=RING_SIZE):
+        """
+        Args:
+            size (int): Samples kept; must be a power of two
+        """
+        if size <= 0 or size & (size - 1):
+            raise ValueError("Ring size must be a power of two")
+        self.size = size
+        self._mask = size - 1
+        self._times = array.array('d', bytes(8 * size))
+        self._values = array.array('d', bytes(8 * size))
+        self.count = 0       # Samples ever appended; bumped after the slot is written
+        self._writing = 0    # Bumped before the slot is written
+
+    def __len__(self):
+        return min(self.count, self.size)
+
+    def append(self, value, timestamp):
+        """Add one sample (writer thread only)"""
+        count = self.count
+        self._writing = count + 1
+        index = count & self._mask
+        self._values[index] = value
+        self._times[index] = timestamp
+        self.count = count + 1
+
+    def latest(self):
+        """
+        Newest sample.
+
+        Returns:
+            tuple: (timestamp, value), or None if empty
+        """
+        count = self.count
+        if not count:
+            return None
+        index = (count - 1) & self._mask
+        return self._times[index], self._values[index]
+
+    def last(self, n=None):
+        """
+        Copy the newest samples.
+
+        Args:
+            n (int): Number of samples (default: all kept)
+
+        Returns:
+            list: (timestamp, value) tuples, oldest first
+        """
+        end = self.count
+        n = len(self) if n is None else min(n, len(self))
+        start = end - n
+        samples = []
+        for number in range(start, end):
+            index = number & self._mask
+            samples.append((self._times[index], self._values[index]))
+        # The writer may have lapped us while we copied: writing sample N
+        # overwrites sample N - size
+        first_valid = self._writing - self.size
+        if first_valid > start:
+            samples = samples[first_valid - start:]
+        return samples
+
+    def values(self, n=None):
+        """
+        Copy the newest values only (array slices, no per-sample Python work).
+
+        Args:
+            n (int): Number of samples (default: all kept)
+
+        Returns:
+            array.array: Values, oldest first
+        """
+        end = self.count
+        n = len(self) if n is None else min(n, len(self))
+        if n <= 0:
+            return array.array('d')
+        start = end - n
+        head, tail = start & self._mask, end & self._mask
+        if head < tail:
+            values = self._values[head:tail]
+        else:
+            values = self._values[head:] + self._values[:tail]
+        first_valid = self._writing - self.size
+        if first_valid > start:
+            values = values[first_valid - start:]
+        return values
+
+
+class HX711Sampler:
+    """Background thread reading raw conversions into a SampleRing"""
+
+    def __init__(self, read_raw, weight_filter, size=RING_SIZE, data_ready=None, clock=time.monotonic):
+        """
+        Args:
+            read_raw (callable): Blocking read; returns a list of raw
+                conversions (or one number). Raises on failure
+            weight_filter (callable): Newest raw values (oldest first) ->
+                kg or None; its `history` attribute is how many it wants
+                (weight_filters.make_filter())
+            size (int): Ring size (power of two)
+            data_ready (threading.Event): Set by the DOUT falling-edge
+                callback; each read waits for it. None reads back to back
+            clock (callable): Monotonic time source (for tests)
+        """
+        self.read_raw = read_raw
+        self.weight_filter = weight_filter
+        self.raw = SampleRing(size)
+        self.data_ready = data_ready
+        self._throttle = 0.0      # Extra seconds between reads (idle cart); 0 = native rate
+        self._wake = threading.Event()
+        self.errors = 0
+        self.reads = 0
+        self._clock = clock
+        self._latest = None       # (timestamp, kg), swapped in whole
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._started_at = None
+
+    @property
+    def throttle(self):
+        """Extra seconds between reads (idle cart); 0 = native rate"""
+        return self._throttle
+
+    @throttle.setter
+    def throttle(self, seconds):
+        lowered = seconds < self._throttle
+        self._throttle = seconds
+        if lowered:
+            self._wake.set()      # Cut a throttled wait short: the cart is active again
+        elif not self._stop_event.is_set():
+            self._wake.clear()
+
+    def start(self):
+        self._started_at = self._clock()
+        self._thread = threading.Thread(target=self._run, name="hx711-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        self._wake.set()
+        if self.data_ready is not None:
+            self.data_ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def get_weight(self):
+        """
+        Latest filtered weight (never blocks).
+
+        Returns:
+            float: kg, or None before the first sample
+        """
+        latest = self._latest
+        return None if latest is None else latest[1]
+
+    def latest(self):
+        """
+        Returns:
+            tuple: (timestamp, kg) of the latest filtered weight, or None
+        """
+        return self._latest
+
+    def get_raw_samples(self, n=None):
+        """
+        Newest raw conversions.
+
+        Args:
+            n (int): Number of samples (default: all kept)
+
+        Returns:
+            list: (timestamp, raw) tuples, oldest first
+        """
+        return self.raw.last(n)
+
+    def stats(self):
+        """
+        Returns:
+            dict: samples, reads, errors, samples_per_sec since start()
+        """
+        elapsed = self._clock() - self._started_at if self._started_at is not None else 0.0
+        return {
+            'samples': self.raw.count,
+            'reads': self.reads,
+            'errors': self.errors,
+            'samples_per_sec': self.raw.count / elapsed if elapsed > 0 else 0.0,
+        }
+
+    def filtered(self):
+        """Weight filter run over the newest raw samples; kg or None"""
+        with HX711_FILTER_SECONDS.time():
+            return self.weight_filter(self.raw.values(self.weight_filter.history))
+
+    def read_once(self):
+        """
+        Take one read: append its conversions and publish the new weight.
+
+        Returns:
+            int: Conversions appended
+        """
+        start = time.perf_counter()
+        values = self.read_raw()
+        HX711_READ_SECONDS.record(time.perf_counter() - start)
+        if not isinstance(values, (list, tuple)):
+            values = [values]
+        now = self._clock()
+        period = 1.0 / SAMPLE_RATE
+        # One call may return several conversions; space them at the ADC rate
+        for offset, value in enumerate(values):
+            self.raw.append(float(value), now - (len(values) - 1 - offset) * period)
+        self.reads += 1
+        HX711_SAMPLES.inc(len(values))
+        weight = self.filtered() if values else None
+        if weight is not None:
+            self._latest = (now, weight)
+        return len(values)
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            if self._throttle:
+                self._wake.wait(self._throttle)
+                self._wake.clear()
+                if self._stop_event.is_set():
+                    break
+            if self.data_ready is not None:
+                self.data_ready.wait(READY_TIMEOUT)
+                if self._stop_event.is_set():
+                    break
+            try:
+                self.read_once()
+            except Exception as e:
+                self.errors += 1
+                HX711_ERRORS.inc()
+                log.error(f"Error reading HX711: {e}", extra={'kind': 'hx711_read_error'})
+                self._stop_event.wait(ERROR_BACKOFF)
+            finally:
+                # Edges from the read's own clocking are not data-ready
+                if self.data_ready is not None:
+                    self.data_ready.clear()
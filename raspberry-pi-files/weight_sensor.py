@@ -1,6 +1,15 @@
 #!/usr/bin/env python3
 
-import random
+import functools
+import os
+import threading
+
+import service_log
+from weight_sampler import HX711Sampler, SAMPLE_RATE
+from weight_filters import make_filter, WEIGHT_FILTER, HAVE_NUMPY
+from calibration import CALIBRATION_PATH, CalibrationProfile, load_profile, save_profile
+from load_cells import HX711_CHANNELS, Channel, LoadCellArray, parse_channels
+from sim_hx711 import SIM_HX711_LOAD, SimulatedHX711
 
 # Try importing Raspberry Pi-specific libraries
 try:
@@ -10,65 +19,219 @@ try:
 except ImportError:
     REAL_HARDWARE = False
 
-# GPIO pin configuration
+# GPIO pin configuration (one load cell; several with HX711_CHANNELS, load_cells.py)
 DT_PIN = 5
 SCK_PIN = 6
+CHANNELS = parse_channels(HX711_CHANNELS)
+# Wait for the DOUT falling edge (data ready) between reads instead of
+# polling DOUT inside the HX711 library
+DATA_READY_EDGE = os.getenv('HX711_DATA_READY', '0').lower() in ('1', 'true', 'yes')
 
-# Calibration values (run calibrate_sensor.py to get these)
+# Calibration values: the cart's profile written by calibrate_sensor.py
+# (calibration.py, CALIBRATION_PATH) if there is one, else these defaults
 ZERO_OFFSET = -121613.47
 SCALE_FACTOR = 131979.86 / 9320  # Adjusted: was reading 2016kg instead of 0.216kg
 # SCALE_FACTOR ≈ 14.16
+try:
+    profile = load_profile()
+    calibration_error = None
+except (OSError, ValueError) as e:
+    profile = None
+    calibration_error = e
+calibration_source = CALIBRATION_PATH if profile is not None else 'defaults'
+if profile is not None:
+    ZERO_OFFSET = profile.zero_offset
+    SCALE_FACTOR = profile.scale_factor
+else:
+    profile = CalibrationProfile(ZERO_OFFSET, SCALE_FACTOR, calibrated_at='defaults')
 
 # Global HX711 instance
 hx = None
+# Off the Pi: a simulated load cell with the same calibration (sim_hx711.py)
+simulated = None if REAL_HARDWARE else SimulatedHX711(ZERO_OFFSET, SCALE_FACTOR, rate=SAMPLE_RATE,
+                                                      load_kg=SIM_HX711_LOAD)
+# Corner load cells read in parallel when HX711_CHANNELS lists several
+cells = None
+# Background reader started by start_sampler() (weight_sampler.py)
+sampler = None
+
+log = service_log.get_logger('Weight Sensor')
 
 def initialize_hx711():
-    """Initialize the HX711 load cell amplifier"""
-    global hx
+    """Initialize the HX711 load cell amplifier (or one per corner)"""
+    global hx, cells
     if not REAL_HARDWARE:
-        print("[Weight Sensor] Running in simulation mode")
+        log.info("Running in simulation mode")
+        return
+    
+    if len(CHANNELS) > 1:
+        try:
+            GPIO.setwarnings(False)
+            channels = []
+            for dout, sck in CHANNELS:
+                log.info(f"Initializing HX711 on GPIO pins DT={dout}, SCK={sck}")
+                channel_hx = HX711(dout_pin=dout, pd_sck_pin=sck)
+                channel_hx.reset()
+                channels.append(Channel(f"gpio{dout}", functools.partial(_read_hx, channel_hx)))
+            cells = LoadCellArray(channels).start()
+            log.info(f"{len(channels)} load cells sampled in parallel")
+        except Exception as e:
+            log.error(f"Error initializing HX711 channels: {e}")
+            raise
         return
     
     try:
-        print(f"[Weight Sensor] Initializing HX711 on GPIO pins DT={DT_PIN}, SCK={SCK_PIN}")
+        log.info(f"Initializing HX711 on GPIO pins DT={DT_PIN}, SCK={SCK_PIN}")
         GPIO.setwarnings(False)
         hx = HX711(dout_pin=DT_PIN, pd_sck_pin=SCK_PIN)
         hx.reset()
-        print("[Weight Sensor] HX711 initialized successfully")
+        log.info("HX711 initialized successfully")
     except Exception as e:
-        print(f"[Weight Sensor] Error initializing HX711: {e}")
+        log.error(f"Error initializing HX711: {e}")
         raise
 
+def _read_hx(device):
+    """One HX711's conversions, failed ones dropped"""
+    raw_data = device.get_raw_data()
+    if not isinstance(raw_data, list):
+        raw_data = [raw_data]
+    # The library reports a failed conversion as False
+    values = [value for value in raw_data if value is not False and value is not None]
+    if not values:
+        raise RuntimeError("HX711 returned no data")
+    return values
+
+def read_raw():
+    """
+    One blocking read of raw HX711 conversions.
+    
+    With several load cells this is their time-aligned sum (load_cells.py).
+    
+    Returns:
+        list: Raw values (hx.get_raw_data() returns several per call)
+    
+    Raises:
+        RuntimeError: Not initialized, or the read returned nothing
+    """
+    if cells is not None:
+        return cells.read()
+    if hx is None:
+        raise RuntimeError("HX711 not initialized. Call initialize_hx711() first.")
+    return _read_hx(hx)
+
+def simulate_raw():
+    """Simulation mode: the simulated HX711's next conversion, at the ADC rate"""
+    return simulated.read()
+
+def raw_to_weight(raw_value):
+    """Apply the calibration to a raw value; kg"""
+    if SCALE_FACTOR != 0:
+        return max(0.0, (raw_value - ZERO_OFFSET) / SCALE_FACTOR)  # Don't return negative weights
+    # No calibration yet, return raw value divided by 1000
+    return raw_value / 1000.0
+
+def start_sampler():
+    """
+    Start reading the HX711 (or the simulation) on a background thread.
+    
+    From then on get_weight() returns the latest filtered weight without
+    blocking.
+    
+    Returns:
+        HX711Sampler: The running sampler
+    """
+    global sampler
+    if sampler is not None:
+        return sampler
+    data_ready = None
+    # With several cells each channel thread waits on its own conversion
+    if REAL_HARDWARE and DATA_READY_EDGE and cells is None:
+        data_ready = threading.Event()
+        GPIO.add_event_detect(DT_PIN, GPIO.FALLING, callback=lambda channel: data_ready.set())
+    weight_filter = make_filter(ZERO_OFFSET, SCALE_FACTOR, to_weight=raw_to_weight)
+    sampler = HX711Sampler(read_raw if REAL_HARDWARE else simulate_raw, weight_filter, data_ready=data_ready)
+    sampler.start()
+    log.info(f"Sampling {'HX711' if REAL_HARDWARE else 'simulation'} in the background"
+             f"{' on data-ready edges' if data_ready is not None else ''}",
+             extra={'fields': {'filter': WEIGHT_FILTER if HAVE_NUMPY else 'mean (no NumPy)',
+                               'calibration': calibration_source}})
+    if calibration_error is not None:
+        log.warning(f"Calibration profile not loaded, using defaults: {calibration_error}")
+    return sampler
+
+def rezero(zero_offset):
+    """
+    Apply a new zero offset (auto re-zero, calibration.AutoZero).
+    
+    The running sampler switches to it on its next read. A cart calibrated
+    with calibrate_sensor.py keeps it in its profile across restarts.
+    """
+    global ZERO_OFFSET
+    ZERO_OFFSET = zero_offset
+    profile.rezero(zero_offset)
+    if sampler is not None:
+        sampler.weight_filter = make_filter(ZERO_OFFSET, SCALE_FACTOR, to_weight=raw_to_weight)
+    if cells is not None:
+        cells.tare()
+    if calibration_source != 'defaults':
+        try:
+            save_profile(profile, calibration_source)
+        except OSError as e:
+            log.warning(f"Could not save the new zero offset: {e}")
+
+def stop_sampler():
+    global sampler
+    if sampler is None:
+        return
+    sampler.stop()
+    if REAL_HARDWARE and sampler.data_ready is not None:
+        GPIO.remove_event_detect(DT_PIN)
+    sampler = None
+    if cells is not None:
+        cells.stop()
+
+def get_cell_diagnostics():
+    """
+    Per-corner load cell state (load_cells.LoadCellArray.diagnostics()).
+    
+    Returns:
+        list: One dict per channel; empty with a single load cell
+    """
+    if cells is None:
+        return []
+    return cells.diagnostics()
+
+def get_raw_samples(n=None):
+    """
+    Newest raw conversions read by the sampler.
+    
+    Args:
+        n (int): Number of samples (default: all kept)
+    
+    Returns:
+        list: (time.monotonic(), raw) tuples, oldest first; empty without a sampler
+    """
+    if sampler is None:
+        return []
+    return sampler.get_raw_samples(n)
+
 def get_weight():
-    """Get current weight reading in kilograms"""
+    """
+    Get current weight reading in kilograms.
+    
+    With the sampler running this is the latest filtered weight and never
+    blocks; otherwise the HX711 is read here.
+    """
+    if sampler is not None:
+        weight = sampler.get_weight()
+        return 0.0 if weight is None else weight
     if REAL_HARDWARE:
-        if hx is None:
-            raise RuntimeError("HX711 not initialized. Call initialize_hx711() first.")
-        
         try:
-            # Get raw data from HX711 (no arguments)
-            raw_data = hx.get_raw_data()
-            
-            if raw_data:
-                # Calculate average if it's a list, otherwise use the value
-                if isinstance(raw_data, list):
-                    raw_value = sum(raw_data) / len(raw_data)
-                else:
-                    raw_value = raw_data
-                
-                # Apply calibration
-                if SCALE_FACTOR != 0:
-                    weight_kg = (raw_value - ZERO_OFFSET) / SCALE_FACTOR
-                    return max(0.0, weight_kg)  # Don't return negative weights
-                else:
-                    # No calibration yet, return raw value divided by 1000
-                    return raw_value / 1000.0
-            else:
-                return 0.0
-                
+            raw_data = read_raw()
+            return raw_to_weight(sum(raw_data) / len(raw_data))
         except Exception as e:
-            print(f"[Weight Sensor] Error reading weight: {e}")
+            log.error(f"Error reading weight: {e}", extra={'kind': 'hx711_read_error'})
             return 0.0
     else:
-        # Simulation mode - return random weight between 0.3 and 0.4 kg
-        return round(random.uniform(0.3, 0.4), 3)
+        # Simulation mode - one conversion of the simulated load cell
+        return round(raw_to_weight(simulated.sample()), 3)
@@ -1,30 +1,97 @@
 #!/usr/bin/env python3
 
+import json
 import os
 import time
 import socketio
 from datetime import datetime, timezone
-from weight_sensor import get_weight, initialize_hx711, REAL_HARDWARE
+from weight_sensor import get_weight, initialize_hx711, start_sampler, stop_sampler, REAL_HARDWARE
 from lcd_display import get_lcd, display_price, cleanup as lcd_cleanup
+from journal import Journal, Forwarder, JOURNAL_DIR
+from governor import Governor, format_savings
+from weight_emitter import WeightEmitter, WEIGHT_DEADBAND_KG, WEIGHT_HEARTBEAT, format_stats as format_emitter_stats
+from step_detector import StepDetector, build_step_payload
+from calibration import AutoZero, AUTOZERO, AUTOZERO_SECONDS
+from load_cells import format_diagnostics as format_cell_diagnostics
+from weight_sampler import SAMPLE_RATE
+import metrics
+import service_log
+import weight_sensor
 
 # Configuration from environment variables
 BACKEND_URL = os.getenv('BACKEND_URL', 'http://172.16.37.181:8001')
 CART_ID = os.getenv('CART_ID', '1234')
+# Updates are change-driven (weight_emitter.py); with WEIGHT_DEADBAND=0 one
+# is sent every WEIGHT_UPDATE_INTERVAL as before. The sampler's filtered
+# weight is checked every WEIGHT_POLL_INTERVAL (cheap: nothing is sent)
 WEIGHT_UPDATE_INTERVAL = float(os.getenv('WEIGHT_UPDATE_INTERVAL', '1.0'))
+WEIGHT_POLL_INTERVAL = float(os.getenv('WEIGHT_POLL_INTERVAL', '0.1'))
+# Each sample is logged at DEBUG; at INFO one summary line per interval
+WEIGHT_LOG_INTERVAL = float(os.getenv('WEIGHT_LOG_INTERVAL', '60'))
+
+# Idle cart (governor.py): sample every WEIGHT_IDLE_INTERVAL seconds and dim
+# the LCD; activity from any service ends the idle wait at once. A weight
+# change of WEIGHT_ACTIVITY_KG counts as cart activity
+WEIGHT_IDLE_INTERVAL = float(os.getenv('WEIGHT_IDLE_INTERVAL', '5.0'))
+WEIGHT_ACTIVITY_KG = float(os.getenv('WEIGHT_ACTIVITY_KG', '0.02'))
+
+# Send a weight_step event (step_detector.py) for every item added or
+# removed, with the settled delta, so the backend can validate a scan
+# against the exact step instead of the last measuredWeight
+WEIGHT_STEP_EVENTS = os.getenv('WEIGHT_STEP_EVENTS', '1').lower() in ('1', 'true', 'yes')
+
+# Weight samples made while offline are journaled and replayed on reconnect.
+# Only recent samples matter, so a full journal drops its oldest ones
+JOURNAL_PATH = os.path.join(JOURNAL_DIR, 'weight.journal')
+
+# Local Prometheus-format metrics endpoint (metrics.py); 0 disables
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9102'))
+
+# Metrics (HX711 read time and sample counts are in weight_sampler.py)
+BACKEND_CONNECTS = metrics.counter('smartkart_backend_connects_total', 'Successful (re)connections to the backend')
+BACKEND_DISCONNECTS = metrics.counter('smartkart_backend_disconnects_total', 'Connections to the backend lost')
+BACKEND_CONNECT_ERRORS = metrics.counter('smartkart_backend_connect_errors_total', 'Failed connection attempts')
+BACKEND_CONNECTED = metrics.gauge('smartkart_backend_connected', '1 while connected to the backend')
+
+log = service_log.get_logger('Weight Service')
 
 # Global variable to track current cart price
 current_cart_price = 0.0
+# True once the backend reports the cart has no items (auto re-zero); None until told
+cart_empty = None
 
 # Socket.IO client
 sio = socketio.Client()
 
+# Set up in main() once the journal file is open
+forwarder = None
+# Set up in main(); shared activity stamp (governor.py)
+governor = None
+# Set up in main(); decides which samples are sent (weight_emitter.py)
+emitter = None
+# Set up in main() when WEIGHT_STEP_EVENTS is on
+step_detector = None
+# Set up in main() when WEIGHT_AUTOZERO is on (calibration.py)
+autozero = None
+
 @sio.event
 def connect():
     """Called when connected to backend"""
-    print(f"[Weight Service] Connected to backend at {BACKEND_URL}")
-    print(f"[Weight Service] Monitoring cart: {CART_ID}")
-    print(f"[Weight Service] Update interval: {WEIGHT_UPDATE_INTERVAL}s")
-    print(f"[Weight Service] Hardware mode: {'REAL' if REAL_HARDWARE else 'SIMULATION'}")
+    BACKEND_CONNECTS.inc()
+    BACKEND_CONNECTED.set(1)
+    log.info(f"Connected to backend at {BACKEND_URL}", extra={'kind': 'connect'})
+    log.info(f"Monitoring cart: {CART_ID}", extra={'kind': 'connect'})
+    if WEIGHT_DEADBAND_KG:
+        log.info(f"Updates on settled changes of {WEIGHT_DEADBAND_KG:g}kg, heartbeat {WEIGHT_HEARTBEAT:g}s")
+    else:
+        log.info(f"Update interval: {WEIGHT_UPDATE_INTERVAL}s")
+    log.info(f"Hardware mode: {'REAL' if REAL_HARDWARE else 'SIMULATION'}")
+    
+    if forwarder is not None:
+        forwarder.start_replay()
+    # A restarted backend may have lost the cart's weight: resend it now
+    if emitter is not None:
+        emitter.last_sent = None
     
     # Display connection status on LCD
     lcd = get_lcd()
@@ -37,7 +104,9 @@ def connect():
 @sio.event
 def disconnect():
     """Called when disconnected from backend"""
-    print("[Weight Service] Disconnected from backend")
+    BACKEND_DISCONNECTS.inc()
+    BACKEND_CONNECTED.set(0)
+    log.warning("Disconnected from backend")
     
     # Display disconnection status on LCD
     lcd = get_lcd()
@@ -46,80 +115,240 @@ def disconnect():
 @sio.event
 def connect_error(data):
     """Called when connection error occurs"""
-    print(f"[Weight Service] Connection error: {data}")
+    BACKEND_CONNECT_ERRORS.inc()
+    log.warning(f"Connection error: {data}", extra={'kind': 'connect_error'})
 
 @sio.on('updateCart')
 def on_cart_update(data):
     """Called when cart is updated (item added/removed)"""
-    global current_cart_price
+    global current_cart_price, cart_empty
     
     try:
         # Check if this update is for our cart
         if data.get('cartId') == CART_ID:
             new_price = data.get('totalPrice', 0)
             current_cart_price = new_price
+            if 'items' in data:
+                cart_empty = not data['items']
             
             action = data.get('action', '')
             product = data.get('affectedProduct', '')
             
-            print(f"[Weight Service] Cart updated: ₹{new_price:.2f} ({action} {product})")
+            log.info(f"Cart updated: ₹{new_price:.2f} ({action} {product})", extra={'kind': 'cart_update'})
+            
+            # An item was scanned: wake the cart (and the backlight) now
+            if governor is not None:
+                governor.touch()
+                get_lcd().set_backlight(True)
             
             # Update LCD with new price
             status = "OK" if sio.connected else "Offline"
             display_price(current_cart_price, status)
     except Exception as e:
-        print(f"[Weight Service] Error processing cart update: {e}")
+        log.error(f"Error processing cart update: {e}", extra={'kind': 'cart_update'})
+
+class WeightSummary:
+    """Counts sent/journaled samples between summary log lines"""
+    
+    def __init__(self):
+        self.reset()
+    
+    def reset(self):
+        self.sent = 0
+        self.journaled = 0
+        self.held = 0
+        self.errors = 0
+        self.low = None
+        self.high = None
+        self.last = None
+    
+    def add(self, weight, outcome):
+        if outcome == 'sent':
+            self.sent += 1
+        elif outcome == 'journaled':
+            self.journaled += 1
+        elif outcome == 'held':
+            self.held += 1
+            return
+        else:
+            self.errors += 1
+            return
+        self.low = weight if self.low is None else min(self.low, weight)
+        self.high = weight if self.high is None else max(self.high, weight)
+        self.last = weight
+    
+    def report(self, seconds):
+        """Log the summary line and start a new interval"""
+        if self.last is not None:
+            log.info(f"{self.sent} update(s) sent, {self.journaled} journaled, {self.held} held (steady) "
+                     f"in {seconds:.0f}s",
+                     extra={'kind': 'weight_summary',
+                            'fields': {'last_kg': f"{self.last:.3f}", 'min_kg': f"{self.low:.3f}",
+                                       'max_kg': f"{self.high:.3f}", 'errors': self.errors}})
+        elif self.errors:
+            log.warning(f"No updates sent in {seconds:.0f}s",
+                        extra={'kind': 'weight_summary', 'fields': {'errors': self.errors}})
+        elif self.held:
+            log.info(f"Weight steady: {self.held} sample(s) held in {seconds:.0f}s", extra={'kind': 'weight_summary'})
+        self.reset()
+
+
+def build_weight_payload(cart_id, measured_weight):
+    """weight_update payload with a UTC ISO timestamp"""
+    return {
+        'cartId': cart_id,
+        'measuredWeight': round(measured_weight, 3),
+        'timestamp': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
+    }
+
 
 def send_weight_update(cart_id, measured_weight):
-    """Send weight update to backend via Socket.IO"""
+    """
+    Send weight update to backend via Socket.IO (journaled while offline).
+    
+    Returns:
+        str: 'sent', 'journaled' or 'error'
+    """
+    try:
+        payload = build_weight_payload(cart_id, measured_weight)
+        if forwarder is None:
+            sio.emit('weight_update', payload)
+        elif not forwarder.emit('weight_update', payload):
+            log.debug(f"Journaled update: {measured_weight:.3f}kg for cart {cart_id}", extra={'kind': 'weight_update'})
+            return 'journaled'
+        log.debug(f"Sent update: {measured_weight:.3f}kg for cart {cart_id}", extra={'kind': 'weight_update'})
+        return 'sent'
+    except Exception as e:
+        log.error(f"Error sending weight update: {e}", extra={'kind': 'send_error'})
+        return 'error'
+
+
+def send_weight_step(cart_id, step):
+    """
+    Send a weight_step event to the backend (journaled while offline).
+    
+    Args:
+        cart_id (str): Cart ID
+        step (step_detector.WeightStep): Settled step
+    """
     try:
         timestamp = datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z')
-        payload = {
-            'cartId': cart_id,
-            'measuredWeight': round(measured_weight, 3),
-            'timestamp': timestamp
-        }
-        sio.emit('weight_update', payload)
-        print(f"[Weight Service] Sent update: {measured_weight:.3f}kg for cart {cart_id}")
+        payload = build_step_payload(cart_id, step, timestamp)
+        if forwarder is None:
+            sio.emit('weight_step', payload)
+        elif not forwarder.emit('weight_step', payload):
+            log.info(f"Journaled weight step {step.delta:+.3f}kg", extra={'kind': 'weight_step'})
+            return
+        log.info(f"Weight step {step.delta:+.3f}kg ({step.before:.3f} -> {step.after:.3f}kg)",
+                 extra={'kind': 'weight_step',
+                        'fields': {'settle_s': f"{step.settle_seconds:.2f}", 'confidence': f"{step.confidence:.2f}"}})
     except Exception as e:
-        print(f"[Weight Service] Error sending weight update: {e}")
+        log.error(f"Error sending weight step: {e}", extra={'kind': 'send_error'})
+
+def rezero(sampler):
+    """Re-zero from the steady empty cart's raw samples, if the zero has drifted"""
+    raw = [value for _, value in sampler.get_raw_samples(int(AUTOZERO_SECONDS * SAMPLE_RATE))]
+    old_zero = weight_sensor.ZERO_OFFSET
+    zero = autozero.shift(raw, weight_sensor.profile)
+    if zero is None:
+        return
+    weight_sensor.rezero(zero)
+    if step_detector is not None:
+        step_detector.reset()
+    log.info(f"Auto re-zero: empty cart read {(zero - old_zero) / weight_sensor.SCALE_FACTOR * 1000:+.0f}g",
+             extra={'kind': 'rezero', 'fields': {'zero_offset': f"{zero:.2f}", 'samples': len(raw)}})
 
 def main_loop():
     """Main loop that reads weight and sends updates"""
-    print("[Weight Service] Starting main loop...")
-    print("[Weight Service] LCD will display cart price (updated on item add/remove)")
+    log.info("Starting main loop...")
+    log.info("LCD will display cart price (updated on item add/remove)")
     
+    sampler = weight_sensor.sampler
+    summary = WeightSummary()
+    summary_start = time.monotonic()
+    last_weight = None
     while True:
         try:
-            # Read current weight
+            # Latest filtered weight from the sampler thread (never blocks)
             weight = get_weight()
             
-            # Send weight update to backend if connected
-            if sio.connected:
-                send_weight_update(CART_ID, weight)
+            # A weight change is cart activity; so is a tag read by the RFID service
+            if last_weight is not None and abs(weight - last_weight) >= WEIGHT_ACTIVITY_KG:
+                governor.touch()
+            last_weight = weight
+            
+            # Item added or removed: report the settled step
+            if step_detector is not None:
+                step = step_detector.update(weight)
+                if step is not None:
+                    send_weight_step(CART_ID, step)
+            
+            # Empty and steady: tare out drift
+            if autozero is not None and sampler is not None and autozero.update(weight, cart_empty, time.monotonic()):
+                rezero(sampler)
+            
+            idle = governor.check()
+            if governor.changed:
+                get_lcd().set_backlight(not idle)
+                if sampler is not None:
+                    sampler.throttle = WEIGHT_IDLE_INTERVAL if idle else 0.0
+                if idle:
+                    log.info(f"Cart idle for {governor.idle_after:g}s - sampling every "
+                             f"{WEIGHT_IDLE_INTERVAL:g}s, LCD dimmed", extra={'kind': 'governor'})
+                else:
+                    log.info(f"Activity - full rate ({format_savings(governor.stats())})", extra={'kind': 'governor'})
+            
+            # Send settled changes and heartbeats (journaled for replay if offline)
+            reason = emitter.decide(weight)
+            if reason is not None:
+                outcome = send_weight_update(CART_ID, weight)
+                if outcome != 'error':
+                    emitter.mark_sent(weight, reason)
             else:
-                print("[Weight Service] Not connected to backend, skipping update")
+                outcome = 'held'
+                if idle:
+                    governor.skip('weight_update', nbytes=len(json.dumps(build_weight_payload(CART_ID, weight))))
+            summary.add(weight, outcome)
+            now = time.monotonic()
+            if now - summary_start >= WEIGHT_LOG_INTERVAL:
+                summary.report(now - summary_start)
+                log.debug(format_emitter_stats(emitter.stats()), extra={'kind': 'weight_summary'})
+                cell_diagnostics = weight_sensor.get_cell_diagnostics()
+                if cell_diagnostics:
+                    log.info(f"Load cells: {format_cell_diagnostics(cell_diagnostics)}", extra={'kind': 'load_cells'})
+                summary_start = now
+            if not sio.connected:
                 # Update LCD to show offline status
                 display_price(current_cart_price, "Offline")
             
-            # Wait before next reading
-            time.sleep(WEIGHT_UPDATE_INTERVAL)
+            # Wait before next reading. Idle, the wait ends as soon as any
+            # service marks activity (a tag frame from the RFID service), so
+            # the next pass is back at full rate within one active sample
+            if idle:
+                start = time.monotonic()
+                governor.wait(WEIGHT_IDLE_INTERVAL, WEIGHT_POLL_INTERVAL)
+                governor.skip('hx711_sample', max(0, round((time.monotonic() - start) / WEIGHT_POLL_INTERVAL) - 1))
+            else:
+                time.sleep(WEIGHT_POLL_INTERVAL)
             
         except KeyboardInterrupt:
-            print("\n[Weight Service] Shutting down...")
+            log.info("Shutting down...")
             break
         except Exception as e:
-            print(f"[Weight Service] Error in main loop: {e}")
+            log.error(f"Error in main loop: {e}", extra={'kind': 'loop_error'})
             time.sleep(WEIGHT_UPDATE_INTERVAL)
 
 def main():
     """Main entry point"""
-    global current_cart_price
+    global current_cart_price, forwarder, governor, emitter, step_detector, autozero
     
     print("=" * 60)
     print("SmartKart Weight Sensor Service")
     print("=" * 60)
     
+    # From here on, output goes through the background log writer
+    service_log.setup()
+    
     # Initialize LCD
     lcd = get_lcd()
     lcd.display_message("SmartKart", "Starting...")
@@ -131,24 +360,45 @@ def main():
             lcd.display_message("SmartKart", "HX711 Ready")
             time.sleep(1)
         except Exception as e:
-            print(f"[Weight Service] Failed to initialize HX711: {e}")
+            log.error(f"Failed to initialize HX711: {e}")
             lcd.display_message("Error", "HX711 Failed")
             time.sleep(2)
+            service_log.shutdown()
             return
     else:
-        print("[Weight Service] Running in SIMULATION mode")
+        log.info("Running in SIMULATION mode")
         lcd.display_message("SmartKart", "Simulation")
         time.sleep(1)
     
+    # Read the load cell on its own thread from here on
+    start_sampler()
+    
+    # Open the journal before connecting so the connect handler can replay
+    journal = Journal(JOURNAL_PATH, evict_oldest=True)
+    forwarder = Forwarder(sio, journal, name="Weight Service")
+    governor = Governor(name="Weight Service")
+    emitter = WeightEmitter(interval=WEIGHT_UPDATE_INTERVAL)
+    if WEIGHT_STEP_EVENTS:
+        step_detector = StepDetector()
+    if AUTOZERO:
+        autozero = AutoZero()
+    
+    if METRICS_PORT:
+        try:
+            metrics.serve(METRICS_PORT)
+            log.info(f"Metrics on http://{metrics.METRICS_ADDR}:{METRICS_PORT}/metrics")
+        except OSError as e:
+            log.warning(f"Metrics endpoint unavailable: {e}")
+    
     # Try to connect to backend (but continue even if it fails)
     try:
-        print(f"[Weight Service] Connecting to backend at {BACKEND_URL}...")
+        log.info(f"Connecting to backend at {BACKEND_URL}...")
         lcd.display_message("Connecting...", "Please wait")
         sio.connect(BACKEND_URL)
-        print("[Weight Service] Connected to backend successfully")
+        log.info("Connected to backend successfully")
     except Exception as e:
-        print(f"[Weight Service] Failed to connect to backend: {e}")
-        print("[Weight Service] Continuing in offline mode...")
+        log.warning(f"Failed to connect to backend: {e}")
+        log.warning("Continuing in offline mode...")
         lcd.display_message("SmartKart", "Offline Mode")
         time.sleep(2)
         # Display initial price (0.00) even in offline mode
@@ -160,10 +410,17 @@ def main():
     finally:
         if sio.connected:
             sio.disconnect()
+        stop_sampler()
+        journal.close()
+        governor.close()
+        log.info(f"Idle governor: {format_savings(governor.stats())}")
+        log.info(f"Weight updates: {format_emitter_stats(emitter.stats())}")
+        lcd.set_backlight(True)
         lcd.display_message("SmartKart", "Stopped")
         time.sleep(1)
         lcd_cleanup()
-        print("[Weight Service] Service stopped")
+        log.info("Service stopped")
+        service_log.shutdown()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,600 @@
+#!/usr/bin/env python3
+"""
+Fleet Load Generator for SmartKart
+Simulates many carts at once over asyncio Socket.IO clients to find the
+backend's saturation point
+
+Each simulated cart is its own socket.io connection (like a Pi) and shops
+on an open-loop schedule: shopping actions arrive as a Poisson process at
+--scan-rate per cart, independent of how fast the backend answers. An
+action puts an item in the basket (or takes one out), immediately sends a
+weight_update with the new basket weight, and sends the rfid_scan
+--settle seconds later, like a tag read after the load cell settles. On
+top of that every cart streams a weight_update every --weight-interval.
+
+Latency is measured to the broadcast the backend sends back for the same
+cart (updateCart / weightMismatch / unknownTag / error for scans,
+weightUpdate for weights). It is measured from the *scheduled* send time,
+so a generator or backend that falls behind shows up as latency instead of
+silently sending less (no coordinated omission); the time from the actual
+send is reported as well.
+
+Several --scan-rate values run as consecutive stages on the same
+connections, so one run walks the load up until latency or timeouts blow
+past --slo. Scan timeouts also count scans the backend ignores on purpose
+(cooldown, a removal the weight doesn't confirm), so saturation is judged
+on latency and lost weight updates:
+
+    python3 fleet_load.py --carts 200 --setup
+    python3 fleet_load.py --carts 2000 --processes 4 --scan-rate 1,2,4,8 --duration 60
+    python3 fleet_load.py --carts 500 --json results.json
+
+The backend broadcasts every updateCart/weightUpdate to every connected
+client, so each simulated cart also receives every other cart's events;
+use --processes to spread that decoding over cores. Event loop lag is
+reported per stage - if it is high, the generator (not the backend) was
+the bottleneck.
+"""
+
+import argparse
+import asyncio
+import heapq
+import json
+import multiprocessing
+import random
+import sys
+import time
+from datetime import datetime
+
+import aiohttp
+import socketio
+
+BACKEND_URL = "http://localhost:8001"
+CART_PREFIX = "load-"
+REMOVE_MIN_AGE = 2.0      # Seconds an item stays in before it may be removed (backend cooldown is 1 s)
+LOOP_LAG_INTERVAL = 0.1   # Seconds between event loop lag probes
+SWEEP_INTERVAL = 0.25     # Seconds between timeout sweeps
+
+SCAN_OUTCOMES = {
+    'updateCart': 'accepted',
+    'weightMismatch': 'weight_mismatch',
+    'unknownTag': 'unknown_tag',
+    'error': 'error',
+}
+
+
+def percentile(values, q):
+    """q-th percentile (0-100) of a sorted list, nearest rank"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, max(0, int(round(q / 100 * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def new_stats():
+    return {'sent': 0, 'outcomes': {}, 'latency': [], 'service': [], 'lag_max': 0.0}
+
+
+class ShardLog:
+    """Per-stage event counters and latency samples for one process"""
+
+    def __init__(self, stages):
+        self.stages = [{'rfid_scan': new_stats(), 'weight_update': new_stats(), 'loop_lag': []}
+                       for _ in range(stages)]
+        self.connect_failures = 0
+        self.unmatched = 0
+
+    def sent(self, stage, kind, lag):
+        stats = self.stages[stage][kind]
+        stats['sent'] += 1
+        stats['lag_max'] = max(stats['lag_max'], lag)
+
+    def resolved(self, stage, kind, outcome, intended, sent, now):
+        stats = self.stages[stage][kind]
+        stats['outcomes'][outcome] = stats['outcomes'].get(outcome, 0) + 1
+        if outcome != 'timeout':
+            stats['latency'].append(now - intended)
+            stats['service'].append(now - sent)
+
+
+class Pending:
+    """A sent event waiting for its broadcast"""
+
+    __slots__ = ('stage', 'intended', 'sent', 'tag_id', 'name', 'action', 'weight')
+
+    def __init__(self, stage, intended, sent, tag_id=None, name=None, action=None, weight=0.0):
+        self.stage = stage
+        self.intended = intended
+        self.sent = sent
+        self.tag_id = tag_id
+        self.name = name
+        self.action = action
+        self.weight = weight
+
+
+class SimCart:
+    """One simulated cart: a socket.io client, a basket and its schedule"""
+
+    def __init__(self, cart_id, products, basket, rng, args, log, clock):
+        """
+        Args:
+            cart_id (str): Cart ID registered on the backend
+            products (list): (tagId, name, weight kg) of every tagged product
+            basket (list): (tagId, name, weight kg) already in the cart
+            rng (random.Random): Per-cart random source
+            args: Parsed command line
+            log (ShardLog): Where results go
+            clock (Clock): Shared stage schedule
+        """
+        self.cart_id = cart_id
+        self.products = products
+        self.rng = rng
+        self.args = args
+        self.log = log
+        self.clock = clock
+        self.basket = {tag_id: (name, weight, 0.0) for tag_id, name, weight in basket}
+        self.weight = sum(weight for _, _, weight in basket)
+        self.pending_scans = []
+        self.pending_weights = {}
+        self.sio = socketio.AsyncClient(reconnection=False)
+        for event in SCAN_OUTCOMES:
+            self.sio.on(event, self._scan_handler(event))
+        self.sio.on('weightUpdate', self._on_weight_update)
+
+    # ----- Responses -----
+
+    def _scan_handler(self, event):
+        async def handler(data=None):
+            data = data or {}
+            if event != 'error' and data.get('cartId') != self.cart_id:
+                return  # Broadcast for another cart
+            self._resolve_scan(event, data)
+        return handler
+
+    def _resolve_scan(self, event, data):
+        # Match by tag or product name where the event carries one, so a
+        # response arriving after its scan timed out can't resolve a newer scan
+        if event == 'unknownTag':
+            match = lambda p: p.tag_id == data.get('tagId')
+        elif event == 'updateCart':
+            match = lambda p: p.name == data.get('affectedProduct')
+        elif event == 'weightMismatch':
+            match = lambda p: p.name == data.get('productName')
+        else:
+            match = lambda p: True
+        for index, pending in enumerate(self.pending_scans):
+            if match(pending):
+                del self.pending_scans[index]
+                outcome = SCAN_OUTCOMES[event]
+                self.log.resolved(pending.stage, 'rfid_scan', outcome,
+                                  pending.intended, pending.sent, time.monotonic())
+                if outcome != 'accepted':
+                    self._undo(pending)
+                return
+        self.log.unmatched += 1
+
+    async def _on_weight_update(self, data=None):
+        data = data or {}
+        if data.get('cartId') != self.cart_id:
+            return
+        pending = self.pending_weights.pop(data.get('timestamp'), None)
+        if pending is None:
+            self.log.unmatched += 1
+            return
+        self.log.resolved(pending.stage, 'weight_update', 'ok',
+                          pending.intended, pending.sent, time.monotonic())
+
+    def sweep(self, now, timeout):
+        """Resolve events with no response after `timeout` seconds"""
+        while self.pending_scans and now - self.pending_scans[0].sent > timeout:
+            pending = self.pending_scans.pop(0)
+            self.log.resolved(pending.stage, 'rfid_scan', 'timeout', pending.intended, pending.sent, now)
+            self._undo(pending)
+        for stamp, pending in list(self.pending_weights.items()):
+            if now - pending.sent > timeout:
+                del self.pending_weights[stamp]
+                self.log.resolved(pending.stage, 'weight_update', 'timeout',
+                                  pending.intended, pending.sent, now)
+
+    def _undo(self, pending):
+        # The backend didn't take the change: the shopper undoes it
+        # physically so the basket and the backend cart stay in step
+        if pending.action == 'add' and pending.tag_id in self.basket:
+            del self.basket[pending.tag_id]
+            self.weight -= pending.weight
+        elif pending.action == 'remove' and pending.tag_id not in self.basket:
+            self.basket[pending.tag_id] = (pending.name, pending.weight, time.monotonic())
+            self.weight += pending.weight
+
+    # ----- Sending -----
+
+    async def send_weight(self, intended):
+        stage = self.clock.stage(intended)
+        timestamp = datetime.now().isoformat()
+        now = time.monotonic()
+        self.pending_weights[timestamp] = Pending(stage, intended, now)
+        self.log.sent(stage, 'weight_update', now - intended)
+        await self.sio.emit('weight_update', {
+            'cartId': self.cart_id,
+            'measuredWeight': round(max(self.weight, 0.0), 3),
+            'timestamp': timestamp,
+        })
+
+    def shop(self, now):
+        """
+        Do one shopping action on the basket.
+
+        Returns:
+            Pending: The scan to send after the settle time (not yet sent)
+        """
+        roll = self.rng.random()
+        if roll < self.args.unknown:
+            tag_id = 'FF%08X' % self.rng.getrandbits(32)
+            return Pending(0, 0.0, 0.0, tag_id=tag_id, action='unknown')
+        removable = [tag_id for tag_id, (_, _, added) in self.basket.items() if now - added >= REMOVE_MIN_AGE]
+        if removable and roll < self.args.unknown + self.args.remove:
+            tag_id = self.rng.choice(removable)
+            name, weight, _ = self.basket.pop(tag_id)
+            self.weight -= weight
+            return Pending(0, 0.0, 0.0, tag_id=tag_id, name=name, action='remove', weight=weight)
+        choices = [product for product in self.products if product[0] not in self.basket]
+        if not choices:
+            return None
+        tag_id, name, weight = self.rng.choice(choices)
+        self.basket[tag_id] = (name, weight, now)
+        self.weight += weight
+        return Pending(0, 0.0, 0.0, tag_id=tag_id, name=name, action='add', weight=weight)
+
+    async def send_scan(self, pending, intended):
+        pending.stage = self.clock.stage(intended)
+        pending.intended = intended
+        pending.sent = time.monotonic()
+        self.pending_scans.append(pending)
+        self.log.sent(pending.stage, 'rfid_scan', pending.sent - intended)
+        await self.sio.emit('rfid_scan', {
+            'cartId': self.cart_id,
+            'tagId': pending.tag_id,
+            'timestamp': datetime.now().isoformat(),
+        })
+
+    async def run(self):
+        """Follow the open-loop schedule until the last stage ends"""
+        rng = self.rng
+        clock = self.clock
+        # (time, order, kind, pending): order breaks ties without comparing Pendings
+        schedule = []
+        order = 0
+        first_action = clock.next_arrival(clock.start, rng)
+        if first_action is not None:
+            heapq.heappush(schedule, (first_action, order, 'shop', None))
+        interval = self.args.weight_interval
+        if interval > 0:
+            order += 1
+            heapq.heappush(schedule, (clock.start + rng.uniform(0, interval), order, 'weight', None))
+
+        while schedule:
+            intended, _, kind, pending = heapq.heappop(schedule)
+            if intended >= clock.end:
+                continue
+            delay = intended - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if not self.sio.connected:
+                return
+            order += 1
+            if kind == 'weight':
+                await self.send_weight(intended)
+                heapq.heappush(schedule, (intended + interval, order, 'weight', None))
+            elif kind == 'shop':
+                scan = self.shop(intended)
+                if scan is not None:
+                    # The item lands on the load cell now; the tag is read once it settles
+                    if scan.action != 'unknown':
+                        await self.send_weight(intended)
+                    heapq.heappush(schedule, (intended + self.args.settle, order, 'scan', scan))
+                following = clock.next_arrival(intended, rng)
+                if following is not None:
+                    order += 1
+                    heapq.heappush(schedule, (following, order, 'shop', None))
+            else:
+                await self.send_scan(pending, intended)
+
+
+class Clock:
+    """Stage boundaries and per-stage action rates on the monotonic clock"""
+
+    def __init__(self, start, duration, rates):
+        """
+        Args:
+            start (float): time.monotonic() the first stage begins
+            duration (float): Seconds per stage
+            rates (list): Shopping actions per minute per cart, one per stage
+        """
+        self.start = start
+        self.duration = duration
+        self.rates = rates
+        self.end = start + duration * len(rates)
+
+    def stage(self, t):
+        return min(len(self.rates) - 1, max(0, int((t - self.start) // self.duration)))
+
+    def next_arrival(self, t, rng):
+        """Next Poisson arrival after t, following the stage rate changes"""
+        while t < self.end:
+            stage = self.stage(t)
+            stage_end = self.start + (stage + 1) * self.duration
+            rate = self.rates[stage] / 60.0
+            if rate > 0:
+                arrival = t + rng.expovariate(rate)
+                if arrival < stage_end:
+                    return arrival
+            # Memoryless: no arrival before the stage changes, draw again from there
+            t = stage_end
+        return None
+
+
+async def connect_all(carts, args, connect_rate, log):
+    """Connect carts at up to connect_rate per second; drop the ones that fail"""
+    connected = []
+    interval = 1.0 / connect_rate if connect_rate > 0 else 0.0
+    next_at = time.monotonic()
+
+    async def connect(cart):
+        try:
+            await cart.sio.connect(args.backend, transports=[args.transport])
+            connected.append(cart)
+        except Exception as e:
+            log.connect_failures += 1
+            if log.connect_failures <= 3:
+                print(f"[Fleet Load] {cart.cart_id}: connect failed: {e}")
+
+    tasks = []
+    for cart in carts:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        next_at += interval
+        tasks.append(asyncio.create_task(connect(cart)))
+    await asyncio.gather(*tasks)
+    return connected
+
+
+async def watch_loop_lag(log, clock):
+    """Sample how late the event loop wakes up (generator saturation)"""
+    while time.monotonic() < clock.end:
+        before = time.monotonic()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        now = time.monotonic()
+        if now >= clock.start:
+            log.stages[clock.stage(now)]['loop_lag'].append(now - before - LOOP_LAG_INTERVAL)
+
+
+async def sweep_timeouts(carts, timeout, until):
+    while True:
+        now = time.monotonic()
+        for cart in carts:
+            cart.sweep(now, timeout)
+        if now >= until:
+            return
+        await asyncio.sleep(SWEEP_INTERVAL)
+
+
+async def run_shard_async(shard, cart_ids, products, baskets, args, ready, go, start_wall):
+    rng = random.Random(args.seed * 1000 + shard)
+    rates = parse_rates(args.scan_rate)
+    log = ShardLog(len(rates))
+    # Placeholder clock until the shared start time is known
+    clock = Clock(0.0, args.duration, rates)
+    carts = [SimCart(cart_id, products, baskets.get(cart_id, []), random.Random(rng.random()),
+                     args, log, clock) for cart_id in cart_ids]
+    connected = await connect_all(carts, args, args.connect_rate / args.processes, log)
+    ready.put(shard)
+    await asyncio.get_running_loop().run_in_executor(None, go.wait)
+
+    # Convert the shared wall-clock start into this process's monotonic clock
+    clock.start = time.monotonic() + (start_wall.value - time.time())
+    clock.end = clock.start + args.duration * len(rates)
+    tasks = [asyncio.create_task(cart.run()) for cart in connected]
+    lag = asyncio.create_task(watch_loop_lag(log, clock))
+    sweeper = asyncio.create_task(sweep_timeouts(connected, args.timeout, clock.end + args.timeout))
+    await asyncio.gather(*tasks)
+    await lag
+    await sweeper
+    await asyncio.gather(*(cart.sio.disconnect() for cart in connected), return_exceptions=True)
+    return {'stages': log.stages, 'connected': len(connected),
+            'connect_failures': log.connect_failures, 'unmatched': log.unmatched}
+
+
+def run_shard(shard, cart_ids, products, baskets, args, ready, go, start_wall, results):
+    result = asyncio.run(run_shard_async(shard, cart_ids, products, baskets, args, ready, go, start_wall))
+    results.put(result)
+
+
+async def prepare(args, cart_ids):
+    """
+    Load tagged products and the carts' current contents from the backend.
+
+    Returns:
+        tuple: (products list, {cartId: basket list}, set of unregistered cart IDs)
+    """
+    async with aiohttp.ClientSession() as session:
+        if args.setup:
+            semaphore = asyncio.Semaphore(20)
+
+            async def add_cart(cart_id):
+                async with semaphore:
+                    async with session.post(f"{args.backend}/api/admin/addCart", json={'cartId': cart_id}) as r:
+                        return r.status == 201
+
+            created = await asyncio.gather(*(add_cart(cart_id) for cart_id in cart_ids))
+            print(f"[Fleet Load] Created {sum(created)} carts ({len(cart_ids) - sum(created)} already existed)")
+
+        async with session.get(f"{args.backend}/api/item/") as r:
+            items = await r.json()
+        async with session.get(f"{args.backend}/api/admin/getAllCarts") as r:
+            carts = await r.json()
+
+    products = [(item['rfidTag'], item['name'], float(item.get('weight') or 0.0))
+                for item in items if item.get('rfidTag')]
+    tags = {item['productId']: item['rfidTag'] for item in items if item.get('rfidTag')}
+    wanted = set(cart_ids)
+    baskets = {}
+    for cart in carts:
+        if cart.get('cartId') in wanted:
+            baskets[cart['cartId']] = [(tags[item['productId']], item['name'], float(item.get('weight') or 0.0))
+                                       for item in cart.get('items', []) if item.get('productId') in tags]
+    missing = wanted - {cart.get('cartId') for cart in carts}
+    return products, baskets, missing
+
+
+def parse_rates(text):
+    return [float(rate) for rate in text.split(',') if rate.strip()]
+
+
+def merge(results, stages):
+    merged = [{'rfid_scan': new_stats(), 'weight_update': new_stats(), 'loop_lag': []} for _ in range(stages)]
+    for result in results:
+        for stage, shard_stage in zip(merged, result['stages']):
+            stage['loop_lag'].extend(shard_stage['loop_lag'])
+            for kind in ('rfid_scan', 'weight_update'):
+                into, part = stage[kind], shard_stage[kind]
+                into['sent'] += part['sent']
+                into['latency'].extend(part['latency'])
+                into['service'].extend(part['service'])
+                into['lag_max'] = max(into['lag_max'], part['lag_max'])
+                for outcome, count in part['outcomes'].items():
+                    into['outcomes'][outcome] = into['outcomes'].get(outcome, 0) + count
+    return merged
+
+
+def summarize(stats):
+    latency = sorted(stats['latency'])
+    service = sorted(stats['service'])
+    resolved = sum(stats['outcomes'].values())
+    return {
+        'sent': stats['sent'],
+        'outcomes': stats['outcomes'],
+        'timeout_ratio': stats['outcomes'].get('timeout', 0) / resolved if resolved else 0.0,
+        'latency_ms': {f'p{q:g}': percentile(latency, q) * 1000 for q in (50, 90, 99, 99.9)},
+        'latency_max_ms': (latency[-1] if latency else 0.0) * 1000,
+        'service_ms': {f'p{q:g}': percentile(service, q) * 1000 for q in (50, 99)},
+        'send_lag_max_ms': stats['lag_max'] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Open-loop multi-cart load generator for the SmartKart backend")
+    parser.add_argument('--backend', default=BACKEND_URL)
+    parser.add_argument('--carts', type=int, default=100, help='simulated carts (one connection each)')
+    parser.add_argument('--cart-prefix', default=CART_PREFIX, help='cart IDs are PREFIX0001, PREFIX0002, ...')
+    parser.add_argument('--setup', action='store_true', help='register the load carts on the backend first')
+    parser.add_argument('--scan-rate', default='2',
+                        help='shopping actions per minute per cart; comma-separated values run as stages')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds per stage')
+    parser.add_argument('--weight-interval', type=float, default=1.0,
+                        help='seconds between periodic weight_update events per cart (0 = only on actions)')
+    parser.add_argument('--settle', type=float, default=0.3, help='seconds from weight change to tag read')
+    parser.add_argument('--remove', type=float, default=0.2, help='share of actions that remove an item')
+    parser.add_argument('--unknown', type=float, default=0.02, help='share of actions that scan an unknown tag')
+    parser.add_argument('--timeout', type=float, default=5.0, help='seconds before an event counts as lost')
+    parser.add_argument('--slo', type=float, default=500.0, help='p99 scan latency target in ms')
+    parser.add_argument('--processes', type=int, default=1, help='worker processes to spread carts over')
+    parser.add_argument('--connect-rate', type=float, default=100.0, help='new connections per second')
+    parser.add_argument('--transport', default='websocket', choices=['websocket', 'polling'])
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args()
+
+    rates = parse_rates(args.scan_rate)
+    cart_ids = [f"{args.cart_prefix}{index:04d}" for index in range(1, args.carts + 1)]
+
+    print("=" * 60)
+    print("SmartKart Fleet Load Generator")
+    print("=" * 60)
+    print(f"Backend: {args.backend}, carts: {args.carts} over {args.processes} process(es)")
+    products, baskets, missing = asyncio.run(prepare(args, cart_ids))
+    if not products:
+        print("No products with an RFID tag on the backend - register tags first")
+        return 1
+    if missing:
+        print(f"{len(missing)} carts are not registered on the backend (use --setup); their scans will error")
+    print(f"Products with tags: {len(products)}")
+
+    ready = multiprocessing.Queue()
+    results = multiprocessing.Queue()
+    go = multiprocessing.Event()
+    start_wall = multiprocessing.Value('d', 0.0)
+    workers = []
+    for shard in range(args.processes):
+        shard_ids = cart_ids[shard::args.processes]
+        worker = multiprocessing.Process(
+            target=run_shard,
+            args=(shard, shard_ids, products, {c: baskets.get(c, []) for c in shard_ids},
+                  args, ready, go, start_wall, results))
+        worker.start()
+        workers.append(worker)
+    for _ in workers:
+        ready.get()
+
+    start_wall.value = time.time() + 1.0
+    go.set()
+    total = args.duration * len(rates)
+    print(f"All carts connected; running {len(rates)} stage(s) of {args.duration:g}s ({total:g}s)")
+    shard_results = [results.get() for _ in workers]
+    for worker in workers:
+        worker.join()
+
+    connected = sum(result['connected'] for result in shard_results)
+    failures = sum(result['connect_failures'] for result in shard_results)
+    unmatched = sum(result['unmatched'] for result in shard_results)
+    stages = merge(shard_results, len(rates))
+
+    report = {'carts': connected, 'connect_failures': failures, 'unmatched': unmatched, 'stages': []}
+    saturated = None
+    print(f"\nConnected: {connected}, connect failures: {failures}, unmatched responses: {unmatched}")
+    for index, (rate, stage) in enumerate(zip(rates, stages)):
+        scans = summarize(stage['rfid_scan'])
+        weights = summarize(stage['weight_update'])
+        loop_lag = sorted(stage['loop_lag'])
+        entry = {
+            'scan_rate_per_cart_min': rate,
+            'target_scans_per_sec': connected * rate / 60,
+            'rfid_scan': scans,
+            'weight_update': weights,
+            'loop_lag_p99_ms': percentile(loop_lag, 99) * 1000,
+        }
+        report['stages'].append(entry)
+        # Scan timeouts include removals the backend ignores on purpose, so
+        # only lost weight updates count towards saturation
+        over = scans['latency_ms']['p99'] > args.slo or weights['timeout_ratio'] > 0.01
+        if over and saturated is None:
+            saturated = index
+
+        print(f"\nStage {index + 1}: {rate:g} actions/min/cart -> {entry['target_scans_per_sec']:.1f} scans/s, "
+              f"{scans['sent'] / args.duration:.1f} scans/s + {weights['sent'] / args.duration:.1f} weights/s sent")
+        print(f"  {'event':14s} {'sent':>7} {'p50':>7} {'p90':>7} {'p99':>7} {'p99.9':>7} {'max':>7}  (ms)")
+        for kind, summary in (('rfid_scan', scans), ('weight_update', weights)):
+            latency = summary['latency_ms']
+            print(f"  {kind:14s} {summary['sent']:7d} {latency['p50']:7.0f} {latency['p90']:7.0f} "
+                  f"{latency['p99']:7.0f} {latency['p99.9']:7.0f} {summary['latency_max_ms']:7.0f}")
+            print(f"  {'':14s} outcomes: " + ', '.join(f"{k}={v}" for k, v in sorted(summary['outcomes'].items())))
+        print(f"  generator loop lag p99: {entry['loop_lag_p99_ms']:.1f} ms"
+              + ("  (generator overloaded - add --processes)" if entry['loop_lag_p99_ms'] > 50 else ""))
+
+    print()
+    if saturated is None:
+        print(f"No stage exceeded the SLO (p99 scan latency {args.slo:g} ms, 1% weight updates lost)")
+    else:
+        print(f"Saturated at stage {saturated + 1} ({rates[saturated]:g} actions/min/cart, "
+              f"{report['stages'][saturated]['target_scans_per_sec']:.1f} scans/s)")
+    report['saturated_stage'] = None if saturated is None else saturated + 1
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.json}")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())